@@ -220,6 +220,7 @@ END $$;
 -- Create indexes if they don't exist
 CREATE INDEX IF NOT EXISTS idx_files_enriched_agent_id ON files_enriched(agent_id);
 CREATE INDEX IF NOT EXISTS idx_files_enriched_hashes ON files_enriched USING GIN (hashes);
+CREATE INDEX IF NOT EXISTS idx_transforms_transform_object_id ON transforms(transform_object_id);
 CREATE INDEX IF NOT EXISTS idx_files_enriched_path_trgm ON files_enriched USING gist (path gist_trgm_ops);
 CREATE INDEX IF NOT EXISTS idx_findings_data_gin ON findings USING GIN (data);
 CREATE INDEX IF NOT EXISTS idx_files_view_history_username ON files_view_history(username);
@@ -348,6 +349,38 @@ CREATE TABLE IF NOT EXISTS yara_rules (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Compiled (serialized yara-x) rule sets keyed by the hash of the enabled rules, shared by the file_enrichment replicas
+CREATE TABLE IF NOT EXISTS yara_ruleset_artifacts (
+    ruleset_hash TEXT PRIMARY KEY,
+    artifact BYTEA NOT NULL,
+    rule_names TEXT[] NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+
+-----------------------
+-- Registry Hives
+-----------------------
+-- SYSTEM/SAM/SECURITY hives by source, type and normalized (lowercase, forward slash) path,
+--  used by the registry_hive and dpapi_masterkey modules to find a hive's companion hives
+-- derived_secrets holds what decrypting SAM/SECURITY needs from a SYSTEM hive (bootkey,
+--  machine name, service accounts), so the SYSTEM hive is parsed once per source
+CREATE TABLE IF NOT EXISTS registry_hive_artifacts (
+    source TEXT NOT NULL,
+    hive_type VARCHAR(16) NOT NULL,
+    normalized_path TEXT NOT NULL,
+    path TEXT NOT NULL,
+    object_id UUID NOT NULL,
+    derived_secrets JSONB,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (source, hive_type, normalized_path),
+    FOREIGN KEY (object_id) REFERENCES files_enriched(object_id) ON DELETE CASCADE
+);
+
+-- Latest hive of a type for a source, for hives that aren't at the standard Windows/System32/Config path
+CREATE INDEX IF NOT EXISTS idx_registry_hive_artifacts_latest ON registry_hive_artifacts(source, hive_type, updated_at DESC);
+
 
 -----------------------
 -- Agent Prompts
@@ -391,6 +424,12 @@ CREATE TABLE IF NOT EXISTS file_linkings (
     link_type VARCHAR(255),  -- Optional: to specify the type of relationship
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    -- Lowercased literal directory prefix of a file_path_2 containing placeholders (e.g. <WINDOWS_USERNAME>), NULL otherwise
+    placeholder_prefix TEXT GENERATED ALWAYS AS (
+        CASE WHEN strpos(file_path_2, '<') > 0 AND strpos(file_path_2, '>') > 0
+            THEN LOWER(COALESCE(substring(file_path_2 from '^[^<]*/'), ''))
+        END
+    ) STORED,
     UNIQUE(source, file_path_1, file_path_2)
 );
 
@@ -398,6 +437,8 @@ CREATE TABLE IF NOT EXISTS file_linkings (
 CREATE INDEX IF NOT EXISTS idx_file_linkings_file_1 ON file_linkings(file_path_1);
 CREATE INDEX IF NOT EXISTS idx_file_linkings_file_2 ON file_linkings(file_path_2);
 CREATE INDEX IF NOT EXISTS idx_file_linkings_source ON file_linkings(source);
+-- Placeholder index: the unresolved placeholder paths a real path can match, by literal prefix
+CREATE INDEX IF NOT EXISTS idx_file_linkings_placeholder_prefix ON file_linkings(source, placeholder_prefix) WHERE placeholder_prefix IS NOT NULL;
 
 
 -----------------------
@@ -412,6 +453,12 @@ CREATE TABLE IF NOT EXISTS file_listings (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     path_lower TEXT GENERATED ALWAYS AS (LOWER(path)) STORED,
+    -- Lowercased literal directory prefix of a path containing placeholders (e.g. <WINDOWS_USERNAME>), NULL otherwise
+    placeholder_prefix TEXT GENERATED ALWAYS AS (
+        CASE WHEN strpos(path, '<') > 0 AND strpos(path, '>') > 0
+            THEN LOWER(COALESCE(substring(path from '^[^<]*/'), ''))
+        END
+    ) STORED,
     UNIQUE(source, path_lower),
     FOREIGN KEY (object_id) REFERENCES files_enriched(object_id) ON DELETE CASCADE
 );
@@ -424,6 +471,10 @@ CREATE INDEX IF NOT EXISTS idx_file_listings_object_id ON file_listings(object_i
 CREATE INDEX IF NOT EXISTS idx_file_listings_source_path ON file_listings(source, path);
 -- Create trigram index for path pattern matching
 CREATE INDEX IF NOT EXISTS idx_file_listings_path_trgm ON file_listings USING gist (path gist_trgm_ops);
+-- Placeholder index: the unresolved placeholder paths a real path can match, by literal prefix
+CREATE INDEX IF NOT EXISTS idx_file_listings_placeholder_prefix ON file_listings(source, placeholder_prefix) WHERE placeholder_prefix IS NOT NULL;
+-- Prefix lookups of collected files for backward placeholder resolution
+CREATE INDEX IF NOT EXISTS idx_file_listings_collected_path_lower ON file_listings(source, path_lower text_pattern_ops) WHERE status = 'collected';
 
 -- Helper functions for file browser hierarchical navigation
 CREATE OR REPLACE FUNCTION get_path_depth(file_path text)
@@ -592,6 +643,11 @@ CREATE OR REPLACE TRIGGER update_file_listings_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
+CREATE OR REPLACE TRIGGER update_registry_hive_artifacts_updated_at
+    BEFORE UPDATE ON registry_hive_artifacts
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
 
 -----------------------
 -- Workflow tracking
@@ -605,6 +661,7 @@ CREATE TABLE IF NOT EXISTS workflows (
     status TEXT NOT NULL CHECK (status IN ('SCHEDULED', 'RUNNING', 'COMPLETED', 'FAILED', 'TIMEOUT')),
     runtime_seconds REAL,
     start_time TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    deadline TIMESTAMP WITH TIME ZONE,
     is_purged BOOLEAN NOT NULL DEFAULT false
 );
 
@@ -612,10 +669,14 @@ CREATE TABLE IF NOT EXISTS workflows (
 -- Partial index: only indexes active workflows to reduce size and write overhead
 CREATE INDEX IF NOT EXISTS idx_workflows_object_id_active ON workflows(object_id) WHERE status IN ('SCHEDULED', 'RUNNING');
 
+-- Used by workflow timeouts (timeout_wheel.py) to find running workflows past their deadline
+-- Partial index: only running workflows, so the sweep stays cheap as the table grows
+CREATE INDEX IF NOT EXISTS idx_workflows_running_deadline ON workflows(deadline) WHERE status = 'RUNNING';
+
 -- Index for workflow purger queries (workflow_purger.py)
--- Optimizes queries that find non-scheduled workflows needing purge verification
--- Partial index: only indexes non-scheduled workflows to minimize size and write overhead
-CREATE INDEX IF NOT EXISTS idx_workflows_purge_candidates ON workflows(status, is_purged, start_time) WHERE status != 'SCHEDULED';
+-- Keyset pagination on (start_time, wf_id) per workflow name (the wf_id prefix before the first '.')
+-- Partial index: purged rows leave the index, so its size tracks the purge backlog rather than the table
+CREATE INDEX IF NOT EXISTS idx_workflows_purge_queue ON workflows(split_part(wf_id, '.', 1), start_time, wf_id) WHERE is_purged = false AND status != 'SCHEDULED';
 
 
 -----------------------
@@ -673,9 +734,19 @@ CREATE TABLE IF NOT EXISTS container_processing (
     workflows_completed INTEGER DEFAULT 0,
     workflows_failed INTEGER DEFAULT 0,
     workflows_total INTEGER DEFAULT 0,
-    total_bytes_processed BIGINT DEFAULT 0
+    total_bytes_processed BIGINT DEFAULT 0,
+    extraction_completed_at TIMESTAMP WITH TIME ZONE,
+    -- Background container jobs: staged upload, metadata and host of the web-api instance that runs the job
+    staged_path TEXT,
+    job_metadata JSONB,
+    job_host VARCHAR(255),
+    -- Number of leading container members already published, an interrupted job resumes from here
+    checkpoint_files INTEGER DEFAULT 0
 );
 
+CREATE INDEX IF NOT EXISTS idx_container_processing_queued ON container_processing (submitted_at)
+    WHERE status = 'submitted';
+
 
 -- Create phoenix database
 CREATE DATABASE phoenix;
@@ -841,6 +912,12 @@ CREATE TABLE IF NOT EXISTS chromium.cookies (
     UNIQUE (source, username, browser, host_key, name, path)
 );
 
+-- Indexes for retrying the decryption of cookies/logins when new keys become available
+CREATE INDEX IF NOT EXISTS idx_logins_retry_state_key ON chromium.logins(source, username, browser, state_key_id) WHERE is_decrypted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_logins_retry_masterkey_guid ON chromium.logins(masterkey_guid) WHERE is_decrypted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_cookies_retry_state_key ON chromium.cookies(source, username, browser, state_key_id) WHERE is_decrypted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_cookies_retry_masterkey_guid ON chromium.cookies(masterkey_guid) WHERE is_decrypted = FALSE;
+
 -- DPAPI tables
 CREATE SCHEMA dpapi;
 
@@ -853,10 +930,15 @@ CREATE TABLE IF NOT EXISTS dpapi.masterkeys (
     plaintext_key_sha1 BYTEA,
     backup_key_guid TEXT,
     masterkey_type TEXT DEFAULT 'unknown',
+    user_sid TEXT,                                      -- SID of the account the masterkey belongs to, from its Protect/<SID> directory
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Indexes for finding the encrypted masterkeys a new backup key or user credential can decrypt
+CREATE INDEX IF NOT EXISTS idx_masterkeys_encrypted_backup_key_guid ON dpapi.masterkeys(backup_key_guid) WHERE plaintext_key_sha1 IS NULL;
+CREATE INDEX IF NOT EXISTS idx_masterkeys_encrypted_user_sid ON dpapi.masterkeys(user_sid) WHERE plaintext_key_sha1 IS NULL;
+
 CREATE TABLE IF NOT EXISTS dpapi.domain_backup_keys (
     id SERIAL PRIMARY KEY,
     guid TEXT UNIQUE NOT NULL,
@@ -875,6 +957,15 @@ CREATE TABLE IF NOT EXISTS dpapi.system_credentials (
     UNIQUE (user_key, machine_key)
 );
 
+-- Masterkeys a credential failed to decrypt, so resubmitting it skips them.
+-- The credential is identified by a SHA256 fingerprint of its derived encryption keys.
+CREATE TABLE IF NOT EXISTS dpapi.masterkey_attempts (
+    credential_fingerprint TEXT NOT NULL,
+    masterkey_guid TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (credential_fingerprint, masterkey_guid)
+);
+
 -- Create triggers for DPAPI tables
 CREATE OR REPLACE TRIGGER update_dpapi_masterkeys_updated_at
     BEFORE UPDATE ON dpapi.masterkeys
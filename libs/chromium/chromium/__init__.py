@@ -16,9 +16,10 @@ from .local_state import (
     retry_decrypt_state_keys_for_masterkey,
 )
 from .logins import process_chromium_logins
-from .retry import retry_decrypt_chromium_data
+from .retry import ChromiumRetryScheduler, retry_decrypt_chromium_data
 
 __all__ = [
+    "ChromiumRetryScheduler",
     "convert_chromium_timestamp",
     "get_all_state_keys_from_source",
     "get_state_key_bytes",
@@ -1,23 +1,20 @@
 """Chromium Cookies file parsing and database operations."""
 
-import sqlite3
+import asyncio
 
 import asyncpg
 from common.logger import get_logger
 from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
-from nemesis_dpapi import Blob, DpapiManager
+from nemesis_dpapi import DpapiManager
 
 from .helpers import (
     convert_chromium_timestamp,
-    decrypt_chrome_string,
     detect_encryption_type,
-    get_state_key_bytes,
-    get_state_key_id,
     is_sqlite3,
     parse_chromium_file_path,
-    try_decrypt_with_all_keys,
 )
+from .importer import StateKeys, copy_upsert, decrypt_dpapi_values, fetch_batches, strip_cookie_offsets
 
 logger = get_logger(__name__)
 
@@ -75,6 +72,39 @@ def _translate_samesite(samesite_int: int) -> str:
     return samesite_map.get(samesite_int, "Unknown")
 
 
+COOKIE_COLUMNS = [
+    "originating_object_id",
+    "agent_id",
+    "source",
+    "project",
+    "username",
+    "browser",
+    "host_key",
+    "name",
+    "path",
+    "creation_utc",
+    "expires_utc",
+    "last_access_utc",
+    "last_update_utc",
+    "is_secure",
+    "is_httponly",
+    "is_persistent",
+    "samesite",
+    "source_port",
+    "encryption_type",
+    "masterkey_guid",
+    "state_key_id",
+    "is_decrypted",
+    "value_enc",
+    "value_dec",
+]
+COOKIE_CONFLICT_COLUMNS = ["source", "username", "browser", "host_key", "name", "path"]
+
+
+def _decrypt_state_key_values(state_keys: StateKeys, values: list[tuple[bytes, str]]) -> list[tuple[str | None, int]]:
+    return [state_keys.decrypt(value, encryption_type, strip_cookie_offsets) for value, encryption_type in values]
+
+
 async def _insert_cookies(
     file_enriched,
     username: str | None,
@@ -86,193 +116,101 @@ async def _insert_cookies(
     """Extract cookies from Cookies database and insert into chromium.cookies table."""
     assert asyncpg_pool is not None, "asyncpg_pool is required"
     try:
-        # Read from SQLite
-        with sqlite3.connect(db_path) as conn:
-            conn.text_factory = bytes  # Get raw bytes, we'll handle text decoding manually
-            cursor = conn.cursor()
+        state_keys = await StateKeys.load(file_enriched.source, username, browser, asyncpg_pool)
+        count = 0
 
-            # Query cookies table
-            cursor.execute("""
+        async for rows in fetch_batches(
+            db_path,
+            """
                 SELECT host_key, name, path, creation_utc, expires_utc, last_access_utc,
                        last_update_utc, is_secure, is_httponly, is_persistent, samesite,
                        source_port, encrypted_value
                 FROM cookies
-            """)
-            rows = cursor.fetchall()
-
-        if not rows:
-            return
-
-        # Prepare data for PostgreSQL
-        cookies_data = []
-        for row in rows:
-            (
-                host_key,
-                name,
-                path,
-                creation_utc,
-                expires_utc,
-                last_access_utc,
-                last_update_utc,
-                is_secure,
-                is_httponly,
-                is_persistent,
-                samesite,
-                source_port,
-                encrypted_value,
-            ) = row
-
-            # Decode text fields from bytes (since we set text_factory = bytes)
-            host_key = host_key.decode("utf-8", errors="replace") if host_key else None
-            name = name.decode("utf-8", errors="replace") if name else None
-            path = path.decode("utf-8", errors="replace") if path else None
-
-            # encrypted_value is already binary (what we want)
-
-            if encrypted_value is None:
-                encrypted_value = b""
-
+            """,
+        ):
             # Detect encryption type and get masterkey GUID (if applicable)
-            encryption_type, masterkey_guid = detect_encryption_type(encrypted_value)
-            is_decrypted = False
-            value_dec = None
-            if masterkey_guid and dpapi_manager:
-                try:
-                    value_dec_bytes = await dpapi_manager.decrypt_blob(Blob.from_bytes(encrypted_value))
-                    if value_dec_bytes:
-                        value_dec = value_dec_bytes.decode("utf-8", errors="replace")
-                        is_decrypted = True
-                except Exception:
-                    pass
-
-            # Get state key ID for key/abe encryption
-            state_key_id = None
-            if encryption_type in ["key", "abe"]:
-                # Try primary approach: get state key based on username/browser
-                if username:  # Only try primary approach if username was extracted
-                    state_key_id = await get_state_key_id(file_enriched.source, username, browser, asyncpg_pool)
-                    if state_key_id:
-                        # Retrieve the pre-processed state key for decryption
-                        state_key_bytes = await get_state_key_bytes(state_key_id, encryption_type, asyncpg_pool)
-                        if state_key_bytes:
-                            try:
-                                value_dec_bytes = decrypt_chrome_string(
-                                    encrypted_value, state_key_bytes, encryption_type
-                                )
-                                if value_dec_bytes:
-                                    # For cookies, may need to strip offset bytes depending on version
-                                    if encryption_type == "abe" and len(value_dec_bytes) > 32:
-                                        # v20 cookies typically have 32-byte offset
-                                        value_dec_bytes = value_dec_bytes[32:]
-                                    elif encryption_type == "key" and len(value_dec_bytes) > 48:
-                                        # v10/v11 cookies may have 32-byte prefix + 16-byte suffix
-                                        value_dec_bytes = value_dec_bytes[32:-16]
-                                    elif encryption_type == "key" and len(value_dec_bytes) > 16:
-                                        # Or just 16-byte suffix
-                                        value_dec_bytes = value_dec_bytes[:-16]
-
-                                    value_dec = value_dec_bytes.decode("utf-8", errors="replace")
-                                    is_decrypted = True
-                            except Exception as e:
-                                logger.warning(
-                                    "Failed to decrypt cookie with state key",
-                                    state_key_id=state_key_id,
-                                    encryption_type=encryption_type,
-                                    error=str(e),
-                                )
-
-                # Backup approach: try all state keys from the same source if primary failed
-                if not is_decrypted:
-                    logger.debug(
-                        "Primary decryption failed, trying backup approach with all keys from source",
-                        source=file_enriched.source,
-                        encryption_type=encryption_type,
-                    )
-                    backup_decrypted_bytes, backup_state_key_id = await try_decrypt_with_all_keys(
-                        encrypted_value, file_enriched.source, encryption_type, asyncpg_pool
+            encrypted_values = [row[12] or b"" for row in rows]
+            encryption = [detect_encryption_type(value) for value in encrypted_values]
+
+            dpapi_indexes = [i for i, (_, masterkey_guid) in enumerate(encryption) if masterkey_guid]
+            key_indexes = [i for i, (encryption_type, _) in enumerate(encryption) if encryption_type in ["key", "abe"]]
+
+            values_dec: list[str | None] = [None] * len(rows)
+            state_key_ids: list[int | None] = [None] * len(rows)
+
+            dpapi_values = await decrypt_dpapi_values(dpapi_manager, [encrypted_values[i] for i in dpapi_indexes])
+            for i, value_dec in zip(dpapi_indexes, dpapi_values, strict=True):
+                values_dec[i] = value_dec
+
+            key_values = await asyncio.to_thread(
+                _decrypt_state_key_values,
+                state_keys,
+                [(encrypted_values[i], encryption[i][0]) for i in key_indexes],
+            )
+            for i, (value_dec, state_key_id) in zip(key_indexes, key_values, strict=True):
+                values_dec[i] = value_dec
+                state_key_ids[i] = state_key_id
+
+            cookies_data = []
+            for i, row in enumerate(rows):
+                (
+                    host_key,
+                    name,
+                    path,
+                    creation_utc,
+                    expires_utc,
+                    last_access_utc,
+                    last_update_utc,
+                    is_secure,
+                    is_httponly,
+                    is_persistent,
+                    samesite,
+                    source_port,
+                    _,
+                ) = row
+                encryption_type, masterkey_guid = encryption[i]
+
+                # Decode text fields from bytes (since we set text_factory = bytes)
+                cookies_data.append(
+                    (
+                        file_enriched.object_id,
+                        file_enriched.agent_id,
+                        file_enriched.source,
+                        file_enriched.project,
+                        username,
+                        browser,
+                        host_key.decode("utf-8", errors="replace") if host_key else None,
+                        name.decode("utf-8", errors="replace") if name else None,
+                        path.decode("utf-8", errors="replace") if path else None,
+                        convert_chromium_timestamp(creation_utc),
+                        convert_chromium_timestamp(expires_utc),
+                        convert_chromium_timestamp(last_access_utc),
+                        convert_chromium_timestamp(last_update_utc),
+                        bool(is_secure),
+                        bool(is_httponly),
+                        bool(is_persistent),
+                        _translate_samesite(samesite) if samesite is not None else "Unknown",
+                        source_port,
+                        encryption_type,
+                        masterkey_guid,
+                        state_key_ids[i],
+                        values_dec[i] is not None,
+                        encrypted_values[i],
+                        values_dec[i],
                     )
-                    if backup_decrypted_bytes and backup_state_key_id:
-                        # Apply the same offset handling as above
-                        if encryption_type == "abe" and len(backup_decrypted_bytes) > 32:
-                            # v20 cookies typically have 32-byte offset
-                            backup_decrypted_bytes = backup_decrypted_bytes[32:]
-                        elif encryption_type == "key" and len(backup_decrypted_bytes) > 48:
-                            # v10/v11 cookies may have 32-byte prefix + 16-byte suffix
-                            backup_decrypted_bytes = backup_decrypted_bytes[32:-16]
-                        elif encryption_type == "key" and len(backup_decrypted_bytes) > 16:
-                            # Or just 16-byte suffix
-                            backup_decrypted_bytes = backup_decrypted_bytes[:-16]
-
-                        value_dec = backup_decrypted_bytes.decode("utf-8", errors="replace")
-                        is_decrypted = True
-                        state_key_id = backup_state_key_id
-                        logger.debug(
-                            "Successfully decrypted cookie using backup approach", state_key_id=backup_state_key_id
-                        )
-
-            cookie_data_tuple = (
-                file_enriched.object_id,
-                file_enriched.agent_id,
-                file_enriched.source,
-                file_enriched.project,
-                username,
-                browser,
-                host_key,
-                name,
-                path,
-                convert_chromium_timestamp(creation_utc),
-                convert_chromium_timestamp(expires_utc),
-                convert_chromium_timestamp(last_access_utc),
-                convert_chromium_timestamp(last_update_utc),
-                bool(is_secure),
-                bool(is_httponly),
-                bool(is_persistent),
-                _translate_samesite(samesite) if samesite is not None else "Unknown",
-                source_port,
-                encryption_type,
-                masterkey_guid,
-                state_key_id,
-                is_decrypted,
-                encrypted_value,
-                value_dec,
+                )
+
+            await copy_upsert(
+                asyncpg_pool,
+                "chromium.cookies",
+                COOKIE_COLUMNS,
+                COOKIE_CONFLICT_COLUMNS,
+                COOKIE_COLUMNS[6:],
+                cookies_data,
             )
-            cookies_data.append(cookie_data_tuple)
-
-        # Insert into PostgreSQL using asyncpg
-        async with asyncpg_pool.acquire() as conn:
-            insert_sql = """
-                INSERT INTO chromium.cookies
-                (originating_object_id, agent_id, source, project, username, browser,
-                 host_key, name, path, creation_utc, expires_utc, last_access_utc,
-                 last_update_utc, is_secure, is_httponly, is_persistent, samesite,
-                 source_port, encryption_type, masterkey_guid, state_key_id,
-                 is_decrypted, value_enc, value_dec)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19, $20, $21, $22, $23, $24)
-                ON CONFLICT (source, username, browser, host_key, name, path)
-                DO UPDATE SET
-                    host_key = EXCLUDED.host_key,
-                    name = EXCLUDED.name,
-                    path = EXCLUDED.path,
-                    creation_utc = EXCLUDED.creation_utc,
-                    expires_utc = EXCLUDED.expires_utc,
-                    last_access_utc = EXCLUDED.last_access_utc,
-                    last_update_utc = EXCLUDED.last_update_utc,
-                    is_secure = EXCLUDED.is_secure,
-                    is_httponly = EXCLUDED.is_httponly,
-                    is_persistent = EXCLUDED.is_persistent,
-                    samesite = EXCLUDED.samesite,
-                    source_port = EXCLUDED.source_port,
-                    encryption_type = EXCLUDED.encryption_type,
-                    masterkey_guid = EXCLUDED.masterkey_guid,
-                    state_key_id = EXCLUDED.state_key_id,
-                    is_decrypted = EXCLUDED.is_decrypted,
-                    value_enc = EXCLUDED.value_enc,
-                    value_dec = EXCLUDED.value_dec
-            """
-
-            await conn.executemany(insert_sql, cookies_data)
+            count += len(cookies_data)
 
-        logger.info("Inserted cookies into database", count=len(cookies_data))
+        logger.info("Inserted cookies into database", count=count)
 
     except Exception:
         logger.exception(
@@ -0,0 +1,177 @@
+"""Batched import of Chromium SQLite tables into Postgres.
+
+Cookies and Login Data files can hold tens of thousands of rows that all share the
+same source, username and browser. Instead of resolving keys row by row, the import
+loads the decrypted state keys of the source once, decrypts DPAPI values a batch at a
+time (one masterkey lookup per GUID through DpapiManager.decrypt_blobs) and runs the
+AES-GCM decryption of a batch in a worker thread. Rows are streamed out of SQLite
+with fetchmany(), and each batch is COPY'd into a temporary table that is merged
+into the target table with a single upsert.
+"""
+
+import os
+import sqlite3
+from collections.abc import AsyncIterator, Callable, Sequence
+from dataclasses import dataclass
+
+import asyncpg
+from common.logger import get_logger
+from nemesis_dpapi import Blob, DpapiManager
+
+from .helpers import decrypt_chrome_string, get_all_state_keys_from_source, is_valid_text
+
+logger = get_logger(__name__)
+
+CHROMIUM_IMPORT_BATCH_SIZE = int(os.getenv("CHROMIUM_IMPORT_BATCH_SIZE", 5000))
+
+
+def strip_cookie_offsets(decrypted: bytes, encryption_type: str) -> bytes:
+    """Strip the prefix/suffix bytes Chromium adds around decrypted cookie values."""
+    if encryption_type == "abe" and len(decrypted) > 32:
+        # v20 cookies typically have 32-byte offset
+        return decrypted[32:]
+    elif encryption_type == "key" and len(decrypted) > 48:
+        # v10/v11 cookies may have 32-byte prefix + 16-byte suffix
+        return decrypted[32:-16]
+    elif encryption_type == "key" and len(decrypted) > 16:
+        # Or just 16-byte suffix
+        return decrypted[:-16]
+    return decrypted
+
+
+def strip_password_offsets(decrypted: bytes, encryption_type: str) -> bytes:
+    """Strip the prefix/suffix bytes Chromium adds around decrypted passwords."""
+    if encryption_type == "key" and len(decrypted) > 32:
+        # v10/v11 passwords may have 32-byte prefix + 16-byte suffix
+        return decrypted[32:-16]
+    elif encryption_type == "key" and len(decrypted) > 16:
+        # Or just 16-byte suffix
+        return decrypted[:-16]
+    # v20 passwords typically don't have offset like cookies
+    return decrypted
+
+
+@dataclass
+class StateKeys:
+    """Decrypted state keys of a source, loaded once per imported file."""
+
+    primary_id: int | None
+    keys: list[dict]
+
+    @classmethod
+    async def load(cls, source: str, username: str | None, browser: str, asyncpg_pool: asyncpg.Pool) -> "StateKeys":
+        keys = sorted(await get_all_state_keys_from_source(source, asyncpg_pool), key=lambda key: key["id"])
+        primary_id = None
+        if username:
+            primary_id = next(
+                (key["id"] for key in keys if key["username"] == username and key["browser"] == browser), None
+            )
+        return cls(primary_id, keys)
+
+    def key_bytes(self, state_key: dict, encryption_type: str) -> bytes | None:
+        return state_key["key_bytes_dec"] if encryption_type == "key" else state_key["app_bound_key_dec"]
+
+    def decrypt(
+        self, encrypted_value: bytes, encryption_type: str, strip_offsets: Callable[[bytes, str], bytes]
+    ) -> tuple[str | None, int | None]:
+        """
+        Decrypt a key/abe encrypted value.
+
+        The state key of the file's username/browser is tried first. If it fails, every
+        state key of the source is tried and the first that yields valid text wins.
+
+        Returns:
+            Tuple of (decrypted_value, state_key_id)
+        """
+        state_key_id = self.primary_id
+        primary = next((key for key in self.keys if key["id"] == self.primary_id), None)
+        if primary and (key_bytes := self.key_bytes(primary, encryption_type)):
+            try:
+                decrypted = decrypt_chrome_string(encrypted_value, key_bytes, encryption_type)
+                if decrypted:
+                    return strip_offsets(decrypted, encryption_type).decode("utf-8", errors="replace"), state_key_id
+            except Exception as e:
+                logger.debug(
+                    "Failed to decrypt value with state key",
+                    state_key_id=state_key_id,
+                    encryption_type=encryption_type,
+                    error=str(e),
+                )
+
+        # Backup approach: try all state keys from the same source
+        for state_key in self.keys:
+            key_bytes = self.key_bytes(state_key, encryption_type)
+            if not key_bytes:
+                continue
+            try:
+                decrypted = decrypt_chrome_string(encrypted_value, key_bytes, encryption_type)
+            except Exception:
+                continue
+            if decrypted and is_valid_text(value := strip_cookie_offsets(decrypted, encryption_type)):
+                return value.decode("utf-8", errors="replace"), state_key["id"]
+
+        return None, state_key_id
+
+
+async def decrypt_dpapi_values(
+    dpapi_manager: DpapiManager | None, encrypted_values: Sequence[bytes]
+) -> list[str | None]:
+    """Decrypt DPAPI encrypted values, one masterkey lookup per distinct GUID."""
+    if not dpapi_manager or not encrypted_values:
+        return [None] * len(encrypted_values)
+
+    results = await dpapi_manager.decrypt_blobs([Blob.from_bytes(value) for value in encrypted_values])
+    return [
+        result.decode("utf-8", errors="replace") if isinstance(result, bytes) and result else None for result in results
+    ]
+
+
+async def fetch_batches(db_path: str, query: str, batch_size: int = CHROMIUM_IMPORT_BATCH_SIZE) -> AsyncIterator[list]:
+    """Stream the rows of a SQLite query in batches."""
+    with sqlite3.connect(db_path) as conn:
+        conn.text_factory = bytes  # Get raw bytes, text decoding is handled by the caller
+        cursor = conn.execute(query)
+        while rows := cursor.fetchmany(batch_size):
+            yield rows
+
+
+async def copy_upsert(
+    asyncpg_pool: asyncpg.Pool,
+    table: str,
+    columns: Sequence[str],
+    conflict_columns: Sequence[str],
+    update_columns: Sequence[str],
+    rows: Sequence[tuple],
+) -> None:
+    """COPY rows into a staging table and upsert them into `table` in one statement."""
+    staging_table = f"import_{table.replace('.', '_')}"
+    column_list = ", ".join(columns)
+    # The last row of a conflict key wins, like consecutive upserts would. Rows with a NULL in
+    # the key never conflict (NULLs are distinct in unique constraints), so they stay separate.
+    any_null = " OR ".join(f"{column} IS NULL" for column in conflict_columns)
+    distinct = ", ".join([*conflict_columns, f"CASE WHEN {any_null} THEN import_seq END"])
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in update_columns)
+
+    async with asyncpg_pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute(
+                f"""
+                CREATE TEMP TABLE {staging_table} ON COMMIT DROP AS
+                SELECT {column_list}, 0::bigint AS import_seq FROM {table} WITH NO DATA
+            """
+            )
+            await conn.copy_records_to_table(
+                staging_table,
+                records=[(*row, seq) for seq, row in enumerate(rows)],
+                columns=[*columns, "import_seq"],
+            )
+            await conn.execute(
+                f"""
+                INSERT INTO {table} ({column_list})
+                SELECT DISTINCT ON ({distinct}) {column_list}
+                FROM {staging_table}
+                ORDER BY {distinct}, import_seq DESC
+                ON CONFLICT ({", ".join(conflict_columns)})
+                DO UPDATE SET {updates}
+            """
+            )
@@ -754,10 +754,11 @@ async def retry_decrypt_state_keys_for_masterkey(
         Dict with statistics: {
             "state_keys_attempted": int,
             "state_keys_progressed": int,
+            "state_key_ids_progressed": list,
             "errors": list
         }
     """
-    result = {"state_keys_attempted": 0, "state_keys_progressed": 0, "errors": []}
+    result = {"state_keys_attempted": 0, "state_keys_progressed": 0, "state_key_ids_progressed": [], "errors": []}
 
     try:
         async with asyncpg_pool.acquire() as conn:
@@ -811,6 +812,7 @@ async def retry_decrypt_state_keys_for_masterkey(
                     or decrypt_result["decrypted_abe_stage2"]
                 ):
                     result["state_keys_progressed"] += 1
+                    result["state_key_ids_progressed"].append(state_key_id)
 
             except Exception as e:
                 error_msg = f"Error processing state_key {state_key_id}: {str(e)}"
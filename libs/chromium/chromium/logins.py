@@ -1,23 +1,20 @@
 """Chromium Login Data file parsing and database operations."""
 
-import sqlite3
+import asyncio
 
 import asyncpg
 from common.logger import get_logger
 from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
-from nemesis_dpapi import Blob, DpapiManager
+from nemesis_dpapi import DpapiManager
 
 from .helpers import (
     convert_chromium_timestamp,
-    decrypt_chrome_string,
     detect_encryption_type,
-    get_state_key_bytes,
-    get_state_key_id,
     is_sqlite3,
     parse_chromium_file_path,
-    try_decrypt_with_all_keys,
 )
+from .importer import StateKeys, copy_upsert, decrypt_dpapi_values, fetch_batches, strip_password_offsets
 
 logger = get_logger(__name__)
 
@@ -64,6 +61,34 @@ async def process_chromium_logins(
     logger.debug("Completed processing Chromium Login Data", object_id=object_id)
 
 
+LOGIN_COLUMNS = [
+    "originating_object_id",
+    "agent_id",
+    "source",
+    "project",
+    "username",
+    "browser",
+    "origin_url",
+    "username_value",
+    "signon_realm",
+    "date_created",
+    "date_last_used",
+    "date_password_modified",
+    "times_used",
+    "encryption_type",
+    "masterkey_guid",
+    "state_key_id",
+    "is_decrypted",
+    "password_value_enc",
+    "password_value_dec",
+]
+LOGIN_CONFLICT_COLUMNS = ["source", "username", "browser", "origin_url", "username_value"]
+
+
+def _decrypt_state_key_values(state_keys: StateKeys, values: list[tuple[bytes, str]]) -> list[tuple[str | None, int]]:
+    return [state_keys.decrypt(value, encryption_type, strip_password_offsets) for value, encryption_type in values]
+
+
 async def _insert_logins(
     file_enriched,
     username: str | None,
@@ -75,175 +100,90 @@ async def _insert_logins(
     """Extract logins from Login Data database and insert into chromium.logins table using asyncpg."""
     assert asyncpg_pool is not None, "asyncpg_pool is required"
     try:
-        # Read from SQLite
-        with sqlite3.connect(db_path) as conn:
-            conn.text_factory = bytes  # Get raw bytes, we'll handle text decoding manually
-            cursor = conn.cursor()
+        state_keys = await StateKeys.load(file_enriched.source, username, browser, asyncpg_pool)
+        count = 0
 
-            # Query logins table
-            cursor.execute("""
+        async for rows in fetch_batches(
+            db_path,
+            """
                 SELECT origin_url, username_value, signon_realm, date_created,
                        date_last_used, date_password_modified, times_used, password_value
                 FROM logins
-            """)
-            rows = cursor.fetchall()
-
-        if not rows:
-            return
-
-        # Prepare data for PostgreSQL
-        logins_data = []
-        for row in rows:
-            (
-                origin_url,
-                username_value,
-                signon_realm,
-                date_created,
-                date_last_used,
-                date_password_modified,
-                times_used,
-                password_value,
-            ) = row
-
-            # Decode text fields from bytes (since we set text_factory = bytes)
-            origin_url = origin_url.decode("utf-8", errors="replace") if origin_url else None
-            username_value = username_value.decode("utf-8", errors="replace") if username_value else None
-            signon_realm = signon_realm.decode("utf-8", errors="replace") if signon_realm else None
-
-            # password_value is already binary (what we want)
-            if password_value is None:
-                password_value = b""
-
+            """,
+        ):
             # Detect encryption type and get masterkey GUID
-            encryption_type, masterkey_guid = detect_encryption_type(password_value)
-            is_decrypted = False
-            password_value_dec = None
-
-            # Try DPAPI decryption first
-            if masterkey_guid and dpapi_manager:
-                try:
-                    password_dec_bytes = await dpapi_manager.decrypt_blob(Blob.from_bytes(password_value))
-                    if password_dec_bytes:
-                        password_value_dec = password_dec_bytes.decode("utf-8", errors="replace")
-                        is_decrypted = True
-                except Exception:
-                    pass
-
-            # Get state key ID for key/abe encryption
-            state_key_id = None
-            if encryption_type in ["key", "abe"]:
-                # Try primary approach: get state key based on username/browser
-                if username:  # Only try primary approach if username was extracted
-                    state_key_id = await get_state_key_id(file_enriched.source, username, browser, asyncpg_pool)
-                    if state_key_id:
-                        # Retrieve the pre-processed state key for decryption
-                        state_key_bytes = await get_state_key_bytes(state_key_id, encryption_type, asyncpg_pool)
-                        if state_key_bytes:
-                            try:
-                                password_dec_bytes = decrypt_chrome_string(
-                                    password_value, state_key_bytes, encryption_type
-                                )
-                                if password_dec_bytes:
-                                    # For passwords, may need to strip offset bytes depending on version
-                                    if encryption_type == "key" and len(password_dec_bytes) > 32:
-                                        # v10/v11 passwords may have 32-byte prefix + 16-byte suffix
-                                        password_dec_bytes = password_dec_bytes[32:-16]
-                                    elif encryption_type == "key" and len(password_dec_bytes) > 16:
-                                        # Or just 16-byte suffix
-                                        password_dec_bytes = password_dec_bytes[:-16]
-                                    # v20 passwords typically don't have offset like cookies
-
-                                    password_value_dec = password_dec_bytes.decode("utf-8", errors="replace")
-                                    is_decrypted = True
-                            except Exception as e:
-                                logger.debug(
-                                    "Failed to decrypt password with state key",
-                                    state_key_id=state_key_id,
-                                    encryption_type=encryption_type,
-                                    error=str(e),
-                                )
-
-                # Backup approach: try all state keys from the same source if primary failed
-                if not is_decrypted:
-                    logger.debug(
-                        "Primary decryption failed, trying backup approach with all keys from source",
-                        source=file_enriched.source,
-                        encryption_type=encryption_type,
-                    )
-                    backup_decrypted_bytes, backup_state_key_id = await try_decrypt_with_all_keys(
-                        password_value, file_enriched.source, encryption_type, asyncpg_pool
+            password_values = [row[7] or b"" for row in rows]
+            encryption = [detect_encryption_type(value) for value in password_values]
+
+            dpapi_indexes = [i for i, (_, masterkey_guid) in enumerate(encryption) if masterkey_guid]
+            key_indexes = [i for i, (encryption_type, _) in enumerate(encryption) if encryption_type in ["key", "abe"]]
+
+            passwords_dec: list[str | None] = [None] * len(rows)
+            state_key_ids: list[int | None] = [None] * len(rows)
+
+            dpapi_values = await decrypt_dpapi_values(dpapi_manager, [password_values[i] for i in dpapi_indexes])
+            for i, password_dec in zip(dpapi_indexes, dpapi_values, strict=True):
+                passwords_dec[i] = password_dec
+
+            key_values = await asyncio.to_thread(
+                _decrypt_state_key_values,
+                state_keys,
+                [(password_values[i], encryption[i][0]) for i in key_indexes],
+            )
+            for i, (password_dec, state_key_id) in zip(key_indexes, key_values, strict=True):
+                passwords_dec[i] = password_dec
+                state_key_ids[i] = state_key_id
+
+            logins_data = []
+            for i, row in enumerate(rows):
+                (
+                    origin_url,
+                    username_value,
+                    signon_realm,
+                    date_created,
+                    date_last_used,
+                    date_password_modified,
+                    times_used,
+                    _,
+                ) = row
+                encryption_type, masterkey_guid = encryption[i]
+
+                # Decode text fields from bytes (since we set text_factory = bytes)
+                logins_data.append(
+                    (
+                        file_enriched.object_id,  # originating_object_id
+                        file_enriched.agent_id,  # agent_id
+                        file_enriched.source,  # source
+                        file_enriched.project,  # project
+                        username,  # username
+                        browser,  # browser
+                        origin_url.decode("utf-8", errors="replace") if origin_url else None,  # origin_url
+                        username_value.decode("utf-8", errors="replace") if username_value else None,  # username_value
+                        signon_realm.decode("utf-8", errors="replace") if signon_realm else None,  # signon_realm
+                        convert_chromium_timestamp(date_created),  # date_created
+                        convert_chromium_timestamp(date_last_used),  # date_last_used
+                        convert_chromium_timestamp(date_password_modified),  # date_password_modified
+                        times_used,  # times_used
+                        encryption_type,  # encryption_type
+                        masterkey_guid,  # masterkey_guid
+                        state_key_ids[i],  # state_key_id
+                        passwords_dec[i] is not None,  # is_decrypted
+                        password_values[i],  # password_value_enc
+                        passwords_dec[i],  # password_value_dec
                     )
-                    if backup_decrypted_bytes and backup_state_key_id:
-                        # Apply the same offset handling as above
-                        if encryption_type == "abe" and len(backup_decrypted_bytes) > 32:
-                            # v20 cookies typically have 32-byte offset
-                            backup_decrypted_bytes = backup_decrypted_bytes[32:]
-                        elif encryption_type == "key" and len(backup_decrypted_bytes) > 48:
-                            # v10/v11 cookies may have 32-byte prefix + 16-byte suffix
-                            backup_decrypted_bytes = backup_decrypted_bytes[32:-16]
-                        elif encryption_type == "key" and len(backup_decrypted_bytes) > 16:
-                            # Or just 16-byte suffix
-                            backup_decrypted_bytes = backup_decrypted_bytes[:-16]
-
-                        password_value_dec = backup_decrypted_bytes.decode("utf-8", errors="replace")
-                        is_decrypted = True
-                        state_key_id = backup_state_key_id
-                        logger.debug(
-                            "Successfully decrypted password using backup approach", state_key_id=backup_state_key_id
-                        )
-
-            login_data = (
-                file_enriched.object_id,  # originating_object_id
-                file_enriched.agent_id,  # agent_id
-                file_enriched.source,  # source
-                file_enriched.project,  # project
-                username,  # username
-                browser,  # browser
-                origin_url,  # origin_url
-                username_value,  # username_value
-                signon_realm,  # signon_realm
-                convert_chromium_timestamp(date_created),  # date_created
-                convert_chromium_timestamp(date_last_used),  # date_last_used
-                convert_chromium_timestamp(date_password_modified),  # date_password_modified
-                times_used,  # times_used
-                encryption_type,  # encryption_type
-                masterkey_guid,  # masterkey_guid
-                state_key_id,  # state_key_id
-                is_decrypted,  # is_decrypted
-                password_value,  # password_value_enc
-                password_value_dec,  # password_value_dec
+                )
+
+            await copy_upsert(
+                asyncpg_pool,
+                "chromium.logins",
+                LOGIN_COLUMNS,
+                LOGIN_CONFLICT_COLUMNS,
+                LOGIN_COLUMNS[6:],
+                logins_data,
             )
-            logins_data.append(login_data)
-
-        # Insert into PostgreSQL using asyncpg
-        async with asyncpg_pool.acquire() as conn:
-            insert_sql = """
-                INSERT INTO chromium.logins
-                (originating_object_id, agent_id, source, project, username, browser,
-                 origin_url, username_value, signon_realm, date_created, date_last_used,
-                 date_password_modified, times_used, encryption_type, masterkey_guid,
-                 state_key_id, is_decrypted, password_value_enc, password_value_dec)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19)
-                ON CONFLICT (source, username, browser, origin_url, username_value)
-                DO UPDATE SET
-                    origin_url = EXCLUDED.origin_url,
-                    username_value = EXCLUDED.username_value,
-                    signon_realm = EXCLUDED.signon_realm,
-                    date_created = EXCLUDED.date_created,
-                    date_last_used = EXCLUDED.date_last_used,
-                    date_password_modified = EXCLUDED.date_password_modified,
-                    times_used = EXCLUDED.times_used,
-                    encryption_type = EXCLUDED.encryption_type,
-                    masterkey_guid = EXCLUDED.masterkey_guid,
-                    state_key_id = EXCLUDED.state_key_id,
-                    is_decrypted = EXCLUDED.is_decrypted,
-                    password_value_enc = EXCLUDED.password_value_enc,
-                    password_value_dec = EXCLUDED.password_value_dec
-            """
-
-            await conn.executemany(insert_sql, logins_data)
+            count += len(logins_data)
 
-        logger.info("Inserted logins into database", count=len(logins_data))
+        logger.info("Inserted logins into database", count=count)
 
     except Exception as e:
         logger.exception(
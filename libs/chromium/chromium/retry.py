@@ -1,30 +1,53 @@
-"""Retry decryption logic for Chromium cookies and logins."""
+"""Retry decryption logic for Chromium cookies and logins.
 
+Retries are scoped to the keys that just became available: DPAPI encrypted rows are
+looked up by the new masterkey GUIDs, and key/abe encrypted rows by the (source,
+username, browser, state_key_id) of the state keys that made progress, both through
+partial indexes over the undecrypted rows. Candidates are read in id-ordered batches,
+decrypted in a worker thread, and each batch is written back with a single UPDATE.
+
+ChromiumRetryScheduler coalesces the retries requested while a burst of masterkeys
+is decrypted, so they run as one pass after the burst instead of once per key.
+"""
+
+import asyncio
+import os
+from collections.abc import Callable, Iterable, Sequence
 from uuid import UUID
 
 import asyncpg
 from common.logger import get_logger
 from nemesis_dpapi import Blob, DpapiManager, MasterKeyNotDecryptedError, MasterKeyNotFoundError
 
-from .helpers import decrypt_chrome_string, get_state_key_bytes
+from .helpers import decrypt_chrome_string
+from .importer import CHROMIUM_IMPORT_BATCH_SIZE, strip_cookie_offsets, strip_password_offsets
 
 logger = get_logger(__name__)
 
+CHROMIUM_RETRY_DEBOUNCE_SECONDS = float(os.getenv("CHROMIUM_RETRY_DEBOUNCE_SECONDS", 2))
+
+# table -> (encrypted column, decrypted column, offset stripping, fall back to any key of the source)
+RETRY_TABLES = {
+    "cookies": ("value_enc", "value_dec", strip_cookie_offsets, False),
+    "logins": ("password_value_enc", "password_value_dec", strip_password_offsets, True),
+}
+
 
 async def retry_decrypt_chromium_data(
-    masterkey_guid: UUID, dpapi_manager: DpapiManager, asyncpg_pool: asyncpg.Pool, masterkey_type: str | None = None
+    dpapi_manager: DpapiManager,
+    asyncpg_pool: asyncpg.Pool,
+    masterkey_guids: Iterable[UUID] = (),
+    state_key_ids: Iterable[int] = (),
+    batch_size: int = CHROMIUM_IMPORT_BATCH_SIZE,
 ) -> dict:
     """Retry decrypting cookies and logins that failed to decrypt previously.
 
-    When a new masterkey becomes available, this function:
-    1. Retries DPAPI-encrypted cookies/logins that use this masterkey
-    2. Retries key/abe-encrypted cookies/logins (state keys may now be decrypted)
-
     Args:
-        masterkey_guid: The GUID of the newly available masterkey
         dpapi_manager: DpapiManager instance for decryption
         asyncpg_pool: Async Postgres connection pool
-        masterkey_type: Optional masterkey type ('system', 'user', 'unknown')
+        masterkey_guids: Newly available masterkeys, retries the DPAPI encrypted rows that use them
+        state_key_ids: Newly decrypted state keys, retries the key/abe encrypted rows they may decrypt
+        batch_size: Number of rows decrypted and updated at a time
 
     Returns:
         Dict with statistics: {
@@ -35,6 +58,8 @@ async def retry_decrypt_chromium_data(
             "errors": list
         }
     """
+    masterkey_guids = sorted({str(guid) for guid in masterkey_guids})
+    state_key_ids = sorted(set(state_key_ids))
     result = {
         "cookies_attempted": 0,
         "cookies_decrypted": 0,
@@ -43,399 +68,276 @@ async def retry_decrypt_chromium_data(
         "errors": [],
     }
 
-    try:
-        # Retry cookies
-        cookies_result = await _retry_decrypt_cookies(masterkey_guid, dpapi_manager, asyncpg_pool)
-        result["cookies_attempted"] = cookies_result["attempted"]
-        result["cookies_decrypted"] = cookies_result["decrypted"]
-        result["errors"].extend(cookies_result["errors"])
-
-        # Retry logins
-        logins_result = await _retry_decrypt_logins(masterkey_guid, dpapi_manager, asyncpg_pool)
-        result["logins_attempted"] = logins_result["attempted"]
-        result["logins_decrypted"] = logins_result["decrypted"]
-        result["errors"].extend(logins_result["errors"])
-
-        logger.warning(
-            "Completed retroactive chromium data decryption for masterkey",
-            masterkey_guid=masterkey_guid,
-            cookies_attempted=result["cookies_attempted"],
-            cookies_decrypted=result["cookies_decrypted"],
-            logins_attempted=result["logins_attempted"],
-            logins_decrypted=result["logins_decrypted"],
-            errors=len(result["errors"]),
-        )
+    for table in RETRY_TABLES:
+        try:
+            if masterkey_guids:
+                attempted, decrypted = await _retry_dpapi_rows(
+                    table, masterkey_guids, dpapi_manager, asyncpg_pool, batch_size
+                )
+                result[f"{table}_attempted"] += attempted
+                result[f"{table}_decrypted"] += decrypted
+            if state_key_ids:
+                attempted, decrypted = await _retry_state_key_rows(table, state_key_ids, asyncpg_pool, batch_size)
+                result[f"{table}_attempted"] += attempted
+                result[f"{table}_decrypted"] += decrypted
+        except Exception as e:
+            error_msg = f"Database error during retroactive chromium {table} decryption: {str(e)}"
+            logger.exception("Error in retry_decrypt_chromium_data", table=table, error=str(e))
+            result["errors"].append(error_msg)
 
-    except Exception as e:
-        error_msg = f"Database error during retroactive chromium data decryption: {str(e)}"
-        logger.exception("Error in retry_decrypt_chromium_data", masterkey_guid=masterkey_guid, error=str(e))
-        result["errors"].append(error_msg)
+    logger.info(
+        "Completed retroactive chromium data decryption",
+        masterkey_guids=len(masterkey_guids),
+        state_key_ids=state_key_ids,
+        cookies_attempted=result["cookies_attempted"],
+        cookies_decrypted=result["cookies_decrypted"],
+        logins_attempted=result["logins_attempted"],
+        logins_decrypted=result["logins_decrypted"],
+        errors=len(result["errors"]),
+    )
 
     return result
 
 
-async def _retry_decrypt_cookies(masterkey_guid: UUID, dpapi_manager: DpapiManager, asyncpg_pool: asyncpg.Pool) -> dict:
-    """Retry decrypting cookies that previously failed.
-
-    Args:
-        masterkey_guid: The GUID of the newly available masterkey
-        dpapi_manager: DpapiManager instance for decryption
-        asyncpg_pool: Async Postgres connection pool
+class ChromiumRetryScheduler:
+    """Coalesces and debounces retries of Chromium data decryption.
 
-    Returns:
-        Dict with {"attempted": int, "decrypted": int, "errors": list}
+    Scheduled masterkey GUIDs and state key IDs are merged into one pending scope. A
+    single background task waits for the debounce delay, then retries the whole scope
+    at once; anything scheduled while a retry runs is picked up by the next pass.
     """
-    result = {"attempted": 0, "decrypted": 0, "errors": []}
 
-    # Find all undecrypted cookies
-    # For DPAPI: only those matching this masterkey
-    # For key/abe: all undecrypted (state keys may now be available)
-    async with asyncpg_pool.acquire() as conn:
-        cookies = await conn.fetch(
-            """
-            SELECT id, encryption_type, masterkey_guid, state_key_id,
-                   value_enc, source, username, browser
-            FROM chromium.cookies
-            WHERE is_decrypted = FALSE
-            AND (
-                (encryption_type = 'dpapi' AND masterkey_guid = $1)
-                OR encryption_type IN ('key', 'abe')
+    def __init__(
+        self,
+        dpapi_manager: DpapiManager,
+        asyncpg_pool: asyncpg.Pool,
+        debounce_seconds: float = CHROMIUM_RETRY_DEBOUNCE_SECONDS,
+    ):
+        self.dpapi_manager = dpapi_manager
+        self.asyncpg_pool = asyncpg_pool
+        self.debounce_seconds = debounce_seconds
+
+        self._masterkey_guids: set[UUID] = set()
+        self._state_key_ids: set[int] = set()
+        self._task: asyncio.Task | None = None
+
+    def schedule(self, masterkey_guids: Iterable[UUID] = (), state_key_ids: Iterable[int] = ()) -> None:
+        """Add keys to the pending retry scope and make sure a retry pass will run."""
+        self._masterkey_guids.update(masterkey_guids)
+        self._state_key_ids.update(state_key_ids)
+        if not (self._masterkey_guids or self._state_key_ids):
+            return
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def join(self) -> None:
+        """Wait until all scheduled retries have run."""
+        if self._task:
+            await asyncio.shield(self._task)
+
+    async def close(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        while self._masterkey_guids or self._state_key_ids:
+            await asyncio.sleep(self.debounce_seconds)
+
+            masterkey_guids, self._masterkey_guids = self._masterkey_guids, set()
+            state_key_ids, self._state_key_ids = self._state_key_ids, set()
+            try:
+                await retry_decrypt_chromium_data(self.dpapi_manager, self.asyncpg_pool, masterkey_guids, state_key_ids)
+            except Exception as e:
+                logger.exception("Error retrying chromium data decryption", error=str(e))
+
+
+async def _retry_dpapi_rows(
+    table: str, masterkey_guids: list[str], dpapi_manager: DpapiManager, asyncpg_pool: asyncpg.Pool, batch_size: int
+) -> tuple[int, int]:
+    """Retry the DPAPI encrypted rows of a table that use one of the masterkeys."""
+    enc_column, dec_column, _, _ = RETRY_TABLES[table]
+    attempted = decrypted = 0
+    last_id = 0
+
+    while True:
+        async with asyncpg_pool.acquire() as conn:
+            rows = await conn.fetch(
+                f"""
+                SELECT id, {enc_column} AS value_enc
+                FROM chromium.{table}
+                WHERE is_decrypted = FALSE
+                AND encryption_type = 'dpapi'
+                AND masterkey_guid = ANY($1::uuid[])
+                AND id > $2
+                ORDER BY id
+                LIMIT $3
+                """,
+                masterkey_guids,
+                last_id,
+                batch_size,
             )
-            """,
-            str(masterkey_guid),
-        )
-
-    logger.debug(
-        "Found undecrypted cookies to retry",
-        masterkey_guid=masterkey_guid,
-        count=len(cookies),
-    )
-
-    for cookie in cookies:
-        result["attempted"] += 1
-        cookie_id = cookie["id"]
-        encryption_type = cookie["encryption_type"]
-        cookie_masterkey_guid = cookie["masterkey_guid"]
-        state_key_id = cookie["state_key_id"]
-        value_enc = cookie["value_enc"]
-        source = cookie["source"]
-        username = cookie["username"]
-        browser = cookie["browser"]
-
-        try:
-            value_dec = None
-            decrypted = False
-
-            # Try DPAPI decryption
-            if encryption_type == "dpapi" and cookie_masterkey_guid == str(masterkey_guid):
-                try:
-                    value_dec_bytes = await dpapi_manager.decrypt_blob(Blob.from_bytes(value_enc))
-                    if value_dec_bytes:
-                        value_dec = value_dec_bytes.decode("utf-8", errors="replace")
-                        decrypted = True
-                        logger.debug("Successfully decrypted cookie with DPAPI", cookie_id=cookie_id)
-                except (MasterKeyNotFoundError, MasterKeyNotDecryptedError):
-                    # Still not available
-                    pass
-                except Exception as e:
-                    logger.warning("Error decrypting cookie with DPAPI", cookie_id=cookie_id, error=str(e))
-
-            # Try state key decryption (key/abe)
-            elif encryption_type in ["key", "abe"]:
-                # Try with existing state_key_id if available
-                if state_key_id:
-                    state_key_bytes = await get_state_key_bytes(state_key_id, encryption_type, asyncpg_pool)
-                    if state_key_bytes:
-                        try:
-                            value_dec_bytes = decrypt_chrome_string(value_enc, state_key_bytes, encryption_type)
-                            if value_dec_bytes:
-                                # Apply offset handling for cookies
-                                if encryption_type == "abe" and len(value_dec_bytes) > 32:
-                                    value_dec_bytes = value_dec_bytes[32:]
-                                elif encryption_type == "key" and len(value_dec_bytes) > 48:
-                                    value_dec_bytes = value_dec_bytes[32:-16]
-                                elif encryption_type == "key" and len(value_dec_bytes) > 16:
-                                    value_dec_bytes = value_dec_bytes[:-16]
-
-                                value_dec = value_dec_bytes.decode("utf-8", errors="replace")
-                                decrypted = True
-                                logger.debug(
-                                    "Successfully decrypted cookie with state key",
-                                    cookie_id=cookie_id,
-                                    state_key_id=state_key_id,
-                                )
-                        except Exception as e:
-                            logger.debug(
-                                "Failed to decrypt cookie with state key",
-                                cookie_id=cookie_id,
-                                state_key_id=state_key_id,
-                                error=str(e),
-                            )
-
-                # If no state_key_id or decryption failed, try to find matching state key
-                if not decrypted and username and browser:
-                    try:
-                        async with asyncpg_pool.acquire() as conn:
-                            # Try to find a decrypted state key for this source/username/browser
-                            state_key_row = await conn.fetchrow(
-                                """
-                                SELECT id FROM chromium.state_keys
-                                WHERE source = $1 AND username = $2 AND browser = $3
-                                AND (
-                                    (key_is_decrypted = TRUE AND $4 = 'key')
-                                    OR (app_bound_key_is_decrypted = TRUE AND $5 = 'abe')
-                                )
-                                """,
-                                source,
-                                username,
-                                browser,
-                                encryption_type,
-                                encryption_type,
-                            )
-                            if state_key_row:
-                                new_state_key_id = state_key_row["id"]
-                                state_key_bytes = await get_state_key_bytes(
-                                    new_state_key_id, encryption_type, asyncpg_pool
-                                )
-                                if state_key_bytes:
-                                    try:
-                                        value_dec_bytes = decrypt_chrome_string(
-                                            value_enc, state_key_bytes, encryption_type
-                                        )
-                                        if value_dec_bytes:
-                                            # Apply offset handling
-                                            if encryption_type == "abe" and len(value_dec_bytes) > 32:
-                                                value_dec_bytes = value_dec_bytes[32:]
-                                            elif encryption_type == "key" and len(value_dec_bytes) > 48:
-                                                value_dec_bytes = value_dec_bytes[32:-16]
-                                            elif encryption_type == "key" and len(value_dec_bytes) > 16:
-                                                value_dec_bytes = value_dec_bytes[:-16]
-
-                                            value_dec = value_dec_bytes.decode("utf-8", errors="replace")
-                                            decrypted = True
-                                            state_key_id = new_state_key_id
-                                            logger.debug(
-                                                "Successfully decrypted cookie with newly found state key",
-                                                cookie_id=cookie_id,
-                                                state_key_id=new_state_key_id,
-                                            )
-                                    except Exception as e:
-                                        logger.debug(
-                                            "Failed to decrypt cookie with newly found state key",
-                                            cookie_id=cookie_id,
-                                            error=str(e),
-                                        )
-                    except Exception as e:
-                        logger.debug("Error looking up state key for cookie", cookie_id=cookie_id, error=str(e))
-
-            # Update database if decrypted
-            if decrypted and value_dec:
-                async with asyncpg_pool.acquire() as conn:
-                    await conn.execute(
-                        """
-                        UPDATE chromium.cookies
-                        SET value_dec = $1, is_decrypted = TRUE, state_key_id = $2
-                        WHERE id = $3
-                        """,
-                        value_dec,
-                        state_key_id,
-                        cookie_id,
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
+        attempted += len(rows)
+
+        results = await dpapi_manager.decrypt_blobs([Blob.from_bytes(row["value_enc"]) for row in rows])
+        updates = []
+        for row, value in zip(rows, results, strict=True):
+            if isinstance(value, bytes) and value:
+                updates.append((row["id"], value.decode("utf-8", errors="replace"), None))
+            elif isinstance(value, Exception) and not isinstance(
+                value, (MasterKeyNotFoundError, MasterKeyNotDecryptedError)
+            ):
+                logger.warning(
+                    "Error decrypting chromium value with DPAPI", table=table, id=row["id"], error=str(value)
+                )
+
+        decrypted += await _update_decrypted(table, dec_column, updates, asyncpg_pool)
+
+    return attempted, decrypted
+
+
+async def _retry_state_key_rows(
+    table: str, state_key_ids: list[int], asyncpg_pool: asyncpg.Pool, batch_size: int
+) -> tuple[int, int]:
+    """Retry the key/abe encrypted rows of a table that the state keys may decrypt."""
+    enc_column, dec_column, strip_offsets, source_fallback = RETRY_TABLES[table]
+    # Rows without username/browser can only be matched to a key by their source
+    unattributed = "OR c.username IS NULL OR c.browser IS NULL" if source_fallback else ""
+    attempted = decrypted = 0
+    last_id = 0
+    state_keys: dict[str, list] = {}
+
+    while True:
+        async with asyncpg_pool.acquire() as conn:
+            rows = await conn.fetch(
+                f"""
+                SELECT c.id, c.encryption_type, c.state_key_id, c.{enc_column} AS value_enc,
+                       c.source, c.username, c.browser
+                FROM chromium.{table} c
+                WHERE c.is_decrypted = FALSE
+                AND c.encryption_type IN ('key', 'abe')
+                AND c.id > $2
+                AND EXISTS (
+                    SELECT 1 FROM chromium.state_keys k
+                    WHERE k.id = ANY($1::int[])
+                    AND c.source = k.source
+                    AND (
+                        c.state_key_id = k.id
+                        OR (c.username = k.username AND c.browser = k.browser)
+                        {unattributed}
                     )
-                result["decrypted"] += 1
-
-        except Exception as e:
-            error_msg = f"Error processing cookie {cookie_id}: {str(e)}"
-            logger.warning("Failed to retry decrypt cookie", cookie_id=cookie_id, error=str(e))
-            result["errors"].append(error_msg)
-
-    return result
-
-
-async def _retry_decrypt_logins(masterkey_guid: UUID, dpapi_manager: DpapiManager, asyncpg_pool: asyncpg.Pool) -> dict:
-    """Retry decrypting logins that previously failed.
-
-    Args:
-        masterkey_guid: The GUID of the newly available masterkey
-        dpapi_manager: DpapiManager instance for decryption
-        asyncpg_pool: Async Postgres connection pool
+                )
+                ORDER BY c.id
+                LIMIT $3
+                """,
+                state_key_ids,
+                last_id,
+                batch_size,
+            )
+            if not rows:
+                break
+
+            missing_sources = list({row["source"] for row in rows} - state_keys.keys())
+            if missing_sources:
+                for source in missing_sources:
+                    state_keys[source] = []
+                for key in await conn.fetch(
+                    """
+                    SELECT id, source, username, browser,
+                           CASE WHEN key_is_decrypted THEN key_bytes_dec END AS key_bytes_dec,
+                           CASE WHEN app_bound_key_is_decrypted THEN app_bound_key_dec END AS app_bound_key_dec
+                    FROM chromium.state_keys
+                    WHERE source = ANY($1::text[])
+                    ORDER BY id
+                    """,
+                    missing_sources,
+                ):
+                    state_keys[key["source"]].append(key)
+
+        last_id = rows[-1]["id"]
+        attempted += len(rows)
+
+        updates = await asyncio.to_thread(decrypt_state_key_rows, rows, state_keys, strip_offsets, source_fallback)
+        decrypted += await _update_decrypted(table, dec_column, updates, asyncpg_pool)
+
+    return attempted, decrypted
+
+
+def decrypt_state_key_rows(
+    rows: Sequence,
+    state_keys: dict[str, list],
+    strip_offsets: Callable[[bytes, str], bytes],
+    source_fallback: bool,
+) -> list[tuple[int, str, int]]:
+    """Decrypt key/abe encrypted rows with the decrypted state keys of their source.
+
+    The row's linked state key is tried first, then the key of its source/username/browser.
+    If source_fallback is set, rows without username/browser use any key of their source.
 
     Returns:
-        Dict with {"attempted": int, "decrypted": int, "errors": list}
+        List of (row id, decrypted value, state_key_id) for the rows that decrypted
     """
-    result = {"attempted": 0, "decrypted": 0, "errors": []}
-
-    # Find all undecrypted logins
+    updates = []
+    for row in rows:
+        encryption_type = row["encryption_type"]
+        key_column = "key_bytes_dec" if encryption_type == "key" else "app_bound_key_dec"
+        keys = [key for key in state_keys.get(row["source"], []) if key[key_column]]
+
+        candidates = [key for key in keys if key["id"] == row["state_key_id"]]
+        if row["username"] and row["browser"]:
+            candidates += [
+                key for key in keys if key["username"] == row["username"] and key["browser"] == row["browser"]
+            ][:1]
+        elif source_fallback:
+            candidates += keys[:1]
+
+        tried = set()
+        for key in candidates:
+            if key["id"] in tried:
+                continue
+            tried.add(key["id"])
+            try:
+                value = decrypt_chrome_string(row["value_enc"], key[key_column], encryption_type)
+            except Exception as e:
+                logger.debug("Failed to decrypt chromium value with state key", id=row["id"], error=str(e))
+                continue
+            if value:
+                updates.append(
+                    (row["id"], strip_offsets(value, encryption_type).decode("utf-8", errors="replace"), key["id"])
+                )
+                break
+
+    return updates
+
+
+async def _update_decrypted(
+    table: str, dec_column: str, updates: list[tuple[int, str, int | None]], asyncpg_pool: asyncpg.Pool
+) -> int:
+    """Write a batch of decrypted values with one UPDATE, keeping the row's state key if none is given."""
+    updates = [update for update in updates if update[1]]
+    if not updates:
+        return 0
+
+    ids, values, state_key_ids = zip(*updates, strict=True)
     async with asyncpg_pool.acquire() as conn:
-        logins = await conn.fetch(
-            """
-            SELECT id, encryption_type, masterkey_guid, state_key_id,
-                   password_value_enc, source, username, browser
-            FROM chromium.logins
-            WHERE is_decrypted = FALSE
-            AND (
-                (encryption_type = 'dpapi' AND masterkey_guid = $1)
-                OR encryption_type IN ('key', 'abe')
-            )
+        await conn.execute(
+            f"""
+            UPDATE chromium.{table} c
+            SET {dec_column} = v.value_dec,
+                is_decrypted = TRUE,
+                state_key_id = coalesce(v.state_key_id, c.state_key_id)
+            FROM unnest($1::int[], $2::text[], $3::int[]) AS v(id, value_dec, state_key_id)
+            WHERE c.id = v.id
             """,
-            str(masterkey_guid),
+            list(ids),
+            list(values),
+            list(state_key_ids),
         )
-
-    logger.debug(
-        "Found undecrypted logins to retry",
-        masterkey_guid=masterkey_guid,
-        count=len(logins),
-    )
-
-    for login in logins:
-        result["attempted"] += 1
-        login_id = login["id"]
-        encryption_type = login["encryption_type"]
-        login_masterkey_guid = login["masterkey_guid"]
-        state_key_id = login["state_key_id"]
-        password_value_enc = login["password_value_enc"]
-        source = login["source"]
-        username = login["username"]
-        browser = login["browser"]
-
-        try:
-            password_dec = None
-            decrypted = False
-
-            # Try DPAPI decryption
-            if encryption_type == "dpapi" and login_masterkey_guid == str(masterkey_guid):
-                try:
-                    password_dec_bytes = await dpapi_manager.decrypt_blob(Blob.from_bytes(password_value_enc))
-                    if password_dec_bytes:
-                        password_dec = password_dec_bytes.decode("utf-8", errors="replace")
-                        decrypted = True
-                        logger.debug("Successfully decrypted login with DPAPI", login_id=login_id)
-                except (MasterKeyNotFoundError, MasterKeyNotDecryptedError):
-                    # Still not available
-                    pass
-                except Exception as e:
-                    logger.warning("Error decrypting login with DPAPI", login_id=login_id, error=str(e))
-
-            # Try state key decryption (key/abe)
-            elif encryption_type in ["key", "abe"]:
-                # Try with existing state_key_id if available
-                if state_key_id:
-                    state_key_bytes = await get_state_key_bytes(state_key_id, encryption_type, asyncpg_pool)
-                    if state_key_bytes:
-                        try:
-                            password_dec_bytes = decrypt_chrome_string(
-                                password_value_enc, state_key_bytes, encryption_type
-                            )
-                            if password_dec_bytes:
-                                # Apply offset handling for passwords
-                                if encryption_type == "key" and len(password_dec_bytes) > 32:
-                                    password_dec_bytes = password_dec_bytes[32:-16]
-                                elif encryption_type == "key" and len(password_dec_bytes) > 16:
-                                    password_dec_bytes = password_dec_bytes[:-16]
-                                # v20 passwords typically don't have offset like cookies
-
-                                password_dec = password_dec_bytes.decode("utf-8", errors="replace")
-                                decrypted = True
-                                logger.debug(
-                                    "Successfully decrypted login with state key",
-                                    login_id=login_id,
-                                    state_key_id=state_key_id,
-                                )
-                        except Exception as e:
-                            logger.debug(
-                                "Failed to decrypt login with state key",
-                                login_id=login_id,
-                                state_key_id=state_key_id,
-                                error=str(e),
-                            )
-
-                # If no state_key_id or decryption failed, try to find matching state key
-                if not decrypted and source:
-                    try:
-                        async with asyncpg_pool.acquire() as conn:
-                            if username and browser:
-                                # Try to find a decrypted state key for this source/username/browser
-                                state_key_row = await conn.fetchrow(
-                                    """
-                                    SELECT id FROM chromium.state_keys
-                                    WHERE source = $1 AND username = $2 AND browser = $3
-                                    AND (
-                                        (key_is_decrypted = TRUE AND $4 = 'key')
-                                        OR (app_bound_key_is_decrypted = TRUE AND $5 = 'abe')
-                                    )
-                                    """,
-                                    source,
-                                    username,
-                                    browser,
-                                    encryption_type,
-                                    encryption_type,
-                                )
-                            else:
-                                # if no username/password, just restrict to SOURCE
-                                state_key_row = await conn.fetchrow(
-                                    """
-                                    SELECT id FROM chromium.state_keys
-                                    WHERE source = $1
-                                    AND (
-                                        (key_is_decrypted = TRUE AND $2 = 'key')
-                                        OR (app_bound_key_is_decrypted = TRUE AND $3 = 'abe')
-                                    )
-                                    """,
-                                    source,
-                                    encryption_type,
-                                    encryption_type,
-                                )
-                            if state_key_row:
-                                new_state_key_id = state_key_row["id"]
-                                state_key_bytes = await get_state_key_bytes(
-                                    new_state_key_id, encryption_type, asyncpg_pool
-                                )
-                                if state_key_bytes:
-                                    try:
-                                        password_dec_bytes = decrypt_chrome_string(
-                                            password_value_enc, state_key_bytes, encryption_type
-                                        )
-                                        if password_dec_bytes:
-                                            # Apply offset handling
-                                            if encryption_type == "key" and len(password_dec_bytes) > 32:
-                                                password_dec_bytes = password_dec_bytes[32:-16]
-                                            elif encryption_type == "key" and len(password_dec_bytes) > 16:
-                                                password_dec_bytes = password_dec_bytes[:-16]
-
-                                            password_dec = password_dec_bytes.decode("utf-8", errors="replace")
-                                            decrypted = True
-                                            state_key_id = new_state_key_id
-                                            logger.debug(
-                                                "Successfully decrypted login with newly found state key",
-                                                login_id=login_id,
-                                                state_key_id=new_state_key_id,
-                                            )
-                                    except Exception as e:
-                                        logger.debug(
-                                            "Failed to decrypt login with newly found state key",
-                                            login_id=login_id,
-                                            error=str(e),
-                                        )
-                    except Exception as e:
-                        logger.debug("Error looking up state key for login", login_id=login_id, error=str(e))
-
-            # Update database if decrypted
-            if decrypted and password_dec:
-                async with asyncpg_pool.acquire() as conn:
-                    await conn.execute(
-                        """
-                        UPDATE chromium.logins
-                        SET password_value_dec = $1, is_decrypted = TRUE, state_key_id = $2
-                        WHERE id = $3
-                        """,
-                        password_dec,
-                        state_key_id,
-                        login_id,
-                    )
-                result["decrypted"] += 1
-
-        except Exception as e:
-            error_msg = f"Error processing login {login_id}: {str(e)}"
-            logger.warning("Failed to retry decrypt login", login_id=login_id, error=str(e))
-            result["errors"].append(error_msg)
-
-    return result
+    return len(updates)
@@ -0,0 +1,62 @@
+"""Tests for the batched Chromium import helpers."""
+
+import os
+import sqlite3
+
+import pytest
+from chromium.importer import StateKeys, fetch_batches, strip_cookie_offsets, strip_password_offsets
+from Crypto.Cipher import AES
+
+
+def encrypt_v10(plaintext: bytes, key: bytes) -> bytes:
+    iv = os.urandom(12)
+    ciphertext, tag = AES.new(key, AES.MODE_GCM, iv).encrypt_and_digest(plaintext)
+    return b"v10" + iv + ciphertext + tag
+
+
+def state_key(key_id: int, username: str, key_bytes: bytes | None) -> dict:
+    return {
+        "id": key_id,
+        "username": username,
+        "browser": "chrome",
+        "key_bytes_dec": key_bytes,
+        "app_bound_key_dec": None,
+    }
+
+
+class TestStateKeys:
+    def test_primary_key_decrypts_value(self):
+        key = os.urandom(32)
+        state_keys = StateKeys(primary_id=1, keys=[state_key(1, "alice", key)])
+
+        value, state_key_id = state_keys.decrypt(encrypt_v10(b"hunter2", key), "key", strip_password_offsets)
+
+        assert value == "hunter2"
+        assert state_key_id == 1
+
+    def test_falls_back_to_other_keys_of_source(self):
+        key = os.urandom(32)
+        state_keys = StateKeys(primary_id=None, keys=[state_key(1, "bob", os.urandom(32)), state_key(2, "alice", key)])
+
+        value, state_key_id = state_keys.decrypt(encrypt_v10(b"session-cookie", key), "key", strip_cookie_offsets)
+
+        assert value == "session-cookie"
+        assert state_key_id == 2
+
+    def test_undecryptable_value_keeps_primary_key_id(self):
+        state_keys = StateKeys(primary_id=1, keys=[state_key(1, "alice", None)])
+
+        assert state_keys.decrypt(encrypt_v10(b"value", os.urandom(32)), "key", strip_cookie_offsets) == (None, 1)
+
+
+@pytest.mark.asyncio
+async def test_fetch_batches_streams_all_rows(tmp_path):
+    db_path = tmp_path / "Cookies"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE cookies (name TEXT)")
+        conn.executemany("INSERT INTO cookies VALUES (?)", [(f"cookie_{i}",) for i in range(25)])
+
+    batches = [rows async for rows in fetch_batches(str(db_path), "SELECT name FROM cookies", batch_size=10)]
+
+    assert [len(rows) for rows in batches] == [10, 10, 5]
+    assert batches[0][0] == (b"cookie_0",)
@@ -0,0 +1,89 @@
+"""Tests for the retry decryption of Chromium cookies and logins."""
+
+import asyncio
+import os
+from unittest.mock import patch
+from uuid import uuid4
+
+import pytest
+from chromium.importer import strip_cookie_offsets, strip_password_offsets
+from chromium.retry import ChromiumRetryScheduler, decrypt_state_key_rows
+from Crypto.Cipher import AES
+
+
+def encrypt_v10(plaintext: bytes, key: bytes) -> bytes:
+    iv = os.urandom(12)
+    ciphertext, tag = AES.new(key, AES.MODE_GCM, iv).encrypt_and_digest(plaintext)
+    return b"v10" + iv + ciphertext + tag
+
+
+def state_key(key_id: int, username: str, key_bytes: bytes | None) -> dict:
+    return {
+        "id": key_id,
+        "source": "host://workstation",
+        "username": username,
+        "browser": "chrome",
+        "key_bytes_dec": key_bytes,
+        "app_bound_key_dec": None,
+    }
+
+
+def row(row_id: int, value_enc: bytes, username: str | None, state_key_id: int | None = None) -> dict:
+    return {
+        "id": row_id,
+        "encryption_type": "key",
+        "state_key_id": state_key_id,
+        "value_enc": value_enc,
+        "source": "host://workstation",
+        "username": username,
+        "browser": "chrome" if username else None,
+    }
+
+
+class TestDecryptStateKeyRows:
+    def test_rows_decrypt_with_key_of_their_user(self):
+        alice_key, bob_key = os.urandom(32), os.urandom(32)
+        keys = {"host://workstation": [state_key(1, "alice", alice_key), state_key(2, "bob", bob_key)]}
+        rows = [
+            row(10, encrypt_v10(b"alice-password", alice_key), "alice"),
+            row(11, encrypt_v10(b"pw", bob_key), "bob"),
+        ]
+
+        updates = decrypt_state_key_rows(rows, keys, strip_password_offsets, source_fallback=False)
+
+        assert updates == [(10, "alice-password", 1), (11, "pw", 2)]
+
+    def test_undecrypted_keys_are_skipped(self):
+        keys = {"host://workstation": [state_key(1, "alice", None)]}
+        rows = [row(10, encrypt_v10(b"value", os.urandom(32)), "alice", state_key_id=1)]
+
+        assert decrypt_state_key_rows(rows, keys, strip_cookie_offsets, source_fallback=False) == []
+
+    def test_source_fallback_for_rows_without_user(self):
+        key = os.urandom(32)
+        keys = {"host://workstation": [state_key(3, "alice", key)]}
+        rows = [row(10, encrypt_v10(b"secret", key), None)]
+
+        assert decrypt_state_key_rows(rows, keys, strip_password_offsets, source_fallback=False) == []
+        assert decrypt_state_key_rows(rows, keys, strip_password_offsets, source_fallback=True) == [(10, "secret", 3)]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_coalesces_retries():
+    calls = []
+
+    async def fake_retry(dpapi_manager, asyncpg_pool, masterkey_guids, state_key_ids):
+        calls.append((set(masterkey_guids), set(state_key_ids)))
+
+    guid_a, guid_b = uuid4(), uuid4()
+    scheduler = ChromiumRetryScheduler(dpapi_manager=None, asyncpg_pool=None, debounce_seconds=0.01)
+    with patch("chromium.retry.retry_decrypt_chromium_data", fake_retry):
+        scheduler.schedule(masterkey_guids=[guid_a], state_key_ids=[1])
+        scheduler.schedule(masterkey_guids=[guid_b], state_key_ids=[1, 2])
+        await scheduler.join()
+
+        scheduler.schedule(state_key_ids=[3])
+        await asyncio.sleep(0)
+        await scheduler.join()
+
+    assert calls == [({guid_a, guid_b}, {1, 2}), (set(), {3})]
@@ -0,0 +1,287 @@
+"""Process-wide local cache of downloaded storage objects.
+
+Objects in the Nemesis bucket are immutable once written, so blobs are keyed by their
+bucket/object ID (not by a hash of their contents) and can be handed out to any number
+of callers. Each caller gets its own writable file: a copy-on-write reflink of the
+cached blob where the filesystem supports it, and a plain copy otherwise. Writing to,
+renaming, or deleting a hand-out therefore never changes the cached blob. While a
+hand-out is open it holds a lease on the blob, and leased blobs are never evicted.
+"""
+
+import atexit
+import fcntl
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass
+from functools import lru_cache
+
+from prometheus_client import Counter, Gauge
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# ioctl request number for FICLONE (copy-on-write clone on btrfs/xfs/overlayfs-on-xfs)
+_FICLONE = 0x40049409
+
+BLOB_CACHE_REQUESTS = Counter(
+    "nemesis_blob_cache_requests_total",
+    "Local blob cache lookups by result",
+    ["result"],
+)
+BLOB_CACHE_BYTES = Gauge("nemesis_blob_cache_bytes", "Bytes currently held in the local blob cache")
+BLOB_CACHE_EVICTIONS = Counter("nemesis_blob_cache_evictions_total", "Blobs evicted from the local blob cache")
+
+
+@dataclass
+class _CacheEntry:
+    path: str
+    size: int
+    leases: int = 0
+
+
+class CachedFile:
+    """
+    Private hand-out of a cached blob.
+
+    Mirrors the parts of the NamedTemporaryFile interface that callers of
+    StorageS3.download rely on: `.name`, context manager support, file methods,
+    and removal of the path on close when `delete` is True.
+    """
+
+    def __init__(self, path: str, release: Callable[[], None], delete: bool = True) -> None:
+        self.name = path
+        self.delete = delete
+        self.file = open(path, "r+b")
+        self._finalizer = weakref.finalize(self, CachedFile._cleanup, self.file, path, delete, release)
+
+    @staticmethod
+    def _cleanup(file, path: str, delete: bool, release: Callable[[], None]) -> None:
+        try:
+            file.close()
+            if delete:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+        finally:
+            release()
+
+    def close(self) -> None:
+        self._finalizer()
+
+    @property
+    def closed(self) -> bool:
+        return not self._finalizer.alive
+
+    def __getattr__(self, name):
+        return getattr(self.__dict__["file"], name)
+
+    def __enter__(self) -> "CachedFile":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def __iter__(self):
+        return iter(self.file)
+
+
+class LocalBlobCache:
+    """
+    Size-bounded LRU cache of storage objects on local disk.
+
+    Concurrent requests for the same key share a single in-flight fetch; blobs are
+    refcounted by leases and only unleased blobs are evicted once the cache grows
+    beyond `max_bytes`.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int) -> None:
+        os.makedirs(cache_dir, exist_ok=True)
+        self._remove_stale_dirs(cache_dir)
+        # Use a private directory per process so processes sharing the cache dir never collide
+        self.cache_dir = tempfile.mkdtemp(prefix=f"blobs-{os.getpid()}-", dir=cache_dir)
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._inflight: dict[str, Future] = {}
+        self._total_bytes = 0
+
+        atexit.register(shutil.rmtree, self.cache_dir, True)
+
+    @staticmethod
+    def _remove_stale_dirs(cache_dir: str) -> None:
+        """
+        Remove blob directories left behind by processes that exited without cleanup.
+
+        A directory is stale when its owning PID is no longer running or is our own PID
+        (a restarted container process commonly gets the same PID as its predecessor).
+        """
+        for dir_name in os.listdir(cache_dir):
+            parts = dir_name.split("-")
+            if len(parts) < 3 or parts[0] != "blobs" or not parts[1].isdigit():
+                continue
+
+            pid = int(parts[1])
+            if pid != os.getpid():
+                try:
+                    os.kill(pid, 0)
+                    continue
+                except ProcessLookupError:
+                    pass
+                except PermissionError:
+                    # The process exists but belongs to another user
+                    continue
+
+            logger.info("Removing stale blob cache directory", path=dir_name)
+            shutil.rmtree(os.path.join(cache_dir, dir_name), ignore_errors=True)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def open(self, key: str, fetch: Callable[[str], None], dest_dir: str, delete: bool = True) -> CachedFile:
+        """
+        Return a private hand-out of the blob for `key`, fetching it on a miss.
+
+        Args:
+            key: Unique, immutable identifier of the object (e.g. "bucket/object_id")
+            fetch: Callable that writes the object's contents to the given path
+            dest_dir: Directory the hand-out is created in
+            delete: Remove the hand-out when it is closed
+
+        Returns:
+            CachedFile: Writable private file whose lease is released on close
+        """
+        entry = self._acquire(key, fetch)
+        try:
+            fd, dest_path = tempfile.mkstemp(dir=dest_dir)
+            os.close(fd)
+            self._link(entry.path, dest_path)
+            return CachedFile(dest_path, lambda: self._release(key), delete=delete)
+        except BaseException:
+            self._release(key)
+            raise
+
+    def _acquire(self, key: str, fetch: Callable[[str], None]) -> _CacheEntry:
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    entry.leases += 1
+                    BLOB_CACHE_REQUESTS.labels(result="hit").inc()
+                    return entry
+
+                future = self._inflight.get(key)
+                if future is None:
+                    future = Future()
+                    self._inflight[key] = future
+                    break
+
+            # Another caller is already fetching this blob; wait for it and look again
+            BLOB_CACHE_REQUESTS.labels(result="shared").inc()
+            future.result()
+
+        BLOB_CACHE_REQUESTS.labels(result="miss").inc()
+        blob_path = os.path.join(self.cache_dir, hashlib.sha256(key.encode()).hexdigest())
+        part_path = f"{blob_path}.part"
+        try:
+            fetch(part_path)
+            os.replace(part_path, blob_path)
+            os.chmod(blob_path, 0o444)
+            entry = _CacheEntry(path=blob_path, size=os.path.getsize(blob_path), leases=1)
+
+            with self._lock:
+                self._entries[key] = entry
+                self._total_bytes += entry.size
+                self._inflight.pop(key, None)
+                self._evict_locked()
+
+            future.set_result(None)
+            return entry
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            for path in (part_path, blob_path):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            raise
+
+    def _release(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.leases -= 1
+                self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        """Drop least recently used, unleased blobs until the cache fits its budget."""
+        if self._total_bytes <= self.max_bytes:
+            BLOB_CACHE_BYTES.set(self._total_bytes)
+            return
+
+        for key in list(self._entries):
+            if self._total_bytes <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if entry.leases > 0:
+                continue
+
+            del self._entries[key]
+            self._total_bytes -= entry.size
+            BLOB_CACHE_EVICTIONS.inc()
+            try:
+                os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
+
+        BLOB_CACHE_BYTES.set(self._total_bytes)
+
+    @staticmethod
+    def _link(src_path: str, dest_path: str) -> None:
+        """Reflink `src_path` to `dest_path`, falling back to a copy.
+
+        Hardlinks are deliberately not used: they would share the cached blob's inode,
+        so a caller writing to its file (e.g. sqlite opening a database read-write)
+        would silently change the blob for every later caller.
+        """
+        try:
+            with open(src_path, "rb") as src, open(dest_path, "wb") as dest:
+                fcntl.ioctl(dest.fileno(), _FICLONE, src.fileno())
+            return
+        except OSError:
+            pass
+
+        shutil.copyfile(src_path, dest_path)
+
+
+@lru_cache(maxsize=1)
+def get_blob_cache() -> LocalBlobCache | None:
+    """
+    Return the process-wide blob cache, or None if it is disabled.
+
+    Configured through BLOB_CACHE_MAX_SIZE_MB (0 disables the cache) and BLOB_CACHE_DIR.
+    """
+    max_size_mb = int(os.getenv("BLOB_CACHE_MAX_SIZE_MB", "0"))
+    if max_size_mb <= 0:
+        return None
+
+    cache_dir = os.getenv("BLOB_CACHE_DIR", "/tmp/nemesis_blob_cache")
+    logger.info("Local blob cache enabled", cache_dir=cache_dir, max_size_mb=max_size_mb)
+    return LocalBlobCache(cache_dir, max_size_mb * 1024 * 1024)
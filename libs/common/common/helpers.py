@@ -2,8 +2,12 @@ import hashlib
 import io
 import posixpath
 import re
+from dataclasses import dataclass
 from typing import BinaryIO
 
+# Read size used when streaming a file through all digests at once
+FINGERPRINT_CHUNK_SIZE = 1024 * 1024
+
 
 def calculate_file_hash(file_path: str, hash_type: str) -> str:
     """
@@ -31,6 +35,88 @@ def calculate_file_hash(file_path: str, hash_type: str) -> str:
     return hasher.hexdigest()
 
 
+@dataclass(frozen=True)
+class FileFingerprint:
+    """Hashes, size, and type information gathered in a single pass over a file."""
+
+    size: int
+    md5: str
+    sha1: str
+    sha256: str
+    magic_type: str
+    mime_type: str
+    is_plaintext: bool
+
+    @property
+    def hashes(self) -> dict[str, str]:
+        return {"md5": self.md5, "sha1": self.sha1, "sha256": self.sha256}
+
+
+def fingerprint_file(
+    file_path: str,
+    chunk_size: int = FINGERPRINT_CHUNK_SIZE,
+    sample_size: int = 1024,
+) -> FileFingerprint:
+    """
+    Compute the MD5/SHA1/SHA256 digests, size, magic/mime type, and plaintext
+    heuristic for a file with a single hashing pass.
+
+    The file is streamed once through a reusable buffer that feeds every digest, and
+    the plaintext sample is taken from the first chunk. libmagic then runs twice (mime
+    and description) against the already-open descriptor; each of those calls reads
+    the file's header region (up to libmagic's bytes_max) on its own.
+
+    Args:
+        file_path (str): Path to the file
+        chunk_size (int): Size of each read (default 1 MiB)
+        sample_size (int): Number of leading bytes used for the plaintext check (default 1024)
+
+    Returns:
+        FileFingerprint: The collected file information
+    """
+    # libmagic is only required by the services that fingerprint files
+    import magic
+
+    md5 = hashlib.md5()
+    sha1 = hashlib.sha1()
+    sha256 = hashlib.sha256()
+    sample = b""
+    size = 0
+
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+
+    with open(file_path, "rb", buffering=0) as f:
+        while bytes_read := f.readinto(buffer):
+            chunk = view[:bytes_read]
+            md5.update(chunk)
+            sha1.update(chunk)
+            sha256.update(chunk)
+            if len(sample) < sample_size:
+                sample += chunk[: sample_size - len(sample)]
+            size += bytes_read
+
+        if size == 0:
+            # libmagic reports "inode/x-empty" for empty files by name but not by descriptor
+            mime_type = magic.from_file(file_path, mime=True)
+            magic_type = magic.from_file(file_path)
+        else:
+            f.seek(0)
+            mime_type = magic.from_descriptor(f.fileno(), mime=True)
+            f.seek(0)
+            magic_type = magic.from_descriptor(f.fileno())
+
+    return FileFingerprint(
+        size=size,
+        md5=md5.hexdigest(),
+        sha1=sha1.hexdigest(),
+        sha256=sha256.hexdigest(),
+        magic_type=magic_type,
+        mime_type=mime_type,
+        is_plaintext=mime_type == "text/plain" or is_plaintext(sample, sample_size),
+    )
+
+
 def can_convert_to_pdf(file_path: str) -> bool:
     """Returns True if the supplied file_path matches an extension that Gotenberg can convert."""
     path_regex = (
@@ -43,10 +129,9 @@ def can_convert_to_pdf(file_path: str) -> bool:
     return re.match(path_regex, file_path, re.IGNORECASE) is not None
 
 
-def is_container(mime_type: str) -> bool:
-    """Returns true if the mime type is a container we can currently extract."""
-
-    supported_mime_types = {
+# Mime types of the containers we can currently extract
+CONTAINER_MIME_TYPES = frozenset(
+    {
         "application/zip",  # .zip
         "application/x-7z-compressed",  # .7z
         "application/x-rar",  # .rar
@@ -60,8 +145,13 @@ def is_container(mime_type: str) -> bool:
         # 'application/x-debian-package',
         # 'application/x-rpm'
     }
+)
+
+
+def is_container(mime_type: str) -> bool:
+    """Returns true if the mime type is a container we can currently extract."""
 
-    return mime_type in supported_mime_types
+    return mime_type in CONTAINER_MIME_TYPES
 
 
 def is_text_file(file_path: str, sample_size: int = 1024):
@@ -2,17 +2,23 @@ import os
 import tempfile
 import uuid
 from io import BytesIO
+from typing import BinaryIO
 
 from dapr.clients import DaprClient
 from fastapi import UploadFile
 from minio import Minio
+from minio.commonconfig import CopySource
 from minio.error import S3Error
 from urllib3 import PoolManager, Retry
 
+from .blob_cache import CachedFile, get_blob_cache
 from .logger import get_logger
 
 logger = get_logger(__name__)
 
+# Part size of multipart uploads from streams of unknown length
+STREAM_PART_SIZE = 10 * 1024 * 1024
+
 
 class StorageS3:
     def __init__(
@@ -43,7 +49,25 @@ class StorageS3:
         # the bucket name must be lowercase
         self.bucket_name = bucket_name.lower()
 
-    def download(self, file_uuid: str, delete: bool = True) -> tempfile._TemporaryFileWrapper:
+    def download(self, file_uuid: str, delete: bool = True) -> tempfile._TemporaryFileWrapper | CachedFile:
+        """
+        Download an object to a local file that is private to the caller.
+
+        When the local blob cache is enabled the object is fetched at most once per
+        process and each call receives its own reflink/copy of the cached blob, so the
+        returned file can be written to, renamed, or deleted without affecting others.
+
+        Args:
+            file_uuid (str): The object ID to download
+            delete (bool): Remove the local file when it is closed
+
+        Returns:
+            File object whose `.name` is the local path
+        """
+        blob_cache = get_blob_cache()
+        if blob_cache is not None:
+            return self._download_cached(blob_cache, file_uuid, delete)
+
         try:
             temp_file = tempfile.NamedTemporaryFile(dir=self.data_download_dir, delete=delete)
 
@@ -66,6 +90,20 @@ class StorageS3:
             logger.exception(file_uuid=file_uuid, bucket_name=self.bucket_name)
             raise
 
+    def _download_cached(self, blob_cache, file_uuid: str, delete: bool) -> CachedFile:
+        """Hand out a private link to the locally cached copy, downloading the object at most once."""
+
+        def fetch(dest_path: str) -> None:
+            logger.debug("Downloading from storage", file_uuid=file_uuid, dest_path=dest_path)
+            self.minio_client.fget_object(self.bucket_name, file_uuid, dest_path)
+            logger.debug("Downloaded file", file_uuid=file_uuid)
+
+        try:
+            return blob_cache.open(f"{self.bucket_name}/{file_uuid}", fetch, self.data_download_dir, delete=delete)
+        except Exception:
+            logger.exception(file_uuid=file_uuid, bucket_name=self.bucket_name)
+            raise
+
     def download_bytes(self, file_uuid: str, offset: int = 0, length: int = 0) -> bytes:
         try:
             logger.debug("Starting file download from storage", file_uuid=file_uuid)
@@ -194,6 +232,29 @@ class StorageS3:
             logger.exception(file_path=file_path, bucket_name=self.bucket_name)
             raise
 
+    def upload_stream(self, stream: BinaryIO, length: int = -1) -> str:
+        """
+        Upload `length` bytes read from `stream` without staging them in a local file.
+
+        Objects larger than a single part are sent as an S3 multipart upload, so memory
+        use is bounded by the part size instead of the object size. With a negative
+        `length` the stream is read to its end.
+        """
+        try:
+            logger.debug(f"Streaming {length if length >= 0 else 'unknown number of'} bytes to storage")
+            file_uuid = f"{uuid.uuid4()}"
+            self.minio_client.put_object(
+                bucket_name=self.bucket_name,
+                object_name=file_uuid,
+                data=stream,
+                length=length,
+                part_size=STREAM_PART_SIZE if length < 0 else 0,
+            )
+            return file_uuid
+        except Exception:
+            logger.exception(bucket_name=self.bucket_name)
+            raise
+
     def upload(self, data: bytes) -> str:
         try:
             logger.debug(f"Uploading {len(data)} bytes to storage")
@@ -209,6 +270,16 @@ class StorageS3:
             logger.exception(bucket_name=self.bucket_name)
             raise
 
+    def copy_object(self, object_id: str) -> str:
+        """Copy an object server-side to a new object ID and return that ID."""
+        try:
+            file_uuid = f"{uuid.uuid4()}"
+            self.minio_client.copy_object(self.bucket_name, file_uuid, CopySource(self.bucket_name, object_id))
+            return file_uuid
+        except Exception:
+            logger.exception(object_id=object_id, bucket_name=self.bucket_name)
+            raise
+
     def delete_object(self, object_id: str) -> bool:
         """Delete a single object from S3 storage.
 
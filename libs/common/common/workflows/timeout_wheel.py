@@ -0,0 +1,250 @@
+"""
+Deadline-based workflow timeouts.
+
+Each workflow row gets a `deadline` when it is registered. Workflows a replica
+scheduled itself are put on an in-memory hashed timer wheel and are timed out
+within a tick of their deadline. A periodic sweep over the partial index on
+(deadline) WHERE status = 'RUNNING' catches the workflows of replicas that went
+away, so its cost depends on the number of expired workflows, not the table size.
+
+Expired workflows are claimed with a single UPDATE ... RETURNING (rows another
+replica already claimed are skipped), then terminated in Dapr concurrently.
+"""
+
+import asyncio
+import math
+import os
+from collections.abc import Awaitable, Callable
+
+import asyncpg
+import dapr.ext.workflow as wf
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Resolution of the in-memory timer wheel
+WORKFLOW_TIMEOUT_TICK_SECONDS = float(os.getenv("WORKFLOW_TIMEOUT_TICK_SECONDS", 1))
+# Interval of the database sweep for expired workflows not on this replica's wheel
+WORKFLOW_TIMEOUT_SWEEP_SECONDS = float(os.getenv("WORKFLOW_TIMEOUT_SWEEP_SECONDS", 60))
+# Maximum number of concurrent Dapr terminate calls
+WORKFLOW_TIMEOUT_CONCURRENCY = int(os.getenv("WORKFLOW_TIMEOUT_CONCURRENCY", 10))
+# Maximum number of workflows claimed per statement
+WORKFLOW_TIMEOUT_BATCH_SIZE = 500
+
+
+async def claim_expired_workflows(
+    pool: asyncpg.Pool,
+    workflow_name: str,
+    wf_ids: list[str] | None = None,
+    limit: int = WORKFLOW_TIMEOUT_BATCH_SIZE,
+) -> list[str]:
+    """Mark running workflows past their deadline as TIMEOUT.
+
+    Args:
+        pool: asyncpg connection pool
+        workflow_name: Workflow name prefix of the workflow IDs (e.g., 'file_enrichment')
+        wf_ids: Only consider these workflows, None for all workflows with the name prefix
+        limit: Maximum number of workflows to claim
+
+    Returns:
+        IDs of the workflows this call moved from RUNNING to TIMEOUT
+    """
+    id_condition = "AND wf_id = ANY($3::text[])" if wf_ids is not None else ""
+    args = [workflow_name, limit] + ([wf_ids] if wf_ids is not None else [])
+
+    async with pool.acquire() as conn:
+        records = await conn.fetch(
+            f"""
+            UPDATE workflows
+            SET status = 'TIMEOUT',
+                enrichments_failure = array_append(enrichments_failure, 'Workflow exceeded its deadline')
+            WHERE wf_id IN (
+                SELECT wf_id
+                FROM workflows
+                WHERE status = 'RUNNING'
+                AND deadline <= CURRENT_TIMESTAMP
+                AND split_part(wf_id, '.', 1) = $1
+                {id_condition}
+                ORDER BY deadline
+                LIMIT $2
+                FOR UPDATE SKIP LOCKED
+            )
+            AND status = 'RUNNING'
+            RETURNING wf_id
+            """,
+            *args,
+        )
+
+    return [record["wf_id"] for record in records]
+
+
+class WorkflowTimeoutWheel:
+    """Times out workflows at their deadline.
+
+    Workflows added with `add()` sit in one of `slots` buckets of a hashed timer wheel
+    that advances every `tick_seconds`. Adding and expiring are O(1) per workflow, and
+    all workflows expiring in the same tick are claimed with one statement.
+    """
+
+    def __init__(
+        self,
+        workflow_name: str,
+        pool: asyncpg.Pool,
+        workflow_client: wf.DaprWorkflowClient,
+        *,
+        tick_seconds: float = WORKFLOW_TIMEOUT_TICK_SECONDS,
+        slots: int = 512,
+        sweep_interval: float = WORKFLOW_TIMEOUT_SWEEP_SECONDS,
+        max_concurrency: int = WORKFLOW_TIMEOUT_CONCURRENCY,
+        on_timeout: Callable[[str], Awaitable[None]] | None = None,
+    ):
+        """
+        Args:
+            workflow_name: Workflow name prefix of the workflow IDs (e.g., 'file_enrichment')
+            pool: asyncpg connection pool (externally managed)
+            workflow_client: Dapr workflow client used to terminate timed out workflows
+            tick_seconds: resolution of the timer wheel
+            slots: number of buckets in the timer wheel
+            sweep_interval: seconds between database sweeps for expired workflows (0 disables)
+            max_concurrency: maximum number of concurrent Dapr terminate calls
+            on_timeout: awaited with the ID of every workflow this wheel timed out
+        """
+        self.workflow_name = workflow_name
+        self.pool = pool
+        self.workflow_client = workflow_client
+        self.tick_seconds = tick_seconds
+        self.sweep_interval = sweep_interval
+        self.on_timeout = on_timeout
+
+        # Each slot maps workflow ID -> remaining full rotations of the wheel
+        self._slots: list[dict[str, int]] = [{} for _ in range(slots)]
+        self._slot_of: dict[str, int] = {}
+        self._tick = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.background_tasks = set()  # Track background tasks to prevent GC
+
+    async def __aenter__(self):
+        for loop in (self._tick_loop(), self._sweep_loop()):
+            task = asyncio.create_task(loop)
+            self.background_tasks.add(task)
+            task.add_done_callback(self.background_tasks.discard)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        for task in list(self.background_tasks):
+            task.cancel()
+        if self.background_tasks:
+            await asyncio.gather(*self.background_tasks, return_exceptions=True)
+        return False
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def add(self, wf_id: str, timeout: float) -> None:
+        """Time out `wf_id` once `timeout` seconds have passed (if it is still running by then)."""
+        # Round up and skip the current tick, so the wheel never fires before the row's deadline
+        ticks = max(1, math.ceil(timeout / self.tick_seconds)) + 1
+        slot = (self._tick + ticks) % len(self._slots)
+
+        self.discard(wf_id)
+        self._slots[slot][wf_id] = (ticks - 1) // len(self._slots)
+        self._slot_of[wf_id] = slot
+
+    def discard(self, wf_id: str) -> None:
+        """Stop tracking the timeout of `wf_id`."""
+        slot = self._slot_of.pop(wf_id, None)
+        if slot is not None:
+            self._slots[slot].pop(wf_id, None)
+
+    def advance(self) -> list[str]:
+        """Move the wheel forward one tick.
+
+        Returns:
+            The workflow IDs whose timeout elapsed
+        """
+        self._tick += 1
+        bucket = self._slots[self._tick % len(self._slots)]
+
+        expired = []
+        for wf_id, rounds in list(bucket.items()):
+            if rounds:
+                bucket[wf_id] = rounds - 1
+            else:
+                del bucket[wf_id]
+                del self._slot_of[wf_id]
+                expired.append(wf_id)
+
+        return expired
+
+    async def expire(self, wf_ids: list[str] | None = None) -> list[str]:
+        """Claim and terminate expired workflows.
+
+        Args:
+            wf_ids: candidate workflow IDs, None to sweep all expired workflows
+
+        Returns:
+            IDs of the workflows that were timed out
+        """
+        timed_out = []
+        while True:
+            claimed = await claim_expired_workflows(self.pool, self.workflow_name, wf_ids)
+            if not claimed:
+                break
+
+            logger.warning(
+                "Workflows exceeded their deadline, terminating",
+                count=len(claimed),
+            )
+            await asyncio.gather(*(self._terminate(wf_id) for wf_id in claimed))
+            timed_out.extend(claimed)
+
+            if len(claimed) < WORKFLOW_TIMEOUT_BATCH_SIZE:
+                break
+
+        return timed_out
+
+    async def _terminate(self, wf_id: str) -> None:
+        async with self._semaphore:
+            try:
+                await asyncio.to_thread(self.workflow_client.terminate_workflow, wf_id)
+            except Exception as e:
+                logger.warning(f"Could not terminate workflow {wf_id}: {e}")
+
+            if self.on_timeout is not None:
+                try:
+                    await self.on_timeout(wf_id)
+                except Exception:
+                    logger.exception(message="Error handling timed out workflow", wf_id=wf_id)
+
+    async def _tick_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+
+        while True:
+            # Schedule against the loop clock so slow ticks don't make the wheel drift
+            next_tick += self.tick_seconds
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+            expired = self.advance()
+            if expired:
+                # Claim/terminate in the background so slow Dapr calls don't hold up the wheel
+                task = asyncio.create_task(self._expire_tick(expired))
+                self.background_tasks.add(task)
+                task.add_done_callback(self.background_tasks.discard)
+
+    async def _expire_tick(self, wf_ids: list[str]) -> None:
+        try:
+            await self.expire(wf_ids)
+        except Exception:
+            logger.exception(message="Error timing out workflows", count=len(wf_ids))
+
+    async def _sweep_loop(self) -> None:
+        if self.sweep_interval <= 0:
+            return
+
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.expire()
+            except Exception:
+                logger.exception(message="Error sweeping for expired workflows")
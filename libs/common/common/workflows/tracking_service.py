@@ -1,5 +1,5 @@
 # src/workflow/workflow_tracking_service.py
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 from enum import StrEnum
 from uuid import uuid4
 
@@ -22,17 +22,19 @@ class WorkflowStatus(StrEnum):
 class WorkflowTrackingService:
     """Service for tracking workflow lifecycle states in the database."""
 
-    def __init__(self, name: str, pool: asyncpg.Pool, workflow_client):
+    def __init__(self, name: str, pool: asyncpg.Pool, workflow_client, max_execution_time: int = 300):
         """Initialize the workflow tracking service.
 
         Args:
             name: Name prefix for workflow instance IDs
             pool: asyncpg connection pool for database operations
             workflow_client: Dapr workflow client for monitoring workflow states
+            max_execution_time: Seconds after registration until a workflow is timed out (default: 300)
         """
         self._name = name
         self.pool = pool
         self.workflow_client = workflow_client
+        self.max_execution_time = max_execution_time
 
     def _create_instance_id(self, object_id: str) -> str:
         """Create a workflow instance ID.
@@ -57,19 +59,21 @@ class WorkflowTrackingService:
             The generated workflow instance ID
         """
         instance_id = self._create_instance_id(object_id)
+        start_time = datetime.now(UTC)
 
         try:
             async with self.pool.acquire() as conn:
                 await conn.execute(
                     """
-                    INSERT INTO workflows (wf_id, object_id, filename, status, start_time)
-                    VALUES ($1, $2, $3, $4, $5)
+                    INSERT INTO workflows (wf_id, object_id, filename, status, start_time, deadline)
+                    VALUES ($1, $2, $3, $4, $5, $6)
                     """,
                     instance_id,
                     object_id,
                     filename,
                     WorkflowStatus.SCHEDULED,
-                    datetime.now(UTC),
+                    start_time,
+                    start_time + timedelta(seconds=self.max_execution_time),
                 )
 
             logger.debug(
@@ -0,0 +1,146 @@
+"""Tests for common.blob_cache - shared local cache of downloaded objects."""
+
+import os
+import threading
+import time
+
+import pytest
+from common.blob_cache import LocalBlobCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LocalBlobCache(str(tmp_path / "cache"), max_bytes=100)
+
+
+@pytest.fixture
+def dest_dir(tmp_path):
+    path = tmp_path / "downloads"
+    path.mkdir()
+    return str(path)
+
+
+def make_fetcher(contents: dict[str, bytes], calls: list[str], delay: float = 0.0):
+    def fetch_for(key: str):
+        def fetch(dest_path: str) -> None:
+            calls.append(key)
+            time.sleep(delay)
+            with open(dest_path, "wb") as f:
+                f.write(contents[key])
+
+        return fetch
+
+    return fetch_for
+
+
+class TestLocalBlobCache:
+    def test_second_open_is_a_hit(self, cache, dest_dir):
+        calls = []
+        fetch_for = make_fetcher({"a": b"hello"}, calls)
+
+        with cache.open("a", fetch_for("a"), dest_dir) as first:
+            assert first.read() == b"hello"
+        with cache.open("a", fetch_for("a"), dest_dir) as second:
+            assert second.read() == b"hello"
+
+        assert calls == ["a"]
+
+    def test_hand_outs_are_private_and_deleted_on_close(self, cache, dest_dir):
+        fetch_for = make_fetcher({"a": b"hello"}, [])
+
+        first = cache.open("a", fetch_for("a"), dest_dir)
+        second = cache.open("a", fetch_for("a"), dest_dir)
+        assert first.name != second.name
+
+        # Renaming one hand-out must not affect the cache or other hand-outs
+        os.rename(first.name, first.name + ".renamed")
+        with open(second.name, "rb") as f:
+            assert f.read() == b"hello"
+
+        second.close()
+        assert not os.path.exists(second.name)
+        first.close()
+        assert os.listdir(dest_dir) == [os.path.basename(first.name) + ".renamed"]
+
+    def test_delete_false_keeps_hand_out(self, cache, dest_dir):
+        fetch_for = make_fetcher({"a": b"hello"}, [])
+
+        with cache.open("a", fetch_for("a"), dest_dir, delete=False) as f:
+            path = f.name
+
+        assert os.path.exists(path)
+
+    def test_lru_eviction_skips_leased_blobs(self, cache, dest_dir):
+        calls = []
+        fetch_for = make_fetcher({"a": b"x" * 60, "b": b"y" * 60, "c": b"z" * 60}, calls)
+
+        leased = cache.open("a", fetch_for("a"), dest_dir)
+        cache.open("b", fetch_for("b"), dest_dir).close()
+
+        # "a" is still leased, so "b" is the one that has to go
+        assert "a" in cache
+        assert "b" not in cache
+
+        leased.close()
+        cache.open("c", fetch_for("c"), dest_dir).close()
+        assert "a" not in cache
+        assert "c" in cache
+        assert cache.total_bytes == 60
+        assert calls == ["a", "b", "c"]
+
+    def test_concurrent_opens_share_one_fetch(self, cache, dest_dir):
+        calls = []
+        fetch_for = make_fetcher({"a": b"hello"}, calls, delay=0.2)
+        results = []
+
+        def worker():
+            with cache.open("a", fetch_for("a"), dest_dir) as f:
+                results.append(f.read())
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert calls == ["a"]
+        assert results == [b"hello"] * 5
+
+    def test_failed_fetch_is_not_cached(self, cache, dest_dir):
+        def failing_fetch(dest_path: str) -> None:
+            raise ConnectionError("boom")
+
+        with pytest.raises(ConnectionError):
+            cache.open("a", failing_fetch, dest_dir)
+
+        assert "a" not in cache
+        assert os.listdir(cache.cache_dir) == []
+
+        with cache.open("a", make_fetcher({"a": b"ok"}, [])("a"), dest_dir) as f:
+            assert f.read() == b"ok"
+
+    def test_writes_to_hand_out_do_not_change_cache(self, cache, dest_dir):
+        fetch_for = make_fetcher({"a": b"original"}, [])
+
+        with cache.open("a", fetch_for("a"), dest_dir) as first:
+            with open(first.name, "r+b") as f:
+                f.write(b"MUTATED!")
+
+        with cache.open("a", fetch_for("a"), dest_dir) as second:
+            assert second.read() == b"original"
+
+    def test_stale_process_dirs_are_removed(self, tmp_path):
+        cache_dir = tmp_path / "cache"
+        # A PID above the kernel's pid_max cannot belong to a running process
+        stale = cache_dir / "blobs-99999999-abc"
+        own_pid_leftover = cache_dir / f"blobs-{os.getpid()}-old"
+        unrelated = cache_dir / "other"
+        for path in (stale, own_pid_leftover, unrelated):
+            path.mkdir(parents=True)
+
+        cache = LocalBlobCache(str(cache_dir), max_bytes=100)
+
+        assert not stale.exists()
+        assert not own_pid_leftover.exists()
+        assert unrelated.exists()
+        assert os.path.isdir(cache.cache_dir)
@@ -1,6 +1,6 @@
 """Tests for chromium.local_state module."""
 
-from common.helpers import get_drive_from_path
+from common.helpers import calculate_file_hash, fingerprint_file, get_drive_from_path
 
 
 class TestGetDriveFromPath:
@@ -122,3 +122,45 @@ class TestGetDriveFromPath:
         assert (
             get_drive_from_path("/E/Users/test/AppData/Local/BraveSoftware/Brave-Browser/User Data/Local State") is None
         )  # Without colon should fail
+
+
+class TestFingerprintFile:
+    """Test cases for the single-pass fingerprint_file function."""
+
+    def test_matches_per_digest_hashes(self, tmp_path):
+        """Hashes match calculate_file_hash across multiple read chunks."""
+        test_file = tmp_path / "data.bin"
+        test_file.write_bytes(bytes(range(256)) * 1000)
+
+        fingerprint = fingerprint_file(str(test_file), chunk_size=4096)
+
+        assert fingerprint.size == 256000
+        assert fingerprint.hashes == {
+            "md5": calculate_file_hash(str(test_file), "md5"),
+            "sha1": calculate_file_hash(str(test_file), "sha1"),
+            "sha256": calculate_file_hash(str(test_file), "sha256"),
+        }
+        assert fingerprint.is_plaintext is False
+
+    def test_plaintext_file(self, tmp_path):
+        """A text file is detected as plaintext with a text mime type."""
+        test_file = tmp_path / "notes.txt"
+        test_file.write_text("hello world\n" * 100)
+
+        fingerprint = fingerprint_file(str(test_file), chunk_size=64)
+
+        assert fingerprint.is_plaintext is True
+        assert fingerprint.mime_type == "text/plain"
+        assert fingerprint.magic_type.startswith("ASCII text")
+
+    def test_empty_file(self, tmp_path):
+        """An empty file keeps libmagic's by-name result."""
+        test_file = tmp_path / "empty"
+        test_file.write_bytes(b"")
+
+        fingerprint = fingerprint_file(str(test_file))
+
+        assert fingerprint.size == 0
+        assert fingerprint.mime_type == "inode/x-empty"
+        assert fingerprint.sha256 == calculate_file_hash(str(test_file), "sha256")
+        assert fingerprint.is_plaintext is True
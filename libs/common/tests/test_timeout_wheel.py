@@ -0,0 +1,78 @@
+"""Tests for common.workflows.timeout_wheel - deadline-based workflow timeouts."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from common.workflows.timeout_wheel import WorkflowTimeoutWheel
+
+
+@pytest.fixture
+def mock_pool():
+    pool = MagicMock()
+    conn = AsyncMock()
+    cm = AsyncMock()
+    cm.__aenter__ = AsyncMock(return_value=conn)
+    cm.__aexit__ = AsyncMock(return_value=False)
+    pool.acquire.return_value = cm
+    return pool, conn
+
+
+def test_wheel_expires_after_timeout(mock_pool):
+    wheel = WorkflowTimeoutWheel("file_enrichment", mock_pool[0], MagicMock(), tick_seconds=1, slots=4)
+    wheel.add("wf.short", 2)
+    # Longer than a full rotation of the wheel
+    wheel.add("wf.long", 9)
+
+    expired = {tick: wheel.advance() for tick in range(1, 12)}
+
+    assert [tick for tick, wf_ids in expired.items() if "wf.short" in wf_ids] == [3]
+    assert [tick for tick, wf_ids in expired.items() if "wf.long" in wf_ids] == [10]
+    assert len(wheel) == 0
+
+
+def test_discarded_workflows_do_not_expire(mock_pool):
+    wheel = WorkflowTimeoutWheel("file_enrichment", mock_pool[0], MagicMock(), tick_seconds=1, slots=4)
+    wheel.add("wf.done", 1)
+    wheel.discard("wf.done")
+
+    assert [wheel.advance() for _ in range(8)] == [[]] * 8
+
+
+@pytest.mark.asyncio
+async def test_expired_workflows_are_claimed_in_one_statement_and_terminated(mock_pool):
+    pool, conn = mock_pool
+    # "wf.finished" completed before its deadline, so the claim doesn't return it
+    conn.fetch.return_value = [{"wf_id": "file_enrichment.a"}, {"wf_id": "file_enrichment.b"}]
+    workflow_client = MagicMock()
+    on_timeout = AsyncMock()
+
+    wheel = WorkflowTimeoutWheel("file_enrichment", pool, workflow_client, on_timeout=on_timeout)
+    timed_out = await wheel.expire(["file_enrichment.a", "file_enrichment.b", "file_enrichment.finished"])
+
+    assert timed_out == ["file_enrichment.a", "file_enrichment.b"]
+    conn.fetch.assert_awaited_once()
+    query, workflow_name, _, wf_ids = conn.fetch.call_args.args
+    assert "FOR UPDATE SKIP LOCKED" in query
+    assert workflow_name == "file_enrichment"
+    assert wf_ids == ["file_enrichment.a", "file_enrichment.b", "file_enrichment.finished"]
+    assert {call.args[0] for call in workflow_client.terminate_workflow.call_args_list} == set(timed_out)
+    assert {call.args[0] for call in on_timeout.await_args_list} == set(timed_out)
+
+
+@pytest.mark.asyncio
+async def test_wheel_times_out_workflows_in_the_background(mock_pool):
+    pool, conn = mock_pool
+    conn.fetch.return_value = [{"wf_id": "file_enrichment.a"}]
+    workflow_client = MagicMock()
+
+    async with WorkflowTimeoutWheel(
+        "file_enrichment", pool, workflow_client, tick_seconds=0.01, sweep_interval=0
+    ) as wheel:
+        wheel.add("file_enrichment.a", 0.01)
+        for _ in range(100):
+            if workflow_client.terminate_workflow.called:
+                break
+            await asyncio.sleep(0.01)
+
+    workflow_client.terminate_workflow.assert_called_once_with("file_enrichment.a")
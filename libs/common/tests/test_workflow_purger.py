@@ -0,0 +1,109 @@
+"""Tests for common.workflows.workflow_purger - set-based purging of finished workflows."""
+
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import grpc
+import pytest
+from common.workflows.workflow_purger import WORKFLOW_PURGE_LAG_SECONDS, WorkflowPurger
+
+
+class NoSuchInstance(grpc.RpcError):
+    def details(self):
+        return "no such instance exists"
+
+
+class StillRunning(grpc.RpcError):
+    def details(self):
+        return "workflow is still running"
+
+
+def make_records(count: int, start: int = 0) -> list[dict]:
+    base = datetime.now(UTC) - timedelta(hours=1)
+    return [
+        {"wf_id": f"file_enrichment.{i:04d}", "start_time": base + timedelta(seconds=i)}
+        for i in range(start, start + count)
+    ]
+
+
+@pytest.fixture
+def mock_pool():
+    pool = MagicMock()
+    conn = AsyncMock()
+    cm = AsyncMock()
+    cm.__aenter__ = AsyncMock(return_value=conn)
+    cm.__aexit__ = AsyncMock(return_value=False)
+    pool.acquire.return_value = cm
+    return pool, conn
+
+
+@pytest.mark.asyncio
+async def test_purge_cycle_pages_by_keyset_and_marks_in_bulk(mock_pool):
+    pool, conn = mock_pool
+    pages = [make_records(2), make_records(2, start=2), []]
+    # First fetch is the timed-out workflow query
+    conn.fetch.side_effect = [[], *pages]
+    workflow_client = MagicMock()
+
+    purger = WorkflowPurger("file_enrichment", pool, workflow_client, batch_size=2)
+    stats = await purger._run_purge_cycle()
+
+    assert stats == {"total_checked": 4, "purged": 4, "timed_out": 0, "batches_processed": 2}
+    assert workflow_client.purge_workflow.call_count == 4
+    workflow_client.get_workflow_state.assert_not_called()
+
+    # The second page continues after the last (start_time, wf_id) of the first
+    second_page_args = conn.fetch.call_args_list[2].args
+    assert "(start_time, wf_id) > ($3, $4)" in second_page_args[0]
+    assert second_page_args[3:5] == (pages[0][-1]["start_time"], pages[0][-1]["wf_id"])
+
+    marked = [call.args[1] for call in conn.execute.call_args_list]
+    assert marked == [
+        ["file_enrichment.0000", "file_enrichment.0001"],
+        ["file_enrichment.0002", "file_enrichment.0003"],
+    ]
+    assert WORKFLOW_PURGE_LAG_SECONDS.labels(workflow_name="file_enrichment")._value.get() >= 3600
+
+
+@pytest.mark.asyncio
+async def test_only_workflows_gone_from_dapr_are_marked_purged(mock_pool):
+    pool, conn = mock_pool
+    conn.fetch.side_effect = [[], make_records(3)]
+    workflow_client = MagicMock()
+    workflow_client.purge_workflow.side_effect = [None, NoSuchInstance(), StillRunning()]
+
+    purger = WorkflowPurger("file_enrichment", pool, workflow_client, batch_size=50)
+    stats = await purger._run_purge_cycle()
+
+    assert stats["purged"] == 2
+    conn.execute.assert_awaited_once()
+    assert conn.execute.call_args.args[1] == ["file_enrichment.0000", "file_enrichment.0001"]
+
+
+@pytest.mark.asyncio
+async def test_workflows_past_deadline_are_terminated(mock_pool):
+    pool, conn = mock_pool
+    # The claim (UPDATE ... RETURNING) returns the workflows it moved to TIMEOUT
+    conn.fetch.side_effect = [[{"wf_id": "file_enrichment.stuck"}], []]
+    workflow_client = MagicMock()
+
+    purger = WorkflowPurger("file_enrichment", pool, workflow_client)
+    stats = await purger._run_purge_cycle()
+
+    assert stats["timed_out"] == 1
+    assert "deadline <= CURRENT_TIMESTAMP" in conn.fetch.call_args_list[0].args[0]
+    workflow_client.terminate_workflow.assert_called_once_with("file_enrichment.stuck")
+    # Marked TIMEOUT only; it is purged from Dapr once it shows up as a purge candidate
+    workflow_client.purge_workflow.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_timeouts_can_be_left_to_a_timeout_wheel(mock_pool):
+    pool, conn = mock_pool
+    conn.fetch.side_effect = [[]]
+
+    purger = WorkflowPurger("file_enrichment", pool, MagicMock(), handle_timeouts=False)
+    stats = await purger._run_purge_cycle()
+
+    assert stats["timed_out"] == 0
+    assert "deadline" not in conn.fetch.call_args.args[0]
@@ -8,11 +8,26 @@ from common.models import EnrichmentResult, FileObject, Finding, FindingCategory
 from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
 from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.routing import ModuleRouting, Route
 from impacket.krb5.ccache import CCache
 
 logger = get_logger(__name__)
 
 
+CCACHE_YARA_RULE = """rule CCache_File {
+    meta:
+        description = "Detects Kerberos credential cache files"
+
+    strings:
+        $ccache_v4 = { 05 04 }
+        $ccache_v3 = { 05 03 }
+
+    condition:
+        ($ccache_v4 at 0) or ($ccache_v3 at 0)
+}
+"""
+
+
 class CcacheAnalyzer(EnrichmentModule):
     """Analyzer for Kerberos Credential Cache (ccache) files.
 
@@ -56,23 +71,14 @@ class CcacheAnalyzer(EnrichmentModule):
     def __init__(self):
         self.storage = StorageMinio()
         self.workflows = ["default"]
+        self.routing = ModuleRouting(
+            routes=(Route(extensions={".ccache"}), Route(names=("krb5cc_*",)), Route(header_rule=CCACHE_YARA_RULE))
+        )
         self.size_limit = 50_000_000  # 50 MB limit for YARA scanning
         self.asyncpg_pool = None
 
         # YARA rule to detect ccache files by magic bytes
-        self.yara_rule = yara_x.compile("""
-rule CCache_File {
-    meta:
-        description = "Detects Kerberos credential cache files"
-
-    strings:
-        $ccache_v4 = { 05 04 }
-        $ccache_v3 = { 05 03 }
-
-    condition:
-        ($ccache_v4 at 0) or ($ccache_v3 at 0)
-}
-        """)
+        self.yara_rule = yara_x.compile(CCACHE_YARA_RULE)
 
     async def should_process(self, object_id: str, file_path: str | None = None) -> bool:
         """Determine if this module should process the file."""
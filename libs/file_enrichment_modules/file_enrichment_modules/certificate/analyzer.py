@@ -12,6 +12,7 @@ from cryptography.exceptions import UnsupportedAlgorithm
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.serialization import pkcs12
 from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.routing import ModuleRouting, Route
 
 logger = get_logger(__name__)
 
@@ -23,12 +24,15 @@ class CertificateAnalyzer(EnrichmentModule):
     def __init__(self):
         self.storage = StorageMinio()
         self.workflows = ["default"]
-
         self.asyncpg_pool = None  # type: ignore
 
         # Valid certificate file extensions
         self.valid_extensions = {".pem", ".crt", ".cer", ".der", ".p7b", ".p7c", ".pfx", ".p12"}
 
+        self.routing = ModuleRouting(
+            routes=(Route(extensions=self.valid_extensions), Route(magic=("certificate", "pkcs", "x.509", "pem")))
+        )
+
         # Common passwords to try for encrypted certificates/keys
         self.common_passwords = [
             "",
@@ -10,6 +10,7 @@ from common.models import EnrichmentResult, Transform
 from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
 from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.routing import ModuleRouting, Route
 
 logger = get_logger(__name__)
 
@@ -21,6 +22,9 @@ class ChromeHistoryParser(EnrichmentModule):
     def __init__(self):
         self.storage = StorageMinio()
         self.workflows = ["default"]
+        self.routing = ModuleRouting(
+            routes=(Route(names=("history",), magic=("sqlite 3.x database",), plaintext=False),), should_process=True
+        )
         self.asyncpg_pool = None  # type: ignore
 
         # Yara rule to check for Chrome History tables
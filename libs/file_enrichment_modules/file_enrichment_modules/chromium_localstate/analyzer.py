@@ -9,6 +9,7 @@ from common.models import EnrichmentResult
 from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
 from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.routing import ModuleRouting, Route
 from nemesis_dpapi import DpapiManager
 
 if TYPE_CHECKING:
@@ -26,6 +27,7 @@ class ChromeLocalStateParser(EnrichmentModule):
 
         # the workflows this module should automatically run in
         self.workflows = ["default"]
+        self.routing = ModuleRouting(routes=(Route(magic=("json",), max_size=4_999_999),), should_process=True)
 
         self.dpapi_manager: DpapiManager = None  # type: ignore
         self.asyncpg_pool = None  # type: ignore
@@ -14,6 +14,7 @@ from common.models import EnrichmentResult, Transform
 from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
 from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.routing import ModuleRouting, Route
 
 if TYPE_CHECKING:
     from nemesis_dpapi import DpapiManager
@@ -30,6 +31,9 @@ class ChromeLoginsParser(EnrichmentModule):
 
         # the workflows this module should automatically run in
         self.workflows = ["default"]
+        self.routing = ModuleRouting(
+            routes=(Route(magic=("sqlite 3.x database",), plaintext=False),), should_process=True
+        )
 
         self.dpapi_manager: DpapiManager = None  # type: ignore
         self.loop: asyncio.AbstractEventLoop = None  # type: ignore
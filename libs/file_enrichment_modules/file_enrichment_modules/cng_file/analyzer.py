@@ -20,6 +20,7 @@ from file_enrichment_modules.cng_file.cng_parser import (
     parse_cng_stream,
 )
 from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.routing import ModuleRouting, Route
 from nemesis_dpapi import Blob, BlobDecryptionError, DpapiManager, MasterKeyNotDecryptedError, MasterKeyNotFoundError
 
 if TYPE_CHECKING:
@@ -30,6 +31,18 @@ if TYPE_CHECKING:
 logger = get_logger(__name__)
 
 
+# Routing prefilter, the full is_cng_file rule is checked by should_process
+CNG_HEADER_YARA_RULE = """rule CNG_Header
+{
+    strings:
+        $cng_header = { 01 00 00 00 00 00 00 00 22 00 00 00 }
+
+    condition:
+        $cng_header at 0
+}
+"""
+
+
 class CngFileAnalyzer(EnrichmentModule):
     name: str = "cng_analyzer"
     dependencies: list[str] = []
@@ -41,6 +54,9 @@ class CngFileAnalyzer(EnrichmentModule):
         self.dpapi_manager: DpapiManager = None  # type: ignore
         self.loop: asyncio.AbstractEventLoop = None  # type: ignore
         self.workflows = ["default"]
+        self.routing = ModuleRouting(
+            routes=(Route(max_size=10000, header_rule=CNG_HEADER_YARA_RULE),), should_process=True
+        )
         self.asyncpg_pool: asyncpg.Pool | None = None  # Connection pool for database operations
 
         # Yara rule to identify CNG files
@@ -5,12 +5,13 @@ import zipfile
 from datetime import UTC, datetime
 
 import py7zr
-from common.helpers import is_container
+from common.helpers import CONTAINER_MIME_TYPES, is_container
 from common.logger import get_logger
 from common.models import EnrichmentResult, Transform
 from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
 from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.routing import ModuleRouting, Route
 
 logger = get_logger(__name__)
 
@@ -24,6 +25,7 @@ class ContainerAnalyzer(EnrichmentModule):
 
         self.asyncpg_pool = None  # type: ignore
         self.workflows = ["default"]
+        self.routing = ModuleRouting(routes=(Route(mime_types=CONTAINER_MIME_TYPES),))
 
     async def should_process(self, object_id: str, file_path: str | None = None) -> bool:
         """Determine if this module should run.
@@ -11,6 +11,7 @@ from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
 from dapr.aio.clients import DaprClient
 from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.routing import ModuleRouting, Route
 
 logger = get_logger(__name__)
 
@@ -116,6 +117,7 @@ class DotNetAnalyzer(EnrichmentModule):
         self.asyncpg_pool = None  # type: ignore
         # the workflows this module should automatically run in
         self.workflows = ["default"]
+        self.routing = ModuleRouting(routes=(Route(magic=("mono/.net assembly",)),))
 
     async def should_process(self, object_id: str, file_path: str | None = None) -> bool:
         """Determine if this module should run."""
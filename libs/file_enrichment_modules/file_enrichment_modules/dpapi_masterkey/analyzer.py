@@ -9,8 +9,11 @@ from common.models import EnrichmentResult
 from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
 from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.registry_hive.hive_index import find_hive
+from file_enrichment_modules.routing import ModuleRouting, Route
 from file_linking.helpers import add_file_linking
 from nemesis_dpapi import DpapiManager, MasterKey, MasterKeyFile, MasterKeyType
+from nemesis_dpapi.core import user_sid_from_path
 from nemesis_dpapi.exceptions import WriteOnceViolationError
 
 if TYPE_CHECKING:
@@ -37,6 +40,9 @@ class DPAPIMasterkeyAnalyzer(EnrichmentModule):
 
         # the workflows this module should automatically run in
         self.workflows = ["default"]
+        self.routing = ModuleRouting(
+            routes=(Route(names=("-".join("[0-9a-f]" * n for n in (8, 4, 4, 4, 12)),), max_size=2048, plaintext=False),)
+        )
 
         # GUID regex pattern
         self.guid_pattern = re.compile(
@@ -64,83 +70,21 @@ class DPAPIMasterkeyAnalyzer(EnrichmentModule):
         file_name_lower = file_enriched.file_name.lower() if file_enriched.file_name else ""
         return self.guid_pattern.match(file_name_lower) is not None
 
-    async def _find_existing_hive(self, file_enriched, target_hive_path: str) -> str | None:
-        """Find an existing hive by path."""
+    async def _get_existing_hive_path(self, file_enriched, standard_path: str) -> str:
+        """Get the actual path of an existing hive, or return the standard path if not found."""
         if not self.asyncpg_pool:
             logger.warning("No connection pool available, cannot find existing hive")
-            return None
+            return standard_path
 
         try:
-            async with self.asyncpg_pool.acquire() as conn:
-                # Look for existing hive by path
-                result = await conn.fetchrow(
-                    """
-                    SELECT object_id
-                    FROM files_enriched
-                    WHERE source = $1
-                    AND LOWER(path) = LOWER($2)
-                    ORDER BY timestamp DESC
-                    LIMIT 1
-                """,
-                    file_enriched.source,
-                    target_hive_path,
-                )
-
-                if result:
-                    return str(result["object_id"])  # Convert UUID to string
-
-                # Fallback query: look for registry files by magic_type and enrichment results
-                # Extract the hive type from the target path (e.g., SECURITY from .../Windows/System32/Config/SECURITY)
-                target_hive_type = posixpath.basename(target_hive_path).upper()
-
-                result = await conn.fetchrow(
-                    """
-                    SELECT fe.object_id
-                    FROM files_enriched fe
-                    JOIN enrichments e ON fe.object_id = e.object_id
-                    WHERE fe.source = $1
-                    AND fe.magic_type = 'MS Windows registry file, NT/2000 or above'
-                    AND e.module_name = 'registry_hive'
-                    AND e.result_data->'results'->'hive_type' = $2
-                    ORDER BY fe.timestamp DESC
-                    LIMIT 1
-                """,
-                    file_enriched.source,
-                    f'"{target_hive_type}"',
-                )
-
-                if result:
-                    return str(result["object_id"])  # Convert UUID to string
-
+            # Look the hive up in the registry_hive module's index of SYSTEM/SAM/SECURITY hives
+            hive_type = posixpath.basename(standard_path).upper()
+            hive = await find_hive(self.asyncpg_pool, file_enriched.source, hive_type, standard_path)
+            if hive and hive.path:
+                logger.debug(f"Found existing hive at {hive.path} instead of {standard_path}")
+                return hive.path
         except Exception as e:
-            logger.error(f"Failed to find existing hive {target_hive_path}: {e}")
-
-        return None
-
-    async def _get_existing_hive_path(self, file_enriched, standard_path: str) -> str:
-        """Get the actual path of an existing hive, or return the standard path if not found."""
-        # First try to find an existing hive
-        object_id = await self._find_existing_hive(file_enriched, standard_path)
-
-        if object_id and self.asyncpg_pool:
-            # Found an existing hive, get its actual path from the database
-            try:
-                async with self.asyncpg_pool.acquire() as conn:
-                    result = await conn.fetchrow(
-                        """
-                        SELECT path
-                        FROM files_enriched
-                        WHERE object_id = $1
-                        LIMIT 1
-                    """,
-                        object_id,
-                    )
-
-                    if result and result["path"]:
-                        logger.debug(f"Found existing hive at {result['path']} instead of {standard_path}")
-                        return result["path"]
-            except Exception as e:
-                logger.error(f"Failed to get path for existing hive {object_id}: {e}")
+            logger.error(f"Failed to find existing hive {standard_path}: {e}")
 
         # Fall back to standard path if not found or on error
         return standard_path
@@ -215,6 +159,7 @@ class DPAPIMasterkeyAnalyzer(EnrichmentModule):
                 encrypted_key_backup=backup_key.raw_bytes if backup_key else None,
                 backup_key_guid=backup_key.guid_key if backup_key else None,
                 masterkey_type=MasterKeyType.from_path(file_enriched.path),
+                user_sid=user_sid_from_path(file_enriched.path),
             )
 
             # The DPAPI manager handles all decryption automatically
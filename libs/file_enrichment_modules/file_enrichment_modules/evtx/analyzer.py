@@ -13,7 +13,7 @@ import json
 import os
 import re
 import tempfile
-from collections import defaultdict
+from collections import defaultdict, deque
 from datetime import datetime, timedelta
 
 import evtx as evtx_lib
@@ -21,7 +21,8 @@ from common.logger import get_logger
 from common.models import EnrichmentResult, FileObject, Finding, FindingCategory, FindingOrigin, Transform
 from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
-from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.module_loader import EnrichmentModule, run_blocking
+from file_enrichment_modules.routing import ModuleRouting, Route
 
 logger = get_logger(__name__)
 
@@ -94,6 +95,10 @@ MAX_SCRIPT_BLOCK_FILES = 100
 MIN_SCRIPT_BLOCK_SIZE = 100
 # Cap on events stored per event ID in the summary (avoids huge result JSON)
 MAX_EVENTS_PER_ID = 50
+# Cap on the events kept in memory for the categories listed in full (CSV transforms, findings)
+MAX_EVENTS_PER_CATEGORY = 1000
+# Threads PyEvtxParser decodes chunks with (0 = one per CPU)
+EVTX_PARSER_THREADS = int(os.getenv("EVTX_PARSER_THREADS", 2))
 # Number of days back from the most recent event to include in the power timeline
 POWER_TIMELINE_DAYS = 15
 
@@ -114,6 +119,35 @@ POWER_EVENT_LABELS = {
     "6008": "Unclean Shutdown",
 }
 
+ACCOUNT_CHANGE_EVENT_IDS = {"4720", "4722", "4726", "4738", "4724"}
+GROUP_CHANGE_EVENT_IDS = {"4728", "4729", "4732", "4733"}
+TASK_EVENT_IDS = {"106", "141", "140"}
+
+# Event IDs whose records are decoded for their details. All other records are only
+# counted and scanned for the time range, computer, accounts and IPs.
+DECODED_EVENT_IDS = frozenset(
+    {"4624", "4625", "4648", "4688", "4776", "4768", "4769", "1102", "7045", "4104"}
+    | ACCOUNT_CHANGE_EVENT_IDS
+    | GROUP_CHANGE_EVENT_IDS
+    | TASK_EVENT_IDS
+    | POWER_EVENT_LABELS.keys()
+)
+
+PROCESS_CREATION_CSV_HEADER = ["time", "process", "command_line", "parent_process", "user", "domain"]
+
+# EventData fields collected into the unique account and IP sets of every record
+ACCOUNT_FIELDS = ("SubjectUserName", "TargetUserName")
+IP_FIELDS = ("IpAddress", "Workstation", "WorkstationName")
+
+# Records are read as compact JSON text, string values are found by their '"key":"' prefix.
+# EventID is either a plain number or {"#attributes": {...}, "#text": N}
+_SYSTEM_TIME_KEY = '"SystemTime":"'
+_COMPUTER_KEY = '"Computer":"'
+_ACCOUNT_KEYS = tuple(f'"{field}":"' for field in ACCOUNT_FIELDS)
+_IP_KEYS = tuple(f'"{field}":"' for field in IP_FIELDS)
+_EVENT_ID_VALUE_RE = re.compile(r'(?:\{(?:[^{}]|\{[^{}]*\})*?"#text":)?"?(\d+)')
+_JSON_STRING_RE = re.compile(r'"(?:[^"\\]|\\.)*"')
+
 
 def _normalize_event_id(eid_raw) -> str:
     """EventID is sometimes a plain int/str, sometimes {'#text': N, '#attributes': {...}}."""
@@ -122,12 +156,9 @@ def _normalize_event_id(eid_raw) -> str:
     return str(eid_raw)
 
 
-def _get_system_time(sys_block: dict) -> str | None:
-    """Extract SystemTime from TimeCreated block."""
-    tc = sys_block.get("TimeCreated", {})
-    if isinstance(tc, dict):
-        return tc.get("#attributes", {}).get("SystemTime")
-    return None
+def _count_events(parsed: dict, event_ids: set[str]) -> int:
+    """Total number of events with the given IDs in the parsed file."""
+    return sum(parsed["event_counts"].get(eid, 0) for eid in event_ids)
 
 
 def _safe_str(val) -> str:
@@ -149,6 +180,393 @@ def _is_noise_user(user: str, sid: str = "") -> bool:
     return bool(_NOISE_USER_CONTEXT_RE.match(bare))
 
 
+def _string_value(record: str, key: str, start: int = 0) -> str | None:
+    """Return the string value after the first `key` ('"name":"') in a record's JSON text."""
+    value_start = record.find(key, start)
+    if value_start == -1:
+        return None
+    value_start += len(key)
+    value = record[value_start : record.find('"', value_start)]
+    if "\\" in value:
+        # Escaped characters (and possibly quotes), decode the whole string
+        value = json.loads(_JSON_STRING_RE.match(record, value_start - 1).group())
+    return value.strip()
+
+
+class _EventAggregator:
+    """Streaming aggregation of the JSON records of one EVTX file.
+
+    Every record is counted and feeds the time range and unique sets, which are found
+    in the record's JSON text. Only records whose event ID is in DECODED_EVENT_IDS are
+    decoded with json.loads, and only while their category still collects events.
+    Per-category event lists are capped (counts come from `event_counts`) and 4688 rows
+    are written straight to a CSV file.
+    """
+
+    def __init__(self):
+        self.event_counts: dict[str, int] = defaultdict(int)
+        self.first_timestamp: str | None = None
+        self.last_timestamp: str | None = None
+        self.unique_accounts: set[str] = set()
+        self.unique_computers: set[str] = set()
+        self.unique_ips: set[str] = set()
+
+        # Per-category collected events
+        self.logon_events: list[dict] = []
+        self.explicit_logon_events: list[dict] = []
+        self.account_change_events: list[dict] = []
+        self.group_change_events: list[dict] = []
+        self.admin_group_change_count = 0
+        self.service_install_events: list[dict] = []
+        self.task_events: list[dict] = []
+        self.log_cleared_events: list[dict] = []
+        self.ntlm_events: list[dict] = []
+        self.kerberos_tgt_events: list[dict] = []
+        self.kerberos_st_events: list[dict] = []
+        # The power timeline shows the most recent events, so keep the last ones
+        self.power_events: deque[dict] = deque(maxlen=MAX_EVENTS_PER_CATEGORY)
+
+        # Process creation — no cap, the full dataset goes to a CSV written while parsing
+        self.process_creation_count = 0
+        self._process_creation_file = None
+        self._process_creation_writer = None
+
+        # Script block reassembly: script_block_id -> list of (msg_num, text)
+        self.script_blocks: dict[str, dict] = {}  # id -> {total, chunks: {num: text}, path: str, time: str}
+
+        # Lists capped at MAX_EVENTS_PER_ID, records of these IDs aren't decoded once they're full
+        self._capped_events = {
+            "4624": self.logon_events,
+            "4625": self.logon_events,
+            "4648": self.explicit_logon_events,
+            "4776": self.ntlm_events,
+            "4768": self.kerberos_tgt_events,
+            "4769": self.kerberos_st_events,
+        }
+
+    def add(self, record: str) -> None:
+        """Aggregate one record, as serialized by PyEvtxParser.records_json()."""
+        try:
+            eid_start = record.find('"EventID":')
+            eid_match = _EVENT_ID_VALUE_RE.match(record, eid_start + 10) if eid_start != -1 else None
+            if eid_match is None:
+                # Unusual layout, let the JSON decoder find the EventID
+                sys = json.loads(record).get("Event", {}).get("System", {})
+                eid = _normalize_event_id(sys.get("EventID", ""))
+            else:
+                eid = eid_match.group(1)
+
+            timestamp = _string_value(record, _SYSTEM_TIME_KEY)
+            computer = _string_value(record, _COMPUTER_KEY)
+
+            self.event_counts[eid] += 1
+            if timestamp:
+                if self.first_timestamp is None or timestamp < self.first_timestamp:
+                    self.first_timestamp = timestamp
+                if self.last_timestamp is None or timestamp > self.last_timestamp:
+                    self.last_timestamp = timestamp
+            if computer:
+                self.unique_computers.add(computer)
+
+            # Collect subject/target usernames and IPs where present
+            event_data_start = record.find('"EventData":')
+            if event_data_start != -1:
+                for key in _ACCOUNT_KEYS:
+                    val = _string_value(record, key, event_data_start)
+                    if val and val not in ("-", "SYSTEM", "LOCAL SERVICE", "NETWORK SERVICE"):
+                        if not val.endswith("$"):  # Skip machine accounts
+                            self.unique_accounts.add(val)
+                for key in _IP_KEYS:
+                    val = _string_value(record, key, event_data_start)
+                    if val and val not in ("-", "::1", "127.0.0.1"):
+                        self.unique_ips.add(val)
+
+            if eid in DECODED_EVENT_IDS and self._collects(eid):
+                edata = json.loads(record).get("Event", {}).get("EventData", {}) or {}
+                self._add_event(eid, timestamp, edata)
+
+        except Exception:
+            logger.exception(message="Error parsing EVTX record")
+
+    def _collects(self, eid: str) -> bool:
+        """Whether events with this ID are still collected, the lists capped per ID stop early."""
+        events = self._capped_events.get(eid)
+        return events is None or len(events) < MAX_EVENTS_PER_ID
+
+    def _add_event(self, eid: str, timestamp: str | None, edata: dict) -> None:
+        """Collect the details of a decoded high-value event."""
+        if eid == "4624":  # Successful logon
+            logon_type = edata.get("LogonType")
+            try:
+                lt = int(logon_type) if logon_type is not None else 0
+            except (ValueError, TypeError):
+                lt = 0
+            if lt in INTERESTING_LOGON_TYPES and len(self.logon_events) < MAX_EVENTS_PER_ID:
+                self.logon_events.append(
+                    {
+                        "time": timestamp,
+                        "target_user": _safe_str(edata.get("TargetUserName")),
+                        "target_domain": _safe_str(edata.get("TargetDomainName")),
+                        "logon_type": lt,
+                        "auth_package": _safe_str(edata.get("AuthenticationPackageName")),
+                        "ip_address": _safe_str(edata.get("IpAddress")),
+                        "workstation": _safe_str(edata.get("WorkstationName")),
+                        "process": _safe_str(edata.get("ProcessName")),
+                    }
+                )
+
+        elif eid == "4625":  # Failed logon
+            if len(self.logon_events) < MAX_EVENTS_PER_ID:
+                self.logon_events.append(
+                    {
+                        "time": timestamp,
+                        "type": "FAILED",
+                        "target_user": _safe_str(edata.get("TargetUserName")),
+                        "target_domain": _safe_str(edata.get("TargetDomainName")),
+                        "logon_type": edata.get("LogonType"),
+                        "failure_reason": _safe_str(edata.get("FailureReason")),
+                        "ip_address": _safe_str(edata.get("IpAddress")),
+                        "workstation": _safe_str(edata.get("WorkstationName")),
+                    }
+                )
+
+        elif eid == "4648":  # Explicit credential use
+            if len(self.explicit_logon_events) < MAX_EVENTS_PER_ID:
+                self.explicit_logon_events.append(
+                    {
+                        "time": timestamp,
+                        "subject_user": _safe_str(edata.get("SubjectUserName")),
+                        "subject_domain": _safe_str(edata.get("SubjectDomainName")),
+                        "target_user": _safe_str(edata.get("TargetUserName")),
+                        "target_domain": _safe_str(edata.get("TargetDomainName")),
+                        "target_server": _safe_str(edata.get("TargetServerName")),
+                        "process": _safe_str(edata.get("ProcessName")),
+                        "ip_address": _safe_str(edata.get("IpAddress")),
+                    }
+                )
+
+        elif eid == "4688":  # Process creation
+            cmdline = _safe_str(edata.get("CommandLine", ""))
+            proc = _safe_str(edata.get("NewProcessName", ""))
+            if cmdline or proc:
+                if self._process_creation_writer is None:
+                    self._process_creation_file = tempfile.NamedTemporaryFile(
+                        mode="w", encoding="utf-8", newline="", suffix=".csv", delete=False
+                    )
+                    self._process_creation_writer = csv.writer(self._process_creation_file)
+                    self._process_creation_writer.writerow(PROCESS_CREATION_CSV_HEADER)
+                self._process_creation_writer.writerow(
+                    [
+                        timestamp,
+                        proc,
+                        cmdline,
+                        _safe_str(edata.get("ParentProcessName")),
+                        _safe_str(edata.get("SubjectUserName")),
+                        _safe_str(edata.get("SubjectDomainName")),
+                    ]
+                )
+                self.process_creation_count += 1
+
+        elif eid in ACCOUNT_CHANGE_EVENT_IDS:
+            if len(self.account_change_events) < MAX_EVENTS_PER_CATEGORY:
+                self.account_change_events.append(
+                    {
+                        "time": timestamp,
+                        "event_id": eid,
+                        "target_user": _safe_str(edata.get("TargetUserName")),
+                        "target_domain": _safe_str(edata.get("TargetDomainName")),
+                        "subject_user": _safe_str(edata.get("SubjectUserName")),
+                        "subject_domain": _safe_str(edata.get("SubjectDomainName")),
+                    }
+                )
+
+        elif eid in GROUP_CHANGE_EVENT_IDS:
+            target_sid = _safe_str(edata.get("TargetSid", ""))
+            is_admin_group = target_sid in ADMIN_GROUP_SIDS
+            self.admin_group_change_count += is_admin_group
+            if len(self.group_change_events) < MAX_EVENTS_PER_CATEGORY:
+                self.group_change_events.append(
+                    {
+                        "time": timestamp,
+                        "event_id": eid,
+                        "member_sid": _safe_str(edata.get("MemberSid")),
+                        "group_name": _safe_str(edata.get("TargetUserName")),
+                        "group_domain": _safe_str(edata.get("TargetDomainName")),
+                        "group_sid": target_sid,
+                        "subject_user": _safe_str(edata.get("SubjectUserName")),
+                        "is_admin_group": is_admin_group,
+                    }
+                )
+
+        elif eid == "4776":  # NTLM credential validation
+            if len(self.ntlm_events) < MAX_EVENTS_PER_ID:
+                self.ntlm_events.append(
+                    {
+                        "time": timestamp,
+                        "target_user": _safe_str(edata.get("TargetUserName")),
+                        "workstation": _safe_str(edata.get("Workstation")),
+                        "error_code": _safe_str(edata.get("Status")),
+                    }
+                )
+
+        elif eid == "4768":  # Kerberos TGT request
+            if len(self.kerberos_tgt_events) < MAX_EVENTS_PER_ID:
+                self.kerberos_tgt_events.append(
+                    {
+                        "time": timestamp,
+                        "client_name": _safe_str(edata.get("TargetUserName")),
+                        "client_domain": _safe_str(edata.get("TargetDomainName")),
+                        "service_name": _safe_str(edata.get("ServiceName")),
+                        "ip_address": _safe_str(edata.get("IpAddress")),
+                        "ticket_options": _safe_str(edata.get("TicketOptions")),
+                        "result_code": _safe_str(edata.get("Status")),
+                    }
+                )
+
+        elif eid == "4769":  # Kerberos service ticket request
+            if len(self.kerberos_st_events) < MAX_EVENTS_PER_ID:
+                self.kerberos_st_events.append(
+                    {
+                        "time": timestamp,
+                        "client_name": _safe_str(edata.get("TargetUserName")),
+                        "client_domain": _safe_str(edata.get("TargetDomainName")),
+                        "service_name": _safe_str(edata.get("ServiceName")),
+                        "ip_address": _safe_str(edata.get("IpAddress")),
+                        "ticket_options": _safe_str(edata.get("TicketOptions")),
+                        "result_code": _safe_str(edata.get("FailureCode")),
+                    }
+                )
+
+        elif eid == "1102":  # Audit log cleared
+            if len(self.log_cleared_events) < MAX_EVENTS_PER_CATEGORY:
+                self.log_cleared_events.append(
+                    {
+                        "time": timestamp,
+                        "subject_user": _safe_str(edata.get("SubjectUserName")),
+                        "subject_domain": _safe_str(edata.get("SubjectDomainName")),
+                    }
+                )
+
+        elif eid in POWER_EVENT_LABELS:  # Power/boot/shutdown events
+            self.power_events.append(
+                {
+                    "time": timestamp,
+                    "event_id": eid,
+                    "description": POWER_EVENT_LABELS[eid],
+                }
+            )
+
+        elif eid == "7045":  # New service installed
+            if len(self.service_install_events) < MAX_EVENTS_PER_CATEGORY:
+                self.service_install_events.append(
+                    {
+                        "time": timestamp,
+                        "service_name": _safe_str(edata.get("ServiceName")),
+                        "image_path": _safe_str(edata.get("ImagePath")),
+                        "service_type": _safe_str(edata.get("ServiceType")),
+                        "start_type": _safe_str(edata.get("StartType")),
+                        "account": _safe_str(edata.get("AccountName")),
+                    }
+                )
+
+        elif eid in TASK_EVENT_IDS:  # Task registered/deleted/updated
+            if len(self.task_events) < MAX_EVENTS_PER_CATEGORY:
+                self.task_events.append(
+                    {
+                        "time": timestamp,
+                        "event_id": eid,
+                        "task_name": _safe_str(edata.get("TaskName", "")),
+                        "user_context": _safe_str(edata.get("UserContext", "")),
+                    }
+                )
+
+        elif eid == "4104":  # PowerShell script block
+            script_id = _safe_str(edata.get("ScriptBlockId", ""))
+            msg_num = edata.get("MessageNumber", 1)
+            msg_total = edata.get("MessageTotal", 1)
+            text = edata.get("ScriptBlockText", "")
+            ps_path = _safe_str(edata.get("Path", ""))
+
+            if script_id and text:
+                if script_id not in self.script_blocks:
+                    self.script_blocks[script_id] = {
+                        "total": msg_total,
+                        "path": ps_path,
+                        "time": timestamp,
+                        "chunks": {},
+                    }
+                self.script_blocks[script_id]["chunks"][msg_num] = text
+                # Update path if we get a non-empty one
+                if ps_path and not self.script_blocks[script_id]["path"]:
+                    self.script_blocks[script_id]["path"] = ps_path
+
+    def discard(self) -> None:
+        """Remove the process creation CSV of a parse that didn't finish."""
+        if self._process_creation_file is not None:
+            self._process_creation_file.close()
+            os.unlink(self._process_creation_file.name)
+            self._process_creation_file = None
+
+    def finish(self) -> dict:
+        """Return the aggregates, the parse result used by the analyzer."""
+        process_creation_csv = None
+        if self._process_creation_file is not None:
+            self._process_creation_file.close()
+            process_creation_csv = self._process_creation_file.name
+
+        return {
+            "event_counts": dict(self.event_counts),
+            "time_range": {"first": self.first_timestamp, "last": self.last_timestamp},
+            "unique_accounts": list(self.unique_accounts),
+            "unique_computers": list(self.unique_computers),
+            "unique_ips": list(self.unique_ips),
+            "logon_events": self.logon_events,
+            "explicit_logon_events": self.explicit_logon_events,
+            "process_creation_count": self.process_creation_count,
+            "process_creation_csv": process_creation_csv,
+            "account_change_events": self.account_change_events,
+            "group_change_events": self.group_change_events,
+            "admin_group_change_count": self.admin_group_change_count,
+            "service_install_events": self.service_install_events,
+            "task_events": self.task_events,
+            "log_cleared_events": self.log_cleared_events,
+            "ntlm_events": self.ntlm_events,
+            "kerberos_tgt_events": self.kerberos_tgt_events,
+            "kerberos_st_events": self.kerberos_st_events,
+            "power_events": list(self.power_events),
+            "script_blocks": self.script_blocks,
+        }
+
+
+def parse_evtx(file_path: str, number_of_threads: int = EVTX_PARSER_THREADS) -> dict:
+    """Stream-parse an EVTX file and aggregate its high-value events.
+
+    Chunks are decoded by PyEvtxParser on `number_of_threads` threads while the records
+    are aggregated, see _EventAggregator for what is kept.
+    """
+    parser = evtx_lib.PyEvtxParser(file_path, number_of_threads=number_of_threads, indent=False)
+    aggregator = _EventAggregator()
+    try:
+        for record in parser.records_json():
+            aggregator.add(record["data"])
+    except BaseException:
+        aggregator.discard()
+        raise
+    return aggregator.finish()
+
+
+# EVTX magic bytes: "ElfFile\x00"
+EVTX_YARA_RULE = """rule EVTX_File
+{
+    strings:
+        $magic = { 45 6C 66 46 69 6C 65 00 }
+
+    condition:
+        $magic at 0
+}
+"""
+
+
 class EVTXAnalyzer(EnrichmentModule):
     name: str = "evtx_analyzer"
     dependencies: list[str] = []
@@ -157,6 +575,15 @@ class EVTXAnalyzer(EnrichmentModule):
         self.storage = StorageMinio()
         self.asyncpg_pool = None
         self.workflows = ["default"]
+        self.routing = ModuleRouting(
+            routes=(
+                Route(extensions={".evtx"}),
+                Route(magic=("ms windows vista event log",)),
+                Route(header_rule=EVTX_YARA_RULE),
+            )
+        )
+        # _parse_evtx runs in the module process pool
+        self.cpu_bound = True
 
         # EVTX magic bytes: "ElfFile\x00"
         self._magic = b"ElfFile\x00"
@@ -185,281 +612,7 @@ class EVTXAnalyzer(EnrichmentModule):
 
     def _parse_evtx(self, file_path: str) -> dict:
         """Stream-parse the EVTX file and collect high-value events."""
-        parser = evtx_lib.PyEvtxParser(file_path)
-
-        # Structures we'll build up
-        event_counts: dict[str, int] = defaultdict(int)
-        timestamps: list[str] = []
-        unique_accounts: set[str] = set()
-        unique_computers: set[str] = set()
-        unique_ips: set[str] = set()
-
-        # Per-category collected events
-        logon_events: list[dict] = []
-        explicit_logon_events: list[dict] = []
-        process_creation_events: list[dict] = []
-        account_change_events: list[dict] = []
-        group_change_events: list[dict] = []
-        service_install_events: list[dict] = []
-        task_events: list[dict] = []
-        log_cleared_events: list[dict] = []
-        ntlm_events: list[dict] = []
-        kerberos_tgt_events: list[dict] = []
-        kerberos_st_events: list[dict] = []
-        power_events: list[dict] = []
-
-        # Script block reassembly: script_block_id -> list of (msg_num, text)
-        script_blocks: dict[str, dict] = {}  # id -> {total, chunks: {num: text}, path: str, time: str}
-
-        for record in parser.records_json():
-            try:
-                data = json.loads(record["data"])
-                event = data.get("Event", {})
-                sys = event.get("System", {})
-                edata = event.get("EventData", {}) or {}
-
-                eid = _normalize_event_id(sys.get("EventID", ""))
-                timestamp = _get_system_time(sys)
-                computer = _safe_str(sys.get("Computer", ""))
-
-                event_counts[eid] += 1
-                if timestamp:
-                    timestamps.append(timestamp)
-                if computer:
-                    unique_computers.add(computer)
-
-                # Collect subject/target usernames and IPs where present
-                for field in ("SubjectUserName", "TargetUserName"):
-                    val = _safe_str(edata.get(field, ""))
-                    if val and val not in ("-", "SYSTEM", "LOCAL SERVICE", "NETWORK SERVICE"):
-                        if not val.endswith("$"):  # Skip machine accounts
-                            unique_accounts.add(val)
-
-                for field in ("IpAddress", "Workstation", "WorkstationName"):
-                    val = _safe_str(edata.get(field, ""))
-                    if val and val not in ("-", "::1", "127.0.0.1"):
-                        unique_ips.add(val)
-
-                # --- Per-event-ID processing ---
-
-                if eid == "4624":  # Successful logon
-                    logon_type = edata.get("LogonType")
-                    try:
-                        lt = int(logon_type) if logon_type is not None else 0
-                    except (ValueError, TypeError):
-                        lt = 0
-                    if lt in INTERESTING_LOGON_TYPES and len(logon_events) < MAX_EVENTS_PER_ID:
-                        logon_events.append(
-                            {
-                                "time": timestamp,
-                                "target_user": _safe_str(edata.get("TargetUserName")),
-                                "target_domain": _safe_str(edata.get("TargetDomainName")),
-                                "logon_type": lt,
-                                "auth_package": _safe_str(edata.get("AuthenticationPackageName")),
-                                "ip_address": _safe_str(edata.get("IpAddress")),
-                                "workstation": _safe_str(edata.get("WorkstationName")),
-                                "process": _safe_str(edata.get("ProcessName")),
-                            }
-                        )
-
-                elif eid == "4625":  # Failed logon
-                    if len(logon_events) < MAX_EVENTS_PER_ID:
-                        logon_events.append(
-                            {
-                                "time": timestamp,
-                                "type": "FAILED",
-                                "target_user": _safe_str(edata.get("TargetUserName")),
-                                "target_domain": _safe_str(edata.get("TargetDomainName")),
-                                "logon_type": edata.get("LogonType"),
-                                "failure_reason": _safe_str(edata.get("FailureReason")),
-                                "ip_address": _safe_str(edata.get("IpAddress")),
-                                "workstation": _safe_str(edata.get("WorkstationName")),
-                            }
-                        )
-
-                elif eid == "4648":  # Explicit credential use
-                    if len(explicit_logon_events) < MAX_EVENTS_PER_ID:
-                        explicit_logon_events.append(
-                            {
-                                "time": timestamp,
-                                "subject_user": _safe_str(edata.get("SubjectUserName")),
-                                "subject_domain": _safe_str(edata.get("SubjectDomainName")),
-                                "target_user": _safe_str(edata.get("TargetUserName")),
-                                "target_domain": _safe_str(edata.get("TargetDomainName")),
-                                "target_server": _safe_str(edata.get("TargetServerName")),
-                                "process": _safe_str(edata.get("ProcessName")),
-                                "ip_address": _safe_str(edata.get("IpAddress")),
-                            }
-                        )
-
-                elif eid == "4688":  # Process creation — no cap, full dataset goes to CSV
-                    cmdline = _safe_str(edata.get("CommandLine", ""))
-                    proc = _safe_str(edata.get("NewProcessName", ""))
-                    if cmdline or proc:
-                        process_creation_events.append(
-                            {
-                                "time": timestamp,
-                                "process": proc,
-                                "command_line": cmdline,
-                                "parent_process": _safe_str(edata.get("ParentProcessName")),
-                                "user": _safe_str(edata.get("SubjectUserName")),
-                                "domain": _safe_str(edata.get("SubjectDomainName")),
-                            }
-                        )
-
-                elif eid in ("4720", "4722", "4726", "4738", "4724"):  # Account changes
-                    account_change_events.append(
-                        {
-                            "time": timestamp,
-                            "event_id": eid,
-                            "target_user": _safe_str(edata.get("TargetUserName")),
-                            "target_domain": _safe_str(edata.get("TargetDomainName")),
-                            "subject_user": _safe_str(edata.get("SubjectUserName")),
-                            "subject_domain": _safe_str(edata.get("SubjectDomainName")),
-                        }
-                    )
-
-                elif eid in ("4728", "4729", "4732", "4733"):  # Group membership changes
-                    target_sid = _safe_str(edata.get("TargetSid", ""))
-                    group_change_events.append(
-                        {
-                            "time": timestamp,
-                            "event_id": eid,
-                            "member_sid": _safe_str(edata.get("MemberSid")),
-                            "group_name": _safe_str(edata.get("TargetUserName")),
-                            "group_domain": _safe_str(edata.get("TargetDomainName")),
-                            "group_sid": target_sid,
-                            "subject_user": _safe_str(edata.get("SubjectUserName")),
-                            "is_admin_group": target_sid in ADMIN_GROUP_SIDS,
-                        }
-                    )
-
-                elif eid == "4776":  # NTLM credential validation
-                    if len(ntlm_events) < MAX_EVENTS_PER_ID:
-                        ntlm_events.append(
-                            {
-                                "time": timestamp,
-                                "target_user": _safe_str(edata.get("TargetUserName")),
-                                "workstation": _safe_str(edata.get("Workstation")),
-                                "error_code": _safe_str(edata.get("Status")),
-                            }
-                        )
-
-                elif eid == "4768":  # Kerberos TGT request
-                    if len(kerberos_tgt_events) < MAX_EVENTS_PER_ID:
-                        kerberos_tgt_events.append(
-                            {
-                                "time": timestamp,
-                                "client_name": _safe_str(edata.get("TargetUserName")),
-                                "client_domain": _safe_str(edata.get("TargetDomainName")),
-                                "service_name": _safe_str(edata.get("ServiceName")),
-                                "ip_address": _safe_str(edata.get("IpAddress")),
-                                "ticket_options": _safe_str(edata.get("TicketOptions")),
-                                "result_code": _safe_str(edata.get("Status")),
-                            }
-                        )
-
-                elif eid == "4769":  # Kerberos service ticket request
-                    if len(kerberos_st_events) < MAX_EVENTS_PER_ID:
-                        kerberos_st_events.append(
-                            {
-                                "time": timestamp,
-                                "client_name": _safe_str(edata.get("TargetUserName")),
-                                "client_domain": _safe_str(edata.get("TargetDomainName")),
-                                "service_name": _safe_str(edata.get("ServiceName")),
-                                "ip_address": _safe_str(edata.get("IpAddress")),
-                                "ticket_options": _safe_str(edata.get("TicketOptions")),
-                                "result_code": _safe_str(edata.get("FailureCode")),
-                            }
-                        )
-
-                elif eid == "1102":  # Audit log cleared
-                    log_cleared_events.append(
-                        {
-                            "time": timestamp,
-                            "subject_user": _safe_str(edata.get("SubjectUserName")),
-                            "subject_domain": _safe_str(edata.get("SubjectDomainName")),
-                        }
-                    )
-
-                elif eid in ("1", "12", "13", "42", "6008"):  # Power/boot/shutdown events
-                    power_events.append(
-                        {
-                            "time": timestamp,
-                            "event_id": eid,
-                            "description": POWER_EVENT_LABELS.get(eid, eid),
-                        }
-                    )
-
-                elif eid == "7045":  # New service installed
-                    service_install_events.append(
-                        {
-                            "time": timestamp,
-                            "service_name": _safe_str(edata.get("ServiceName")),
-                            "image_path": _safe_str(edata.get("ImagePath")),
-                            "service_type": _safe_str(edata.get("ServiceType")),
-                            "start_type": _safe_str(edata.get("StartType")),
-                            "account": _safe_str(edata.get("AccountName")),
-                        }
-                    )
-
-                elif eid in ("106", "141", "140"):  # Task registered/deleted/updated
-                    # edata may be nested under #attributes
-                    task_name = _safe_str(edata.get("TaskName", ""))
-                    user_ctx = _safe_str(edata.get("UserContext", ""))
-                    task_events.append(
-                        {
-                            "time": timestamp,
-                            "event_id": eid,
-                            "task_name": task_name,
-                            "user_context": user_ctx,
-                        }
-                    )
-
-                elif eid == "4104":  # PowerShell script block
-                    script_id = _safe_str(edata.get("ScriptBlockId", ""))
-                    msg_num = edata.get("MessageNumber", 1)
-                    msg_total = edata.get("MessageTotal", 1)
-                    text = edata.get("ScriptBlockText", "")
-                    ps_path = _safe_str(edata.get("Path", ""))
-
-                    if script_id and text:
-                        if script_id not in script_blocks:
-                            script_blocks[script_id] = {
-                                "total": msg_total,
-                                "path": ps_path,
-                                "time": timestamp,
-                                "chunks": {},
-                            }
-                        script_blocks[script_id]["chunks"][msg_num] = text
-                        # Update path if we get a non-empty one
-                        if ps_path and not script_blocks[script_id]["path"]:
-                            script_blocks[script_id]["path"] = ps_path
-
-            except Exception:
-                logger.exception(message="Error parsing EVTX record")
-                continue
-
-        return {
-            "event_counts": dict(event_counts),
-            "timestamps": sorted(timestamps),
-            "unique_accounts": list(unique_accounts),
-            "unique_computers": list(unique_computers),
-            "unique_ips": list(unique_ips),
-            "logon_events": logon_events,
-            "explicit_logon_events": explicit_logon_events,
-            "process_creation_events": process_creation_events,
-            "account_change_events": account_change_events,
-            "group_change_events": group_change_events,
-            "service_install_events": service_install_events,
-            "task_events": task_events,
-            "log_cleared_events": log_cleared_events,
-            "ntlm_events": ntlm_events,
-            "kerberos_tgt_events": kerberos_tgt_events,
-            "kerberos_st_events": kerberos_st_events,
-            "power_events": power_events,
-            "script_blocks": script_blocks,
-        }
+        return parse_evtx(file_path)
 
     def _reassemble_script_blocks(self, script_blocks: dict) -> list[dict]:
         """Reassemble multi-chunk 4104 script blocks into complete scripts, deduped by content hash."""
@@ -490,9 +643,8 @@ class EVTXAnalyzer(EnrichmentModule):
 
     def _build_summary_markdown(self, file_name: str, parsed: dict, script_blocks_extracted: int = 0) -> str:
         """Build a human-readable markdown summary of the EVTX analysis."""
-        timestamps = parsed["timestamps"]
-        first_ts = timestamps[0] if timestamps else "unknown"
-        last_ts = timestamps[-1] if timestamps else "unknown"
+        first_ts = parsed["time_range"]["first"] or "unknown"
+        last_ts = parsed["time_range"]["last"] or "unknown"
 
         event_counts = parsed["event_counts"]
         total_events = sum(event_counts.values())
@@ -534,23 +686,22 @@ class EVTXAnalyzer(EnrichmentModule):
             lines += [
                 "",
                 "## Account Changes",
-                f"- {len(parsed['account_change_events'])} account change event(s) detected",
+                f"- {_count_events(parsed, ACCOUNT_CHANGE_EVENT_IDS)} account change event(s) detected",
                 "- Full details available as downloadable CSV transform",
             ]
 
         if parsed["group_change_events"]:
-            admin_count = sum(1 for e in parsed["group_change_events"] if e["is_admin_group"])
             lines += [
                 "",
                 "## Group Membership Changes",
-                f"- {len(parsed['group_change_events'])} group membership change(s) detected ({admin_count} to privileged groups)",
+                f"- {_count_events(parsed, GROUP_CHANGE_EVENT_IDS)} group membership change(s) detected ({parsed['admin_group_change_count']} to privileged groups)",
                 "- Full details available as downloadable CSV transform",
             ]
 
         if parsed["task_events"]:
-            task_registered = sum(1 for e in parsed["task_events"] if e["event_id"] == "106")
-            task_deleted = sum(1 for e in parsed["task_events"] if e["event_id"] == "141")
-            task_updated = sum(1 for e in parsed["task_events"] if e["event_id"] == "140")
+            task_registered = _count_events(parsed, {"106"})
+            task_deleted = _count_events(parsed, {"141"})
+            task_updated = _count_events(parsed, {"140"})
             # Collect filtered unique user contexts
             seen_users: set[str] = set()
             for e in parsed["task_events"]:
@@ -570,7 +721,7 @@ class EVTXAnalyzer(EnrichmentModule):
             lines += [
                 "",
                 "## Explicit Credential Use (4648)",
-                f"- {len(parsed['explicit_logon_events'])} explicit credential use event(s) detected",
+                f"- {_count_events(parsed, {'4648'})} explicit credential use event(s) detected",
                 "- Full details available as downloadable CSV transform",
             ]
 
@@ -584,18 +735,18 @@ class EVTXAnalyzer(EnrichmentModule):
             for e in parsed["ntlm_events"][:30]:
                 lines.append(f"| {fmt_time(e['time'])} | {e['target_user']} | {e['workstation']} | {e['error_code']} |")
 
-        if parsed["process_creation_events"]:
+        if parsed["process_creation_count"]:
             lines += [
                 "",
                 "## Process Creation (4688)",
-                f"- {len(parsed['process_creation_events'])} process creation event(s) recorded",
+                f"- {parsed['process_creation_count']} process creation event(s) recorded",
                 "- Full details available as downloadable CSV transform",
             ]
 
         # --- System: Power/Boot/Shutdown Timeline ---
         if parsed.get("power_events"):
             # Only show events within the last POWER_TIMELINE_DAYS days of the log
-            ref_ts = timestamps[-1] if timestamps else None
+            ref_ts = parsed["time_range"]["last"]
             if ref_ts:
                 try:
                     ref_dt = datetime.fromisoformat(ref_ts.replace("Z", "+00:00"))
@@ -725,7 +876,7 @@ class EVTXAnalyzer(EnrichmentModule):
         result = EnrichmentResult(module_name=self.name, dependencies=self.dependencies)
 
         try:
-            parsed = self._parse_evtx(file_path)
+            parsed = await run_blocking(self._parse_evtx, file_path)
         except Exception:
             logger.exception(message="Failed to parse EVTX file", file_name=file_enriched.file_name)
             return None
@@ -737,17 +888,14 @@ class EVTXAnalyzer(EnrichmentModule):
             "file_name": file_enriched.file_name,
             "total_events": sum(parsed["event_counts"].values()),
             "event_counts": parsed["event_counts"],
-            "time_range": {
-                "first": parsed["timestamps"][0] if parsed["timestamps"] else None,
-                "last": parsed["timestamps"][-1] if parsed["timestamps"] else None,
-            },
+            "time_range": parsed["time_range"],
             "unique_accounts": parsed["unique_accounts"],
             "unique_computers": parsed["unique_computers"],
             "unique_ips": list(parsed["unique_ips"]),
-            "service_installs_count": len(parsed["service_install_events"]),
-            "account_changes_count": len(parsed["account_change_events"]),
-            "group_changes_count": len(parsed["group_change_events"]),
-            "explicit_logons_count": len(parsed["explicit_logon_events"]),
+            "service_installs_count": _count_events(parsed, {"7045"}),
+            "account_changes_count": _count_events(parsed, ACCOUNT_CHANGE_EVENT_IDS),
+            "group_changes_count": _count_events(parsed, GROUP_CHANGE_EVENT_IDS),
+            "explicit_logons_count": _count_events(parsed, {"4648"}),
             "log_cleared": len(parsed["log_cleared_events"]) > 0,
             "script_blocks_extracted": len(script_block_data),
         }
@@ -877,13 +1025,13 @@ class EVTXAnalyzer(EnrichmentModule):
                         origin_name=self.name,
                         object_id=file_enriched.object_id,
                         severity=7,
-                        raw_data={"count": len(admin_changes)},
+                        raw_data={"count": parsed["admin_group_change_count"]},
                         data=[FileObject(type="finding_summary", metadata={"summary": "\n".join(summary_lines)})],
                     )
                 )
 
-            non_admin_changes = [e for e in parsed["group_change_events"] if not e["is_admin_group"]]
-            if non_admin_changes:
+            non_admin_count = _count_events(parsed, GROUP_CHANGE_EVENT_IDS) - parsed["admin_group_change_count"]
+            if non_admin_count:
                 result.findings.append(
                     Finding(
                         category=FindingCategory.EXTRACTED_DATA,
@@ -892,12 +1040,12 @@ class EVTXAnalyzer(EnrichmentModule):
                         origin_name=self.name,
                         object_id=file_enriched.object_id,
                         severity=3,
-                        raw_data={"count": len(non_admin_changes)},
+                        raw_data={"count": non_admin_count},
                         data=[
                             FileObject(
                                 type="finding_summary",
                                 metadata={
-                                    "summary": f"{len(non_admin_changes)} non-admin group membership change(s) detected"
+                                    "summary": f"{non_admin_count} non-admin group membership change(s) detected"
                                 },
                             )
                         ],
@@ -951,12 +1099,12 @@ class EVTXAnalyzer(EnrichmentModule):
                     origin_name=self.name,
                     object_id=file_enriched.object_id,
                     severity=5,
-                    raw_data={"count": len(parsed["account_change_events"])},
+                    raw_data={"count": _count_events(parsed, ACCOUNT_CHANGE_EVENT_IDS)},
                     data=[
                         FileObject(
                             type="finding_summary",
                             metadata={
-                                "summary": f"{len(parsed['account_change_events'])} account change event(s) detected"
+                                "summary": f"{_count_events(parsed, ACCOUNT_CHANGE_EVENT_IDS)} account change event(s) detected"
                             },
                         )
                     ],
@@ -965,12 +1113,10 @@ class EVTXAnalyzer(EnrichmentModule):
 
         # Scheduled task changes — finding + downloadable CSV (not inline markdown)
         if parsed["task_events"]:
-            task_registered = [e for e in parsed["task_events"] if e["event_id"] == "106"]
-            task_deleted = [e for e in parsed["task_events"] if e["event_id"] == "141"]
-            task_updated = [e for e in parsed["task_events"] if e["event_id"] == "140"]
-            summary = (
-                f"{len(task_registered)} task(s) registered, {len(task_deleted)} deleted, {len(task_updated)} updated"
-            )
+            task_registered = _count_events(parsed, {"106"})
+            task_deleted = _count_events(parsed, {"141"})
+            task_updated = _count_events(parsed, {"140"})
+            summary = f"{task_registered} task(s) registered, {task_deleted} deleted, {task_updated} updated"
 
             eid_desc = {"106": "Registered", "141": "Deleted", "140": "Updated"}
             with tempfile.NamedTemporaryFile(
@@ -1005,10 +1151,10 @@ class EVTXAnalyzer(EnrichmentModule):
                     object_id=file_enriched.object_id,
                     severity=4,
                     raw_data={
-                        "total": len(parsed["task_events"]),
-                        "registered": len(task_registered),
-                        "deleted": len(task_deleted),
-                        "updated": len(task_updated),
+                        "total": _count_events(parsed, TASK_EVENT_IDS),
+                        "registered": task_registered,
+                        "deleted": task_deleted,
+                        "updated": task_updated,
                     },
                     data=[FileObject(type="finding_summary", metadata={"summary": summary})],
                 )
@@ -1067,38 +1213,24 @@ class EVTXAnalyzer(EnrichmentModule):
                     origin_name=self.name,
                     object_id=file_enriched.object_id,
                     severity=4,
-                    raw_data={"count": len(parsed["explicit_logon_events"])},
+                    raw_data={"count": _count_events(parsed, {"4648"})},
                     data=[
                         FileObject(
                             type="finding_summary",
                             metadata={
-                                "summary": f"{len(parsed['explicit_logon_events'])} explicit credential use event(s) (4648)"
+                                "summary": f"{_count_events(parsed, {'4648'})} explicit credential use event(s) (4648)"
                             },
                         )
                     ],
                 )
             )
 
-        # Process creation (4688) — CSV transform (no finding, just the data)
-        if parsed["process_creation_events"]:
-            with tempfile.NamedTemporaryFile(
-                mode="w", encoding="utf-8", newline="", suffix=".csv", delete=False
-            ) as tmp_csv:
-                writer = csv.writer(tmp_csv)
-                writer.writerow(["time", "process", "command_line", "parent_process", "user", "domain"])
-                for e in parsed["process_creation_events"]:
-                    writer.writerow(
-                        [
-                            e["time"],
-                            e["process"],
-                            e["command_line"],
-                            e["parent_process"],
-                            e["user"],
-                            e["domain"],
-                        ]
-                    )
-                tmp_csv.flush()
-                proc_csv_id = self.storage.upload_file(tmp_csv.name)
+        # Process creation (4688) — CSV transform (no finding, just the data), written while parsing
+        if parsed["process_creation_csv"]:
+            try:
+                proc_csv_id = self.storage.upload_file(parsed["process_creation_csv"])
+            finally:
+                os.unlink(parsed["process_creation_csv"])
 
             result.transforms.append(
                 Transform(
@@ -8,6 +8,7 @@ from common.models import EnrichmentResult, Transform
 from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
 from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.routing import ModuleRouting, Route
 from PIL import Image
 from PIL.ExifTags import GPSTAGS, TAGS
 
@@ -240,6 +241,7 @@ class ExifMetadataExtractor(EnrichmentModule):
         self.asyncpg_pool = None  # type: ignore
         # the workflows this module should automatically run in
         self.workflows = ["default"]
+        self.routing = ModuleRouting(routes=(Route(extensions=SUPPORTED_EXTENSIONS, magic=("jpeg", "tiff", "image")),))
 
     async def should_process(self, object_id: str, file_path: str | None = None) -> bool:
         """Determine if this module should run."""
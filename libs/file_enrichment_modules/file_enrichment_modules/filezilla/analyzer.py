@@ -10,6 +10,7 @@ from common.models import EnrichmentResult, FileObject, Finding, FindingCategory
 from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
 from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.routing import ModuleRouting, Route
 
 logger = get_logger(__name__)
 
@@ -24,6 +25,10 @@ class FileZillaParser(EnrichmentModule):
         self.asyncpg_pool = None  # type: ignore
         # the workflows this module should automatically run in
         self.workflows = ["default"]
+        self.routing = ModuleRouting(
+            routes=(Route(names=("sitemanager.xml", "recentservers.xml", "*filezilla*"), plaintext=True),),
+            should_process=True,
+        )
 
         self.size_limit = 50000000  # only check the first 50 megs, for efficiency
 
@@ -12,6 +12,7 @@ from common.storage import StorageMinio
 from Cryptodome.Cipher import AES
 from Cryptodome.Util.Padding import unpad
 from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.routing import ModuleRouting, Route
 
 logger = get_logger(__name__)
 
@@ -27,6 +28,7 @@ class GroupPolicyPreferencesParser(EnrichmentModule):
 
         # the workflows this module should automatically run in
         self.workflows = ["default"]
+        self.routing = ModuleRouting(routes=(Route(mime_types={"text/xml"}, plaintext=True),), should_process=True)
 
         self.size_limit = 1_000_000  # 1MB size limit
 
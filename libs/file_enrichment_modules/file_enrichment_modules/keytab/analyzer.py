@@ -10,10 +10,25 @@ from common.models import EnrichmentResult, FileObject, Finding, FindingCategory
 from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
 from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.routing import ModuleRouting, Route
 
 logger = get_logger(__name__)
 
 
+KEYTAB_YARA_RULE = """rule Keytab_File
+{
+    meta:
+        description = "Detects Kerberos keytab files"
+
+    strings:
+        $keytab_header = { 05 02 }  // Keytab format version 0x502 (version 2)
+
+    condition:
+        $keytab_header at 0
+}
+"""
+
+
 class KeytabAnalyzer(EnrichmentModule):
     name: str = "keytab_analyzer"
     dependencies: list[str] = []
@@ -23,6 +38,7 @@ class KeytabAnalyzer(EnrichmentModule):
 
         # the workflows this module should automatically run in
         self.workflows = ["default"]
+        self.routing = ModuleRouting(routes=(Route(extensions={".keytab"}), Route(header_rule=KEYTAB_YARA_RULE)))
 
         self.size_limit = 50000000  # only check the first 50 megs for DPAPI blobs, for performance
 
@@ -46,19 +62,7 @@ class KeytabAnalyzer(EnrichmentModule):
         }
 
         # Yara rule to check for keytab files
-        self.yara_rule = yara_x.compile("""
-rule Keytab_File
-{
-    meta:
-        description = "Detects Kerberos keytab files"
-
-    strings:
-        $keytab_header = { 05 02 }  // Keytab format version 0x502 (version 2)
-
-    condition:
-        $keytab_header at 0
-}
-        """)
+        self.yara_rule = yara_x.compile(KEYTAB_YARA_RULE)
 
     async def should_process(self, object_id: str, file_path: str | None = None) -> bool:
         """Determine if this module should run."""
@@ -10,6 +10,7 @@ from common.models import EnrichmentResult, FileObject, Finding, FindingCategory
 from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
 from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.routing import ModuleRouting, Route
 
 logger = get_logger(__name__)
 
@@ -24,8 +25,8 @@ class KubeconfigParser(EnrichmentModule):
         self.asyncpg_pool = None  # type: ignore
         # the workflows this module should automatically run in
         self.workflows = ["default"]
-
         self.size_limit = 1000000  # 1 MB limit - skip larger files
+        self.routing = ModuleRouting(routes=(Route(max_size=self.size_limit, plaintext=True),), should_process=True)
 
         # YARA rule to detect Kubernetes configuration files
         self.yara_rule = yara_x.compile("""
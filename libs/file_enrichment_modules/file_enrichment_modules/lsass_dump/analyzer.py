@@ -9,7 +9,8 @@ from common.logger import get_logger
 from common.models import EnrichmentResult, FileObject, Finding, FindingCategory, FindingOrigin, Transform
 from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
-from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.module_loader import EnrichmentModule, run_blocking
+from file_enrichment_modules.routing import ModuleRouting, Route
 from nemesis_dpapi import DpapiManager, MasterKey, MasterKeyType
 from pypykatz.pypykatz import pypykatz
 
@@ -60,6 +61,7 @@ class LsassDumpParser(EnrichmentModule):
         self.asyncpg_pool = None  # type: ignore
         # the workflows this module should automatically run in
         self.workflows = ["default"]
+        self.routing = ModuleRouting(routes=(Route(magic=("mini dump crash report",)),))
         self.dpapi_manager: DpapiManager = None  # type: ignore
         self.loop: asyncio.AbstractEventLoop = None  # type: ignore
         self.size_limit = 1024 * 1024 * 100  # 100 MB size limit for LSASS dumps
@@ -99,7 +101,7 @@ class LsassDumpParser(EnrichmentModule):
         masterkeys = []
 
         try:
-            pypy_parse = pypykatz.parse_minidump_file(dump_file_path)
+            pypy_parse = await run_blocking(pypykatz.parse_minidump_file, dump_file_path)
         except Exception as e:
             logger.error(f"An error occurred while parsing lsass dump: {e}", exc_info=True)
             return [], [], [], []
@@ -1,6 +1,11 @@
 import asyncio
+import contextvars
+import functools
 import importlib.util
+import os
 import sys
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Protocol, runtime_checkable
 
@@ -8,14 +13,54 @@ import asyncpg
 from common.logger import get_logger
 from common.models import EnrichmentResult
 
+from file_enrichment_modules.process_pool import get_process_pool
+
 logger = get_logger(__name__)
 
+# Shared, bounded pool for the synchronous parsing done inside module process() calls
+_blocking_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("MAX_MODULE_THREADS", 4)),
+    thread_name_prefix="enrichment-module",
+)
+
+
+async def run_blocking[T](func: Callable[..., T], /, *args, **kwargs) -> T:
+    """Run a module's synchronous analysis in the shared module thread pool.
+
+    Modules should use this for file parsing so the event loop stays free and other
+    modules for the same file can run in the meantime. Like asyncio.to_thread, the
+    current context (e.g. the active tracing span) is propagated to the worker.
+    If the caller is cancelled (e.g. by a module timeout), the await is abandoned
+    but the worker thread runs the function to completion.
+
+    Methods of modules that declare `cpu_bound = True` run in the module process pool
+    instead (when it is enabled), so their arguments and return value must be picklable.
+    """
+    process_pool = get_process_pool()
+    module = getattr(func, "__self__", None)
+    if process_pool is not None and getattr(module, "cpu_bound", False):
+        return await process_pool.run(module, func.__name__, *args, **kwargs)
+
+    return await run_in_thread(func, *args, **kwargs)
+
+
+async def run_in_thread[T](func: Callable[..., T], /, *args, **kwargs) -> T:
+    """Run a module's synchronous analysis in the shared module thread pool, even for CPU-bound modules.
+
+    For work that doesn't fit in a process pool worker's address space limit.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_blocking_executor, functools.partial(context.run, func, *args, **kwargs))
+
 
 @runtime_checkable
 class EnrichmentModule(Protocol):
     """Protocol defining the interface for enrichment modules.
 
     All enrichment modules must implement this protocol with async methods.
+    Modules with heavy synchronous parsing can also set `cpu_bound = True` to have
+    the methods they pass to run_blocking executed in the module process pool.
     """
 
     name: str
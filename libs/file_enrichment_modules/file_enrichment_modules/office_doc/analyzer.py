@@ -11,8 +11,9 @@ from common.logger import get_logger
 from common.models import EnrichmentResult, FileObject, Finding, FindingCategory, FindingOrigin, Transform
 from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
-from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.module_loader import EnrichmentModule, run_blocking
 from file_enrichment_modules.office_doc.office2john import extract_file_encryption_hash
+from file_enrichment_modules.routing import ModuleRouting, Route
 from oletools.olevba import VBA_Parser
 
 logger = get_logger(__name__)
@@ -332,6 +333,14 @@ class OfficeAnalyzer(EnrichmentModule):
         self.asyncpg_pool = None  # type: ignore
         # the workflows this module should automatically run in
         self.workflows = ["default"]
+        self.routing = ModuleRouting(
+            routes=(
+                Route(extensions={".doc", ".docx", ".ppt", ".pptx", ".xls", ".xlsx"}),
+                Route(magic=("word", "excel", "powerpoint", "composite document")),
+            )
+        )
+        # _analyze_office_document (incl. office2john) runs in the module process pool
+        self.cpu_bound = True
 
     async def should_process(self, object_id: str, file_path: str | None = None) -> bool:
         """Determine if this module should run based on file extension and type."""
@@ -434,10 +443,10 @@ class OfficeAnalyzer(EnrichmentModule):
 
             # Use provided file_path if available, otherwise download
             if file_path:
-                return self._analyze_office_document(file_path, file_enriched)
+                return await run_blocking(self._analyze_office_document, file_path, file_enriched)
             else:
                 with self.storage.download(file_enriched.object_id) as file:
-                    return self._analyze_office_document(file.name, file_enriched)
+                    return await run_blocking(self._analyze_office_document, file.name, file_enriched)
 
         except Exception:
             logger.exception(message="Error processing Office file")
@@ -14,7 +14,8 @@ from common.logger import get_logger
 from common.models import EnrichmentResult
 from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
-from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.module_loader import EnrichmentModule, run_blocking
+from file_enrichment_modules.routing import ModuleRouting, Route
 
 logger = get_logger(__name__)
 
@@ -340,6 +341,16 @@ def parse_pe_file(file_path: str) -> dict[str, Any]:
         return {"error": str(e)}
 
 
+PE_YARA_RULE = """import "pe"
+
+rule is_pe
+{
+    condition:
+        pe.is_pe
+}
+"""
+
+
 class PEAnalyzer(EnrichmentModule):
     name: str = "pe_analyzer"
     dependencies: list[str] = []
@@ -350,16 +361,11 @@ class PEAnalyzer(EnrichmentModule):
         self.asyncpg_pool = None  # type: ignore
         # the workflows this module should automatically run in
         self.workflows = ["default"]
+        self.routing = ModuleRouting(routes=(Route(header_rule=PE_YARA_RULE),))
+        # _analyze_pe runs in the module process pool
+        self.cpu_bound = True
 
-        self.yara_rule = yara_x.compile("""
-import "pe"
-
-rule is_pe
-{
-    condition:
-        pe.is_pe
-}
-        """)
+        self.yara_rule = yara_x.compile(PE_YARA_RULE)
 
         self.python_packed_rule = yara_x.compile(r"""
 import "pe"
@@ -626,13 +632,13 @@ rule python_packed_executable
 
             # Use provided file_path if available, otherwise download
             if file_path:
-                result = self._analyze_pe(file_path, file_enriched)
+                result = await run_blocking(self._analyze_pe, file_path, file_enriched)
                 # Check for Python packing and unpack
                 result = await self._try_python_unpack(file_path, file_enriched, result)
                 return result
             else:
                 with self.storage.download(file_enriched.object_id) as file:
-                    result = self._analyze_pe(file.name, file_enriched)
+                    result = await run_blocking(self._analyze_pe, file.name, file_enriched)
                     # Check for Python packing and unpack
                     result = await self._try_python_unpack(file.name, file_enriched, result)
                     return result
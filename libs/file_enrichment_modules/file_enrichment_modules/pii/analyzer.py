@@ -9,6 +9,7 @@ from common.models import EnrichmentResult, FileObject, Finding, FindingCategory
 from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
 from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.routing import ModuleRouting, Route
 from presidio_analyzer import AnalyzerEngine
 
 logger = get_logger(__name__)
@@ -44,6 +45,7 @@ class PIIAnalyzer(EnrichmentModule):
         self.size_limit = 10_000_000  # 10MB size limit
         # the workflows this module should automatically run in
         self.workflows = ["default"]
+        self.routing = ModuleRouting(routes=(Route(plaintext=True),), should_process=True)
 
     def _get_analyzer(self) -> AnalyzerEngine:
         """Get or create thread-local AnalyzerEngine instance."""
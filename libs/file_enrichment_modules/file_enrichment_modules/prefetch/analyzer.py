@@ -20,6 +20,7 @@ from common.models import EnrichmentResult, Transform
 from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
 from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.routing import ModuleRouting, Route
 
 logger = get_logger(__name__)
 
@@ -33,6 +34,21 @@ FORMAT_VERSION_MAP = {
 }
 
 
+PREFETCH_YARA_RULE = """rule Windows_Prefetch_File
+{
+    meta:
+        description = "Detects Windows Prefetch files (SCCA and MAM formats)"
+
+    strings:
+        $scca_header = { ?? 00 00 00 53 43 43 41 }  // SCCA at offset 4
+        $mam_header = { 4D 41 4D 04 }               // MAM compressed
+
+    condition:
+        $scca_header at 0 or $mam_header at 0
+}
+"""
+
+
 class PrefetchAnalyzer(EnrichmentModule):
     name: str = "prefetch_analyzer"
     dependencies: list[str] = []
@@ -41,24 +57,12 @@ class PrefetchAnalyzer(EnrichmentModule):
         self.storage = StorageMinio()
         self.asyncpg_pool = None  # type: ignore
         self.workflows = ["default"]
+        self.routing = ModuleRouting(routes=(Route(extensions={".pf"}), Route(header_rule=PREFETCH_YARA_RULE)))
 
         # YARA rule to detect prefetch files by magic bytes
         # SCCA = uncompressed (Windows XP-8.1)
         # MAM\x04 = compressed (Windows 10+)
-        self.yara_rule = yara_x.compile("""
-rule Windows_Prefetch_File
-{
-    meta:
-        description = "Detects Windows Prefetch files (SCCA and MAM formats)"
-
-    strings:
-        $scca_header = { ?? 00 00 00 53 43 43 41 }  // SCCA at offset 4
-        $mam_header = { 4D 41 4D 04 }               // MAM compressed
-
-    condition:
-        $scca_header at 0 or $mam_header at 0
-}
-        """)
+        self.yara_rule = yara_x.compile(PREFETCH_YARA_RULE)
 
     async def should_process(self, object_id: str, file_path: str | None = None) -> bool:
         """Determine if this module should process the file."""
@@ -0,0 +1,210 @@
+"""Process pool for the synchronous parsing of CPU-bound enrichment modules.
+
+Modules that set `cpu_bound = True` have the methods they pass to `run_blocking`
+executed here instead of in the module thread pool, so heavy parsing neither holds
+the GIL against the workflow event loop nor can freeze the service.
+
+Workers are spawned (not forked, the parent runs Dapr/gRPC threads) and preload an
+instance of every CPU-bound module, so a task only carries the module's import path,
+the method name and its (picklable) arguments. Each worker runs with an address
+space limit, each task with a time limit, and a worker that hangs or dies is
+isolated by recycling the pool: the task that caused it fails, everything else
+keeps running.
+"""
+
+import asyncio
+import importlib
+import multiprocessing
+import os
+import resource
+import threading
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+from common.logger import get_logger
+from prometheus_client import Counter
+
+logger = get_logger(__name__)
+
+MODULE_POOL_TASKS = Counter(
+    "nemesis_module_process_pool_tasks_total",
+    "Tasks run in the enrichment module process pool by outcome",
+    ["module", "outcome"],
+)
+MODULE_POOL_RECYCLES = Counter(
+    "nemesis_module_process_pool_recycles_total",
+    "Times the enrichment module process pool was torn down and restarted",
+    ["reason"],
+)
+
+# Module instances preloaded in a worker process, keyed by analyzer import path
+_worker_modules: dict[str, Any] = {}
+
+_process_pool: "ModuleProcessPool | None" = None
+
+
+def _load_worker_module(module_path: str) -> Any:
+    module = _worker_modules.get(module_path)
+    if module is None:
+        module = importlib.import_module(module_path).create_enrichment_module()
+        _worker_modules[module_path] = module
+    return module
+
+
+def _init_worker(module_paths: list[str], memory_limit_bytes: int) -> None:
+    """Preload the CPU-bound modules, then cap the worker's address space."""
+    for module_path in module_paths:
+        try:
+            _load_worker_module(module_path)
+        except Exception:
+            logger.exception("Failed to preload module in process pool worker", module_path=module_path)
+
+    if memory_limit_bytes > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+
+
+def _run_task(module_path: str, method_name: str, args: tuple, kwargs: dict) -> Any:
+    return getattr(_load_worker_module(module_path), method_name)(*args, **kwargs)
+
+
+class ModuleProcessPool:
+    """
+    Managed ProcessPoolExecutor for CPU-bound module methods.
+
+    A ProcessPoolExecutor cannot stop a single worker, so a task that exceeds
+    `task_timeout` (or whose caller is cancelled while it still runs) recycles the
+    whole pool. Tasks that were running in the recycled pool through no fault of
+    their own are resubmitted once to the new pool.
+    """
+
+    def __init__(
+        self,
+        module_paths: Iterable[str],
+        max_workers: int,
+        task_timeout: float,
+        memory_limit_mb: int = 0,
+        max_tasks_per_child: int | None = None,
+    ) -> None:
+        self.module_paths = sorted(set(module_paths))
+        self.max_workers = max_workers
+        self.task_timeout = task_timeout
+        self.memory_limit_bytes = memory_limit_mb * 1024 * 1024
+        self.max_tasks_per_child = max_tasks_per_child
+
+        self._lock = threading.Lock()
+        self._executor = self._create_executor()
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.module_paths, self.memory_limit_bytes),
+            max_tasks_per_child=self.max_tasks_per_child,
+        )
+
+    def _recycle(self, executor: ProcessPoolExecutor, reason: str) -> None:
+        """Kill the workers of `executor` and replace it, unless that already happened."""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = self._create_executor()
+
+        MODULE_POOL_RECYCLES.labels(reason=reason).inc()
+        logger.warning("Recycling enrichment module process pool", reason=reason)
+
+        # _processes is None once the executor has broken and cleaned up after itself
+        for process in list((executor._processes or {}).values()):
+            process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, module: Any, method_name: str, /, *args, **kwargs) -> Any:
+        """
+        Run `module.<method_name>(*args, **kwargs)` in a worker process.
+
+        Raises:
+            TimeoutError: The task exceeded the pool's task timeout
+            BrokenProcessPool: The worker running the task died (e.g. a segfault)
+        """
+        module_path = type(module).__module__
+        module_name = getattr(module, "name", module_path)
+
+        for attempt in range(2):
+            executor = self._executor
+            try:
+                future = executor.submit(_run_task, module_path, method_name, args, kwargs)
+            except (BrokenProcessPool, RuntimeError):
+                # Broken by another task or already shut down by _recycle
+                self._recycle(executor, "crash")
+                continue
+
+            try:
+                result = await asyncio.wait_for(asyncio.wrap_future(future), self.task_timeout)
+                MODULE_POOL_TASKS.labels(module=module_name, outcome="success").inc()
+                return result
+            except TimeoutError:
+                MODULE_POOL_TASKS.labels(module=module_name, outcome="timeout").inc()
+                self._recycle(executor, "timeout")
+                raise TimeoutError(
+                    f"{module_name}.{method_name} timed out after {self.task_timeout} seconds in the process pool"
+                ) from None
+            except asyncio.CancelledError:
+                if not future.done():
+                    self._recycle(executor, "cancelled")
+                raise
+            except BrokenProcessPool:
+                if self._executor is not executor and attempt == 0:
+                    # Another task's timeout or crash took this worker down with it
+                    continue
+                MODULE_POOL_TASKS.labels(module=module_name, outcome="crash").inc()
+                self._recycle(executor, "crash")
+                raise
+            except Exception:
+                MODULE_POOL_TASKS.labels(module=module_name, outcome="error").inc()
+                raise
+
+        raise BrokenProcessPool(f"{module_name}.{method_name} could not be run in the process pool")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor = self._executor
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_process_pool() -> ModuleProcessPool | None:
+    """Return the process pool started by start_process_pool, if any."""
+    return _process_pool
+
+
+def start_process_pool(modules: Iterable[Any]) -> ModuleProcessPool | None:
+    """
+    Start the process pool for the CPU-bound modules among `modules`.
+
+    Configured through MODULE_PROCESS_POOL_SIZE (0 disables the pool, CPU-bound
+    modules then use the module thread pool), MODULE_PROCESS_MEMORY_LIMIT_MB,
+    MODULE_PROCESS_MAX_TASKS_PER_CHILD and MAX_MODULE_EXECUTION_TIME.
+    """
+    global _process_pool
+
+    module_paths = [type(module).__module__ for module in modules if getattr(module, "cpu_bound", False)]
+    pool_size = int(os.getenv("MODULE_PROCESS_POOL_SIZE", 2))
+    if not module_paths or pool_size <= 0:
+        return None
+
+    max_tasks_per_child = int(os.getenv("MODULE_PROCESS_MAX_TASKS_PER_CHILD", 100))
+    _process_pool = ModuleProcessPool(
+        module_paths,
+        max_workers=pool_size,
+        task_timeout=float(os.getenv("MAX_MODULE_EXECUTION_TIME", 120)),
+        memory_limit_mb=int(os.getenv("MODULE_PROCESS_MEMORY_LIMIT_MB", 4096)),
+        max_tasks_per_child=max_tasks_per_child or None,
+    )
+    logger.info(
+        "Started enrichment module process pool",
+        modules=_process_pool.module_paths,
+        workers=pool_size,
+        memory_limit_mb=_process_pool.memory_limit_bytes // (1024 * 1024),
+    )
+    return _process_pool
@@ -1,23 +1,27 @@
 # enrichment_modules/registry_hive/analyzer.py
-import os
 import posixpath
-import shutil
 import struct
 import tempfile
 import textwrap
 from datetime import UTC, datetime
 from typing import TYPE_CHECKING
 
+from aiowinreg.hive import AIOWinRegHive
 from common.helpers import get_drive_from_path
 from common.logger import get_logger
 from common.models import EnrichmentResult, FileObject, Finding, FindingCategory, FindingOrigin, Transform
 from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
-from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.module_loader import EnrichmentModule, run_blocking
+from file_enrichment_modules.registry_hive.hive_index import HiveArtifact, find_hive, register_hive
+from file_enrichment_modules.routing import ModuleRouting, Route
 from file_linking.helpers import add_file_linking
 from nemesis_dpapi import DpapiSystemCredential
 from pypykatz.registry.offline_parser import OffineRegistry as OfflineRegistry
+from pypykatz.registry.sam.sam import SAM
 from pypykatz.registry.sam.structures import USER_ACCOUNT_V
+from pypykatz.registry.security.security import SECURITY
+from pypykatz.registry.system.system import SYSTEM
 from regipy.registry import RegistryHive
 
 if TYPE_CHECKING:
@@ -76,6 +80,23 @@ def _filetime_to_str(filetime: int) -> str | None:
         return None
 
 
+class _DerivedSystem:
+    """Stands in for pypykatz's SYSTEM when decrypting SAM/SECURITY hives with secrets derived earlier.
+
+    Besides the bootkey, SECURITY only reads the machine name and the service accounts
+    (for the machine account and _SC_ service secrets) from the SYSTEM hive.
+    """
+
+    def __init__(self, secrets: dict):
+        self.bootkey = bytes.fromhex(secrets["bootkey"])
+        self.machinename = secrets.get("machine_name")
+        self.currentcontrol = secrets.get("current_control_set")
+        self.service_users: dict[str, str] = secrets.get("service_users", {})
+
+    def get_service_user(self, service_name: str) -> str | None:
+        return self.service_users.get(service_name)
+
+
 class RegistryHiveAnalyzer(EnrichmentModule):
     name: str = "registry_hive"
     dependencies: list[str] = []
@@ -85,6 +106,22 @@ class RegistryHiveAnalyzer(EnrichmentModule):
 
         self.asyncpg_pool = None  # type: ignore
         self.workflows = ["default"]
+        self.routing = ModuleRouting(
+            routes=(
+                Route(
+                    mime_types={"application/octet-stream"},
+                    magic=(
+                        "ms windows registry file",
+                        "windows registry file",
+                        "registry hive",
+                        "windows nt registry hive",
+                    ),
+                    plaintext=False,
+                ),
+            )
+        )
+        # hive parsing passed to run_blocking runs in the module process pool
+        self.cpu_bound = True
         self.dpapi_manager: DpapiManager = None  # type: ignore
         self.asyncpg_pool: asyncpg.Pool | None = None  # type: ignore
 
@@ -141,54 +178,16 @@ class RegistryHiveAnalyzer(EnrichmentModule):
             logger.error(f"Failed to extract bootkey: {e}")
             return None
 
-    async def _find_existing_hive(self, file_enriched, target_hive_path: str) -> str | None:
-        """Find an existing hive by path."""
+    async def _find_existing_hive(self, file_enriched, target_hive_path: str) -> HiveArtifact | None:
+        """Find an existing hive of the type in target_hive_path, preferring the one at that path."""
         if not self.asyncpg_pool:
             logger.warning("No connection pool available, cannot find existing hive")
             return None
 
         try:
-            async with self.asyncpg_pool.acquire() as conn:
-                # Look for existing hive by path
-                result = await conn.fetchrow(
-                    """
-                    SELECT object_id
-                    FROM files_enriched
-                    WHERE source = $1
-                    AND LOWER(path) = LOWER($2)
-                    ORDER BY timestamp DESC
-                    LIMIT 1
-                """,
-                    file_enriched.source,
-                    target_hive_path,
-                )
-
-                if result:
-                    return str(result["object_id"])  # Convert UUID to string
-
-                # Fallback query: look for registry files by magic_type and enrichment results
-                # Extract the hive type from the target path (e.g., SECURITY from .../Windows/System32/Config/SECURITY)
-                target_hive_type = posixpath.basename(target_hive_path).upper()
-
-                result = await conn.fetchrow(
-                    """
-                    SELECT fe.object_id
-                    FROM files_enriched fe
-                    JOIN enrichments e ON fe.object_id = e.object_id
-                    WHERE fe.source = $1
-                    AND fe.magic_type = 'MS Windows registry file, NT/2000 or above'
-                    AND e.module_name = 'registry_hive'
-                    AND e.result_data->'results'->'hive_type' = $2
-                    ORDER BY fe.timestamp DESC
-                    LIMIT 1
-                """,
-                    file_enriched.source,
-                    f'"{target_hive_type}"',
-                )
-
-                if result:
-                    return str(result["object_id"])  # Convert UUID to string
-
+            # The hive type is the file name of the standard path (e.g., SECURITY from .../Windows/System32/Config/SECURITY)
+            target_hive_type = posixpath.basename(target_hive_path).upper()
+            return await find_hive(self.asyncpg_pool, file_enriched.source, target_hive_type, target_hive_path)
         except Exception as e:
             logger.error(f"Failed to find existing hive {target_hive_path}: {e}")
 
@@ -196,31 +195,29 @@ class RegistryHiveAnalyzer(EnrichmentModule):
 
     async def _get_existing_hive_path(self, file_enriched, standard_path: str) -> str:
         """Get the actual path of an existing hive, or return the standard path if not found."""
-        # First try to find an existing hive
-        object_id = await self._find_existing_hive(file_enriched, standard_path)
+        hive = await self._find_existing_hive(file_enriched, standard_path)
+        if hive and hive.path:
+            logger.debug(f"Found existing hive at {hive.path} instead of {standard_path}")
+            return hive.path
 
-        if object_id and self.asyncpg_pool:
-            # Found an existing hive, get its actual path from the database
-            try:
-                async with self.asyncpg_pool.acquire() as conn:
-                    result = await conn.fetchrow(
-                        """
-                        SELECT path
-                        FROM files_enriched
-                        WHERE object_id = $1
-                        LIMIT 1
-                    """,
-                        object_id,
-                    )
+        return standard_path
 
-                    if result and result["path"]:
-                        logger.debug(f"Found existing hive at {result['path']} instead of {standard_path}")
-                        return result["path"]
-            except Exception as e:
-                logger.error(f"Failed to get path for existing hive {object_id}: {e}")
+    async def _register_hive(self, file_enriched, hive_type: str, derived_secrets: dict | None = None):
+        """Add this hive to the registry_hive_artifacts index so its companion hives can find it."""
+        if not self.asyncpg_pool or not file_enriched.source or not file_enriched.path:
+            return
 
-        # Fall back to standard path if not found or on error
-        return standard_path
+        try:
+            await register_hive(
+                self.asyncpg_pool,
+                file_enriched.source,
+                hive_type,
+                file_enriched.path,
+                file_enriched.object_id,
+                derived_secrets,
+            )
+        except Exception as e:
+            logger.error(f"Failed to register {hive_type} hive {file_enriched.path}: {e}")
 
     async def _create_proactive_file_linkings(self, file_enriched, hive_type: str):
         """Create proactive file linkings based on hive type."""
@@ -278,7 +275,7 @@ class RegistryHiveAnalyzer(EnrichmentModule):
         except Exception as e:
             logger.error(f"Failed to create proactive file linkings: {e}")
 
-    def _extract_machine_sid(self, sam_file: str) -> str | None:
+    def _extract_machine_sid(self, sam_file: str | RegistryHive) -> str | None:
         """Extract the machine SID from the SAM hive's domain V value.
 
         SAM\\Domains\\Account\\V contains an array of SAMP_VARIABLE_LENGTH_ATTRIBUTE
@@ -294,10 +291,11 @@ class RegistryHiveAnalyzer(EnrichmentModule):
         Offsets are relative to the start of the data region, which begins
         immediately after the descriptor array (data_base = num_entries * 12).
 
+        Accepts the SAM path or an already opened regipy hive.
         Returns a string like 'S-1-5-21-1234567890-1234567890-1234567890' or None.
         """
         try:
-            hive = RegistryHive(sam_file)
+            hive = RegistryHive(sam_file) if isinstance(sam_file, str) else sam_file
             account_key = hive.get_key("\\SAM\\Domains\\Account")
             v_raw = account_key.get_value("V")
 
@@ -346,20 +344,21 @@ class RegistryHiveAnalyzer(EnrichmentModule):
             logger.debug(f"Could not extract machine SID: {e}")
         return None
 
-    def _get_sam_user_metadata(self, sam_file: str) -> dict[int, dict]:
+    def _get_sam_user_metadata(self, sam_file: str | RegistryHive) -> dict[int, dict]:
         """Read additional per-user metadata from a SAM hive using regipy.
 
         Reads the per-user F value (SAM_USER_FIXED_DATA) for account flags and timestamps,
         and the V value (USER_ACCOUNT_V) for full name and comment. These fields are not
         exposed by pypykatz's SAMSecret objects.
 
+        Accepts the SAM path or an already opened regipy hive.
         Returns a dict keyed by RID with metadata for each user.
         """
         metadata: dict[int, dict] = {}
         max_pw_age: int = 0  # Domain max password age (signed, negative = duration, 0 = never)
 
         try:
-            hive = RegistryHive(sam_file)
+            hive = RegistryHive(sam_file) if isinstance(sam_file, str) else sam_file
 
             # Read domain-level F value for password policy (max_pw_age)
             try:
@@ -436,19 +435,75 @@ class RegistryHiveAnalyzer(EnrichmentModule):
 
         return metadata
 
-    def _process_sam_hive(self, sam_file: str, system_file: str | None) -> dict:
+    def _derive_system_secrets(self, system_file: str) -> dict | None:
+        """Derive what decrypting the SAM and SECURITY hives needs from a SYSTEM hive.
+
+        The result is cached in the registry_hive_artifacts index, so the SYSTEM hive is
+        parsed once rather than once per SAM or SECURITY hive it is paired with.
+        """
+        try:
+            with open(system_file, "rb") as f:
+                system = SYSTEM(AIOWinRegHive(f))
+                system.get_secrets()
+
+                service_users = {}
+                for service_name in system.hive.enum_key(f"{system.currentcontrol}\\Services", throw=False) or []:
+                    service_user = system.get_service_user(service_name)
+                    if service_user:
+                        service_users[service_name] = service_user
+
+            return {
+                "bootkey": system.bootkey.hex(),  # pyright: ignore[reportOptionalMemberAccess]
+                "machine_name": system.machinename,
+                "current_control_set": system.currentcontrol,
+                "service_users": service_users,
+            }
+        except Exception as e:
+            logger.error(f"Failed to derive secrets from SYSTEM hive: {e}")
+            return None
+
+    def _load_companion_registry(
+        self, system_secrets: dict, sam_file: str | None = None, security_file: str | None = None
+    ) -> OfflineRegistry:
+        """Decrypt a SAM and/or SECURITY hive with the secrets derived from their SYSTEM hive.
+
+        Builds the OfflineRegistry that OfflineRegistry.from_files() would, without parsing SYSTEM again.
+        """
+        registry = OfflineRegistry()
+        registry.system = _DerivedSystem(system_secrets)  # pyright: ignore[reportAttributeAccessIssue]
+        bootkey = registry.system.bootkey
+
+        if sam_file:
+            with open(sam_file, "rb") as f:
+                registry.sam = SAM(AIOWinRegHive(f), bootkey)
+                registry.sam.get_secrets()
+
+        if security_file:
+            with open(security_file, "rb") as f:
+                registry.security = SECURITY(AIOWinRegHive(f), bootkey, registry.system)
+                registry.security.get_secrets()
+
+        return registry
+
+    def _process_sam_hive(
+        self, sam_file: str, system_file: str | None = None, system_secrets: dict | None = None
+    ) -> dict:
         """Process SAM hive to extract local accounts using pypykatz.
 
         Combines pypykatz hash decryption with regipy metadata extraction to
         produce detailed per-account information including hashes, account status,
-        and timestamps.
+        and timestamps. The SAM is decrypted with system_secrets when given (see
+        _derive_system_secrets), otherwise with the secrets derived from system_file.
         """
-        results: dict = {"accounts": [], "bootkey_available": system_file is not None}
+        if system_secrets is None and system_file:
+            system_secrets = self._derive_system_secrets(system_file)
+
+        results: dict = {"accounts": [], "bootkey_available": system_secrets is not None}
 
         try:
-            # Use pypykatz to parse the SAM hive with optional SYSTEM hive for decryption
-            if system_file:
-                registry = OfflineRegistry.from_files(system_path=system_file, sam_path=sam_file)
+            # Use pypykatz to decrypt the SAM hive with the bootkey from the SYSTEM hive
+            if system_secrets:
+                registry = self._load_companion_registry(system_secrets, sam_file=sam_file)
                 bootkey = self._extract_bootkey(registry)
                 results["bootkey"] = bootkey
             else:
@@ -456,13 +511,20 @@ class RegistryHiveAnalyzer(EnrichmentModule):
                 logger.warning("Cannot process SAM hive without SYSTEM hive - pypykatz requires both")
                 return results
 
-            # Extract the machine SID from the SAM hive
-            machine_sid = self._extract_machine_sid(sam_file)
-            if machine_sid:
-                results["machine_sid"] = machine_sid
+            # Open the SAM once with regipy for the machine SID and the per-user metadata
+            user_metadata: dict[int, dict] = {}
+            try:
+                hive = RegistryHive(sam_file)
+            except Exception as e:
+                logger.debug(f"Could not open SAM hive with regipy: {e}")
+            else:
+                # Extract the machine SID from the SAM hive
+                machine_sid = self._extract_machine_sid(hive)
+                if machine_sid:
+                    results["machine_sid"] = machine_sid
 
-            # Read additional per-user metadata (full_name, comment, flags, timestamps)
-            user_metadata = self._get_sam_user_metadata(sam_file)
+                # Read additional per-user metadata (full_name, comment, flags, timestamps)
+                user_metadata = self._get_sam_user_metadata(hive)
 
             # Extract user information from parsed SAM
             if hasattr(registry, "sam") and registry.sam:
@@ -513,38 +575,31 @@ class RegistryHiveAnalyzer(EnrichmentModule):
 
         return results
 
-    async def _process_security_hive(self, security_file: str, system_file: str | None) -> dict:
-        """Process SECURITY hive to extract LSA secrets using pypykatz."""
+    async def _process_security_hive(
+        self, security_file: str, system_file: str | None = None, system_secrets: dict | None = None
+    ) -> dict:
+        """Process SECURITY hive to extract LSA secrets using pypykatz.
+
+        Like _process_sam_hive, the hive is decrypted with system_secrets when given,
+        otherwise with the secrets derived from system_file.
+        """
+        if system_secrets is None and system_file:
+            system_secrets = self._derive_system_secrets(system_file)
+
         results = {
             "lsa_secrets": [],
             "cached_credentials": [],
-            "bootkey_available": system_file is not None,
+            "bootkey_available": system_secrets is not None,
         }
 
-        if not system_file:
+        if not system_secrets:
             # Cannot parse SECURITY without SYSTEM - pypykatz requires SYSTEM hive
             logger.debug("Cannot process SECURITY hive without SYSTEM hive - pypykatz requires both")
             return results
 
-        # Create persistent copies of both files that pypykatz can access
-        security_copy_path = None
-        system_copy_path = None
-
         try:
-            # Create temporary copies that persist during processing
-            security_fd, security_copy_path = tempfile.mkstemp(suffix=".security")
-            system_fd, system_copy_path = tempfile.mkstemp(suffix=".system")
-
-            # Close the file descriptors but keep the paths
-            os.close(security_fd)
-            os.close(system_fd)
-
-            # Copy the files
-            shutil.copy2(security_file, security_copy_path)
-            shutil.copy2(system_file, system_copy_path)
-
-            # Now parse with pypykatz using the persistent copies
-            registry = OfflineRegistry.from_files(system_path=system_copy_path, security_path=security_copy_path)
+            # Decrypt the LSA secrets with the bootkey from the SYSTEM hive
+            registry = self._load_companion_registry(system_secrets, security_file=security_file)
 
             # Extract bootkey from SYSTEM
             bootkey = self._extract_bootkey(registry)
@@ -554,14 +609,6 @@ class RegistryHiveAnalyzer(EnrichmentModule):
             else:
                 logger.warning("Failed to extract bootkey from SYSTEM hive")
 
-            # Call get_secrets to extract and decrypt secrets
-            try:
-                registry.get_secrets()
-                logger.debug("get_secrets() completed successfully")
-            except Exception as e:
-                logger.warning(f"Failed to extract secrets: {e}")
-                # Continue anyway to see if we can get any data
-
             # Extract LSA secrets from parsed SECURITY hive
             if hasattr(registry, "security") and registry.security:
                 security_obj = registry.security
@@ -805,76 +852,49 @@ class RegistryHiveAnalyzer(EnrichmentModule):
             results["lsa_secrets"] = []
             results["error"] = "Could not parse SECURITY hive"
 
-        finally:
-            # Clean up temporary files
-            for temp_path in [security_copy_path, system_copy_path]:
-                if temp_path and os.path.exists(temp_path):
-                    try:
-                        os.unlink(temp_path)
-                    except Exception as e:
-                        logger.warning(f"Failed to clean up temporary file {temp_path}: {e}")
-
         return results
 
-    def _process_system_hive(self, system_file: str) -> dict:
-        """Process SYSTEM hive to extract bootkey and system information using pypykatz."""
-        results = {
-            "bootkey": None,
-            "computer_name": None,
-            "current_control_set": None,
-            "services": [],
-        }
-
-        try:
-            # Use pypykatz to parse the SYSTEM hive
-            registry = OfflineRegistry.from_files(system_path=system_file)
-
-            # Extract bootkey
-            bootkey = self._extract_bootkey(registry)
-            if bootkey:
-                results["bootkey"] = bootkey
-
-            # Extract system information from parsed SYSTEM hive
-            if hasattr(registry, "system") and registry.system:
-                system_obj = registry.system
-
-                # Get computer name if available
-                if hasattr(system_obj, "machinename"):
-                    results["computer_name"] = system_obj.machinename  # pyright: ignore[reportAttributeAccessIssue]
-
-                # Get current control set info if available
-                if hasattr(system_obj, "currentcontrol"):
-                    results["current_control_set"] = system_obj.currentcontrol  # pyright: ignore[reportAttributeAccessIssue]
-
-                # Extract some basic service info if available
-                interesting_services = [
-                    "NTDS",
-                    "DNS",
-                    "W32Time",
-                    "LanmanServer",
-                    "Spooler",
-                ]
-                for service_name in interesting_services:
-                    service_info = {
-                        "name": service_name,
-                        "display_name": None,
-                        "start_type": None,
-                        "status": "present_in_system_hive",
-                    }
-                    results["services"].append(service_info)
+    def _process_system_hive(self, system_file: str) -> tuple[dict, dict | None]:
+        """Process SYSTEM hive to extract bootkey and system information using pypykatz.
 
-        except Exception:
-            logger.exception(message="Failed to process SYSTEM hive with pypykatz")
-            # Return empty results on error
-            results = {
+        Returns the analysis results and the secrets derived for decrypting the
+        companion SAM/SECURITY hives (None if the hive couldn't be parsed).
+        """
+        system_secrets = self._derive_system_secrets(system_file)
+        if not system_secrets:
+            return {
                 "bootkey": None,
                 "error": "Could not parse SYSTEM hive",
                 "computer_name": None,
                 "current_control_set": None,
                 "services": [],
+            }, None
+
+        results = {
+            "bootkey": system_secrets["bootkey"],
+            "computer_name": system_secrets["machine_name"],
+            "current_control_set": system_secrets["current_control_set"],
+            "services": [],
+        }
+
+        # Extract some basic service info if available
+        interesting_services = [
+            "NTDS",
+            "DNS",
+            "W32Time",
+            "LanmanServer",
+            "Spooler",
+        ]
+        for service_name in interesting_services:
+            service_info = {
+                "name": service_name,
+                "display_name": None,
+                "start_type": None,
+                "status": "present_in_system_hive",
             }
+            results["services"].append(service_info)
 
-        return results
+        return results, system_secrets
 
     def _format_sam_accounts_markdown(self, accounts: list[dict], limit: int = 10) -> str:
         """Format SAM accounts as detailed markdown."""
@@ -1170,7 +1190,7 @@ class RegistryHiveAnalyzer(EnrichmentModule):
         enrichment_result = EnrichmentResult(module_name=self.name, dependencies=self.dependencies)
 
         # Identify hive type
-        hive_type = self._identify_hive_type(hive_file_path)
+        hive_type = await run_blocking(self._identify_hive_type, hive_file_path)
         if not hive_type:
             logger.warning(f"Could not identify registry hive type for {file_enriched.file_name}")
             return None
@@ -1181,10 +1201,12 @@ class RegistryHiveAnalyzer(EnrichmentModule):
         # Create proactive file linkings
         await self._create_proactive_file_linkings(file_enriched, hive_type)
 
-        # Process based on hive type
+        # Process based on hive type. Each hive is added to the index before looking up its
+        # companions, so of two companion hives processed at the same time, at least one sees the other.
         if hive_type == "SYSTEM":
             # Process SYSTEM hive first
-            analysis_results = self._process_system_hive(hive_file_path)
+            analysis_results, system_secrets = await run_blocking(self._process_system_hive, hive_file_path)
+            await self._register_hive(file_enriched, hive_type, system_secrets)
 
             # Also check for and process existing SAM/SECURITY hives
             drive = get_drive_from_path(file_enriched.path) or ""
@@ -1192,68 +1214,62 @@ class RegistryHiveAnalyzer(EnrichmentModule):
             sam_path = f"{drive}/Windows/System32/Config/SAM"
             security_path = f"{drive}/Windows/System32/Config/SECURITY"
 
-            sam_object_id = await self._find_existing_hive(file_enriched, sam_path)
-            security_object_id = await self._find_existing_hive(file_enriched, security_path)
+            sam_hive = await self._find_existing_hive(file_enriched, sam_path)
+            security_hive = await self._find_existing_hive(file_enriched, security_path)
 
             # Process SAM if found
-            if sam_object_id:
+            if sam_hive:
                 try:
-                    with self.storage.download(sam_object_id) as sam_temp_file:
-                        sam_results = self._process_sam_hive(sam_temp_file.name, hive_file_path)
+                    with self.storage.download(sam_hive.object_id) as sam_temp_file:
+                        sam_results = await run_blocking(
+                            self._process_sam_hive, sam_temp_file.name, system_secrets=system_secrets
+                        )
                         analysis_results["sam_analysis"] = sam_results
                         logger.debug(f"Processed paired SAM hive for SYSTEM: {sam_path}")
                 except Exception as e:
                     logger.error(f"Failed to process paired SAM hive: {e}")
 
             # Process SECURITY if found
-            if security_object_id:
+            if security_hive:
                 try:
-                    with self.storage.download(security_object_id) as security_temp_file:
-                        sam_results = await self._process_security_hive(security_temp_file.name, hive_file_path)
-                        analysis_results["security_analysis"] = sam_results
+                    with self.storage.download(security_hive.object_id) as security_temp_file:
+                        security_results = await self._process_security_hive(
+                            security_temp_file.name, system_secrets=system_secrets
+                        )
+                        analysis_results["security_analysis"] = security_results
                         logger.debug(f"Processed paired SECURITY hive for SYSTEM: {security_path}")
                 except Exception as e:
                     logger.error(f"Failed to process paired SECURITY hive: {e}")
 
         elif hive_type in ["SAM", "SECURITY"]:
+            await self._register_hive(file_enriched, hive_type)
+
             # Look for SYSTEM hive
             drive = get_drive_from_path(file_enriched.path) or ""
-            system_object_id = None
 
             # if drive:
             system_path = f"{drive}/Windows/System32/Config/SYSTEM"
-            system_object_id = await self._find_existing_hive(file_enriched, system_path)
+            system_hive = await self._find_existing_hive(file_enriched, system_path)
 
-            if system_object_id:
-                # Download the SYSTEM hive
-                try:
-                    with self.storage.download(system_object_id) as system_temp_file:
-                        if hive_type == "SAM":
-                            analysis_results = self._process_sam_hive(hive_file_path, system_temp_file.name)
-                        else:  # SECURITY
-                            analysis_results = await self._process_security_hive(hive_file_path, system_temp_file.name)
-                        logger.debug(f"Processed {hive_type} hive with SYSTEM bootkey")
+            # The secrets derived from the SYSTEM hive when it was processed, so it isn't downloaded
+            # and parsed again (None if it couldn't be parsed)
+            system_secrets = system_hive.derived_secrets if system_hive else None
 
-                except Exception as e:
-                    logger.error(f"Error downloading SYSTEM hive: {e}")
-                    # Process without SYSTEM hive
-                    if hive_type == "SAM":
-                        analysis_results = self._process_sam_hive(hive_file_path, None)
-                    else:  # SECURITY
-                        analysis_results = await self._process_security_hive(hive_file_path, None)
-                    logger.debug(f"Processed {hive_type} hive without SYSTEM bootkey (download error)")
+            if hive_type == "SAM":
+                analysis_results = await run_blocking(
+                    self._process_sam_hive, hive_file_path, system_secrets=system_secrets
+                )
+            else:  # SECURITY
+                analysis_results = await self._process_security_hive(hive_file_path, system_secrets=system_secrets)
 
+            if system_secrets:
+                logger.debug(f"Processed {hive_type} hive with SYSTEM bootkey")
             else:
-                # Process without SYSTEM hive
-                if hive_type == "SAM":
-                    analysis_results = self._process_sam_hive(hive_file_path, None)
-                else:  # SECURITY
-                    analysis_results = await self._process_security_hive(hive_file_path, None)
                 logger.debug(f"Processed {hive_type} hive without SYSTEM bootkey")
 
             # Store reference to system hive if found
-            if system_object_id:
-                linked_system_object_id = system_object_id
+            if system_hive:
+                linked_system_object_id = system_hive.object_id
 
         else:
             # For other hive types, just note the type
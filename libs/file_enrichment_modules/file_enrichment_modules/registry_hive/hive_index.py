@@ -0,0 +1,98 @@
+# enrichment_modules/registry_hive/hive_index.py
+"""Index of the SYSTEM/SAM/SECURITY hives seen for each source (the registry_hive_artifacts table).
+
+Modules that pair a file with its companion hives look them up here by
+(source, hive_type, normalized path) instead of scanning files_enriched and
+the registry_hive enrichment results. SYSTEM rows also carry the secrets
+derived from the hive, so SAM and SECURITY hives can be decrypted without
+downloading and parsing SYSTEM again.
+"""
+
+import json
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from common.logger import get_logger
+
+if TYPE_CHECKING:
+    import asyncpg
+
+logger = get_logger(__name__)
+
+# Hive types kept in the index
+INDEXED_HIVE_TYPES = frozenset({"SYSTEM", "SAM", "SECURITY"})
+
+
+@dataclass(frozen=True)
+class HiveArtifact:
+    object_id: str
+    path: str | None
+    # Only set for SYSTEM hives: bootkey, machine name, current control set and service accounts
+    derived_secrets: dict | None = None
+
+
+def normalize_hive_path(path: str) -> str:
+    """Normalize a hive path for the index: forward slashes, case-insensitive."""
+    return path.replace("\\", "/").lower()
+
+
+async def register_hive(
+    pool: "asyncpg.Pool",
+    source: str,
+    hive_type: str,
+    path: str,
+    object_id: str,
+    derived_secrets: dict | None = None,
+) -> None:
+    """Record a hive in the index, replacing any earlier hive at the same path."""
+    if hive_type not in INDEXED_HIVE_TYPES:
+        return
+
+    async with pool.acquire() as conn:
+        await conn.execute(
+            """
+            INSERT INTO registry_hive_artifacts (source, hive_type, normalized_path, path, object_id, derived_secrets)
+            VALUES ($1, $2, $3, $4, $5, $6)
+            ON CONFLICT (source, hive_type, normalized_path) DO UPDATE SET
+                path = EXCLUDED.path,
+                object_id = EXCLUDED.object_id,
+                derived_secrets = EXCLUDED.derived_secrets
+            """,
+            source,
+            hive_type,
+            normalize_hive_path(path),
+            path,
+            object_id,
+            json.dumps(derived_secrets) if derived_secrets is not None else None,
+        )
+
+
+async def find_hive(pool: "asyncpg.Pool", source: str, hive_type: str, expected_path: str) -> HiveArtifact | None:
+    """Find the hive of a type for a source, preferring the one at the expected path.
+
+    Falls back to the most recently registered hive of that type, for hives
+    collected outside of the standard Windows/System32/Config location.
+    """
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(
+            """
+            SELECT object_id, path, derived_secrets
+            FROM registry_hive_artifacts
+            WHERE source = $1 AND hive_type = $2
+            ORDER BY normalized_path = $3 DESC, updated_at DESC
+            LIMIT 1
+            """,
+            source,
+            hive_type,
+            normalize_hive_path(expected_path),
+        )
+
+    if not row:
+        return None
+
+    derived_secrets = row["derived_secrets"]
+    return HiveArtifact(
+        object_id=str(row["object_id"]),
+        path=row["path"],
+        derived_secrets=json.loads(derived_secrets) if derived_secrets else None,
+    )
@@ -0,0 +1,247 @@
+"""Declarative routing of files to enrichment modules.
+
+Instead of awaiting `should_process` on every module for every file, modules declare
+the files they apply to with a `routing` attribute: one or more `Route`s built from
+mime types, extensions, libmagic substrings, file name globs, a size window, the
+plaintext flag and an optional YARA rule evaluated on the first bytes of the file.
+
+`ModuleRouter` compiles the routes of all loaded modules into lookup tables and one
+combined YARA ruleset, so finding the candidate modules for a file takes a few set
+lookups and at most one header scan. Only modules whose routing asks for it (checks
+a declaration can't express, e.g. a YARA scan of the whole file) and modules without
+a routing declaration get their `should_process` called, and only for the files
+their routes let through.
+"""
+
+import fnmatch
+import os
+import re
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+
+import yara_x
+from common.logger import get_logger
+from common.models import FileEnriched
+
+logger = get_logger(__name__)
+
+# Bytes at the start of a file that header rules are evaluated on
+ROUTING_HEADER_BYTES = int(os.getenv("MODULE_ROUTING_HEADER_BYTES", 4096))
+
+
+@dataclass(frozen=True)
+class Route:
+    """One kind of file a module applies to.
+
+    Every criterion that is set must match. Within a criterion, matching any of the
+    values is enough (e.g. any of the extensions). Text comparisons are case-insensitive.
+    """
+
+    mime_types: frozenset[str] = field(default_factory=frozenset)
+    extensions: frozenset[str] = field(default_factory=frozenset)
+    # Substrings of the libmagic description
+    magic: tuple[str, ...] = ()
+    # fnmatch patterns for the file name
+    names: tuple[str, ...] = ()
+    min_size: int | None = None
+    max_size: int | None = None
+    plaintext: bool | None = None
+    # YARA rule source, evaluated on the first ROUTING_HEADER_BYTES of the file
+    header_rule: str | None = None
+
+    def __post_init__(self):
+        object.__setattr__(self, "mime_types", frozenset(value.lower() for value in self.mime_types))
+        object.__setattr__(self, "extensions", frozenset(value.lower() for value in self.extensions))
+        object.__setattr__(self, "magic", tuple(value.lower() for value in self.magic))
+        object.__setattr__(self, "names", tuple(value.lower() for value in self.names))
+
+    @property
+    def is_selective(self) -> bool:
+        """True if the route can only match files that hit one of the lookup tables."""
+        return bool(self.mime_types or self.extensions or self.magic or self.names or self.header_rule)
+
+    def matches_constraints(self, file_enriched: FileEnriched) -> bool:
+        if self.plaintext is not None and file_enriched.is_plaintext != self.plaintext:
+            return False
+        if self.min_size is not None and file_enriched.size < self.min_size:
+            return False
+        if self.max_size is not None and file_enriched.size > self.max_size:
+            return False
+        return True
+
+
+@dataclass(frozen=True)
+class ModuleRouting:
+    """The routes of a module.
+
+    A file is a candidate for the module if any of its routes matches. With
+    `should_process=True` the module's should_process is awaited for the candidates
+    to make the final decision, otherwise the routes are the decision.
+    """
+
+    routes: tuple[Route, ...]
+    should_process: bool = False
+
+    def __post_init__(self):
+        object.__setattr__(self, "routes", tuple(self.routes))
+
+
+# Modules without a routing declaration: every file is a candidate and should_process decides
+UNROUTED = ModuleRouting(routes=(Route(),), should_process=True)
+
+
+@dataclass
+class _FileKeys:
+    """The normalized lookup keys of a file."""
+
+    mime_type: str
+    extension: str
+    magic_type: str
+    file_name: str
+
+    @classmethod
+    def from_file_enriched(cls, file_enriched: FileEnriched) -> "_FileKeys":
+        return cls(
+            mime_type=(file_enriched.mime_type or "").lower(),
+            extension=(file_enriched.extension or "").lower(),
+            magic_type=(file_enriched.magic_type or "").lower(),
+            file_name=(file_enriched.file_name or "").lower(),
+        )
+
+
+class ModuleRouter:
+    """Index of the routes of all enrichment modules."""
+
+    def __init__(self, modules: Mapping[str, object], header_bytes: int = ROUTING_HEADER_BYTES):
+        """
+        Args:
+            modules: Enrichment modules by name, modules without a `routing` attribute are
+                treated as UNROUTED
+            header_bytes: Bytes at the start of a file that header rules are evaluated on
+        """
+        self.header_bytes = header_bytes
+
+        self._routes: list[tuple[str, Route]] = []
+        self._checked_modules: set[str] = set()
+
+        self._by_mime: dict[str, list[int]] = {}
+        self._by_extension: dict[str, list[int]] = {}
+        self._by_magic: dict[str, list[int]] = {}
+        self._by_name: dict[str, list[int]] = {}
+        self._name_patterns: dict[str, re.Pattern] = {}
+        self._header_routes: list[int] = []
+        self._unselective_routes: list[int] = []
+
+        compiler = yara_x.Compiler()
+        for module_name, module in modules.items():
+            routing = getattr(module, "routing", None) or UNROUTED
+            if routing.should_process:
+                self._checked_modules.add(module_name)
+
+            for route in routing.routes:
+                route_id = len(self._routes)
+                self._routes.append((module_name, route))
+
+                for mime_type in route.mime_types:
+                    self._by_mime.setdefault(mime_type, []).append(route_id)
+                for extension in route.extensions:
+                    self._by_extension.setdefault(extension, []).append(route_id)
+                for magic in route.magic:
+                    self._by_magic.setdefault(magic, []).append(route_id)
+                for pattern in route.names:
+                    self._by_name.setdefault(pattern, []).append(route_id)
+                    self._name_patterns.setdefault(pattern, re.compile(fnmatch.translate(pattern)))
+
+                if route.header_rule:
+                    compiler.new_namespace(f"route_{route_id}")
+                    compiler.add_source(route.header_rule)
+                    self._header_routes.append(route_id)
+
+                if not route.is_selective:
+                    self._unselective_routes.append(route_id)
+
+        self._header_rules = compiler.build() if self._header_routes else None
+
+        logger.info(
+            "Built module routing index",
+            modules=len(modules),
+            routes=len(self._routes),
+            header_rules=len(self._header_routes),
+            should_process_modules=sorted(self._checked_modules),
+        )
+
+    def needs_should_process(self, module_name: str) -> bool:
+        """Whether the module's should_process makes the final decision for its candidates."""
+        return module_name in self._checked_modules
+
+    def route(self, file_enriched: FileEnriched, file_path: str | None = None) -> set[str]:
+        """Return the names of the modules whose routes match the file.
+
+        Args:
+            file_enriched: The file's basic analysis
+            file_path: Path to the downloaded file, needed to evaluate header rules (routes
+                with a header rule don't match without it)
+        """
+        keys = _FileKeys.from_file_enriched(file_enriched)
+
+        # Criteria of each route that matched, by route id
+        hits: dict[int, set[str]] = {}
+
+        def hit(route_ids: Iterable[int], criterion: str) -> None:
+            for route_id in route_ids:
+                hits.setdefault(route_id, set()).add(criterion)
+
+        hit(self._by_mime.get(keys.mime_type, ()), "mime_types")
+        hit(self._by_extension.get(keys.extension, ()), "extensions")
+        for magic, route_ids in self._by_magic.items():
+            if magic in keys.magic_type:
+                hit(route_ids, "magic")
+        for pattern, route_ids in self._by_name.items():
+            if self._name_patterns[pattern].match(keys.file_name):
+                hit(route_ids, "names")
+
+        candidates = set(hits) | set(self._unselective_routes) | set(self._header_routes)
+        header_matches: set[int] | None = None
+
+        matched_modules: set[str] = set()
+        for route_id in sorted(candidates):
+            module_name, route = self._routes[route_id]
+            if module_name in matched_modules:
+                continue
+
+            route_hits = hits.get(route_id, set())
+            if route.mime_types and "mime_types" not in route_hits:
+                continue
+            if route.extensions and "extensions" not in route_hits:
+                continue
+            if route.magic and "magic" not in route_hits:
+                continue
+            if route.names and "names" not in route_hits:
+                continue
+            if not route.matches_constraints(file_enriched):
+                continue
+
+            if route.header_rule:
+                # One scan of the file header for all header rules, only once a route needs it
+                if header_matches is None:
+                    header_matches = self._scan_header(file_path)
+                if route_id not in header_matches:
+                    continue
+
+            matched_modules.add(module_name)
+
+        return matched_modules
+
+    def _scan_header(self, file_path: str | None) -> set[int]:
+        """Return the ids of the routes whose header rule matches the start of the file."""
+        if self._header_rules is None or file_path is None:
+            return set()
+
+        try:
+            with open(file_path, "rb") as f:
+                header = f.read(self.header_bytes)
+        except OSError:
+            logger.exception(message="Error reading file header for module routing", file_path=file_path)
+            return set()
+
+        return {int(rule.namespace.removeprefix("route_")) for rule in self._header_rules.scan(header).matching_rules}
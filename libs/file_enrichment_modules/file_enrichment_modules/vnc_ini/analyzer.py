@@ -9,6 +9,7 @@ from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
 from Crypto.Cipher import DES
 from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.routing import ModuleRouting, Route
 
 logger = get_logger(__name__)
 
@@ -31,6 +32,7 @@ class VncParser(EnrichmentModule):
 
         # the workflows this module should automatically run in
         self.workflows = ["default"]
+        self.routing = ModuleRouting(routes=(Route(extensions={".ini"}, names=("*vnc*",), magic=("text",)),))
 
     async def should_process(self, object_id: str, file_path: str | None = None) -> bool:
         """Determine if this module should run based on file type."""
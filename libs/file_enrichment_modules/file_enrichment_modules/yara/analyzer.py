@@ -1,15 +1,44 @@
 import base64
 import binascii
+import os
+import time
 
+import yara_x
 from common.logger import get_logger
 from common.models import EnrichmentResult, FileObject, Finding, FindingCategory, FindingOrigin
 from common.state_helpers import get_file_enriched_async
 from common.storage import StorageMinio
-from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.module_loader import EnrichmentModule, run_blocking, run_in_thread
+from file_enrichment_modules.routing import ModuleRouting, Route
 from file_enrichment_modules.yara.yara_manager import YaraRuleManager
+from prometheus_client import Counter, Histogram
 
 logger = get_logger(__name__)
 
+# yara-x maps the file it scans, which counts against the address space limit of the
+# module process pool workers: larger files are scanned in the module thread pool
+YARA_PROCESS_POOL_MAX_FILE_MB = int(os.getenv("YARA_PROCESS_POOL_MAX_FILE_MB", 1024))
+
+YARA_SCAN_SECONDS = Histogram(
+    "nemesis_yara_scan_seconds",
+    "Duration of Yara scans of a file, including the extraction of matched data",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+YARA_SCAN_TIMEOUTS = Counter(
+    "nemesis_yara_scan_timeouts_total",
+    "Yara scans aborted after YARA_SCAN_TIMEOUT seconds",
+)
+YARA_RULE_MATCHES = Counter(
+    "nemesis_yara_rule_matches_total",
+    "Pattern matches of a Yara rule (1 per file for rules matching without patterns)",
+    ["rule"],
+)
+YARA_RULE_SCAN_SECONDS = Counter(
+    "nemesis_yara_rule_scan_seconds_total",
+    "Duration of the Yara scans a rule matched in, to find noisy rules that slow down scans",
+    ["rule"],
+)
+
 
 def yara_match_to_markdown(match):
     markdown = [
@@ -51,6 +80,41 @@ def format_hex_like_xxd(data):
     return " ".join(hex_str[i : i + 8] for i in range(0, len(hex_str), 8))
 
 
+def _match_instance(rule_name: str, match: yara_x.Match, fd: int, is_plaintext: bool) -> dict:
+    """Build the match instance dict of a pattern match, reading the matched data from `fd`."""
+    string_match_instance = {
+        "offset": match.offset,
+        "length": match.length,
+    }
+
+    if match.length >= 1000:
+        logger.warning(f"Yara match for rule '{rule_name}' is length {match.length}, not including in base64 data")
+        return string_match_instance
+
+    matched_data = os.pread(fd, match.length, match.offset)
+
+    # Always include base64 representation for compatibility
+    string_match_instance["matched_data_b64"] = base64.b64encode(matched_data).decode("utf-8")
+
+    # Format differently based on file type
+    if is_plaintext:
+        try:
+            # Try to decode as UTF-8
+            string_match_instance["matched_data_text"] = matched_data.decode("utf-8")
+        except UnicodeDecodeError:
+            try:
+                # Fallback to a more lenient encoding
+                string_match_instance["matched_data_text"] = matched_data.decode("unicode_escape")
+            except Exception:
+                # If both decodings fail, use hex format
+                string_match_instance["matched_data_hex"] = format_hex_like_xxd(matched_data)
+    else:
+        # Binary file - format as hex
+        string_match_instance["matched_data_hex"] = format_hex_like_xxd(matched_data)
+
+    return string_match_instance
+
+
 class YaraScanner(EnrichmentModule):
     name: str = "yara_scanner"
     dependencies: list[str] = []
@@ -62,11 +126,61 @@ class YaraScanner(EnrichmentModule):
         self.rule_manager = YaraRuleManager()
         # the workflows this module should automatically run in
         self.workflows = ["default"]
+        self.routing = ModuleRouting(routes=(Route(),))
+        # yara-x holds the GIL while scanning, so _scan_file runs in the module process pool
+        self.cpu_bound = True
 
     async def should_process(self, object_id: str, file_path: str | None = None) -> bool:
         """Always returns True as Yara scanning should run on all files."""
         return True
 
+    def _scan_file(self, file_path: str, is_plaintext: bool, ruleset_hash: str, rules_path: str) -> dict:
+        """Scan a file and extract the matched data (runs in the module process pool).
+
+        Args:
+            file_path: Path to the file to scan
+            is_plaintext: Whether matched data is rendered as text instead of hex
+            ruleset_hash: Hash of the ruleset to scan with
+            rules_path: Path of the serialized ruleset
+
+        Returns:
+            Dictionary with the match dicts, the scan duration and whether the scan timed out
+        """
+        start = time.perf_counter()
+        try:
+            scan_results = self.rule_manager.scan_file(file_path, ruleset_hash, rules_path)
+        except yara_x.TimeoutError:
+            return {"matches": [], "scan_seconds": time.perf_counter() - start, "timed_out": True}
+
+        yara_matches = []
+        if not scan_results:
+            return {"matches": yara_matches, "scan_seconds": time.perf_counter() - start, "timed_out": False}
+
+        with open(file_path, "rb") as f:
+            for rule in scan_results:
+                yara_match = {"rule_name": rule.identifier, "rule_string_matches": []}
+
+                # Add metadata if available
+                metadata_dict = dict(rule.metadata)
+                if "description" in metadata_dict:
+                    yara_match["rule_description"] = metadata_dict["description"]
+
+                # Process patterns (strings in yara-x)
+                for pattern in rule.patterns:
+                    if pattern.matches:  # Only process patterns that had matches
+                        string_match = {
+                            "identifier": pattern.identifier,
+                            "yara_string_match_instances": [
+                                _match_instance(rule.identifier, match, f.fileno(), is_plaintext)
+                                for match in pattern.matches
+                            ],
+                        }
+                        yara_match["rule_string_matches"].append(string_match)
+
+                yara_matches.append(yara_match)
+
+        return {"matches": yara_matches, "scan_seconds": time.perf_counter() - start, "timed_out": False}
+
     async def _analyze_yara(self, file_path: str, file_enriched) -> EnrichmentResult | None:
         """Analyze file using Yara rules and generate enrichment result.
 
@@ -77,97 +191,60 @@ class YaraScanner(EnrichmentModule):
         Returns:
             EnrichmentResult or None if analysis fails
         """
-        # Get scan results
-        scan_results = self.rule_manager.match(file_path)
+        ruleset = self.rule_manager.ruleset
+        if ruleset is None:
+            logger.debug("No Yara rules compiled")
+            return None
+
+        is_plaintext = bool(getattr(file_enriched, "is_plaintext", False))
+        if os.path.getsize(file_path) > YARA_PROCESS_POOL_MAX_FILE_MB * 1024 * 1024:
+            scan = await run_in_thread(self._scan_file, file_path, is_plaintext, *ruleset)
+        else:
+            scan = await run_blocking(self._scan_file, file_path, is_plaintext, *ruleset)
+
+        YARA_SCAN_SECONDS.observe(scan["scan_seconds"])
+        if scan["timed_out"]:
+            YARA_SCAN_TIMEOUTS.inc()
+            logger.warning(
+                "Yara scan timed out", object_id=file_enriched.object_id, scan_seconds=round(scan["scan_seconds"], 2)
+            )
+            return None
 
         enrichment_result = EnrichmentResult(module_name=self.name)
 
-        yara_matches = []
-        for rule in scan_results:
-            rule_text = await self.rule_manager.get_rule_content(rule.identifier)
-            yara_match = {"rule_name": rule.identifier, "rule_string_matches": [], "rule_text": rule_text}
-
-            # Add metadata if available
-            metadata_dict = dict(rule.metadata)
-            if "description" in metadata_dict:
-                yara_match["rule_description"] = metadata_dict["description"]
-
-            # Process patterns (strings in yara-x)
-            for pattern in rule.patterns:
-                if pattern.matches:  # Only process patterns that had matches
-                    string_match = {
-                        "identifier": pattern.identifier,
-                        "yara_string_match_instances": [],
-                    }
-
-                    for match in pattern.matches:
-                        if match.length < 1000:
-                            # Read the matched data from the file
-                            with open(file_path, "rb") as f:
-                                f.seek(match.offset)
-                                matched_data = f.read(match.length)
-
-                                string_match_instance = {
-                                    "offset": match.offset,
-                                    "length": match.length,
-                                }
-
-                                # Always include base64 representation for compatibility
-                                string_match_instance["matched_data_b64"] = base64.b64encode(matched_data).decode(
-                                    "utf-8"
-                                )
-
-                                # Format differently based on file type
-                                if hasattr(file_enriched, "is_plaintext") and file_enriched.is_plaintext:
-                                    try:
-                                        # Try to decode as UTF-8
-                                        string_match_instance["matched_data_text"] = matched_data.decode("utf-8")
-                                    except UnicodeDecodeError:
-                                        try:
-                                            # Fallback to a more lenient encoding
-                                            string_match_instance["matched_data_text"] = matched_data.decode(
-                                                "unicode_escape"
-                                            )
-                                        except Exception:
-                                            # If both decodings fail, use hex format
-                                            string_match_instance["matched_data_hex"] = format_hex_like_xxd(
-                                                matched_data
-                                            )
-                                else:
-                                    # Binary file - format as hex
-                                    string_match_instance["matched_data_hex"] = format_hex_like_xxd(matched_data)
-                        else:
-                            logger.warning(
-                                f"Yara match for rule '{rule.identifier}' is length {match.length}, not including in base64 data"
-                            )
-                            string_match_instance = {
-                                "offset": match.offset,
-                                "length": match.length,
-                            }
-                        string_match["yara_string_match_instances"].append(string_match_instance)
-
-                    yara_match["rule_string_matches"].append(string_match)
-
-                    summary_markdown = yara_match_to_markdown(yara_match)
-                    display_data = FileObject(type="finding_summary", metadata={"summary": summary_markdown})
-
-                    finding = Finding(
-                        category=FindingCategory.YARA_MATCH,
-                        finding_name="yara_match",
-                        origin_type=FindingOrigin.ENRICHMENT_MODULE,
-                        origin_name=self.name,
-                        object_id=file_enriched.object_id,
-                        severity=6,
-                        raw_data={"match": yara_match},
-                        data=[display_data],
-                    )
-
-                    if not enrichment_result.findings:
-                        enrichment_result.findings = []
-
-                    enrichment_result.findings.append(finding)
-
-            yara_matches.append(yara_match)
+        yara_matches = scan["matches"]
+        for yara_match in yara_matches:
+            rule_name = yara_match["rule_name"]
+            yara_match["rule_text"] = self.rule_manager.get_rule_content(rule_name)
+
+            string_matches = yara_match["rule_string_matches"]
+            YARA_RULE_MATCHES.labels(rule=rule_name).inc(
+                sum(len(string_match["yara_string_match_instances"]) for string_match in string_matches) or 1
+            )
+            YARA_RULE_SCAN_SECONDS.labels(rule=rule_name).inc(scan["scan_seconds"])
+
+            # One finding per matching pattern, summarizing the rule's matches up to that pattern
+            for i in range(len(string_matches)):
+                summary_markdown = yara_match_to_markdown(
+                    {**yara_match, "rule_string_matches": string_matches[: i + 1]}
+                )
+                display_data = FileObject(type="finding_summary", metadata={"summary": summary_markdown})
+
+                finding = Finding(
+                    category=FindingCategory.YARA_MATCH,
+                    finding_name="yara_match",
+                    origin_type=FindingOrigin.ENRICHMENT_MODULE,
+                    origin_name=self.name,
+                    object_id=file_enriched.object_id,
+                    severity=6,
+                    raw_data={"match": yara_match},
+                    data=[display_data],
+                )
+
+                if not enrichment_result.findings:
+                    enrichment_result.findings = []
+
+                enrichment_result.findings.append(finding)
 
         if yara_matches:
             enrichment_result.results = {"yara_matches": yara_matches}
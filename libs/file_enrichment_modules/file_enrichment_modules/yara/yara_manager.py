@@ -1,8 +1,15 @@
+import asyncio
 import glob
+import hashlib
+import io
 import os
+import tempfile
 import threading
+import time
+from collections.abc import Sequence
 from datetime import UTC, datetime
-from typing import TYPE_CHECKING
+from importlib.metadata import version as package_version
+from typing import TYPE_CHECKING, Any
 
 import plyara
 import yara_x
@@ -18,16 +25,38 @@ logger = get_logger(__name__)
 YARA_RULES_FOLDER_PATH = os.getenv("YARA_RULES_FOLDER_PATH", "/yara_rules/")
 check_directory_exists(YARA_RULES_FOLDER_PATH)
 
+# Seconds after which a single scan is aborted
+YARA_SCAN_TIMEOUT = int(os.getenv("YARA_SCAN_TIMEOUT", 60))
+# Number of compiled rule set artifacts kept in the database
+YARA_RULESET_ARTIFACTS_KEPT = 5
+
+
+def ruleset_hash(rules: Sequence[Any]) -> str:
+    """Content hash of a set of rules (records with name and content) and the yara-x version compiling them."""
+    digest = hashlib.sha256(package_version("yara-x").encode())
+    for rule in sorted(rules, key=lambda rule: rule["name"]):
+        digest.update(b"\0" + rule["name"].encode() + b"\0" + rule["content"].encode())
+    return digest.hexdigest()
+
 
 class YaraRuleManager:
     _thread_local = threading.local()
 
     def __init__(self):
         self.parser = plyara.Plyara()
-        self._compiler = yara_x.Compiler()
         self._compiled_rules: yara_x.Rules | None = None
         self.asyncpg_pool: asyncpg.Pool | None = None  # Connection pool for database operations
 
+        # Content of the compiled rules by rule name, so matches don't need a database lookup
+        self._rule_contents: dict[str, str] = {}
+        # The compiled rules serialized to disk for scans in other processes, as (ruleset hash, path)
+        self._ruleset: tuple[str, str] | None = None
+        self._rules_dir: str | None = None
+        # Rules deserialized from a ruleset file in this process, as (ruleset hash, rules)
+        self._loaded_ruleset: tuple[str, yara_x.Rules] | None = None
+        # Whether a rule compiles on its own, by hash of the rule content, so reloads only validate changed rules
+        self._rule_validity: dict[str, bool] = {}
+
     async def initialize(self):
         """Initialize the Yara rule manager by loading and compiling rules.
 
@@ -37,20 +66,71 @@ class YaraRuleManager:
         await self._process_disk_rules()
         await self.load_db_rules()
 
-    def _get_scanner(self) -> yara_x.Scanner | None:
-        """Get or create thread-local scanner instance."""
-        if not hasattr(self._thread_local, "scanner"):
-            if self._compiled_rules:
-                self._thread_local.scanner = yara_x.Scanner(self._compiled_rules)
-                self._thread_local.scanner.set_timeout(60)
-            else:
-                return None
+    def _get_scanner(self, rules: yara_x.Rules | None) -> yara_x.Scanner | None:
+        """Get or create the thread-local scanner instance for `rules`."""
+        if rules is None:
+            return None
+
+        # Scanners are bound to their rules, so a reload replaces the scanner of every thread on its next scan
+        if getattr(self._thread_local, "rules", None) is not rules:
+            scanner = yara_x.Scanner(rules)
+            scanner.set_timeout(YARA_SCAN_TIMEOUT)
+            self._thread_local.scanner = scanner
+            self._thread_local.rules = rules
         return self._thread_local.scanner
 
-    def _clear_scanner(self):
-        """Clear the thread-local scanner if it exists."""
-        if hasattr(self._thread_local, "scanner"):
-            delattr(self._thread_local, "scanner")
+    @property
+    def ruleset(self) -> tuple[str, str] | None:
+        """The current compiled rules as (ruleset hash, path of the serialized rules), None without rules."""
+        return self._ruleset
+
+    def _set_compiled_rules(self, rules: yara_x.Rules | None, key: str = "", serialized: bytes = b"") -> None:
+        """Swap in new compiled rules and write their serialized form for scans in worker processes.
+
+        Scans in flight keep the rules (and ruleset file) they started with.
+        """
+        if rules is None:
+            self._compiled_rules = None
+            self._ruleset = None
+            return
+
+        if self._rules_dir is None:
+            self._rules_dir = tempfile.mkdtemp(prefix="nemesis-yara-")
+
+        path = os.path.join(self._rules_dir, f"rules-{key}.yarc")
+        with open(path, "wb") as f:
+            f.write(serialized)
+
+        # Scans submitted before the swap may still need the previous ruleset
+        keep = {path, self._ruleset[1] if self._ruleset else ""}
+        for old_path in glob.glob(os.path.join(self._rules_dir, "rules-*.yarc")):
+            if old_path not in keep:
+                os.remove(old_path)
+
+        self._compiled_rules = rules
+        self._ruleset = (key, path)
+
+    def get_rules(self, key: str, path: str) -> yara_x.Rules:
+        """Return the rules of a ruleset, deserializing them if this process didn't compile them."""
+        if self._ruleset and self._ruleset[0] == key and self._compiled_rules is not None:
+            return self._compiled_rules
+
+        loaded = self._loaded_ruleset
+        if loaded is None or loaded[0] != key:
+            with open(path, "rb") as f:
+                loaded = (key, yara_x.Rules.deserialize_from(f))
+            self._loaded_ruleset = loaded
+        return loaded[1]
+
+    def scan_file(self, file_path: str, key: str, path: str) -> list[yara_x.Rule]:
+        """
+        Scan a file with the rules of a ruleset (see `ruleset`).
+
+        Raises:
+            yara_x.TimeoutError: The scan took longer than YARA_SCAN_TIMEOUT seconds
+        """
+        scanner = self._get_scanner(self.get_rules(key, path))
+        return list(scanner.scan_file(file_path).matching_rules)  # pyright: ignore[reportOptionalMemberAccess]
 
     async def _process_disk_rules(self):
         """Load Yara rules from disk and insert into database if they don't exist."""
@@ -130,9 +210,9 @@ class YaraRuleManager:
             logger.exception(message="Error processing disk rules")
             raise
 
-    async def get_rule_content(self, rule_name: str) -> str | None:
+    def get_rule_content(self, rule_name: str) -> str | None:
         """
-        Retrieve the content of a Yara rule by name.
+        Retrieve the content of a compiled Yara rule by name.
 
         Args:
             rule_name: Name of the rule to retrieve
@@ -140,36 +220,69 @@ class YaraRuleManager:
         Returns:
             The rule content if found, None otherwise
         """
-        if not self.asyncpg_pool:
-            logger.warning("No asyncpg pool available, cannot retrieve rule content")
-            return None
+        return self._rule_contents.get(rule_name)
 
-        try:
-            async with self.asyncpg_pool.acquire() as conn:
-                result = await conn.fetchrow(
-                    """
-                    SELECT content
-                    FROM yara_rules
-                    WHERE name = $1
-                    """,
-                    rule_name,
-                )
-                return result["content"] if result else None
-        except Exception as e:
-            logger.error(f"Error retrieving rule: {e}", rule=rule_name)
-            return None
+    def _compile_rules(self, rules: Sequence[Any]) -> tuple[yara_x.Rules | None, list[str], bytes]:
+        """Compile the valid rules into one rule set (blocking, run in a thread).
+
+        Each rule is first test compiled on its own, unless a rule with the same content
+        was validated before.
+
+        Returns:
+            The compiled rules, the names of the rules they contain and their serialized form
+        """
+        # Compilers are local: they must be dropped on the thread that created them
+        compiler = yara_x.Compiler()
+        rule_names = []
+        rule_validity = {}
+
+        # Try to add each rule to the compiler
+        for rule in rules:
+            content_hash = hashlib.sha256(rule["content"].encode()).hexdigest()
+            valid = self._rule_validity.get(content_hash)
+            try:
+                if valid is None:
+                    # Test compile the individual rule first
+                    valid = False
+                    test_compiler = yara_x.Compiler()
+                    test_compiler.add_source(rule["content"], origin=rule.get("source", "database"))
+                    test_compiler.build()
+                    valid = True
+
+                if valid:
+                    # If test compilation succeeds, add to main compiler
+                    compiler.add_source(rule["content"], origin=rule.get("source", "database"))
+                    rule_names.append(rule["name"])
+            except Exception as e:
+                logger.warn(f"Error compiling database Yara rule '{rule['name']}': {e}")
+                logger.debug("Error compiling database rule", rule=rule["name"])
+            rule_validity[content_hash] = valid
+
+        # Only remember the rules of the current rule set
+        self._rule_validity = rule_validity
+
+        logger.info(f"{len(rule_names)} valid yara rules compiled from the database")
+        if not rule_names:
+            return None, [], b""
+
+        # Compile all valid rules together
+        compiled = compiler.build()
+        buffer = io.BytesIO()
+        compiled.serialize_into(buffer)
+        return compiled, rule_names, buffer.getvalue()
 
     async def load_db_rules(self):
-        """Load all enabled rules from database and compile them."""
+        """Load all enabled rules from database and swap them in.
+
+        The compiled rule set is stored in the database keyed by the hash of the enabled
+        rules, so only the first replica to see a rule set compiles it and the others
+        (and later reloads/restarts) deserialize the stored artifact.
+        """
         if not self.asyncpg_pool:
             logger.warning("No asyncpg pool available, cannot load rules from database")
             return
 
         try:
-            # Create a new compiler instance
-            self._compiler = yara_x.Compiler()
-            valid_rules = 0
-
             async with self.asyncpg_pool.acquire() as conn:
                 rules = await conn.fetch("""
                     SELECT name, content, source
@@ -180,39 +293,75 @@ class YaraRuleManager:
 
             logger.info(f"Loading {len(rules)} yara rules from the database")
 
-            # Try to add each rule to the compiler
-            for rule in rules:
-                try:
-                    # Test compile the individual rule first
-                    test_compiler = yara_x.Compiler()
-                    test_compiler.add_source(rule["content"], origin=rule.get("source", "database"))
-                    test_compiler.build()
+            if not rules:
+                logger.warning("No valid rules to compile")
+                self._set_compiled_rules(None)
+                return
 
-                    # If test compilation succeeds, add to main compiler
-                    self._compiler.add_source(rule["content"], origin=rule.get("source", "database"))
-                    valid_rules += 1
-                except Exception as e:
-                    logger.warn(f"Error compiling database Yara rule '{rule['name']}': {e}")
-                    logger.debug("Error compiling database rule", rule=rule["name"])
-                    continue
+            key = ruleset_hash(rules)
+            if self._ruleset and self._ruleset[0] == key:
+                logger.info("Yara rules unchanged, keeping the compiled rule set")
+                return
 
-            logger.info(f"{valid_rules} valid yara rules compiled from the database")
+            start = time.perf_counter()
+            async with self.asyncpg_pool.acquire() as conn:
+                async with conn.transaction():
+                    # Replicas reloading at the same time wait here for the one compiling the rule set
+                    await conn.execute("SELECT pg_advisory_xact_lock(hashtextextended($1, 0))", key)
+
+                    artifact = await conn.fetchrow(
+                        "SELECT artifact, rule_names FROM yara_ruleset_artifacts WHERE ruleset_hash = $1", key
+                    )
+                    compiled = None
+                    if artifact:
+                        try:
+                            serialized, rule_names = artifact["artifact"], list(artifact["rule_names"])
+                            compiled = await asyncio.to_thread(yara_x.Rules.deserialize_from, io.BytesIO(serialized))
+                            source = "artifact"
+                        except Exception as e:
+                            logger.warning(f"Error loading compiled Yara rule set, recompiling: {e}")
 
-            if valid_rules > 0:
-                try:
-                    # Compile all valid rules together
-                    self._compiled_rules = self._compiler.build()
-                    # Clear any existing thread-local scanners
-                    self._clear_scanner()
-                    logger.info(f"Successfully compiled {valid_rules} database rules")
-                except Exception as e:
-                    logger.error(f"Error in final compilation of database rules: {e}")
-                    self._compiled_rules = None
-                    self._clear_scanner()
-            else:
+                    if compiled is None:
+                        compiled, rule_names, serialized = await asyncio.to_thread(self._compile_rules, rules)
+                        source = "compiled"
+                        if compiled is not None:
+                            await conn.execute(
+                                """
+                                INSERT INTO yara_ruleset_artifacts (ruleset_hash, artifact, rule_names)
+                                VALUES ($1, $2, $3)
+                                ON CONFLICT (ruleset_hash) DO UPDATE
+                                SET artifact = EXCLUDED.artifact, rule_names = EXCLUDED.rule_names
+                                """,
+                                key,
+                                serialized,
+                                rule_names,
+                            )
+                            await conn.execute(
+                                """
+                                DELETE FROM yara_ruleset_artifacts
+                                WHERE ruleset_hash NOT IN (
+                                    SELECT ruleset_hash FROM yara_ruleset_artifacts
+                                    ORDER BY created_at DESC
+                                    LIMIT $1
+                                )
+                                """,
+                                YARA_RULESET_ARTIFACTS_KEPT,
+                            )
+
+            if compiled is None:
                 logger.warning("No valid rules to compile")
-                self._compiled_rules = None
-                self._clear_scanner()
+                self._set_compiled_rules(None)
+                return
+
+            included = set(rule_names)
+            self._rule_contents = {rule["name"]: rule["content"] for rule in rules if rule["name"] in included}
+            self._set_compiled_rules(compiled, key, serialized)
+            logger.info(
+                f"Successfully loaded {len(rule_names)} database rules",
+                source=source,
+                ruleset_hash=key,
+                seconds=round(time.perf_counter() - start, 2),
+            )
 
         except Exception:
             logger.exception(message="Error loading rules from database")
@@ -223,7 +372,7 @@ class YaraRuleManager:
         Performs Yara matching on the given target.
         Target can be either a file path string or raw data.
         """
-        scanner = self._get_scanner()
+        scanner = self._get_scanner(self._compiled_rules)
         if not scanner:
             logger.debug("No Yara rules compiled")
             return []
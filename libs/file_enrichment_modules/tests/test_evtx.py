@@ -0,0 +1,102 @@
+import csv
+import json
+import os
+from unittest.mock import patch
+
+from file_enrichment_modules.evtx import analyzer
+from file_enrichment_modules.evtx.analyzer import MAX_EVENTS_PER_ID, _EventAggregator
+
+
+def record(event_id, time: str, event_data: dict | None = None, computer: str = "DC01") -> str:
+    """A record as PyEvtxParser.records_json() serializes it."""
+    event = {
+        "System": {
+            "Provider": {"#attributes": {"Name": "Microsoft-Windows-Security-Auditing"}},
+            "EventID": event_id,
+            "TimeCreated": {"#attributes": {"SystemTime": time}},
+            "Computer": computer,
+        }
+    }
+    if event_data is not None:
+        event["EventData"] = event_data
+    return json.dumps({"Event": event}, separators=(",", ":"))
+
+
+class TestEventAggregator:
+    def test_every_record_feeds_the_streaming_aggregates(self):
+        aggregator = _EventAggregator()
+        # Events the analyzer doesn't report on are counted without being decoded
+        with patch.object(analyzer.json, "loads", wraps=json.loads) as loads:
+            aggregator.add(
+                record(
+                    4634, "2024-01-02T00:00:00.000000Z", {"TargetUserName": "alice", "IpAddress": "10.0.0.1"}, "WS01"
+                )
+            )
+            aggregator.add(
+                record(
+                    {"#attributes": {"Qualifiers": 16384}, "#text": 5156},
+                    "2024-01-01T00:00:00.000000Z",
+                    {"SubjectUserName": 'CORP\\"bob"', "Workstation": "-", "WorkstationName": "WS02"},
+                )
+            )
+            aggregator.add(record(4672, "2024-01-03T00:00:00.000000Z", {"SubjectUserName": "DC01$"}))
+            aggregator.add(record(4672, "2024-01-03T00:00:00.000000Z"))
+            # Only the escaped string value is decoded, not the records
+            assert [call.args[0] for call in loads.call_args_list] == ['"CORP\\\\\\"bob\\""']
+        parsed = aggregator.finish()
+
+        assert parsed["event_counts"] == {"4634": 1, "5156": 1, "4672": 2}
+        assert parsed["time_range"] == {"first": "2024-01-01T00:00:00.000000Z", "last": "2024-01-03T00:00:00.000000Z"}
+        assert sorted(parsed["unique_accounts"]) == ['CORP\\"bob"', "alice"]
+        assert sorted(parsed["unique_ips"]) == ["10.0.0.1", "WS02"]
+        assert sorted(parsed["unique_computers"]) == ["DC01", "WS01"]
+
+    def test_capped_categories_stop_decoding_and_keep_exact_counts(self):
+        aggregator = _EventAggregator()
+        with patch.object(analyzer.json, "loads", wraps=json.loads) as loads:
+            for i in range(MAX_EVENTS_PER_ID + 20):
+                aggregator.add(
+                    record(4776, "2024-01-01T00:00:00.000000Z", {"TargetUserName": f"user{i}", "Workstation": "WS01"})
+                )
+            assert loads.call_count == MAX_EVENTS_PER_ID
+        with patch.object(analyzer, "MAX_EVENTS_PER_CATEGORY", 2):
+            for sid in ("S-1-5-32-544", "S-1-5-21-513", "S-1-5-32-544", "S-1-5-32-544"):
+                aggregator.add(record(4732, "2024-01-01T00:00:00.000000Z", {"TargetSid": sid}))
+        parsed = aggregator.finish()
+
+        assert len(parsed["ntlm_events"]) == MAX_EVENTS_PER_ID
+        # Accounts are still collected from the records that weren't decoded
+        assert len(parsed["unique_accounts"]) == MAX_EVENTS_PER_ID + 20
+        assert len(parsed["group_change_events"]) == 2
+        assert analyzer._count_events(parsed, analyzer.GROUP_CHANGE_EVENT_IDS) == 4
+        assert parsed["admin_group_change_count"] == 3
+
+    def test_process_creation_is_written_to_csv_while_parsing(self):
+        aggregator = _EventAggregator()
+        for i in range(3):
+            aggregator.add(
+                record(
+                    4688,
+                    f"2024-01-01T00:00:0{i}.000000Z",
+                    {"NewProcessName": "C:\\Windows\\System32\\cmd.exe", "CommandLine": f"cmd /c echo {i}"},
+                )
+            )
+        parsed = aggregator.finish()
+
+        try:
+            assert parsed["process_creation_count"] == 3
+            with open(parsed["process_creation_csv"], newline="", encoding="utf-8") as f:
+                rows = list(csv.reader(f))
+            assert rows[0] == analyzer.PROCESS_CREATION_CSV_HEADER
+            assert [row[2] for row in rows[1:]] == ["cmd /c echo 0", "cmd /c echo 1", "cmd /c echo 2"]
+        finally:
+            os.unlink(parsed["process_creation_csv"])
+
+    def test_discard_removes_the_process_creation_csv(self):
+        aggregator = _EventAggregator()
+        aggregator.add(record(4688, "2024-01-01T00:00:00.000000Z", {"NewProcessName": "cmd.exe"}))
+        csv_path = aggregator._process_creation_file.name
+
+        aggregator.discard()
+
+        assert not os.path.exists(csv_path)
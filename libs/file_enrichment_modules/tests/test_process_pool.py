@@ -0,0 +1,90 @@
+"""Tests for the process pool that runs CPU-bound module parsing."""
+
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from file_enrichment_modules.process_pool import ModuleProcessPool
+
+
+class CpuBoundModule:
+    """Stand-in module; workers import this test module and call create_enrichment_module()."""
+
+    name = "cpu_test"
+    cpu_bound = True
+
+    def pid(self) -> int:
+        return os.getpid()
+
+    def add(self, a: int, b: int = 0) -> int:
+        return a + b
+
+    def hang(self) -> None:
+        time.sleep(60)
+
+    def crash(self) -> None:
+        os._exit(1)
+
+    def allocate(self, size: int) -> int:
+        return len(bytearray(size))
+
+
+def create_enrichment_module() -> CpuBoundModule:
+    return CpuBoundModule()
+
+
+@pytest.fixture
+def pool():
+    process_pool = ModuleProcessPool(
+        [CpuBoundModule.__module__],
+        max_workers=2,
+        task_timeout=5,
+        memory_limit_mb=1024,
+    )
+    yield process_pool
+    process_pool.shutdown()
+
+
+class TestModuleProcessPool:
+    @pytest.mark.asyncio
+    async def test_runs_in_another_process(self, pool):
+        module = CpuBoundModule()
+
+        assert await pool.run(module, "add", 2, b=3) == 5
+        assert await pool.run(module, "pid") != os.getpid()
+
+    @pytest.mark.asyncio
+    async def test_timeout_recycles_pool(self, pool):
+        module = CpuBoundModule()
+        worker_pid = await pool.run(module, "pid")
+        pool.task_timeout = 1
+
+        start = time.monotonic()
+        with pytest.raises(TimeoutError, match="cpu_test.hang timed out"):
+            await pool.run(module, "hang")
+        assert time.monotonic() - start < 5
+
+        # The hung worker was killed and the replacement pool keeps working
+        pool.task_timeout = 30
+        assert await pool.run(module, "add", 1, b=1) == 2
+        assert await pool.run(module, "pid") != worker_pid
+
+    @pytest.mark.asyncio
+    async def test_crash_is_isolated(self, pool):
+        module = CpuBoundModule()
+
+        with pytest.raises(BrokenProcessPool):
+            await pool.run(module, "crash")
+
+        assert await pool.run(module, "add", 40, b=2) == 42
+
+    @pytest.mark.asyncio
+    async def test_memory_limit(self, pool):
+        module = CpuBoundModule()
+
+        with pytest.raises(MemoryError):
+            await pool.run(module, "allocate", 2 * 1024 * 1024 * 1024)
+
+        # The worker survives a failed allocation
+        assert await pool.run(module, "allocate", 1024) == 1024
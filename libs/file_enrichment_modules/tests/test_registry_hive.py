@@ -8,16 +8,25 @@ Dataset: cfreds-2017-winreg_sgrd-10
 
 import os
 import struct
+from contextlib import asynccontextmanager
+from itertools import count
 from unittest.mock import MagicMock, patch
 
 import pytest
+from common.models import FileEnriched
+from file_enrichment_modules.registry_hive import analyzer as analyzer_module
 from file_enrichment_modules.registry_hive.analyzer import (
     EMPTY_LM_HASH,
     EMPTY_NT_HASH,
+    OfflineRegistry,
     RegistryHiveAnalyzer,
+    _DerivedSystem,
     _filetime_to_str,
     _regipy_value_to_bytes,
 )
+from file_enrichment_modules.registry_hive.hive_index import find_hive, register_hive
+
+from tests.harness import FileEnrichedFactory
 
 # Path to NIST CFReDS registry hive fixtures
 FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "registry_hives")
@@ -906,3 +915,140 @@ class TestFormatLsaSecretsMarkdown:
         assert "secret_4" in md
         assert "secret_5" not in md
         assert "10 more secrets" in md
+
+
+# ---------------------------------------------------------------------------
+# Companion hive index and derived SYSTEM secrets
+# ---------------------------------------------------------------------------
+
+SYSTEM_SECRETS = {
+    "bootkey": "00112233445566778899aabbccddeeff",
+    "machine_name": "WS01",
+    "current_control_set": "ControlSet001",
+    "service_users": {"MSSQLSERVER": "CORP\\sqlsvc"},
+}
+
+
+class FakeHiveDb:
+    """The registry_hive_artifacts table, behind an asyncpg-like pool."""
+
+    def __init__(self):
+        self.rows: dict[tuple[str, str, str], dict] = {}
+        self._updates = count()
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self
+
+    async def execute(self, query: str, source, hive_type, normalized_path, path, object_id, derived_secrets):
+        self.rows[(source, hive_type, normalized_path)] = {
+            "object_id": object_id,
+            "path": path,
+            "derived_secrets": derived_secrets,
+            "updated_at": next(self._updates),
+        }
+
+    async def fetchrow(self, query: str, source, hive_type, normalized_path):
+        matches = [
+            (key[2] == normalized_path, row["updated_at"], row)
+            for key, row in self.rows.items()
+            if key[:2] == (source, hive_type)
+        ]
+        return max(matches, key=lambda match: match[:2])[2] if matches else None
+
+
+def make_file(path: str) -> FileEnriched:
+    return FileEnriched(**FileEnrichedFactory.create(file_name=path.rsplit("/", 1)[-1], path=path))
+
+
+def fake_companion_registry(system_secrets: dict, sam_file=None, security_file=None):
+    """What _load_companion_registry returns, with a SAM decrypted to a single Administrator account."""
+    registry = OfflineRegistry()
+    registry.system = _DerivedSystem(system_secrets)
+    registry.sam = MagicMock(secrets=[MagicMock(rid=500, username="Administrator", nt_hash=None, lm_hash=None)])
+    return registry
+
+
+class TestHiveIndex:
+    @pytest.mark.asyncio
+    async def test_find_prefers_the_expected_path_then_the_latest_hive(self):
+        db = FakeHiveDb()
+        await register_hive(db, "host1", "SYSTEM", "C:\\Windows\\System32\\Config\\SYSTEM", "1", SYSTEM_SECRETS)
+        await register_hive(db, "host1", "SYSTEM", "C:/backup/SYSTEM", "2")
+        await register_hive(db, "host1", "SOFTWARE", "C:/Windows/System32/Config/SOFTWARE", "3")
+
+        hive = await find_hive(db, "host1", "SYSTEM", "c:/windows/system32/config/system")
+        assert (hive.object_id, hive.path) == ("1", "C:\\Windows\\System32\\Config\\SYSTEM")
+        assert hive.derived_secrets == SYSTEM_SECRETS
+
+        hive = await find_hive(db, "host1", "SYSTEM", "D:/Windows/System32/Config/SYSTEM")
+        assert (hive.object_id, hive.derived_secrets) == ("2", None)
+
+        # Only the companion hive types are indexed
+        assert await find_hive(db, "host1", "SOFTWARE", "C:/Windows/System32/Config/SOFTWARE") is None
+        assert await find_hive(db, "host2", "SYSTEM", "C:/Windows/System32/Config/SYSTEM") is None
+
+
+class TestCompanionHives:
+    @pytest.fixture
+    def paired_analyzer(self, analyzer):
+        analyzer.asyncpg_pool = FakeHiveDb()
+        analyzer.storage.download.return_value.__enter__.return_value.name = SAM_HIVE
+        with (
+            patch.object(analyzer, "_derive_system_secrets", return_value=SYSTEM_SECRETS),
+            patch.object(analyzer, "_load_companion_registry", side_effect=fake_companion_registry),
+            patch.object(analyzer, "_create_proactive_file_linkings"),
+        ):
+            yield analyzer
+
+    @pytest.mark.asyncio
+    async def test_sam_uses_the_secrets_derived_from_the_indexed_system_hive(self, paired_analyzer):
+        # The hive contents come from the fixture SAM, only the SYSTEM parse is faked
+        with patch.object(paired_analyzer, "_identify_hive_type", return_value="SYSTEM"):
+            await paired_analyzer._analyze_registry_hive_file(SAM_HIVE, make_file("C:/Windows/System32/Config/SYSTEM"))
+
+        with (
+            patch.object(paired_analyzer, "_identify_hive_type", return_value="SAM"),
+            patch.object(analyzer_module, "RegistryHive", wraps=analyzer_module.RegistryHive) as registry_hive,
+        ):
+            result = await paired_analyzer._analyze_registry_hive_file(
+                SAM_HIVE, make_file("C:/Windows/System32/Config/SAM")
+            )
+            # The machine SID and the user metadata are read from one regipy hive
+            assert registry_hive.call_count == 1
+
+        # The SYSTEM hive is neither downloaded nor parsed again
+        assert paired_analyzer._derive_system_secrets.call_count == 1
+        paired_analyzer.storage.download.assert_not_called()
+        paired_analyzer._load_companion_registry.assert_called_once_with(SYSTEM_SECRETS, sam_file=SAM_HIVE)
+
+        analysis = result.results["analysis_results"]
+        assert analysis["bootkey"] == SYSTEM_SECRETS["bootkey"]
+        assert analysis["machine_sid"] == "S-1-5-21-4144202625-3024446806-325092953"
+        [account] = analysis["accounts"]
+        assert account["username"] == "Administrator"
+        assert result.findings[0].raw_data["linked_system_hive"]
+
+    @pytest.mark.asyncio
+    async def test_system_decrypts_the_indexed_sam_hive(self, paired_analyzer):
+        sam = make_file("C:/Windows/System32/Config/SAM")
+        with patch.object(paired_analyzer, "_identify_hive_type", return_value="SAM"):
+            result = await paired_analyzer._analyze_registry_hive_file(SAM_HIVE, sam)
+        assert not result.results["analysis_results"]["bootkey_available"]
+
+        with patch.object(paired_analyzer, "_identify_hive_type", return_value="SYSTEM"):
+            result = await paired_analyzer._analyze_registry_hive_file(
+                SAM_HIVE, make_file("C:/Windows/System32/Config/SYSTEM")
+            )
+
+        paired_analyzer.storage.download.assert_called_once_with(sam.object_id)
+        analysis = result.results["analysis_results"]
+        assert analysis["computer_name"] == "WS01"
+        assert analysis["sam_analysis"]["bootkey"] == SYSTEM_SECRETS["bootkey"]
+        assert [account["username"] for account in analysis["sam_analysis"]["accounts"]] == ["Administrator"]
+
+    def test_derived_system_serves_the_cached_service_accounts(self):
+        system = _DerivedSystem(SYSTEM_SECRETS)
+        assert system.bootkey == bytes.fromhex(SYSTEM_SECRETS["bootkey"])
+        assert system.get_service_user("MSSQLSERVER") == "CORP\\sqlsvc"
+        assert system.get_service_user("Spooler") is None
@@ -0,0 +1,136 @@
+import os
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from common.models import FileEnriched
+from common.storage import StorageMinio
+from file_enrichment_modules.keytab.analyzer import KEYTAB_YARA_RULE
+from file_enrichment_modules.module_loader import ModuleLoader
+from file_enrichment_modules.pe.analyzer import PE_YARA_RULE
+from file_enrichment_modules.routing import UNROUTED, ModuleRouter, ModuleRouting, Route
+from prometheus_client import REGISTRY
+
+from tests.harness import FileEnrichedFactory
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "test_files")
+
+
+def make_file(**kwargs) -> FileEnriched:
+    return FileEnriched(**FileEnrichedFactory.create(**kwargs))
+
+
+def module(routing: ModuleRouting | None = None) -> SimpleNamespace:
+    return SimpleNamespace(routing=routing) if routing else SimpleNamespace()
+
+
+class TestModuleRouter:
+    def test_criteria_of_a_route_must_all_match(self):
+        router = ModuleRouter(
+            {
+                "sqlite_history": module(
+                    ModuleRouting(routes=(Route(magic=("sqlite 3.x database",), names=("history",)),))
+                ),
+            }
+        )
+
+        history = make_file(
+            file_name="History", magic_type="SQLite 3.x database, last written using SQLite version 3039004"
+        )
+        other_db = make_file(file_name="Cookies", magic_type="SQLite 3.x database")
+        text = make_file(file_name="History", magic_type="ASCII text")
+
+        assert router.route(history) == {"sqlite_history"}
+        assert router.route(other_db) == set()
+        assert router.route(text) == set()
+
+    def test_any_route_of_a_module_is_enough(self):
+        router = ModuleRouter(
+            {
+                "office": module(
+                    ModuleRouting(
+                        routes=(Route(extensions={".docx", ".xlsx"}), Route(mime_types={"application/msword"}))
+                    )
+                ),
+            }
+        )
+
+        assert router.route(make_file(file_name="report.DOCX")) == {"office"}
+        assert router.route(make_file(file_name="report.doc", mime_type="application/msword")) == {"office"}
+        assert router.route(make_file(file_name="report.pdf", mime_type="application/pdf")) == set()
+
+    def test_size_and_plaintext_constraints(self):
+        router = ModuleRouter(
+            {
+                "pii": module(ModuleRouting(routes=(Route(plaintext=True, max_size=1000),))),
+                "everything": module(ModuleRouting(routes=(Route(),))),
+            }
+        )
+
+        assert router.route(make_file(is_plaintext=True, size=10)) == {"pii", "everything"}
+        assert router.route(make_file(is_plaintext=True, size=10_000)) == {"everything"}
+        assert router.route(make_file(is_plaintext=False, size=10)) == {"everything"}
+
+    def test_header_rules_are_evaluated_in_one_scan(self, tmp_path):
+        router = ModuleRouter(
+            {
+                "pe": module(ModuleRouting(routes=(Route(header_rule=PE_YARA_RULE),))),
+                "keytab": module(
+                    ModuleRouting(routes=(Route(extensions={".keytab"}), Route(header_rule=KEYTAB_YARA_RULE)))
+                ),
+            }
+        )
+        keytab_path = tmp_path / "krb5"
+        keytab_path.write_bytes(b"\x05\x02" + b"\x00" * 64)
+
+        exe = make_file(file_name="packed.exe")
+        assert router.route(exe, os.path.join(FIXTURES_DIR, "pyinstaller_packed.exe")) == {"pe"}
+        assert router.route(make_file(file_name="krb5"), str(keytab_path)) == {"keytab"}
+        # Without the file only the routes without a header rule can match
+        assert router.route(make_file(file_name="krb5.keytab")) == {"keytab"}
+        assert router.route(exe) == set()
+
+    def test_should_process_is_only_needed_where_declared(self):
+        router = ModuleRouter(
+            {
+                "declared": module(ModuleRouting(routes=(Route(extensions={".xml"}),))),
+                "checked": module(ModuleRouting(routes=(Route(extensions={".xml"}),), should_process=True)),
+                "unrouted": module(),
+            }
+        )
+
+        # Modules without a routing declaration see every file and decide in should_process
+        assert router.route(make_file(file_name="unattend.xml")) == {"declared", "checked", "unrouted"}
+        assert router.route(make_file(file_name="notes.txt")) == {"unrouted"}
+        assert not router.needs_should_process("declared")
+        assert router.needs_should_process("checked")
+        assert router.needs_should_process("unrouted")
+
+
+class TestLoadedModules:
+    @pytest.mark.asyncio
+    async def test_router_builds_from_every_module(self, monkeypatch):
+        # The yara module checks for the rules folder on import
+        monkeypatch.setenv("YARA_RULES_FOLDER_PATH", os.path.dirname(__file__))
+        loader = ModuleLoader()
+        # Modules without create_enrichment_module() (e.g. base64_decoder) are disabled
+        module_dirs = [
+            path
+            for path in loader.modules_dir.iterdir()
+            if (path / "analyzer.py").exists()
+            and "\ndef create_enrichment_module(" in (path / "analyzer.py").read_text()
+        ]
+
+        # Construct each module through create_enrichment_module(), like the file_enrichment service.
+        # The loader executes a fresh copy of modules other tests already imported, so their
+        # metrics would be registered twice.
+        with patch.object(StorageMinio, "__init__", return_value=None), patch.object(REGISTRY, "register"):
+            for module_dir in module_dirs:
+                await loader._load_module(module_dir)
+
+        assert set(loader.modules) == {path.name for path in module_dirs}
+        # Modules without routing (e.g. dpapi_blob) are checked for every file
+        assert all(
+            isinstance(getattr(module, "routing", UNROUTED), ModuleRouting) for module in loader.modules.values()
+        )
+        ModuleRouter(loader.modules)
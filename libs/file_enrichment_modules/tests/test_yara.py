@@ -0,0 +1,214 @@
+import os
+from contextlib import asynccontextmanager, nullcontext
+from unittest.mock import patch
+
+import pytest
+
+# The rule manager checks for the rules folder on import
+os.environ.setdefault("YARA_RULES_FOLDER_PATH", os.path.dirname(__file__))
+
+import yara_x  # noqa: E402
+from common.models import FileEnriched  # noqa: E402
+from file_enrichment_modules.yara import yara_manager  # noqa: E402
+from file_enrichment_modules.yara.analyzer import YARA_RULE_MATCHES, YaraScanner  # noqa: E402
+
+from tests.harness import FileEnrichedFactory  # noqa: E402
+
+SECRET_RULE = """rule Test_Secret
+{
+    meta:
+        description = "Finds test secrets"
+    strings:
+        $secret = "SECRET_TOKEN="
+        $key = "-----BEGIN TEST KEY-----"
+    condition:
+        any of them
+}"""
+
+EMPTY_FILE_RULE = """rule Test_Empty
+{
+    condition:
+        filesize == 0
+}"""
+
+
+class FakeYaraDb:
+    """The yara_rules and yara_ruleset_artifacts tables, behind an asyncpg-like pool."""
+
+    def __init__(self, *rules: str):
+        self.set_rules(*rules)
+        self.artifacts: dict[str, dict] = {}
+        self.acquired = 0
+
+    def set_rules(self, *rules: str) -> None:
+        self.rules = [{"name": rule.split()[1], "content": rule, "source": "test"} for rule in rules]
+
+    @asynccontextmanager
+    async def acquire(self):
+        self.acquired += 1
+        yield self
+
+    def transaction(self):
+        return nullcontext()
+
+    async def fetch(self, query: str, *args):
+        return self.rules
+
+    async def fetchrow(self, query: str, key: str):
+        return self.artifacts.get(key)
+
+    async def execute(self, query: str, *args):
+        if "INSERT INTO yara_ruleset_artifacts" in query:
+            key, artifact, rule_names = args
+            self.artifacts[key] = {"artifact": artifact, "rule_names": rule_names}
+
+
+async def make_scanner(*rules: str, db: FakeYaraDb | None = None) -> YaraScanner:
+    with patch("file_enrichment_modules.yara.analyzer.StorageMinio"):
+        scanner = YaraScanner()
+    scanner.rule_manager.asyncpg_pool = db or FakeYaraDb(*rules)
+    await scanner.rule_manager.load_db_rules()
+    return scanner
+
+
+def make_file(**kwargs) -> FileEnriched:
+    return FileEnriched(**FileEnrichedFactory.create(**kwargs))
+
+
+class TestYaraScanner:
+    @pytest.mark.asyncio
+    async def test_matches_are_extracted_with_rule_text_from_memory(self, tmp_path):
+        scanner = await make_scanner(SECRET_RULE)
+        path = tmp_path / "config.env"
+        path.write_bytes(b"A=1\nSECRET_TOKEN=abc\nB=2\nSECRET_TOKEN=def\n")
+        matches_before = YARA_RULE_MATCHES.labels(rule="Test_Secret")._value.get()
+
+        result = await scanner._analyze_yara(str(path), make_file(file_name="config.env", is_plaintext=True))
+
+        assert result is not None
+        [yara_match] = result.results["yara_matches"]
+        assert yara_match["rule_name"] == "Test_Secret"
+        assert yara_match["rule_description"] == "Finds test secrets"
+        assert yara_match["rule_text"] == SECRET_RULE
+        [string_match] = yara_match["rule_string_matches"]
+        assert [(i["offset"], i["matched_data_text"]) for i in string_match["yara_string_match_instances"]] == [
+            (4, "SECRET_TOKEN="),
+            (25, "SECRET_TOKEN="),
+        ]
+        assert len(result.findings) == 1
+        # The rule text is served from the compiled rule set, not looked up per match
+        assert scanner.rule_manager.asyncpg_pool.acquired == 2
+        assert YARA_RULE_MATCHES.labels(rule="Test_Secret")._value.get() == matches_before + 2
+
+    @pytest.mark.asyncio
+    async def test_binary_matches_are_hex_and_empty_files_scan(self, tmp_path):
+        scanner = await make_scanner(SECRET_RULE, EMPTY_FILE_RULE)
+        binary = tmp_path / "blob.bin"
+        binary.write_bytes(b"\x00\x01SECRET_TOKEN=\xff")
+        empty = tmp_path / "empty"
+        empty.write_bytes(b"")
+
+        result = await scanner._analyze_yara(str(binary), make_file(file_name="blob.bin"))
+        [instance] = result.results["yara_matches"][0]["rule_string_matches"][0]["yara_string_match_instances"]
+        assert instance["offset"] == 2
+        assert instance["matched_data_hex"] == "53454352 45545f54 4f4b454e 3d"
+
+        result = await scanner._analyze_yara(str(empty), make_file(file_name="empty", size=0))
+        assert [match["rule_name"] for match in result.results["yara_matches"]] == ["Test_Empty"]
+        # Rules without patterns produce no findings
+        assert not result.findings
+
+    @pytest.mark.asyncio
+    async def test_scan_in_another_process_loads_the_serialized_ruleset(self, tmp_path):
+        scanner = await make_scanner(SECRET_RULE)
+        path = tmp_path / "config.env"
+        path.write_bytes(b"SECRET_TOKEN=abc")
+
+        # A fresh instance, like the one preloaded in a process pool worker, has no compiled rules
+        with patch("file_enrichment_modules.yara.analyzer.StorageMinio"):
+            worker_scanner = YaraScanner()
+        scan = worker_scanner._scan_file(str(path), True, *scanner.rule_manager.ruleset)
+
+        assert [match["rule_name"] for match in scan["matches"]] == ["Test_Secret"]
+        assert not scan["timed_out"]
+
+    @pytest.mark.asyncio
+    async def test_large_files_are_scanned_outside_the_process_pool(self, tmp_path):
+        """yara-x maps the scanned file, which must fit in a pool worker's address space limit."""
+        scanner = await make_scanner(SECRET_RULE)
+        path = tmp_path / "config.env"
+        path.write_bytes(b"SECRET_TOKEN=abc")
+
+        class FakeProcessPool:
+            def __init__(self):
+                self.methods = []
+
+            async def run(self, module, method_name, *args):
+                self.methods.append(method_name)
+                return getattr(module, method_name)(*args)
+
+        process_pool = FakeProcessPool()
+        with patch("file_enrichment_modules.module_loader.get_process_pool", return_value=process_pool):
+            await scanner._analyze_yara(str(path), make_file(file_name="config.env", is_plaintext=True))
+            assert process_pool.methods == ["_scan_file"]
+
+            with patch("file_enrichment_modules.yara.analyzer.YARA_PROCESS_POOL_MAX_FILE_MB", 0):
+                result = await scanner._analyze_yara(str(path), make_file(file_name="config.env", is_plaintext=True))
+            assert process_pool.methods == ["_scan_file"]
+
+        [instance] = result.results["yara_matches"][0]["rule_string_matches"][0]["yara_string_match_instances"]
+        assert instance["matched_data_text"] == "SECRET_TOKEN="
+
+    @pytest.mark.asyncio
+    async def test_reload_swaps_the_ruleset(self, tmp_path):
+        db = FakeYaraDb(SECRET_RULE)
+        scanner = await make_scanner(db=db)
+        first_hash, first_path = scanner.rule_manager.ruleset
+        path = tmp_path / "config.env"
+        path.write_bytes(b"SECRET_TOKEN=abc")
+        assert await scanner._analyze_yara(str(path), make_file()) is not None
+
+        db.set_rules(EMPTY_FILE_RULE)
+        await scanner.rule_manager.load_db_rules()
+
+        assert scanner.rule_manager.ruleset[0] != first_hash
+        assert await scanner._analyze_yara(str(path), make_file()) is None
+        # Scans submitted before the swap can still load the previous ruleset
+        assert os.path.exists(first_path)
+
+
+class TestRulesetArtifacts:
+    @pytest.mark.asyncio
+    async def test_replicas_share_the_compiled_ruleset(self, tmp_path):
+        db = FakeYaraDb(SECRET_RULE, EMPTY_FILE_RULE)
+        first = await make_scanner(db=db)
+        assert list(db.artifacts) == [first.rule_manager.ruleset[0]]
+
+        with patch.object(yara_manager.yara_x, "Compiler", side_effect=yara_x.Compiler) as compiler:
+            second = await make_scanner(db=db)
+        compiler.assert_not_called()
+
+        assert second.rule_manager.ruleset[0] == first.rule_manager.ruleset[0]
+        assert second.rule_manager.get_rule_content("Test_Secret") == SECRET_RULE
+        path = tmp_path / "config.env"
+        path.write_bytes(b"SECRET_TOKEN=abc")
+        result = await second._analyze_yara(str(path), make_file())
+        assert [match["rule_name"] for match in result.results["yara_matches"]] == ["Test_Secret"]
+
+    @pytest.mark.asyncio
+    async def test_reload_only_validates_changed_rules(self):
+        db = FakeYaraDb(SECRET_RULE, EMPTY_FILE_RULE, "rule Broken { condition: nope }")
+        scanner = await make_scanner(db=db)
+        assert scanner.rule_manager.get_rule_content("Broken") is None
+
+        db.set_rules(SECRET_RULE, EMPTY_FILE_RULE, "rule Broken { condition: nope }", "rule New { condition: true }")
+        with patch.object(yara_manager.yara_x, "Compiler", side_effect=yara_x.Compiler) as compiler:
+            await scanner.rule_manager.load_db_rules()
+            # The combined rule set and the test compilation of the new rule
+            assert compiler.call_count == 2
+
+            # Unchanged rules are neither validated nor compiled again
+            await scanner.rule_manager.load_db_rules()
+            assert compiler.call_count == 2
+
+        assert scanner.rule_manager.get_rule_content("New") == "rule New { condition: true }"
@@ -4,13 +4,17 @@ File linking system for Nemesis.
 This module provides rule-based detection and tracking of file dependencies and relationships.
 """
 
-from .database_service import FileLinkingDatabaseService, FileListingStatus
+from .database_service import FileLinking, FileLinkingDatabaseService, FileListing, FileListingStatus
 from .helpers import add_file_linking
 from .rules_engine import FileLinkingEngine
+from .writer import FileLinkingWriter
 
 __all__ = [
     "FileLinkingEngine",
     "FileLinkingDatabaseService",
+    "FileLinking",
+    "FileLinkingWriter",
+    "FileListing",
     "FileListingStatus",
     "add_file_linking",
 ]
@@ -4,6 +4,7 @@ Database service layer for file linking system.
 Handles all database operations for file_listings and file_linkings tables.
 """
 
+from dataclasses import dataclass
 from enum import StrEnum
 
 import asyncpg
@@ -19,6 +20,56 @@ class FileListingStatus(StrEnum):
     NOT_WANTED = "not_wanted"
 
 
+@dataclass
+class FileListing:
+    """A row to upsert into file_listings."""
+
+    source: str
+    path: str
+    status: FileListingStatus
+    object_id: str | None = None
+
+
+@dataclass
+class FileLinking:
+    """A row to upsert into file_linkings."""
+
+    source: str
+    file_path_1: str
+    file_path_2: str
+    link_type: str | None = None
+
+
+def merge_file_listings(listings: list[FileListing]) -> list[FileListing]:
+    """
+    Merge listings of the same (source, path) the way consecutive upserts would, in lock order.
+
+    A path keeps the spelling it was first listed with, and once it is collected it stays
+    collected. The result is sorted by (source, lowercased path) so concurrent batch writes
+    lock rows in the same order and can't deadlock.
+    """
+    merged: dict[tuple[str, str], FileListing] = {}
+    for listing in listings:
+        if not listing.source or not listing.path:
+            continue
+        key = (listing.source, listing.path.lower())
+        existing = merged.get(key)
+        if existing is None:
+            merged[key] = listing
+        elif existing.status != FileListingStatus.COLLECTED:
+            merged[key] = FileListing(existing.source, existing.path, listing.status, listing.object_id)
+    return [merged[key] for key in sorted(merged)]
+
+
+def merge_file_linkings(linkings: list[FileLinking]) -> list[FileLinking]:
+    """Merge linkings of the same (source, file_path_1, file_path_2), last link type wins, in lock order."""
+    merged: dict[tuple[str, str, str], FileLinking] = {}
+    for linking in linkings:
+        if linking.source and linking.file_path_1 and linking.file_path_2:
+            merged[(linking.source, linking.file_path_1, linking.file_path_2)] = linking
+    return [merged[key] for key in sorted(merged)]
+
+
 class FileLinkingDatabaseService:
     """Service for managing file listings and linkings in the database."""
 
@@ -145,14 +196,107 @@ class FileLinkingDatabaseService:
 
         return False
 
-    async def get_placeholder_entries(self, source: str) -> list[dict]:
+    async def add_file_listings_and_linkings(
+        self, listings: list[FileListing], linkings: list[FileLinking], conn=None
+    ) -> bool:
+        """
+        Add or update many file_listings and file_linkings rows in one transaction.
+
+        Rows are merged and sorted (see merge_file_listings/merge_file_linkings) and each
+        table is written with a single multi-row upsert, with the same conflict handling as
+        add_file_listing and add_file_linking. Listings are always written before linkings.
+
+        Args:
+            listings: Listings to add or update
+            linkings: Linkings to add or update
+            conn: Optional database connection to use (for transactions)
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        listings = merge_file_listings(listings)
+        linkings = merge_file_linkings(linkings)
+        if not listings and not linkings:
+            return True
+
+        try:
+            if conn:
+                await self._write_listings_and_linkings(conn, listings, linkings)
+            else:
+                async with self.pool.acquire() as conn:
+                    await self._write_listings_and_linkings(conn, listings, linkings)
+
+            logger.debug("Added/updated file listings and linkings", listings=len(listings), linkings=len(linkings))
+            return True
+
+        except Exception as e:
+            logger.exception(
+                "Error adding file listings and linkings",
+                listings=len(listings),
+                linkings=len(linkings),
+                error=str(e),
+            )
+            return False
+
+    async def _write_listings_and_linkings(
+        self, conn: asyncpg.Connection, listings: list[FileListing], linkings: list[FileLinking]
+    ) -> None:
+        async with conn.transaction():
+            if listings:
+                await conn.execute(
+                    """
+                    INSERT INTO file_listings (source, path, object_id, status)
+                    SELECT * FROM unnest($1::text[], $2::text[], $3::uuid[], $4::text[])
+                    ON CONFLICT (source, path_lower)
+                    DO UPDATE SET
+                        object_id = CASE
+                            WHEN file_listings.status = 'collected' THEN file_listings.object_id
+                            ELSE EXCLUDED.object_id
+                        END,
+                        status = CASE
+                            WHEN file_listings.status = 'collected' THEN file_listings.status
+                            ELSE EXCLUDED.status
+                        END,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE file_listings.status != 'collected' OR EXCLUDED.status = 'collected'
+                    """,
+                    [listing.source for listing in listings],
+                    [listing.path for listing in listings],
+                    [listing.object_id for listing in listings],
+                    [listing.status.value for listing in listings],
+                )
+
+            if linkings:
+                await conn.execute(
+                    """
+                    INSERT INTO file_linkings (source, file_path_1, file_path_2, link_type)
+                    SELECT * FROM unnest($1::text[], $2::text[], $3::text[], $4::text[])
+                    ON CONFLICT (source, file_path_1, file_path_2)
+                    DO UPDATE SET
+                        link_type = EXCLUDED.link_type,
+                        updated_at = CURRENT_TIMESTAMP
+                    """,
+                    [linking.source for linking in linkings],
+                    [linking.file_path_1 for linking in linkings],
+                    [linking.file_path_2 for linking in linkings],
+                    [linking.link_type for linking in linkings],
+                )
+
+    async def get_placeholder_entries(
+        self, source: str, table_name: str | None = None, path_prefixes: list[str] | None = None
+    ) -> list[dict]:
         """
-        Query entries containing any known placeholders for a given source.
+        Query entries containing placeholders for a given source.
 
-        Dynamically reads the PLACEHOLDERS registry to build the query.
+        Uses the generated placeholder_prefix column (the lowercased literal directory prefix
+        of a placeholder path, NULL for real paths) and its partial index, so only placeholder
+        entries are read and no LIKE scan over the source is needed.
 
         Args:
             source: Source identifier
+            table_name: Only query this table ("file_listings" or "file_linkings")
+            path_prefixes: Only return entries with one of these placeholder prefixes,
+                i.e. the lowercased parent directories of a real path
 
         Returns:
             List of dicts with 'table_name' and 'path' keys
@@ -164,38 +308,33 @@ class FileLinkingDatabaseService:
             ]
         """
         try:
-            # Import PLACEHOLDERS dynamically to avoid circular dependency
-            from .placeholder_resolver import PLACEHOLDERS
-
-            if not PLACEHOLDERS:
-                return []
-
-            # Build LIKE conditions from PLACEHOLDERS array for each table
-            placeholder_conditions_listings = " OR ".join(
-                [f"file_listings.path LIKE '%{p.name}%'" for p in PLACEHOLDERS]
+            prefix_condition = "placeholder_prefix = ANY($2::text[])" if path_prefixes is not None else "TRUE"
+            subqueries = {
+                "file_listings": f"""
+                    SELECT 'file_listings' as table_name, path
+                    FROM file_listings
+                    WHERE source = $1 AND placeholder_prefix IS NOT NULL AND {prefix_condition}
+                """,
+                "file_linkings": f"""
+                    SELECT DISTINCT 'file_linkings' as table_name, file_path_2 as path
+                    FROM file_linkings
+                    WHERE source = $1 AND placeholder_prefix IS NOT NULL AND {prefix_condition}
+                """,
+            }
+            query = " UNION ALL ".join(
+                subquery for name, subquery in subqueries.items() if table_name is None or name == table_name
             )
-            placeholder_conditions_linkings = " OR ".join(
-                [f"file_linkings.file_path_2 LIKE '%{p.name}%'" for p in PLACEHOLDERS]
-            )
-
-            query = f"""
-                SELECT 'file_listings' as table_name, path
-                FROM file_listings
-                WHERE source = $1 AND ({placeholder_conditions_listings})
-                UNION
-                SELECT 'file_linkings' as table_name, file_path_2 as path
-                FROM file_linkings
-                WHERE source = $1 AND ({placeholder_conditions_linkings})
-            """
+            args = [source] if path_prefixes is None else [source, path_prefixes]
 
             # Use asyncpg for async operations
             async with self.pool.acquire() as conn:
-                rows = await conn.fetch(query, source)
+                rows = await conn.fetch(query, *args)
                 results = [{"table_name": row["table_name"], "path": row["path"]} for row in rows]
 
                 logger.debug(
                     "Queried placeholder entries",
                     source=source,
+                    table_name=table_name,
                     count=len(results),
                 )
                 return results
@@ -204,15 +343,17 @@ class FileLinkingDatabaseService:
             logger.exception("Error querying placeholder entries", source=source, error=str(e))
             return []
 
-    async def get_collected_files(self, source: str) -> list[str]:
+    async def get_collected_files(self, source: str, path_prefix: str | None = None) -> list[str]:
         """
-        Get all file paths that have been collected for a given source.
+        Get the file paths that have been collected for a given source.
 
         Used for backward resolution to check if a real file exists
         before inserting a placeholder path.
 
         Args:
             source: Source identifier
+            path_prefix: Only return files whose lowercased path starts with this prefix
+                (the placeholder prefix of the placeholder path being resolved)
 
         Returns:
             List of file paths with status='collected'
@@ -225,14 +366,20 @@ class FileLinkingDatabaseService:
                 AND status = 'collected'
                 AND object_id IS NOT NULL
             """
+            args = [source]
+            if path_prefix:
+                # Prefix match on the (source, path_lower text_pattern_ops) index of collected files
+                query += " AND path_lower LIKE $2"
+                args.append(_escape_like(path_prefix) + "%")
 
             async with self.pool.acquire() as conn:
-                rows = await conn.fetch(query, source)
+                rows = await conn.fetch(query, *args)
                 paths = [row["path"] for row in rows]
 
                 logger.debug(
                     "Queried collected files",
                     source=source,
+                    path_prefix=path_prefix,
                     count=len(paths),
                 )
                 return paths
@@ -338,3 +485,8 @@ class FileLinkingDatabaseService:
                 error=str(e),
             )
             return False
+
+
+def _escape_like(value: str) -> str:
+    """Escape the LIKE wildcards (and the default escape character) in a literal string."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
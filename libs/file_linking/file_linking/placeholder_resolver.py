@@ -3,10 +3,18 @@ Placeholder resolution for file paths in file_listings and file_linkings tables.
 
 Provides bidirectional resolution between placeholder paths (e.g., containing <WINDOWS_USERNAME>)
 and real file paths, handling files arriving in any order.
+
+Placeholder paths are indexed by their literal directory prefix (the lowercased path up to the
+last '/' before the first placeholder, stored in the generated placeholder_prefix column of
+file_listings and file_linkings). A real file only has to be matched against the placeholders
+whose prefix is one of its parent directories, and the regex of a placeholder path is compiled
+once per process.
 """
 
+import os
 import re
 from dataclasses import dataclass
+from functools import lru_cache
 
 from common.logger import get_logger
 
@@ -14,6 +22,9 @@ from file_linking.database_service import FileLinkingDatabaseService
 
 logger = get_logger(__name__)
 
+# Compiled placeholder path patterns kept in memory
+PLACEHOLDER_PATTERN_CACHE_SIZE = int(os.getenv("PLACEHOLDER_PATTERN_CACHE_SIZE", 10000))
+
 
 @dataclass
 class PlaceholderDefinition:
@@ -45,6 +56,125 @@ PLACEHOLDERS = [
 ]
 
 
+@lru_cache(maxsize=PLACEHOLDER_PATTERN_CACHE_SIZE)
+def compile_placeholder_pattern(template_path: str) -> re.Pattern | None:
+    """
+    Convert a placeholder template path to a compiled regex pattern.
+
+    Replaces each placeholder with its regex pattern and escapes special characters.
+    Handles both full paths and bare filenames. Patterns are cached, so each distinct
+    template path is only compiled once.
+
+    Args:
+        template_path: Path containing placeholders (e.g., '/C:/Users/<WINDOWS_USERNAME>/...')
+
+    Returns:
+        Compiled case-insensitive regex pattern, or None if no placeholders found
+
+    Example:
+        Input:  '/C:/Users/<WINDOWS_USERNAME>/AppData/Roaming/file.txt'
+        Output: Pattern matching '/C:/Users/john.doe/AppData/Roaming/file.txt' (case-insensitive)
+    """
+    if not template_path or ("<" not in template_path and ">" not in template_path):
+        return None
+
+    # Start with the template path
+    regex_str = template_path
+
+    # Track which placeholders we're replacing
+    found_placeholders = []
+
+    # Replace each placeholder with its regex pattern
+    for placeholder_def in PLACEHOLDERS:
+        if placeholder_def.name in regex_str:
+            regex_str = regex_str.replace(placeholder_def.name, placeholder_def.pattern)
+            found_placeholders.append(placeholder_def.name)
+
+    if not found_placeholders:
+        return None
+
+    # Escape special regex characters, but preserve our capture groups
+    # First, temporarily replace capture groups with placeholders
+    group_placeholder = "###CAPTURE_GROUP_{}###"
+    group_count = 0
+    temp_str = regex_str
+
+    # Extract and protect capture groups
+    capture_groups = []
+    while "(" in temp_str:
+        start = temp_str.find("(")
+        depth = 1
+        i = start + 1
+        while i < len(temp_str) and depth > 0:
+            if temp_str[i] == "(":
+                depth += 1
+            elif temp_str[i] == ")":
+                depth -= 1
+            i += 1
+
+        if depth == 0:
+            capture_group = temp_str[start:i]
+            capture_groups.append(capture_group)
+            temp_str = temp_str[:start] + group_placeholder.format(group_count) + temp_str[i:]
+            group_count += 1
+        else:
+            break
+
+    # Escape regex special characters in the non-capture-group parts
+    temp_str = re.escape(temp_str)
+
+    # Restore capture groups
+    for i, capture_group in enumerate(capture_groups):
+        temp_str = temp_str.replace(re.escape(group_placeholder.format(i)), capture_group)
+
+    # Compile with case-insensitive flag for Windows paths
+    try:
+        pattern = re.compile(temp_str, re.IGNORECASE)
+        logger.debug(
+            "Converted placeholder template to regex",
+            template=template_path,
+            placeholders=found_placeholders,
+        )
+        return pattern
+    except re.error as e:
+        logger.warning("Failed to compile regex pattern", template=template_path, error=str(e))
+        return None
+
+
+def placeholder_prefix(path: str) -> str | None:
+    """
+    Get the literal directory prefix of a placeholder path.
+
+    Mirrors the generated placeholder_prefix column of file_listings and file_linkings.
+
+    Returns:
+        Lowercased path up to and including the last '/' before the first placeholder,
+        or None if the path contains no placeholders
+
+    Example:
+        Input:  '/C:/Users/<WINDOWS_USERNAME>/AppData/file.txt'
+        Output: '/c:/users/'
+    """
+    if "<" not in path or ">" not in path:
+        return None
+    return path[: path.rfind("/", 0, path.index("<")) + 1].lower()
+
+
+def path_prefixes(path: str) -> list[str]:
+    """
+    Get the placeholder prefixes that can match a real path.
+
+    Returns:
+        The empty prefix and the lowercased parent directories of the path
+
+    Example:
+        Input:  '/C:/Users/file.txt'
+        Output: ['', '/', '/c:/', '/c:/users/']
+    """
+    lowered = path.lower()
+    return ["", *(lowered[: index + 1] for index, char in enumerate(lowered) if char == "/")]
+
+
 class PlaceholderResolver:
     """
     Resolves placeholders in file paths bidirectionally.
@@ -64,86 +194,8 @@ class PlaceholderResolver:
         self.db_service = db_service
 
     def _convert_placeholder_to_regex(self, template_path: str) -> re.Pattern | None:
-        """
-        Convert a placeholder template path to a compiled regex pattern.
-
-        Replaces each placeholder with its regex pattern and escapes special characters.
-        Handles both full paths and bare filenames.
-
-        Args:
-            template_path: Path containing placeholders (e.g., '/C:/Users/<WINDOWS_USERNAME>/...')
-
-        Returns:
-            Compiled case-insensitive regex pattern, or None if no placeholders found
-
-        Example:
-            Input:  '/C:/Users/<WINDOWS_USERNAME>/AppData/Roaming/file.txt'
-            Output: Pattern matching '/C:/Users/john.doe/AppData/Roaming/file.txt' (case-insensitive)
-        """
-        if not template_path or ("<" not in template_path and ">" not in template_path):
-            return None
-
-        # Start with the template path
-        regex_str = template_path
-
-        # Track which placeholders we're replacing
-        found_placeholders = []
-
-        # Replace each placeholder with its regex pattern
-        for placeholder_def in PLACEHOLDERS:
-            if placeholder_def.name in regex_str:
-                regex_str = regex_str.replace(placeholder_def.name, placeholder_def.pattern)
-                found_placeholders.append(placeholder_def.name)
-
-        if not found_placeholders:
-            return None
-
-        # Escape special regex characters, but preserve our capture groups
-        # First, temporarily replace capture groups with placeholders
-        group_placeholder = "###CAPTURE_GROUP_{}###"
-        group_count = 0
-        temp_str = regex_str
-
-        # Extract and protect capture groups
-        capture_groups = []
-        while "(" in temp_str:
-            start = temp_str.find("(")
-            depth = 1
-            i = start + 1
-            while i < len(temp_str) and depth > 0:
-                if temp_str[i] == "(":
-                    depth += 1
-                elif temp_str[i] == ")":
-                    depth -= 1
-                i += 1
-
-            if depth == 0:
-                capture_group = temp_str[start:i]
-                capture_groups.append(capture_group)
-                temp_str = temp_str[:start] + group_placeholder.format(group_count) + temp_str[i:]
-                group_count += 1
-            else:
-                break
-
-        # Escape regex special characters in the non-capture-group parts
-        temp_str = re.escape(temp_str)
-
-        # Restore capture groups
-        for i, capture_group in enumerate(capture_groups):
-            temp_str = temp_str.replace(re.escape(group_placeholder.format(i)), capture_group)
-
-        # Compile with case-insensitive flag for Windows paths
-        try:
-            pattern = re.compile(temp_str, re.IGNORECASE)
-            logger.debug(
-                "Converted placeholder template to regex",
-                template=template_path,
-                placeholders=found_placeholders,
-            )
-            return pattern
-        except re.error as e:
-            logger.warning("Failed to compile regex pattern", template=template_path, error=str(e))
-            return None
+        """Convert a placeholder template path to a compiled regex pattern, see compile_placeholder_pattern()."""
+        return compile_placeholder_pattern(template_path)
 
     def _replace_placeholders_with_captures(self, template_path: str, match: re.Match) -> str:
         """
@@ -181,7 +233,7 @@ class PlaceholderResolver:
 
         return result
 
-    async def resolve_placeholders_for_file(self, file_path: str, source: str) -> int:
+    async def resolve_placeholders_for_file(self, file_path: str, source: str, table_name: str | None = None) -> int:
         """
         Forward resolution: Match a real file against placeholder entries and update them.
 
@@ -191,6 +243,7 @@ class PlaceholderResolver:
         Args:
             file_path: Real file path that was just collected
             source: Source identifier
+            table_name: Only resolve entries of this table ("file_listings" or "file_linkings")
 
         Returns:
             Number of placeholder entries resolved
@@ -203,8 +256,10 @@ class PlaceholderResolver:
         if not file_path or not source:
             return 0
 
-        # Query for placeholder entries for this source
-        placeholder_entries = await self.db_service.get_placeholder_entries(source)
+        # Only placeholders whose literal prefix is a parent directory of the file can match it
+        placeholder_entries = await self.db_service.get_placeholder_entries(
+            source, table_name=table_name, path_prefixes=path_prefixes(file_path)
+        )
 
         if not placeholder_entries:
             logger.debug("No placeholder entries found for source", source=source)
@@ -213,11 +268,14 @@ class PlaceholderResolver:
         resolved_count = 0
 
         for entry in placeholder_entries:
-            table_name = entry["table_name"]
+            if table_name is not None and entry["table_name"] != table_name:
+                continue
+
+            entry_table = entry["table_name"]
             placeholder_path = entry["path"]
 
             # Convert placeholder path to regex
-            pattern = self._convert_placeholder_to_regex(placeholder_path)
+            pattern = compile_placeholder_pattern(placeholder_path)
             if not pattern:
                 continue
 
@@ -233,14 +291,14 @@ class PlaceholderResolver:
                     placeholder_path=placeholder_path,
                     real_path=file_path,
                     resolved_path=resolved_path,
-                    table=table_name,
+                    table=entry_table,
                     source=source,
                 )
 
                 # Update the database
-                if table_name == "file_listings":
+                if entry_table == "file_listings":
                     await self.db_service.update_file_listing_path(source, placeholder_path, resolved_path)
-                elif table_name == "file_linkings":
+                elif entry_table == "file_linkings":
                     await self.db_service.update_file_linking_path(source, placeholder_path, resolved_path)
 
                 resolved_count += 1
@@ -282,12 +340,12 @@ class PlaceholderResolver:
             return None
 
         # Convert placeholder path to regex pattern
-        pattern = self._convert_placeholder_to_regex(placeholder_path)
+        pattern = compile_placeholder_pattern(placeholder_path)
         if not pattern:
             return None
 
-        # Get all collected files for this source
-        collected_files = await self.db_service.get_collected_files(source)
+        # Get the collected files of this source under the literal prefix of the placeholder path
+        collected_files = await self.db_service.get_collected_files(source, placeholder_prefix(placeholder_path))
 
         if not collected_files:
             logger.debug("No collected files found for backward resolution", source=source)
@@ -9,6 +9,7 @@ Processes files to detect relationships and create linkings based on:
 import fnmatch
 import os
 import posixpath
+import re
 from dataclasses import dataclass
 
 import asyncpg
@@ -16,8 +17,9 @@ import yaml
 from common.logger import get_logger
 from common.models import FileEnriched
 
-from .database_service import FileLinkingDatabaseService, FileListingStatus
+from .database_service import FileLinking, FileLinkingDatabaseService, FileListing, FileListingStatus
 from .placeholder_resolver import PlaceholderResolver
+from .writer import FileLinkingWriter
 
 logger = get_logger(__name__)
 
@@ -54,6 +56,91 @@ class LinkingRule:
     linked_files: list[LinkedFile]
 
 
+class CompiledTrigger:
+    """A trigger with its path globs translated to one regex, built once when rules are loaded."""
+
+    def __init__(self, trigger: Trigger):
+        self.trigger = trigger
+        # Same semantics as fnmatch.fnmatch on POSIX (case-sensitive, '*' crosses '/')
+        self.path_regex = "|".join(fnmatch.translate(pattern) for pattern in trigger.file_patterns) or None
+        self.path_pattern = re.compile(self.path_regex) if self.path_regex else None
+        self.mime_types = frozenset(trigger.mime_patterns)
+        self.magic_patterns = tuple(trigger.magic_patterns)
+
+    def matches(self, file_path: str, mime_type: str | None, magic_type: str | None) -> bool:
+        """Check if a file matches the path, mime type, and magic type conditions of the trigger."""
+        if self.path_pattern and not self.path_pattern.match(file_path):
+            return False
+        if self.mime_types and mime_type not in self.mime_types:
+            return False
+        if self.magic_patterns and not any(pattern in (magic_type or "") for pattern in self.magic_patterns):
+            return False
+        return True
+
+
+class TriggerMatcher:
+    """
+    The triggers of all rules compiled into one matcher.
+
+    A file is checked against every rule in one pass: triggers are looked up by MIME type,
+    one combined regex of all path globs and one of all magic substrings rule out most
+    triggers (and, for files no rule cares about, all of them) before the remaining
+    candidates are checked individually.
+    """
+
+    def __init__(self, rules: list[LinkingRule]):
+        self._triggers: list[tuple[LinkingRule, CompiledTrigger]] = []
+        self._by_mime: dict[str, list[int]] = {}
+        self._any_mime: list[int] = []
+
+        for rule in rules:
+            for trigger in rule.triggers:
+                index = len(self._triggers)
+                compiled = CompiledTrigger(trigger)
+                self._triggers.append((rule, compiled))
+
+                if compiled.mime_types:
+                    for mime_type in compiled.mime_types:
+                        self._by_mime.setdefault(mime_type, []).append(index)
+                else:
+                    self._any_mime.append(index)
+
+        path_regexes = [compiled.path_regex for _, compiled in self._triggers if compiled.path_regex]
+        self._any_path = re.compile("|".join(path_regexes)) if path_regexes else None
+        magic_patterns = {pattern for _, compiled in self._triggers for pattern in compiled.magic_patterns}
+        self._any_magic = re.compile("|".join(map(re.escape, magic_patterns))) if magic_patterns else None
+
+    def match(self, file_enriched: FileEnriched) -> list[tuple[LinkingRule, Trigger]]:
+        """
+        Get the rules a file matches.
+
+        Returns:
+            (rule, trigger) for each matching rule, in rule order, with the first trigger of the rule that matches
+        """
+        candidates = self._by_mime.get(file_enriched.mime_type, []) + self._any_mime
+        if not candidates:
+            return []
+
+        file_path = file_enriched.path
+        magic_type = file_enriched.magic_type or ""
+        any_path = self._any_path is None or self._any_path.match(file_path) is not None
+        any_magic = self._any_magic is None or self._any_magic.search(magic_type) is not None
+
+        matches = []
+        matched_rules = set()
+        for index in sorted(candidates):
+            rule, compiled = self._triggers[index]
+            if id(rule) in matched_rules:
+                continue  # Only match first trigger per rule
+            if (compiled.path_pattern and not any_path) or (compiled.magic_patterns and not any_magic):
+                continue
+            if compiled.matches(file_path, file_enriched.mime_type, magic_type):
+                matched_rules.add(id(rule))
+                matches.append((rule, compiled.trigger))
+
+        return matches
+
+
 class FileLinkingEngine:
     """
     Engine for processing file linking rules and creating database entries.
@@ -61,10 +148,21 @@ class FileLinkingEngine:
     Supports both YAML-based rules and programmatic calls from enrichment modules.
     """
 
-    def __init__(self, connection_pool: asyncpg.Pool, rules_dir: str | None = None):
+    def __init__(
+        self, connection_pool: asyncpg.Pool, rules_dir: str | None = None, writer: FileLinkingWriter | None = None
+    ):
+        """
+        Args:
+            connection_pool: asyncpg connection pool (externally managed)
+            rules_dir: Directory of YAML rule files, defaults to the bundled rules
+            writer: Optional write-behind queue merging the writes of concurrently processed files.
+                If None, each file's listings and linkings are written directly in one batch.
+        """
         self.db_service = FileLinkingDatabaseService(connection_pool)
+        self.writer = writer
         self.placeholder_resolver = PlaceholderResolver(self.db_service)
         self.rules: list[LinkingRule] = []
+        self.trigger_matcher = TriggerMatcher([])
 
         if rules_dir is None:
             rules_dir = os.path.join(os.path.dirname(__file__), "rules")
@@ -92,6 +190,7 @@ class FileLinkingEngine:
                     except Exception as e:
                         logger.exception("Error loading rule file", rule_path=rule_path, error=str(e))
 
+        self.trigger_matcher = TriggerMatcher(self.rules)
         logger.info("Loaded file linking rules", count=rules_loaded, rules_dir=self.rules_dir)
 
     def _load_rule_file(self, rule_path: str) -> LinkingRule | None:
@@ -139,32 +238,7 @@ class FileLinkingEngine:
 
     def _matches_trigger(self, file_enriched: FileEnriched, trigger: Trigger) -> bool:
         """Check if a file matches a path, mime type, or magic type trigger condition."""
-        file_path = file_enriched.path
-        mime_type = file_enriched.mime_type
-        magic_type = file_enriched.magic_type
-
-        # Check file patterns
-        logger.debug(f"file_patterns: {trigger.file_patterns}")
-
-        if trigger.file_patterns:
-            path_match = any(fnmatch.fnmatch(file_path, pattern) for pattern in trigger.file_patterns)
-
-            if not path_match:
-                return False
-
-        # Check MIME types
-        if trigger.mime_patterns and mime_type not in trigger.mime_patterns:
-            logger.debug(f"path_match but mime types mismatch: {mime_type}")
-            return False
-
-        # Check magic patterns
-        if trigger.magic_patterns:
-            magic_match = any(pattern in magic_type for pattern in trigger.magic_patterns)
-            if not magic_match:
-                logger.debug("path_match but magic string mismatch")
-                return False
-
-        return True
+        return CompiledTrigger(trigger).matches(file_enriched.path, file_enriched.mime_type, file_enriched.magic_type)
 
     async def _resolve_backward(self, source: str, linked_path: str) -> tuple[str, FileListingStatus]:
         """
@@ -220,37 +294,7 @@ class FileLinkingEngine:
             return
 
         try:
-            placeholder_entries = await self.db_service.get_placeholder_entries(source)
-
-            for entry in placeholder_entries:
-                if entry["table_name"] != table_name:
-                    continue
-
-                placeholder_path = entry["path"]
-
-                # Convert placeholder to regex and try to match
-                pattern = self.placeholder_resolver._convert_placeholder_to_regex(placeholder_path)
-                match = pattern.match(real_path) if pattern else None
-                if match:
-                    # This real path matches an existing placeholder
-                    resolved_path = self.placeholder_resolver._replace_placeholders_with_captures(
-                        placeholder_path, match
-                    )
-
-                    logger.info(
-                        f"Forward resolution matched placeholder in {table_name}",
-                        placeholder_path=placeholder_path,
-                        real_path=real_path,
-                        source=source,
-                    )
-
-                    # Update the placeholder in the appropriate table
-                    if table_name == "file_listings":
-                        await self.db_service.update_file_listing_path(source, placeholder_path, resolved_path)
-                    elif table_name == "file_linkings":
-                        await self.db_service.update_file_linking_path(source, placeholder_path, resolved_path)
-                    # Continue checking other placeholders (no break)
-
+            await self.placeholder_resolver.resolve_placeholders_for_file(real_path, source, table_name)
         except Exception as e:
             logger.warning(
                 f"Error in forward placeholder resolution for {table_name}",
@@ -302,8 +346,8 @@ class FileLinkingEngine:
         - Forward: resolves existing placeholder entries using this real file
         - Backward: checks if placeholder paths already have matching real files
 
-        Database operations use individual atomic upserts to avoid deadlocks in
-        concurrent file processing scenarios.
+        All listings and linkings of the file are written in one batch once the rules
+        are processed (see _write_listings_and_linkings).
 
         Args:
             file_enriched: File data from files_enriched table
@@ -343,64 +387,45 @@ class FileLinkingEngine:
         await self._resolve_forward_for_table(source, file_path, "file_listings")
         await self._resolve_forward_for_table(source, file_path, "file_linkings")
 
-        await self.db_service.add_file_listing(
-            source=source,
-            path=file_path,
-            status=FileListingStatus.COLLECTED,
-            object_id=file_enriched.object_id,
-        )
+        listings = [FileListing(source, file_path, FileListingStatus.COLLECTED, file_enriched.object_id)]
+        linkings = []
         logger.debug("Adding file listing (collected)", file_path=file_path, source=source)
 
-        # Process each rule
-        for rule in self.rules:
+        # Process each rule the file matches, all rules are matched in one pass
+        for rule, _trigger in self.trigger_matcher.match(file_enriched):
             try:
-                # Check if any trigger matches
-                for trigger in rule.triggers:
-                    if self._matches_trigger(file_enriched, trigger):
-                        logger.debug("File matches rule trigger", rule_name=rule.name, file_path=file_path)
-
-                        # Process linked files for this rule
-                        for linked_file in rule.linked_files:
-                            for template in linked_file.path_templates:
-                                linked_path = self._expand_path_template(template, file_enriched.path)
-
-                                # Backward resolution: If linked_path contains placeholders,
-                                # check if a matching real file already exists
-                                linked_path, status = await self._resolve_backward(source, linked_path)
-
-                                # Add file listing
-                                await self.db_service.add_file_listing(
-                                    source=source,
-                                    path=linked_path,
-                                    status=status,
-                                )
-
-                                # Add file linking
-                                link_type = f"{rule.category}:{linked_file.name}"
-                                await self.db_service.add_file_linking(
-                                    source=source,
-                                    file_path_1=file_path,
-                                    file_path_2=linked_path,
-                                    link_type=link_type,
-                                )
-
-                                linkings_created += 1
-
-                                logger.debug(
-                                    "Created file linking",
-                                    rule_name=rule.name,
-                                    linked_file=linked_file.name,
-                                    source_path=file_path,
-                                    linked_path=linked_path,
-                                    link_type=link_type,
-                                )
-
-                        # Only match first trigger per rule
-                        break
+                logger.debug("File matches rule trigger", rule_name=rule.name, file_path=file_path)
+
+                # Process linked files for this rule
+                for linked_file in rule.linked_files:
+                    for template in linked_file.path_templates:
+                        linked_path = self._expand_path_template(template, file_enriched.path)
+
+                        # Backward resolution: If linked_path contains placeholders,
+                        # check if a matching real file already exists
+                        linked_path, status = await self._resolve_backward(source, linked_path)
+
+                        # Add file listing and linking
+                        link_type = f"{rule.category}:{linked_file.name}"
+                        listings.append(FileListing(source, linked_path, status))
+                        linkings.append(FileLinking(source, file_path, linked_path, link_type))
+
+                        linkings_created += 1
+
+                        logger.debug(
+                            "Created file linking",
+                            rule_name=rule.name,
+                            linked_file=linked_file.name,
+                            source_path=file_path,
+                            linked_path=linked_path,
+                            link_type=link_type,
+                        )
 
             except Exception as e:
                 logger.exception("Error processing rule", rule_name=rule.name, file_path=file_path, error=str(e))
 
+        await self._write_listings_and_linkings(listings, linkings)
+
         if linkings_created > 0:
             logger.info("Created file linkings from rules", file_path=file_path, linkings_created=linkings_created)
 
@@ -421,8 +446,7 @@ class FileLinkingEngine:
         - If linked_path has placeholders: checks if real file exists (backward resolution)
         - If linked_path is real: checks if placeholder exists and resolves it (forward resolution)
 
-        Database operations use individual atomic upserts to avoid deadlocks in
-        concurrent file processing scenarios.
+        All listings and linkings are written in one batch at the end.
 
         Args:
             source: Source identifier
@@ -435,6 +459,8 @@ class FileLinkingEngine:
             int: Number of linkings created
         """
         linkings_created = 0
+        listings = []
+        linkings = []
 
         for linked_path in linked_file_paths:
             # Backward resolution: If linked_path contains placeholders,
@@ -446,24 +472,13 @@ class FileLinkingEngine:
             await self._resolve_forward_for_table(source, final_linked_path, "file_linkings")
             await self._resolve_forward_for_table(source, final_linked_path, "file_listings")
 
-            # Add file listing
-            await self.db_service.add_file_listing(
-                source=source,
-                path=final_linked_path,
-                status=status,
-            )
-
-            # Add file linking
+            # Add file listing and linking
             full_link_type = link_type
             if collection_reason:
                 full_link_type += f":{collection_reason}"
 
-            await self.db_service.add_file_linking(
-                source=source,
-                file_path_1=source_file_path,
-                file_path_2=final_linked_path,
-                link_type=full_link_type,
-            )
+            listings.append(FileListing(source, final_linked_path, status))
+            linkings.append(FileLinking(source, source_file_path, final_linked_path, full_link_type))
 
             linkings_created += 1
 
@@ -474,4 +489,22 @@ class FileLinkingEngine:
                 link_type=full_link_type,
             )
 
+        await self._write_listings_and_linkings(listings, linkings)
+
         return linkings_created
+
+    async def _write_listings_and_linkings(self, listings: list[FileListing], linkings: list[FileLinking]) -> bool:
+        """
+        Write the listings and linkings of one file in one batch.
+
+        Rows are merged and sorted before the multi-row upserts, so concurrent writers lock
+        rows in the same order. With a writer, the batch is also merged with the writes of
+        other files flushed within the same window.
+        """
+        try:
+            if self.writer is not None:
+                return await self.writer.write(listings, linkings)
+            return await self.db_service.add_file_listings_and_linkings(listings, linkings)
+        except Exception as e:
+            logger.exception("Error writing file listings and linkings", error=str(e))
+            return False
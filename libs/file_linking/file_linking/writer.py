@@ -0,0 +1,113 @@
+"""
+Write-behind queue for file listings and linkings.
+
+Merges the listings and linkings of concurrently processed files into batched writes.
+"""
+
+import asyncio
+import os
+
+from common.logger import get_logger
+
+from .database_service import FileLinking, FileLinkingDatabaseService, FileListing
+
+logger = get_logger(__name__)
+
+# Window for merging the file listing/linking writes of concurrent workflows
+FILE_LINKING_FLUSH_INTERVAL_MS = int(os.getenv("FILE_LINKING_FLUSH_INTERVAL_MS", 20))
+# Pending rows that force a flush
+FILE_LINKING_FLUSH_MAX_ROWS = int(os.getenv("FILE_LINKING_FLUSH_MAX_ROWS", 5000))
+
+
+class FileLinkingWriter:
+    """
+    Coalesces the listings and linkings of concurrently processed files into batched writes.
+
+    Each `write()` call is queued and flushed together with every other call that arrives
+    within `flush_interval` seconds (or as soon as `max_batch_rows` rows are pending). A
+    flush merges and sorts all queued rows and writes them with one multi-row upsert per
+    table. If that fails, each call is retried on its own so one bad file cannot fail the
+    files it was flushed with.
+    """
+
+    def __init__(
+        self,
+        db_service: FileLinkingDatabaseService,
+        flush_interval: float = FILE_LINKING_FLUSH_INTERVAL_MS / 1000,
+        max_batch_rows: int = FILE_LINKING_FLUSH_MAX_ROWS,
+    ):
+        """
+        Args:
+            db_service: Database service used for the batched writes
+            flush_interval: seconds to wait for other writes before flushing
+            max_batch_rows: pending row count that triggers an immediate flush
+        """
+        self.db_service = db_service
+        self.flush_interval = flush_interval
+        self.max_batch_rows = max_batch_rows
+
+        self._pending: list[tuple[list[FileListing], list[FileLinking], asyncio.Future]] = []
+        self._pending_rows = 0
+        self._flush_timer: asyncio.TimerHandle | None = None
+        self.background_tasks = set()  # Track flush tasks to prevent GC
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Flush whatever is still queued and wait for in-flight flushes."""
+        self._start_flush()
+        if self.background_tasks:
+            await asyncio.gather(*self.background_tasks, return_exceptions=True)
+
+    async def write(self, listings: list[FileListing], linkings: list[FileLinking]) -> bool:
+        """
+        Queue listings and linkings and wait until they have been committed.
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        if not listings and not linkings:
+            return True
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((listings, linkings, future))
+        self._pending_rows += len(listings) + len(linkings)
+
+        if self._pending_rows >= self.max_batch_rows:
+            self._start_flush()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.get_running_loop().call_later(self.flush_interval, self._start_flush)
+
+        # Shield the commit so a cancelled caller doesn't leave the future unresolved mid-flush
+        return await asyncio.shield(future)
+
+    def _start_flush(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, []
+        self._pending_rows = 0
+
+        task = asyncio.create_task(self._flush(pending))
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+
+    async def _flush(self, pending: list[tuple[list[FileListing], list[FileLinking], asyncio.Future]]) -> None:
+        listings = [listing for call_listings, _, _ in pending for listing in call_listings]
+        linkings = [linking for _, call_linkings, _ in pending for linking in call_linkings]
+
+        success = await self.db_service.add_file_listings_and_linkings(listings, linkings)
+        if success or len(pending) == 1:
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_result(success)
+            return
+
+        logger.warning("Batched file linking write failed, retrying per file", files=len(pending))
+        for call_listings, call_linkings, future in pending:
+            future.set_result(await self.db_service.add_file_listings_and_linkings(call_listings, call_linkings))
@@ -8,6 +8,9 @@ from file_linking.placeholder_resolver import (
     PLACEHOLDERS,
     PlaceholderDefinition,
     PlaceholderResolver,
+    compile_placeholder_pattern,
+    path_prefixes,
+    placeholder_prefix,
 )
 
 
@@ -394,4 +397,48 @@ class TestPlaceholderResolutionScenarios:
 
         # Should return the real path instead of None
         assert result == real_path
-        self.db_service.get_collected_files.assert_called_once_with(source)
+        # Only the collected files under the literal prefix of the placeholder path are queried
+        self.db_service.get_collected_files.assert_called_once_with(
+            source, "/c:/programdata/microsoft/crypto/systemkeys/"
+        )
+
+
+class TestPlaceholderIndex:
+    """Tests for the placeholder prefix index helpers."""
+
+    def test_placeholder_prefix(self):
+        """The prefix is the lowercased directory before the first placeholder."""
+        assert placeholder_prefix("/C:/Users/<WINDOWS_USERNAME>/AppData/<WINDOWS_SECURITY_IDENTIFIER>") == "/c:/users/"
+        assert placeholder_prefix("<WINDOWS_USERNAME>.txt") == ""
+        assert placeholder_prefix("/C:/Users/john.doe/file.txt") is None
+
+    def test_placeholder_prefix_is_a_prefix_of_matching_paths(self):
+        """A real path matching a placeholder path has the placeholder's prefix among its prefixes."""
+        placeholder_path = "/C:/Users/<WINDOWS_USERNAME>/AppData/Roaming/file.txt"
+        real_path = "/c:/users/John.Doe/AppData/Roaming/file.txt"
+
+        assert compile_placeholder_pattern(placeholder_path).match(real_path)
+        assert placeholder_prefix(placeholder_path) in path_prefixes(real_path)
+
+    def test_path_prefixes(self):
+        """All parent directories of a real path are candidate prefixes."""
+        assert path_prefixes("/C:/Users/file.txt") == ["", "/", "/c:/", "/c:/users/"]
+
+    def test_patterns_are_compiled_once(self):
+        """Converting the same template twice returns the cached pattern."""
+        template = "/C:/Users/<WINDOWS_USERNAME>/NTUSER.DAT"
+
+        assert compile_placeholder_pattern(template) is compile_placeholder_pattern(template)
+
+    @pytest.mark.asyncio
+    async def test_forward_resolution_queries_by_prefix(self):
+        """Forward resolution looks up the placeholders by the prefixes of the real path."""
+        db_service = MagicMock()
+        db_service.get_placeholder_entries = AsyncMock(return_value=[])
+        resolver = PlaceholderResolver(db_service)
+
+        await resolver.resolve_placeholders_for_file("/C:/Users/file.txt", "test-source", "file_listings")
+
+        db_service.get_placeholder_entries.assert_called_once_with(
+            "test-source", table_name="file_listings", path_prefixes=["", "/", "/c:/", "/c:/users/"]
+        )
@@ -1,11 +1,12 @@
 """Tests for the file linking rules engine."""
 
+import os
 from datetime import datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from common.models import FileEnriched, FileHashes
-from file_linking.rules_engine import FileLinkingEngine, Trigger
+from file_linking.rules_engine import FileLinkingEngine, LinkingRule, Trigger, TriggerMatcher
 
 
 @pytest.fixture
@@ -543,6 +544,7 @@ class TestPlaceholderResolutionIntegration:
         # Mock the database service methods (now async)
         engine.db_service.add_file_listing = AsyncMock(return_value=True)
         engine.db_service.add_file_linking = AsyncMock(return_value=True)
+        engine.db_service.add_file_listings_and_linkings = AsyncMock(return_value=True)
 
         return engine
 
@@ -577,6 +579,32 @@ class TestPlaceholderResolutionIntegration:
         assert call_args[0][1] == placeholder_path  # old path
         assert call_args[0][2] == "/C:/Users/john.doe/AppData/Roaming/file.txt"  # new path
 
+    async def test_listings_and_linkings_are_written_in_one_batch(self, engine):
+        """The collected file and all its linked files are written with one call."""
+        from file_linking.database_service import FileLinking, FileListing, FileListingStatus
+
+        engine.rules_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "file_linking", "rules")
+        engine._load_rules()
+        engine.db_service.get_placeholder_entries = AsyncMock(return_value=[])
+
+        local_state_path = "/C:/Users/Alice/AppData/Local/Google/Chrome/User Data/Local State"
+        file_enriched = create_file_enriched(
+            object_id="test-local-state-001", path=local_state_path, mime_type="application/json", magic_type="JSON"
+        )
+        file_enriched.source = "test-agent"
+
+        assert await engine.apply_linking_rules(file_enriched) == 2
+
+        engine.db_service.add_file_listings_and_linkings.assert_awaited_once()
+        listings, linkings = engine.db_service.add_file_listings_and_linkings.call_args[0]
+        assert listings[0] == FileListing(
+            "test-agent", local_state_path, FileListingStatus.COLLECTED, "test-local-state-001"
+        )
+        assert [listing.status for listing in listings[1:]] == [FileListingStatus.NEEDS_TO_BE_COLLECTED] * 2
+        assert all(isinstance(linking, FileLinking) for linking in linkings)
+        assert {linking.file_path_2 for linking in linkings} == {listing.path for listing in listings[1:]}
+        engine.db_service.add_file_listing.assert_not_called()
+
     async def test_backward_resolution_real_file_first_placeholder_later(self, engine):
         """Test backward resolution: real file exists, placeholder path created."""
         from pathlib import Path
@@ -814,4 +842,84 @@ linked_files:
         await engine.apply_linking_rules(file_enriched)
 
         # Verify query was called with correct source
-        engine.db_service.get_placeholder_entries.assert_called_with("source-2")
+        assert engine.db_service.get_placeholder_entries.call_args[0][0] == "source-2"
+
+
+def create_rule(name: str, *triggers: Trigger) -> LinkingRule:
+    """Helper function to create a LinkingRule without linked files."""
+    return LinkingRule(
+        name=name, description=name, category="test", enabled=True, triggers=list(triggers), linked_files=[]
+    )
+
+
+class TestTriggerMatcher:
+    """Tests for the compiled matcher of all rule triggers."""
+
+    def test_matches_all_rules_in_rule_order(self):
+        """Every matching rule is returned once, with its first matching trigger."""
+        sqlite_trigger = Trigger(
+            file_patterns=["*/Cookies"], mime_patterns=["application/vnd.sqlite3"], magic_patterns=[]
+        )
+        any_cookies = Trigger(file_patterns=["**/Network/Cookies"], mime_patterns=[], magic_patterns=[])
+        magic_trigger = Trigger(file_patterns=[], mime_patterns=[], magic_patterns=["SQLite"])
+        rules = [
+            create_rule("first", sqlite_trigger, any_cookies),
+            create_rule("other_mime", Trigger(file_patterns=[], mime_patterns=["application/json"], magic_patterns=[])),
+            create_rule("magic", magic_trigger),
+        ]
+        file_enriched = create_file_enriched(
+            object_id="test-001",
+            path="/C:/Users/Alice/AppData/Local/Google/Chrome/User Data/Default/Network/Cookies",
+            mime_type="application/vnd.sqlite3",
+            magic_type="SQLite 3.x database",
+        )
+
+        matches = TriggerMatcher(rules).match(file_enriched)
+
+        assert [(rule.name, trigger) for rule, trigger in matches] == [
+            ("first", sqlite_trigger),
+            ("magic", magic_trigger),
+        ]
+
+    def test_no_match(self):
+        """Files no trigger applies to match no rule."""
+        rules = [
+            create_rule(
+                "cookies",
+                Trigger(file_patterns=["**/Network/Cookies"], mime_patterns=[], magic_patterns=["SQLite"]),
+            )
+        ]
+        file_enriched = create_file_enriched(
+            object_id="test-001",
+            path="/C:/Users/Alice/Network/Cookies",
+            mime_type="text/plain",
+            magic_type="ASCII text",
+        )
+
+        assert TriggerMatcher(rules).match(file_enriched) == []
+        assert TriggerMatcher([]).match(file_enriched) == []
+
+    def test_agrees_with_matches_trigger(self, mock_asyncpg_pool):
+        """The combined matcher and the per-trigger check agree on the bundled rules."""
+        engine = FileLinkingEngine(connection_pool=mock_asyncpg_pool)
+        paths = [
+            "/C:/Users/Alice/AppData/Local/Google/Chrome/User Data/Default/Network/Cookies",
+            "/C:/Users/Alice/AppData/Local/Google/Chrome/User Data/Default/Login Data",
+            "/C:/Users/Alice/AppData/Local/Google/Chrome/User Data/Local State",
+            "/C:/Users/Alice/Documents/notes.txt",
+        ]
+        mime_types = ["application/vnd.sqlite3; charset=binary", "application/json", "text/plain"]
+        matched = 0
+
+        for path in paths:
+            for mime_type in mime_types:
+                file_enriched = create_file_enriched("test-001", path, mime_type, "data")
+                expected = [
+                    rule.name
+                    for rule in engine.rules
+                    if any(engine._matches_trigger(file_enriched, trigger) for trigger in rule.triggers)
+                ]
+                assert [rule.name for rule, _ in engine.trigger_matcher.match(file_enriched)] == expected
+                matched += len(expected)
+
+        assert matched == 3
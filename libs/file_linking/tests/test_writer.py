@@ -0,0 +1,77 @@
+"""Tests for batched file listing/linking writes."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from file_linking.database_service import (
+    FileLinking,
+    FileListing,
+    FileListingStatus,
+    merge_file_linkings,
+    merge_file_listings,
+)
+from file_linking.writer import FileLinkingWriter
+
+
+class TestMergeRows:
+    """Tests for merging rows of one batch."""
+
+    def test_listings_are_merged_like_consecutive_upserts(self):
+        """Collected listings stay collected and keep their first spelling, rows are in lock order."""
+        listings = [
+            FileListing("agent", "/C:/b.txt", FileListingStatus.NEEDS_TO_BE_COLLECTED),
+            FileListing("agent", "/C:/a.txt", FileListingStatus.COLLECTED, "obj-a"),
+            FileListing("agent", "/c:/A.TXT", FileListingStatus.NEEDS_TO_BE_COLLECTED),
+            FileListing("agent", "/c:/B.txt", FileListingStatus.COLLECTED, "obj-b"),
+        ]
+
+        assert merge_file_listings(listings) == [
+            FileListing("agent", "/C:/a.txt", FileListingStatus.COLLECTED, "obj-a"),
+            FileListing("agent", "/C:/b.txt", FileListingStatus.COLLECTED, "obj-b"),
+        ]
+
+    def test_linkings_last_link_type_wins(self):
+        """Duplicate linkings keep the last link type, rows are in lock order."""
+        linkings = [
+            FileLinking("agent", "/b", "/c", "first"),
+            FileLinking("agent", "/a", "/c", "other"),
+            FileLinking("agent", "/b", "/c", "second"),
+        ]
+
+        assert merge_file_linkings(linkings) == [
+            FileLinking("agent", "/a", "/c", "other"),
+            FileLinking("agent", "/b", "/c", "second"),
+        ]
+
+
+@pytest.mark.asyncio
+class TestFileLinkingWriter:
+    """Tests for the write-behind queue."""
+
+    async def test_concurrent_writes_are_flushed_together(self):
+        """Writes within the flush window share one database write."""
+        db_service = MagicMock()
+        db_service.add_file_listings_and_linkings = AsyncMock(return_value=True)
+        listing_1 = FileListing("agent", "/a", FileListingStatus.COLLECTED, "obj-a")
+        listing_2 = FileListing("agent", "/b", FileListingStatus.NEEDS_TO_BE_COLLECTED)
+        linking = FileLinking("agent", "/a", "/b", "test")
+
+        async with FileLinkingWriter(db_service, flush_interval=0.01) as writer:
+            results = await asyncio.gather(writer.write([listing_1], []), writer.write([listing_2], [linking]))
+
+        assert results == [True, True]
+        db_service.add_file_listings_and_linkings.assert_awaited_once_with([listing_1, listing_2], [linking])
+
+    async def test_failed_flush_is_retried_per_write(self):
+        """If the merged write fails, each write is retried on its own."""
+        db_service = MagicMock()
+        db_service.add_file_listings_and_linkings = AsyncMock(side_effect=[False, True, False])
+        good = FileListing("agent", "/a", FileListingStatus.COLLECTED, "obj-a")
+        bad = FileListing("agent", "/b", FileListingStatus.COLLECTED, "obj-b")
+
+        async with FileLinkingWriter(db_service, flush_interval=0.01) as writer:
+            results = await asyncio.gather(writer.write([good], []), writer.write([bad], []))
+
+        assert results == [True, False]
+        assert db_service.add_file_listings_and_linkings.await_count == 3
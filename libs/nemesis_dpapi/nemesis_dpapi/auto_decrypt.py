@@ -6,11 +6,8 @@ from logging import getLogger
 from typing import TYPE_CHECKING
 from uuid import UUID
 
-from nemesis_dpapi.exceptions import MasterKeyDecryptionError
-from nemesis_dpapi.keys import MasterKeyEncryptionKey
-from nemesis_dpapi.repositories import EncryptionFilter
-
-from .core import BackupKeyRecoveryBlob, MasterKey, MasterKeyFile, MasterKeyPolicy, MasterKeyType
+from .bulk_decrypt import decrypt_with_backup_key, decrypt_with_encryption_keys
+from .core import MasterKey, MasterKeyType
 from .eventing import (
     DpapiEvent,
     DpapiObserver,
@@ -18,7 +15,7 @@ from .eventing import (
     NewDpapiSystemCredentialEvent,
     NewEncryptedMasterKeyEvent,
 )
-from .keys import DpapiSystemCredential
+from .keys import DpapiSystemCredential, derive_mk_encryption_keys, mk_keys_fingerprint
 
 if TYPE_CHECKING:
     from .manager import DpapiManager
@@ -49,7 +46,7 @@ class AutoDecryptionObserver(DpapiObserver):
         elif isinstance(event, NewEncryptedMasterKeyEvent):
             await self._handle_new_encrypted_masterkey(event)
         elif isinstance(event, NewDpapiSystemCredentialEvent):
-            self._create_task(await self._handle_new_sytem_credential(event))
+            self._create_task(self._handle_new_sytem_credential(event))
 
     def _create_task(self, coroutine) -> asyncio.Task:
         """Creates a background task and maintains a reference until its completion
@@ -118,46 +115,26 @@ class AutoDecryptionObserver(DpapiObserver):
 
         logger.debug("Attempting to decrypt masterkeys with new DPAPI_SYSTEM credential")
 
-        if encrypted_masterkeys is None:
-            # Filter out User masterkeys
-            encrypted_masterkeys = await self.dpapi_manager.get_masterkeys(
-                encryption_filter=EncryptionFilter.ENCRYPTED_ONLY,
+        mk_keys = derive_mk_encryption_keys(credential)
+
+        try:
+            decrypted_count = await self.dpapi_manager.decrypt_masterkeys(
+                decrypt_with_encryption_keys,
+                mk_keys,
+                masterkeys=encrypted_masterkeys,
+                # Filter out User masterkeys
                 masterkey_type=[MasterKeyType.SYSTEM, MasterKeyType.SYSTEM_USER, MasterKeyType.UNKNOWN],
+                attempt_fingerprint=mk_keys_fingerprint(mk_keys),
             )
-
-        if not encrypted_masterkeys:
+        except Exception as e:
+            logger.error(f"Error decrypting masterkeys with DPAPI_SYSTEM credential: {e}")
             return
 
-        decrypted_count = 0
-        for encrypted_mk in encrypted_masterkeys:
-            try:
-                if not encrypted_mk.encrypted_key_usercred:
-                    continue
-
-                # Try the machine key first, then the user key
-                for i in range(2):
-                    if i == 0:
-                        mk_key = MasterKeyEncryptionKey.from_dpapi_system_cred(credential.machine_key)
-                    else:
-                        mk_key = MasterKeyEncryptionKey.from_dpapi_system_cred(credential.user_key)
-
-                    try:
-                        plaintext_mk = encrypted_mk.decrypt(mk_key)
-                        decrypted_count += 1
-                    except MasterKeyDecryptionError:
-                        continue
-
-                    print(f"Successfully decrypted masterkey {encrypted_mk.guid} with DPAPI_SYSTEM credential")
-                    await self.dpapi_manager.upsert_masterkey(plaintext_mk)
-                    break  # Decrypted successfully, no need to try other key
-            except Exception as e:
-                logger.error(
-                    f"Error decrypting masterkey with DPAPI_SYSTEM credential. MasterKey UUID: {encrypted_mk.guid}: {e}"
-                )
-                continue
-
         end_time = time.perf_counter()
-        logger.debug(f"_attempt_masterkey_decryption_with_system_credential took {end_time - start_time:.4f} seconds")
+        logger.debug(
+            f"_attempt_masterkey_decryption_with_system_credential decrypted {decrypted_count} masterkeys "
+            f"in {end_time - start_time:.4f} seconds"
+        )
 
     async def _attempt_masterkey_decryption_with_backup_key(
         self, backup_key_guid: UUID, encrypted_masterkeys: list[MasterKey] | None = None
@@ -165,76 +142,21 @@ class AutoDecryptionObserver(DpapiObserver):
         """Attempt to decrypt masterkeys using a backup key."""
 
         try:
-            if encrypted_masterkeys is None:
-                # Filter out SYSTEM masterkeys
-                encrypted_masterkeys = await self.dpapi_manager.get_masterkeys(
-                    encryption_filter=EncryptionFilter.ENCRYPTED_ONLY,
-                    masterkey_type=[MasterKeyType.USER, MasterKeyType.UNKNOWN],
-                )
-
-            if not encrypted_masterkeys:
-                return
-
             backup_keys = await self.dpapi_manager.get_backup_keys(guid=backup_key_guid)
 
             if not backup_keys:
                 return
 
-            new_backup_key = backup_keys[0]
-
-            # Try to decrypt each encrypted masterkey with the new backup key
-            for enc_masterkey in encrypted_masterkeys:
-                if enc_masterkey.is_decrypted:
-                    continue
-
-                if enc_masterkey.encrypted_key_backup is None:
-                    continue
-
-                if enc_masterkey.masterkey_type not in (MasterKeyType.USER, MasterKeyType.UNKNOWN):
-                    continue
-
-                # Parse the encrypted backup key bytes into a BackupKeyRecoveryBlob
-                try:
-                    backup_key_blob = BackupKeyRecoveryBlob.from_bytes(enc_masterkey.encrypted_key_backup)
-                except Exception:
-                    # Skip if we can't parse the backup key blob
-                    continue
-
-                if backup_key_blob.guid_key != new_backup_key.guid:
-                    continue  # This backup key does not match the masterkey's backup key GUID
-
-                masterkey_file = MasterKeyFile(
-                    version=0,
-                    modified=False,
-                    file_path=None,
-                    masterkey_guid=enc_masterkey.guid,
-                    policy=MasterKeyPolicy.NONE,
-                    masterkey_type=enc_masterkey.masterkey_type,
-                    domain_backup_key=backup_key_blob,
-                    raw_bytes=b"",  # Not needed for decryption
-                )
-
-                try:
-                    result = masterkey_file.decrypt(new_backup_key)
-                except (MasterKeyDecryptionError, ValueError):
-                    # Skip masterkeys that can't be decrypted (wrong key, local backup key, etc.)
-                    continue
-
-                if result:
-                    print(
-                        f"Successfully decrypted masterkey {enc_masterkey.guid} with new backup key {new_backup_key.guid}"
-                    )
-                    new_mk = MasterKey(
-                        guid=enc_masterkey.guid,
-                        masterkey_type=enc_masterkey.masterkey_type,
-                        encrypted_key_usercred=enc_masterkey.encrypted_key_usercred,
-                        encrypted_key_backup=enc_masterkey.encrypted_key_backup,
-                        plaintext_key=result.plaintext_key,
-                        plaintext_key_sha1=result.plaintext_key_sha1,
-                        backup_key_guid=result.backup_key_guid,
-                    )
-
-                    await self.dpapi_manager.upsert_masterkey(new_mk)
+            # Only the masterkeys backed up with this key are read from storage
+            decrypted_count = await self.dpapi_manager.decrypt_masterkeys(
+                decrypt_with_backup_key,
+                backup_keys[0],
+                masterkeys=encrypted_masterkeys,
+                backup_key_guid=backup_key_guid,
+                # Filter out SYSTEM masterkeys
+                masterkey_type=[MasterKeyType.USER, MasterKeyType.UNKNOWN],
+            )
+            logger.debug(f"Decrypted {decrypted_count} masterkeys with backup key {backup_key_guid}")
 
         except Exception as e:
             logger.error(f"Auto-decrypt _attempt_masterkey_decryption_with_backup_key error: {e}")
@@ -251,42 +173,10 @@ class AutoDecryptionObserver(DpapiObserver):
 
         # Try to decrypt the masterkey with each backup key
         for backup_key in backup_keys:
-            try:
-                # Parse the encrypted backup key bytes into a BackupKeyRecoveryBlob
-                try:
-                    backup_key_blob = BackupKeyRecoveryBlob.from_bytes(masterkey.encrypted_key_backup)
-                except Exception:
-                    # Skip if we can't parse the backup key blob
-                    continue
-
-                masterkey_file = MasterKeyFile(
-                    version=0,
-                    modified=False,
-                    file_path=None,
-                    masterkey_guid=masterkey.guid,
-                    policy=MasterKeyPolicy.NONE,
-                    masterkey_type=masterkey.masterkey_type,
-                    domain_backup_key=backup_key_blob,
-                    raw_bytes=b"",  # Not needed for decryption
-                )
-
-                result = masterkey_file.decrypt(backup_key)
-            except Exception:
-                logger.debug(f"Failed to decrypt masterkey {masterkey.guid} with backup key {backup_key.guid}")
-                continue
-
-            if result:
-                new_mk = MasterKey(
-                    guid=masterkey.guid,
-                    masterkey_type=masterkey.masterkey_type,
-                    encrypted_key_usercred=masterkey.encrypted_key_usercred,
-                    encrypted_key_backup=masterkey.encrypted_key_backup,
-                    plaintext_key=result.plaintext_key,
-                    plaintext_key_sha1=result.plaintext_key_sha1,
-                    backup_key_guid=result.backup_key_guid,
-                )
-                print(f"Successfully decrypted masterkey {masterkey.guid} with backup key {backup_key.guid}")
-                await self.dpapi_manager.upsert_masterkey(new_mk)
+            decrypted = decrypt_with_backup_key([masterkey], backup_key)
+            if decrypted:
+                logger.debug(f"Successfully decrypted masterkey {masterkey.guid} with backup key {backup_key.guid}")
+                await self.dpapi_manager.upsert_masterkey(decrypted[0])
                 break
 
         end_time = time.perf_counter()
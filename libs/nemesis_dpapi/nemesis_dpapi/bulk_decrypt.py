@@ -0,0 +1,151 @@
+"""Masterkey decryption on a process pool.
+
+Decrypting a masterkey with a domain backup key (RSA) or a user credential (PBKDF2/HMAC)
+is CPU-bound. When a backup key or credential arrives that may unlock thousands of
+masterkeys, the candidates are decrypted in chunks on a pool of worker processes so
+the event loop of the service stays responsive.
+
+Workers are spawned (not forked, the parent runs Dapr/gRPC threads). The decryption
+functions only take and return picklable models.
+"""
+
+import asyncio
+import math
+import multiprocessing
+import os
+from collections.abc import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from logging import getLogger
+from typing import Any
+
+from .core import BackupKeyRecoveryBlob, MasterKey, MasterKeyFile, MasterKeyPolicy
+from .exceptions import DpapiError
+from .keys import DomainBackupKey, MasterKeyEncryptionKey
+
+logger = getLogger(__name__)
+
+# Worker processes used for masterkey decryption, 0 decrypts in a thread of the calling process
+DPAPI_DECRYPT_PROCESSES = int(os.getenv("DPAPI_DECRYPT_PROCESSES", os.cpu_count() or 1))
+# Encrypted masterkeys read from storage and decrypted at a time
+DPAPI_MASTERKEY_BATCH_SIZE = int(os.getenv("DPAPI_MASTERKEY_BATCH_SIZE", 1000))
+
+MasterKeyDecryptor = Callable[[Sequence[MasterKey], Any], list[MasterKey]]
+
+
+def decrypt_with_backup_key(masterkeys: Sequence[MasterKey], backup_key: DomainBackupKey) -> list[MasterKey]:
+    """Decrypt the masterkeys that were backed up with a domain backup key.
+
+    Returns:
+        The decrypted masterkeys, masterkeys the backup key can't decrypt are left out
+    """
+    decrypted = []
+    for masterkey in masterkeys:
+        if masterkey.is_decrypted or masterkey.encrypted_key_backup is None:
+            continue
+
+        try:
+            backup_key_blob = BackupKeyRecoveryBlob.from_bytes(masterkey.encrypted_key_backup)
+        except Exception:
+            # Skip if we can't parse the backup key blob
+            continue
+
+        if backup_key_blob.guid_key != backup_key.guid:
+            continue  # This backup key does not match the masterkey's backup key GUID
+
+        masterkey_file = MasterKeyFile(
+            version=0,
+            modified=False,
+            file_path=None,
+            masterkey_guid=masterkey.guid,
+            policy=MasterKeyPolicy.NONE,
+            masterkey_type=masterkey.masterkey_type,
+            domain_backup_key=backup_key_blob,
+            raw_bytes=b"",  # Not needed for decryption
+        )
+
+        try:
+            result = masterkey_file.decrypt(backup_key)
+        except (DpapiError, ValueError):
+            # Skip masterkeys that can't be decrypted (wrong key, local backup key, etc.)
+            continue
+
+        decrypted.append(
+            masterkey.model_copy(
+                update={
+                    "plaintext_key": result.plaintext_key,
+                    "plaintext_key_sha1": result.plaintext_key_sha1,
+                    "backup_key_guid": result.backup_key_guid,
+                }
+            )
+        )
+
+    return decrypted
+
+
+def decrypt_with_encryption_keys(
+    masterkeys: Sequence[MasterKey], mk_keys: Sequence[MasterKeyEncryptionKey]
+) -> list[MasterKey]:
+    """Decrypt masterkeys with the first of the masterkey encryption keys that works.
+
+    Returns:
+        The decrypted masterkeys, masterkeys none of the keys can decrypt are left out
+    """
+    decrypted = []
+    for masterkey in masterkeys:
+        if masterkey.is_decrypted or not masterkey.encrypted_key_usercred:
+            continue
+
+        for mk_key in mk_keys:
+            try:
+                decrypted.append(masterkey.decrypt(mk_key))
+                break  # We decrypted it, no need to try other keys
+            except Exception as e:
+                logger.debug(f"Failed to decrypt master key {masterkey.guid}: {e}")
+
+    return decrypted
+
+
+class MasterKeyDecryptionPool:
+    """Runs masterkey decryptors over batches of masterkeys on worker processes.
+
+    The process pool is started on first use.
+    """
+
+    def __init__(self, processes: int = DPAPI_DECRYPT_PROCESSES):
+        self.processes = max(0, processes)
+        self._executor: ProcessPoolExecutor | None = None
+
+    async def decrypt(
+        self, decryptor: MasterKeyDecryptor, masterkeys: Sequence[MasterKey], key: Any
+    ) -> list[MasterKey]:
+        """Decrypt masterkeys with `decryptor(masterkeys, key)`, split across the worker processes."""
+        if not masterkeys:
+            return []
+
+        if self.processes == 0:
+            return await asyncio.to_thread(decryptor, masterkeys, key)
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes, mp_context=multiprocessing.get_context("spawn")
+            )
+
+        loop = asyncio.get_running_loop()
+        chunk_size = math.ceil(len(masterkeys) / self.processes)
+        chunks = [masterkeys[start : start + chunk_size] for start in range(0, len(masterkeys), chunk_size)]
+        try:
+            results = await asyncio.gather(
+                *(loop.run_in_executor(self._executor, decryptor, list(chunk), key) for chunk in chunks)
+            )
+        except BrokenProcessPool:
+            # A worker died, start a new pool for the next batch
+            self.shutdown()
+            raise
+
+        return [masterkey for result in results for masterkey in result]
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -39,6 +39,7 @@ _PATTERN_USER_FULL = re.compile(
     r"/users/.+/appdata/roaming/microsoft/protect/s-1-5-21-[\d-]+/[0-9a-f-]+", re.IGNORECASE
 )
 _PATTERN_USER_FALLBACK = re.compile(r"/users/.+/appdata/roaming/microsoft/protect/", re.IGNORECASE)
+_PATTERN_PROTECT_SID = re.compile(r"/microsoft/protect/(s-1-\d+(?:-\d+)+)/", re.IGNORECASE)
 
 
 class BaseModel(PydanticBaseModel):
@@ -148,6 +149,20 @@ class MasterKeyType(StrEnum):
         return cls.UNKNOWN
 
 
+def user_sid_from_path(path: str | None) -> str | None:
+    """Extract the SID of the account a masterkey file belongs to from its path.
+
+    Examples:
+        - /C:/Users/username/AppData/Roaming/Microsoft/Protect/S-1-5-21-.../{GUID} -> S-1-5-21-...
+        - /C:/Windows/System32/Microsoft/Protect/S-1-5-18/User/{GUID} -> S-1-5-18
+    """
+    if not path:
+        return None
+
+    match = _PATTERN_PROTECT_SID.search(path)
+    return match.group(1).upper() if match else None
+
+
 class MasterKey(BaseModel):
     """Represents a DPAPI masterkey.
 
@@ -159,6 +174,8 @@ class MasterKey(BaseModel):
         plaintext_key: Decrypted masterkey data.
         plaintext_key_sha1: SHA1 hash of the plaintext masterkey. AKA the Master Key (MK) Encryption Key.
         masterkey_type: Type of user account this masterkey belongs to.
+        user_sid: SID of the account this masterkey belongs to, if known. Only used to narrow
+            down the masterkeys a user credential is tried against.
     """
 
     guid: UUID
@@ -168,6 +185,7 @@ class MasterKey(BaseModel):
     plaintext_key: bytes | None = None
     plaintext_key_sha1: bytes | None = None
     backup_key_guid: UUID | None = None
+    user_sid: str | None = None
 
     @model_validator(mode="before")
     @classmethod
@@ -212,6 +230,7 @@ class MasterKey(BaseModel):
             f"  plaintext_key_sha1: {self.plaintext_key_sha1.hex() if self.plaintext_key_sha1 else None}",
             f"  backup_key_guid: {self.backup_key_guid}",
             f"  masterkey_type: {self.masterkey_type.value}",
+            f"  user_sid: {self.user_sid}",
         ]
         return "\r\n".join(lines)
 
@@ -2,7 +2,10 @@
 
 from __future__ import annotations
 
+import os
 import struct
+import threading
+from collections import OrderedDict
 from enum import Enum
 from typing import TYPE_CHECKING
 from uuid import UUID  # noqa: TC003 - need for pydantic
@@ -22,6 +25,9 @@ PVK_FILE_VERSION_0 = 0
 PVK_NO_ENCRYPT = 0
 MAX_PVK_FILE_LEN = 4096
 
+# Credentials whose derived masterkey encryption keys are kept in memory (0 disables the cache)
+DPAPI_DERIVED_KEY_CACHE_SIZE = int(os.getenv("DPAPI_DERIVED_KEY_CACHE_SIZE", 256))
+
 
 class PvkFileHeader(BaseModel):
     """PVK file header structure.
@@ -502,3 +508,136 @@ class DpapiSystemCredential(BaseModel):
             raise ValueError(f"Unexpected LSA secret version: {version}, expected 1")
 
         return cls(user_key=user_key, machine_key=machine_key)
+
+
+def credential_fingerprint(
+    credential: Password | NtlmHash | Sha1Hash | Pbkdf2Hash | DpapiSystemCredential, user_sid: Sid | None = None
+) -> str:
+    """SHA256 fingerprint of a credential and the account SID it is used for.
+
+    Identifies a credential without keeping the secret itself, e.g. as a cache key.
+    """
+    if isinstance(credential, DpapiSystemCredential):
+        value = credential.machine_key + credential.user_key
+    elif isinstance(credential, Password):
+        value = credential.value.encode("utf-16le")
+    else:
+        value = credential.value
+
+    data = b"\0".join([type(credential).__name__.encode(), value, (user_sid or "").encode()])
+    return SHA256.new(data).hexdigest()
+
+
+def mk_keys_fingerprint(mk_keys: list[MasterKeyEncryptionKey]) -> str:
+    """SHA256 fingerprint of a set of masterkey encryption keys, whatever their order.
+
+    A password and its NTLM hash don't share a fingerprint: the password also derives
+    a key from its SHA1 hash.
+    """
+    return SHA256.new(b"".join(sorted(mk_key.key.value for mk_key in mk_keys))).hexdigest()
+
+
+def derive_mk_encryption_keys(
+    credential: Password | NtlmHash | Sha1Hash | Pbkdf2Hash | DpapiSystemCredential, user_sid: Sid | None = None
+) -> list[MasterKeyEncryptionKey]:
+    """Derive the masterkey encryption keys to try for a credential.
+
+    Args:
+        credential: User credential or DPAPI_SYSTEM credential
+        user_sid: SID of the account. Required for user credentials, ignored for DPAPI_SYSTEM.
+
+    Returns:
+        The masterkey encryption keys, in the order they should be tried
+    """
+    if isinstance(credential, DpapiSystemCredential):
+        # Try the machine key first, then the user key
+        return [
+            MasterKeyEncryptionKey.from_dpapi_system_cred(credential.machine_key),
+            MasterKeyEncryptionKey.from_dpapi_system_cred(credential.user_key),
+        ]
+
+    if user_sid is None:
+        raise ValueError("user_sid is required to derive keys from a user credential")
+
+    if isinstance(credential, Password):
+        cred_keys = [
+            CredKey.from_password(credential.value, CredKeyHashType.PBKDF2, user_sid),
+            CredKey.from_password(credential.value, CredKeyHashType.SHA1),
+            CredKey.from_password(credential.value, CredKeyHashType.NTLM),
+        ]
+    elif isinstance(credential, NtlmHash):
+        cred_keys = [
+            CredKey.from_ntlm(credential.value, CredKeyHashType.PBKDF2, user_sid),
+            CredKey.from_ntlm(credential.value, CredKeyHashType.NTLM),
+        ]
+    elif isinstance(credential, Sha1Hash):
+        cred_keys = [CredKey.from_sha1(credential.value)]
+    elif isinstance(credential, Pbkdf2Hash):
+        cred_keys = [CredKey.from_pbkdf2(credential.value)]
+    else:
+        raise ValueError(f"Unsupported credential type: {type(credential).__name__}")
+
+    return [MasterKeyEncryptionKey.from_cred_key(cred_key, user_sid) for cred_key in cred_keys]
+
+
+class DerivedKeyCache:
+    """Bounded LRU cache of the masterkey encryption keys derived from credentials.
+
+    Deriving the keys of a password or NTLM hash runs PBKDF2, and the same credential is
+    often submitted again for the same account. Entries are keyed by credential_fingerprint()
+    so no secret is kept as a key, and the key material of evicted or cleared entries is
+    overwritten with zeros. Callers get their own MasterKeyEncryptionKey copies.
+    """
+
+    def __init__(self, max_size: int = DPAPI_DERIVED_KEY_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, list[bytearray]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self,
+        credential: Password | NtlmHash | Sha1Hash | Pbkdf2Hash | DpapiSystemCredential,
+        user_sid: Sid | None = None,
+    ) -> list[MasterKeyEncryptionKey]:
+        """Return the masterkey encryption keys of a credential, deriving them on a cache miss."""
+        fingerprint = credential_fingerprint(credential, user_sid)
+
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is not None:
+                self._entries.move_to_end(fingerprint)
+                return [MasterKeyEncryptionKey(key=Sha1Hash(value=bytes(key))) for key in entry]
+
+        mk_keys = derive_mk_encryption_keys(credential, user_sid)
+        if self.max_size <= 0:
+            return mk_keys
+
+        with self._lock:
+            replaced = self._entries.pop(fingerprint, None)
+            if replaced is not None:
+                _zeroize(replaced)
+            self._entries[fingerprint] = [bytearray(mk_key.key.value) for mk_key in mk_keys]
+            while len(self._entries) > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                _zeroize(evicted)
+
+        return mk_keys
+
+    def clear(self) -> None:
+        """Drop all entries, zeroizing their key material."""
+        with self._lock:
+            for entry in self._entries.values():
+                _zeroize(entry)
+            self._entries.clear()
+
+
+def _zeroize(keys: list[bytearray]) -> None:
+    for key in keys:
+        key[:] = bytes(len(key))
+
+
+# Shared by the credential submission endpoint and auto-decryption
+derived_key_cache = DerivedKeyCache()
@@ -1,14 +1,23 @@
 """Main DPAPI manager class."""
 
-from typing import TYPE_CHECKING, Self
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Sequence
+from typing import TYPE_CHECKING, Any, Self
 from uuid import UUID
 
 import asyncpg
 
 from .auto_decrypt import AutoDecryptionObserver
+from .bulk_decrypt import (
+    DPAPI_DECRYPT_PROCESSES,
+    DPAPI_MASTERKEY_BATCH_SIZE,
+    MasterKeyDecryptionPool,
+    MasterKeyDecryptor,
+)
 from .core import Blob, MasterKey, MasterKeyType
 from .eventing import (
     DaprDpapiEventPublisher,
+    DpapiEvent,
     DpapiObserver,
     InMemoryPublisher,
     NewDomainBackupKeyEvent,
@@ -21,11 +30,13 @@ from .keys import DomainBackupKey, DpapiSystemCredential
 from .storage_in_memory import (
     InMemoryDomainBackupKeyRepository,
     InMemoryDpapiSystemCredentialRepository,
+    InMemoryMasterKeyAttemptRepository,
     InMemoryMasterKeyRepository,
 )
 from .storage_postgres import (
     PostgresDomainBackupKeyRepository,
     PostgresDpapiSystemCredentialRepository,
+    PostgresMasterKeyAttemptRepository,
     PostgresMasterKeyRepository,
 )
 from .validation import check_write_once_conflicts, validate_and_calculate_sha1, validate_no_empty_string
@@ -34,12 +45,27 @@ if TYPE_CHECKING:
     from .repositories import (
         DomainBackupKeyRepository,
         DpapiSystemCredentialRepository,
+        MasterKeyAttemptRepository,
         MasterKeyRepository,
     )
 
 from .protocols import DpapiManagerProtocol
 from .repositories import EncryptionFilter
 
+# Number of decrypted masterkeys kept in memory by default
+MASTERKEY_CACHE_SIZE = 1024
+
+
+class MasterKeyCacheInvalidator(DpapiObserver):
+    """Drops cached masterkeys when a new plaintext version of them is published."""
+
+    def __init__(self, dpapi_manager: "DpapiManager"):
+        self.dpapi_manager = dpapi_manager
+
+    async def update(self, event: DpapiEvent) -> None:
+        if isinstance(event, NewPlaintextMasterKeyEvent):
+            self.dpapi_manager.invalidate_masterkey(event.masterkey_guid)
+
 
 class DpapiManager(DpapiManagerProtocol):
     """Main DPAPI manager for handling masterkeys, backup keys, and blob decryption."""
@@ -49,6 +75,8 @@ class DpapiManager(DpapiManagerProtocol):
         storage_backend: str | asyncpg.Pool = "memory",
         auto_decrypt: bool = True,
         publisher: DaprDpapiEventPublisher | None = None,
+        masterkey_cache_size: int = MASTERKEY_CACHE_SIZE,
+        decrypt_processes: int = DPAPI_DECRYPT_PROCESSES,
     ) -> None:
         """Initialize DPAPI manager with specified storage backend.
 
@@ -56,6 +84,10 @@ class DpapiManager(DpapiManagerProtocol):
             storage_backend: Either "memory" for in-memory storage or an asyncpg.Pool object
                            for PostgreSQL database storage.
             auto_decrypt: Enable automatic masterkey decryption as new domain backup keys are added.
+            masterkey_cache_size: Maximum number of decrypted masterkeys kept in memory for blob
+                           decryption (0 disables the cache).
+            decrypt_processes: Worker processes used to decrypt masterkeys in bulk when a backup key
+                           or credential arrives (0 decrypts in a thread instead).
         """
         super().__init__()
         self._storage_backend = storage_backend
@@ -66,6 +98,7 @@ class DpapiManager(DpapiManagerProtocol):
         self._masterkey_repo: MasterKeyRepository
         self._backup_key_repo: DomainBackupKeyRepository
         self._dpapi_system_cred_repo: DpapiSystemCredentialRepository
+        self._attempt_repo: MasterKeyAttemptRepository
         self._pg_pool: asyncpg.Pool | None = None
 
         if publisher is None:
@@ -76,12 +109,21 @@ class DpapiManager(DpapiManagerProtocol):
         # Auto-decryption observer will be set up during async initialization
         self._auto_decrypt_observer: AutoDecryptionObserver | None = None
 
+        # LRU cache of decrypted masterkeys by GUID. Only decrypted masterkeys are cached,
+        # so keys that are missing or still encrypted are looked up again on the next blob.
+        self._masterkey_cache: OrderedDict[UUID, MasterKey] = OrderedDict()
+        self._masterkey_cache_size = masterkey_cache_size
+        self._cache_invalidator: MasterKeyCacheInvalidator | None = None
+
+        self._decryption_pool = MasterKeyDecryptionPool(decrypt_processes)
+
     async def _initialize_storage(self) -> None:
         """Initialize storage repositories based on backend type."""
         if self._storage_backend == "memory":
             self._masterkey_repo = InMemoryMasterKeyRepository()
             self._backup_key_repo = InMemoryDomainBackupKeyRepository()
             self._dpapi_system_cred_repo = InMemoryDpapiSystemCredentialRepository()
+            self._attempt_repo = InMemoryMasterKeyAttemptRepository()
         elif isinstance(self._storage_backend, asyncpg.Pool):
             # Use provided PostgreSQL connection pool
             self._pg_pool = self._storage_backend
@@ -89,6 +131,7 @@ class DpapiManager(DpapiManagerProtocol):
             self._masterkey_repo = PostgresMasterKeyRepository(self._pg_pool)
             self._backup_key_repo = PostgresDomainBackupKeyRepository(self._pg_pool)
             self._dpapi_system_cred_repo = PostgresDpapiSystemCredentialRepository(self._pg_pool)
+            self._attempt_repo = PostgresMasterKeyAttemptRepository(self._pg_pool)
         else:
             raise ValueError(f"Unsupported storage backend: {self._storage_backend}. Must be 'memory' or asyncpg.Pool")
 
@@ -97,6 +140,10 @@ class DpapiManager(DpapiManagerProtocol):
             self._auto_decrypt_observer = AutoDecryptionObserver(self)
             await self._publisher.register_subscriber(self._auto_decrypt_observer)
 
+        if self._masterkey_cache_size > 0 and self._cache_invalidator is None:
+            self._cache_invalidator = MasterKeyCacheInvalidator(self)
+            await self._publisher.register_subscriber(self._cache_invalidator)
+
         self._initialized = True
 
     async def __aenter__(self) -> Self:
@@ -106,7 +153,7 @@ class DpapiManager(DpapiManagerProtocol):
 
     async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
         """Async context manager exit."""
-        pass
+        self._decryption_pool.shutdown()
 
     async def subscribe(self, observer: DpapiObserver) -> None:
         """Subscribe an observer to DPAPI events.
@@ -171,6 +218,7 @@ class DpapiManager(DpapiManagerProtocol):
 
         # Call repository to perform the upsert (repository layer also enforces write-once at SQL level)
         await self._masterkey_repo.upsert_masterkey(new_masterkey)
+        self.invalidate_masterkey(new_masterkey.guid)
 
         # Publish appropriate event based on what was added
         if new_masterkey.plaintext_key or new_masterkey.plaintext_key_sha1:
@@ -178,6 +226,101 @@ class DpapiManager(DpapiManagerProtocol):
         elif new_masterkey.encrypted_key_usercred or new_masterkey.encrypted_key_backup:
             await self._publisher.publish_event(NewEncryptedMasterKeyEvent(masterkey_guid=new_masterkey.guid))
 
+    async def upsert_masterkeys(self, masterkeys: Sequence[MasterKey]) -> None:
+        """Add or update many masterkeys in one storage round trip.
+
+        Meant for masterkeys decrypted in bulk. Write-once semantics are enforced by the
+        storage layer only, there is no per-key check against the existing records.
+
+        Args:
+            masterkeys: MasterKey objects to add or update
+        """
+        if not self._initialized:
+            await self._initialize_storage()
+
+        validated = []
+        for masterkey in masterkeys:
+            validated_sha1 = validate_and_calculate_sha1(masterkey.plaintext_key, masterkey.plaintext_key_sha1)
+            if validated_sha1 != masterkey.plaintext_key_sha1:
+                masterkey = masterkey.model_copy(update={"plaintext_key_sha1": validated_sha1})
+            validated.append(masterkey)
+
+        await self._masterkey_repo.upsert_masterkeys(validated)
+
+        for masterkey in validated:
+            self.invalidate_masterkey(masterkey.guid)
+            if masterkey.plaintext_key or masterkey.plaintext_key_sha1:
+                await self._publisher.publish_event(NewPlaintextMasterKeyEvent(masterkey_guid=masterkey.guid))
+            elif masterkey.encrypted_key_usercred or masterkey.encrypted_key_backup:
+                await self._publisher.publish_event(NewEncryptedMasterKeyEvent(masterkey_guid=masterkey.guid))
+
+    async def decrypt_masterkeys(
+        self,
+        decryptor: MasterKeyDecryptor,
+        key: Any,
+        masterkeys: Sequence[MasterKey] | None = None,
+        backup_key_guid: UUID | None = None,
+        masterkey_type: list[MasterKeyType] | None = None,
+        user_sid: str | None = None,
+        batch_size: int = DPAPI_MASTERKEY_BATCH_SIZE,
+        attempt_fingerprint: str | None = None,
+    ) -> int:
+        """Decrypt encrypted masterkeys on the decryption process pool and store the results.
+
+        Args:
+            decryptor: Picklable function decrypting a list of masterkeys with `key`, see bulk_decrypt
+            key: Backup key or encryption keys passed to the decryptor
+            masterkeys: Masterkeys to decrypt. If None, the encrypted masterkeys matching the
+                filters are streamed from storage in batches.
+            backup_key_guid: Only decrypt masterkeys backed up with this backup key
+            masterkey_type: Only decrypt masterkeys of these account types
+            user_sid: Only decrypt masterkeys of this account (or of an unknown account)
+            batch_size: Number of masterkeys read, decrypted and stored at a time
+            attempt_fingerprint: Fingerprint of the encryption keys (see keys.mk_keys_fingerprint).
+                If set, masterkeys these keys already failed to decrypt are skipped, and the
+                masterkeys with user credential data they fail to decrypt are recorded.
+
+        Returns:
+            The number of decrypted masterkeys
+        """
+        if not self._initialized:
+            await self._initialize_storage()
+
+        if masterkeys is not None:
+            batches = _batches(masterkeys, batch_size)
+        else:
+            batches = self._masterkey_repo.iter_masterkeys(
+                encryption_filter=EncryptionFilter.ENCRYPTED_ONLY,
+                backup_key_guid=backup_key_guid,
+                masterkey_type=masterkey_type,
+                user_sid=user_sid,
+                batch_size=batch_size,
+            )
+
+        decrypted_count = 0
+        async for batch in batches:
+            if attempt_fingerprint is not None:
+                attempted = await self._attempt_repo.get_attempted(attempt_fingerprint, [mk.guid for mk in batch])
+                batch = [masterkey for masterkey in batch if masterkey.guid not in attempted]
+
+            decrypted = await self._decryption_pool.decrypt(decryptor, batch, key)
+            if decrypted:
+                await self.upsert_masterkeys(decrypted)
+                decrypted_count += len(decrypted)
+
+            if attempt_fingerprint is not None:
+                decrypted_guids = {masterkey.guid for masterkey in decrypted}
+                failed = [
+                    masterkey.guid
+                    for masterkey in batch
+                    if masterkey.encrypted_key_usercred
+                    and not masterkey.is_decrypted
+                    and masterkey.guid not in decrypted_guids
+                ]
+                await self._attempt_repo.add_attempts(attempt_fingerprint, failed)
+
+        return decrypted_count
+
     async def get_masterkeys(
         self,
         guid: UUID | None = None,
@@ -279,6 +422,41 @@ class DpapiManager(DpapiManagerProtocol):
 
         return await self._dpapi_system_cred_repo.get_all_credentials()
 
+    def invalidate_masterkey(self, guid: UUID) -> None:
+        """Drop a masterkey from the decrypted masterkey cache.
+
+        Args:
+            guid: GUID of the masterkey to drop
+        """
+        self._masterkey_cache.pop(guid, None)
+
+    async def _get_decrypted_masterkey(self, guid: UUID) -> MasterKey:
+        """Get a decrypted masterkey, from the cache if possible.
+
+        Raises:
+            MasterKeyNotFoundError: If the masterkey is not available
+            MasterKeyNotDecryptedError: If the masterkey exists but is not decrypted
+        """
+        masterkey = self._masterkey_cache.get(guid)
+        if masterkey is not None:
+            self._masterkey_cache.move_to_end(guid)
+            return masterkey
+
+        masterkeys = await self._masterkey_repo.get_masterkeys(guid=guid)
+        if not masterkeys:
+            raise MasterKeyNotFoundError(guid)
+
+        masterkey = masterkeys[0]
+        if not masterkey.is_decrypted:
+            raise MasterKeyNotDecryptedError(guid)
+
+        if self._masterkey_cache_size > 0:
+            self._masterkey_cache[guid] = masterkey
+            if len(self._masterkey_cache) > self._masterkey_cache_size:
+                self._masterkey_cache.popitem(last=False)
+
+        return masterkey
+
     async def decrypt_blob(self, blob: Blob, entropy: bytes | None = None) -> bytes:
         """Decrypt a DPAPI blob using available masterkeys.
 
@@ -296,13 +474,45 @@ class DpapiManager(DpapiManagerProtocol):
         if not self._initialized:
             await self._initialize_storage()
 
-        # Find the required masterkey
-        masterkeys = await self._masterkey_repo.get_masterkeys(guid=blob.masterkey_guid)
-        if not masterkeys:
-            raise MasterKeyNotFoundError(blob.masterkey_guid)
+        masterkey = await self._get_decrypted_masterkey(blob.masterkey_guid)
+        return blob.decrypt(masterkey, entropy)
 
-        masterkey = masterkeys[0]
-        if not masterkey.is_decrypted:
-            raise MasterKeyNotDecryptedError(blob.masterkey_guid)
+    async def decrypt_blobs(self, blobs: Sequence[Blob], entropy: bytes | None = None) -> list[bytes | Exception]:
+        """Decrypt many DPAPI blobs, looking up each distinct masterkey once.
 
-        return blob.decrypt(masterkey, entropy)
+        Args:
+            blobs: DPAPI blobs to decrypt
+            entropy: Optional entropy used for all blobs
+
+        Returns:
+            One entry per blob, in order: the decrypted data, or the exception decrypt_blob
+            would have raised for it
+        """
+        if not self._initialized:
+            await self._initialize_storage()
+
+        blobs_by_guid: dict[UUID, list[int]] = {}
+        for index, blob in enumerate(blobs):
+            blobs_by_guid.setdefault(blob.masterkey_guid, []).append(index)
+
+        results: list[bytes | Exception] = [b""] * len(blobs)
+        for guid, indexes in blobs_by_guid.items():
+            try:
+                masterkey = await self._get_decrypted_masterkey(guid)
+            except Exception as e:
+                for index in indexes:
+                    results[index] = e
+                continue
+
+            for index in indexes:
+                try:
+                    results[index] = blobs[index].decrypt(masterkey, entropy)
+                except Exception as e:
+                    results[index] = e
+
+        return results
+
+
+async def _batches(masterkeys: Sequence[MasterKey], batch_size: int) -> AsyncIterator[list[MasterKey]]:
+    for start in range(0, len(masterkeys), batch_size):
+        yield list(masterkeys[start : start + batch_size])
@@ -3,10 +3,18 @@ from time import perf_counter
 
 from common.logger import get_logger
 
+from .bulk_decrypt import decrypt_with_encryption_keys
 from .core import MasterKeyType
-from .exceptions import MasterKeyDecryptionError
-from .keys import CredKey, CredKeyHashType, MasterKeyEncryptionKey, NtlmHash, Password, Pbkdf2Hash, Sha1Hash
-from .manager import DpapiManager, EncryptionFilter
+from .keys import (
+    MasterKeyEncryptionKey,
+    NtlmHash,
+    Password,
+    Pbkdf2Hash,
+    Sha1Hash,
+    derived_key_cache,
+    mk_keys_fingerprint,
+)
+from .manager import DpapiManager
 from .types import Sid
 
 logger = get_logger(__name__)
@@ -26,9 +34,10 @@ class MasterKeyDecryptorService:
     ) -> dict:
         """Handle password, NTLM hash, and cred key credential submissions."""
 
-        mk_keys_to_try = self._generate_mk_encryption_keys(credential, account_sid)
+        # Re-submitting a credential for the same account reuses the derived keys
+        mk_keys_to_try = derived_key_cache.get(credential, account_sid)
 
-        task = asyncio.create_task(self._decrypt_masterkeys_background(mk_keys_to_try, type(credential)))
+        task = asyncio.create_task(self._decrypt_masterkeys_background(mk_keys_to_try, type(credential), account_sid))
         self._background_tasks.add(task)
         task.add_done_callback(self._background_tasks.discard)
 
@@ -39,42 +48,30 @@ class MasterKeyDecryptorService:
         }
 
     async def _decrypt_masterkeys_background(
-        self, mk_keys_to_try: list[MasterKeyEncryptionKey], credential_type: type
+        self, mk_keys_to_try: list[MasterKeyEncryptionKey], credential_type: type, account_sid: Sid
     ) -> None:
-        """Perform master key decryption attempts in background."""
+        """Perform master key decryption attempts in background.
+
+        The encryption keys are derived from the account SID, so only the masterkeys of
+        that account (or of an unknown account) are tried.
+        """
         start_time = perf_counter()
         try:
             logger.info(f"Starting background decryption for credential type: {credential_type.__name__}")
 
-            encrypted_masterkeys = await self.dpapi_manager.get_masterkeys(
-                encryption_filter=EncryptionFilter.ENCRYPTED_ONLY,
+            decrypted_count = await self.dpapi_manager.decrypt_masterkeys(
+                decrypt_with_encryption_keys,
+                mk_keys_to_try,
                 masterkey_type=[MasterKeyType.USER, MasterKeyType.UNKNOWN],
+                user_sid=account_sid,
+                # Skip the masterkeys these keys already failed to decrypt
+                attempt_fingerprint=mk_keys_fingerprint(mk_keys_to_try),
             )
 
-            decrypted_count = 0
-
-            logger.info(f"Attempting to decrypt {len(encrypted_masterkeys)} encrypted master keys")
-            for masterkey in encrypted_masterkeys:
-                if not masterkey.encrypted_key_usercred:
-                    continue
-
-                for mk_key in mk_keys_to_try:
-                    try:
-                        plaintext_mk = masterkey.decrypt(mk_key)
-                        await self.dpapi_manager.upsert_masterkey(plaintext_mk)
-                        decrypted_count += 1
-                        logger.info(
-                            f"Successfully decrypted master key {masterkey.guid} with {credential_type.__name__}"
-                        )
-                        break  # We decrypted it, no need to try other keys
-                    except MasterKeyDecryptionError as e:
-                        logger.debug(f"Failed to decrypt master key: {e}")
-                        continue
-
             # TODO: Notify the user that new master keys have been decrypted
             elapsed_time = perf_counter() - start_time
             logger.info(
-                f"Background decryption completed. Decrypted {decrypted_count}/({len(encrypted_masterkeys)}) master keys in {elapsed_time:.2f} seconds"
+                f"Background decryption completed. Decrypted {decrypted_count} master keys of {account_sid} with {credential_type.__name__} in {elapsed_time:.2f} seconds"
             )
 
         except Exception as e:
@@ -83,38 +80,6 @@ class MasterKeyDecryptorService:
                 f"Error in background masterkey decryption task. Cred type: {credential_type.__name__}. Error: {e}. Elapsed time: {elapsed_time:.2f} seconds"
             )
 
-    def _generate_mk_encryption_keys(
-        self,
-        cred: Password | NtlmHash | Sha1Hash | Pbkdf2Hash,
-        account_sid: Sid,
-    ) -> list[MasterKeyEncryptionKey]:
-        """Generate MasterKeyEncryptionKey objects based on the credential type."""
-        cred_keys = []
-
-        if isinstance(cred, Password):
-            cred_keys = [
-                CredKey.from_password(cred.value, CredKeyHashType.PBKDF2, account_sid),
-                CredKey.from_password(cred.value, CredKeyHashType.SHA1),
-                CredKey.from_password(cred.value, CredKeyHashType.NTLM),
-            ]
-        elif isinstance(cred, NtlmHash):
-            cred_keys = [
-                CredKey.from_ntlm(cred.value, CredKeyHashType.PBKDF2, account_sid),
-                CredKey.from_ntlm(cred.value, CredKeyHashType.NTLM),
-            ]
-        elif isinstance(cred, Sha1Hash):
-            cred_keys = [
-                CredKey.from_sha1(cred.value),
-            ]
-        elif isinstance(cred, Pbkdf2Hash):
-            cred_keys = [
-                CredKey.from_pbkdf2(cred.value),
-            ]
-        else:
-            raise ValueError(f"Unsupported credential type: {cred.type}")
-
-        return [MasterKeyEncryptionKey.from_cred_key(cred, account_sid) for cred in cred_keys]
-
     async def shutdown(self):
         """Cancel all background tasks on shutdown."""
         if self._background_tasks:
@@ -1,5 +1,6 @@
 """Null DPAPI manager implementation."""
 
+from collections.abc import Sequence
 from typing import Any, Self
 from uuid import UUID
 
@@ -25,6 +26,10 @@ class NullDpapiManager(DpapiManagerProtocol):
         """Add or update a masterkey (does nothing)."""
         pass
 
+    async def upsert_masterkeys(self, masterkeys: Sequence[MasterKey]) -> None:
+        """Add or update many masterkeys (does nothing)."""
+        pass
+
     async def upsert_domain_backup_key(self, backup_key: DomainBackupKey) -> int:
         """Add or update a domain backup key (does nothing)."""
         return 0
@@ -37,6 +42,10 @@ class NullDpapiManager(DpapiManagerProtocol):
         """Decrypt a DPAPI blob (always fails)."""
         raise MasterKeyNotFoundError(blob.masterkey_guid)
 
+    async def decrypt_blobs(self, blobs: Sequence[Blob]) -> list[bytes | Exception]:
+        """Decrypt many DPAPI blobs (always fails)."""
+        return [MasterKeyNotFoundError(blob.masterkey_guid) for blob in blobs]
+
     async def get_masterkeys(
         self,
         guid: UUID | None = None,
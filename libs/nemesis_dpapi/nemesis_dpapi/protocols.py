@@ -1,5 +1,6 @@
 """Protocol definitions for DPAPI components."""
 
+from collections.abc import Sequence
 from typing import Protocol, Self, runtime_checkable
 from uuid import UUID
 
@@ -24,6 +25,10 @@ class DpapiManagerProtocol(Protocol):
         """Add or update a masterkey (encrypted or plaintext)."""
         ...
 
+    async def upsert_masterkeys(self, masterkeys: Sequence[MasterKey]) -> None:
+        """Add or update many masterkeys."""
+        ...
+
     async def upsert_domain_backup_key(self, backup_key: DomainBackupKey) -> int:
         """Add or update a domain backup key."""
         ...
@@ -36,6 +41,10 @@ class DpapiManagerProtocol(Protocol):
         """Decrypt a DPAPI blob using available masterkeys."""
         ...
 
+    async def decrypt_blobs(self, blobs: Sequence[Blob]) -> list[bytes | Exception]:
+        """Decrypt many DPAPI blobs, returning the data or the error of each."""
+        ...
+
     async def get_masterkeys(
         self,
         guid: UUID | None = None,
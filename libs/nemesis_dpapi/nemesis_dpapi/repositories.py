@@ -1,5 +1,6 @@
 """Repository interfaces and implementations for DPAPI storage."""
 
+from collections.abc import AsyncIterator, Sequence
 from enum import Enum
 from typing import Protocol
 from uuid import UUID
@@ -43,6 +44,32 @@ class MasterKeyRepository(Protocol):
         """
         ...
 
+    async def upsert_masterkeys(self, masterkeys: Sequence[MasterKey]) -> None:
+        """Add or update many masterkeys in storage, with the write-once semantics of upsert_masterkey."""
+        ...
+
+    def iter_masterkeys(
+        self,
+        encryption_filter: EncryptionFilter = EncryptionFilter.ALL,
+        backup_key_guid: UUID | None = None,
+        masterkey_type: list[MasterKeyType] | None = None,
+        user_sid: str | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[MasterKey]]:
+        """Stream filtered masterkeys in batches.
+
+        Args:
+            encryption_filter: Filter by decryption status (default: ALL).
+            backup_key_guid: Filter by backup key GUID (default: None for all).
+            masterkey_type: Filter by user account types (default: None for all).
+            user_sid: Filter by account SID (default: None for all). Masterkeys with an unknown SID always match.
+            batch_size: Maximum number of masterkeys per batch.
+
+        Yields:
+            Lists of at most batch_size MasterKeys
+        """
+        ...
+
     async def delete_masterkey(self, guid: UUID) -> None:
         """Delete a masterkey by GUID."""
         ...
@@ -85,3 +112,15 @@ class DpapiSystemCredentialRepository(Protocol):
     async def delete_all_credentials(self) -> None:
         """Delete all DPAPI system credentials."""
         ...
+
+
+class MasterKeyAttemptRepository(Protocol):
+    """Protocol for storing which credentials failed to decrypt which masterkeys."""
+
+    async def get_attempted(self, fingerprint: str, guids: Sequence[UUID]) -> set[UUID]:
+        """Return the masterkeys among `guids` the credential with this fingerprint already failed to decrypt."""
+        ...
+
+    async def add_attempts(self, fingerprint: str, guids: Sequence[UUID]) -> None:
+        """Record that the credential with this fingerprint failed to decrypt these masterkeys."""
+        ...
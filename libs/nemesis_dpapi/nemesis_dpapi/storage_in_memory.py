@@ -1,5 +1,6 @@
 """Storage backend implementations."""
 
+from collections.abc import AsyncIterator, Sequence
 from uuid import UUID
 
 from .core import MasterKey, MasterKeyType
@@ -44,9 +45,18 @@ class InMemoryMasterKeyRepository:
             if conflicts:
                 raise WriteOnceViolationError("masterkey", str(masterkey.guid), conflicts)
 
+            # The account SID is informational, keep the known one
+            if masterkey.user_sid is None and existing.user_sid is not None:
+                masterkey = masterkey.model_copy(update={"user_sid": existing.user_sid})
+
         # Insert or update (only reached if no conflicts)
         self._masterkeys[masterkey.guid] = masterkey
 
+    async def upsert_masterkeys(self, masterkeys: Sequence[MasterKey]) -> None:
+        """Add or update many masterkeys in storage, with the write-once semantics of upsert_masterkey."""
+        for masterkey in masterkeys:
+            await self.upsert_masterkey(masterkey)
+
     async def get_masterkeys(
         self,
         guid: UUID | None = None,
@@ -71,6 +81,41 @@ class InMemoryMasterKeyRepository:
             return [mk] if mk is not None else []
 
         # Otherwise, return filtered list
+        return self._filter_masterkeys(encryption_filter, backup_key_guid, masterkey_type)
+
+    async def iter_masterkeys(
+        self,
+        encryption_filter: EncryptionFilter = EncryptionFilter.ALL,
+        backup_key_guid: UUID | None = None,
+        masterkey_type: list[MasterKeyType] | None = None,
+        user_sid: str | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[MasterKey]]:
+        """Stream filtered masterkeys in batches.
+
+        Args:
+            encryption_filter: Filter by decryption status (default: ALL).
+            backup_key_guid: Filter by backup key GUID (default: None for all).
+            masterkey_type: Filter by user account types (default: None for all).
+            user_sid: Filter by account SID (default: None for all). Masterkeys with an unknown SID always match.
+            batch_size: Maximum number of masterkeys per batch.
+
+        Yields:
+            Lists of at most batch_size MasterKeys
+        """
+        masterkeys = self._filter_masterkeys(encryption_filter, backup_key_guid, masterkey_type)
+        if user_sid is not None:
+            masterkeys = [mk for mk in masterkeys if mk.user_sid is None or mk.user_sid == user_sid]
+
+        for start in range(0, len(masterkeys), batch_size):
+            yield masterkeys[start : start + batch_size]
+
+    def _filter_masterkeys(
+        self,
+        encryption_filter: EncryptionFilter,
+        backup_key_guid: UUID | None,
+        masterkey_type: list[MasterKeyType] | None,
+    ) -> list[MasterKey]:
         masterkeys = list(self._masterkeys.values())
 
         # Filter by decryption status
@@ -183,3 +228,18 @@ class InMemoryDpapiSystemCredentialRepository:
     async def delete_all_credentials(self) -> None:
         """Delete all DPAPI system credentials."""
         self._credentials.clear()
+
+
+class InMemoryMasterKeyAttemptRepository:
+    """In-memory storage for failed masterkey decryption attempts."""
+
+    def __init__(self) -> None:
+        self._attempts: set[tuple[str, UUID]] = set()
+
+    async def get_attempted(self, fingerprint: str, guids: Sequence[UUID]) -> set[UUID]:
+        """Return the masterkeys among `guids` the credential with this fingerprint already failed to decrypt."""
+        return {guid for guid in guids if (fingerprint, guid) in self._attempts}
+
+    async def add_attempts(self, fingerprint: str, guids: Sequence[UUID]) -> None:
+        """Record that the credential with this fingerprint failed to decrypt these masterkeys."""
+        self._attempts.update((fingerprint, guid) for guid in guids)
@@ -1,5 +1,6 @@
 """PostgreSQL storage backend implementations."""
 
+from collections.abc import AsyncIterator, Sequence
 from uuid import UUID
 
 import asyncpg
@@ -12,6 +13,106 @@ from .repositories import EncryptionFilter
 MASTKEYS_TABLE = "dpapi.masterkeys"
 BACKUPKEYS_TABLE = "dpapi.domain_backup_keys"
 SYSTEMCREDS_TABLE = "dpapi.system_credentials"
+ATTEMPTS_TABLE = "dpapi.masterkey_attempts"
+
+
+_MASTERKEY_COLUMNS = (
+    "id, guid, encrypted_key_usercred, encrypted_key_backup, plaintext_key, plaintext_key_sha1, "
+    "backup_key_guid, masterkey_type, user_sid"
+)
+
+_UPSERT_MASTERKEY_QUERY = f"""
+    INSERT INTO {MASTKEYS_TABLE} (guid, encrypted_key_usercred, encrypted_key_backup,
+                          plaintext_key, plaintext_key_sha1, backup_key_guid, masterkey_type, user_sid)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+    ON CONFLICT (guid) DO UPDATE SET
+        encrypted_key_usercred = EXCLUDED.encrypted_key_usercred,
+        encrypted_key_backup = EXCLUDED.encrypted_key_backup,
+        plaintext_key = EXCLUDED.plaintext_key,
+        plaintext_key_sha1 = EXCLUDED.plaintext_key_sha1,
+        backup_key_guid = EXCLUDED.backup_key_guid,
+        masterkey_type = EXCLUDED.masterkey_type,
+        -- The account SID is informational, keep the known one
+        user_sid = COALESCE(EXCLUDED.user_sid, {MASTKEYS_TABLE}.user_sid)
+    WHERE
+        -- Write-once enforcement: only update if existing is NULL or matches new value
+        -- SQL Pattern: (existing IS NULL OR existing = new)
+        -- This correctly handles NULL because:
+        --   - If existing IS NULL: first condition is TRUE, allows write
+        --   - If existing is NOT NULL: second condition checked, must equal new value
+        --   - Note: "NULL = NULL" returns NULL (falsy), but "IS NULL" returns TRUE
+        ({MASTKEYS_TABLE}.encrypted_key_usercred IS NULL OR
+         {MASTKEYS_TABLE}.encrypted_key_usercred = EXCLUDED.encrypted_key_usercred)
+        AND ({MASTKEYS_TABLE}.encrypted_key_backup IS NULL OR
+             {MASTKEYS_TABLE}.encrypted_key_backup = EXCLUDED.encrypted_key_backup)
+        AND ({MASTKEYS_TABLE}.plaintext_key IS NULL OR
+             {MASTKEYS_TABLE}.plaintext_key = EXCLUDED.plaintext_key)
+        AND ({MASTKEYS_TABLE}.plaintext_key_sha1 IS NULL OR
+             {MASTKEYS_TABLE}.plaintext_key_sha1 = EXCLUDED.plaintext_key_sha1)
+        AND ({MASTKEYS_TABLE}.backup_key_guid IS NULL OR
+             {MASTKEYS_TABLE}.backup_key_guid = EXCLUDED.backup_key_guid)
+        AND ({MASTKEYS_TABLE}.masterkey_type IS NULL OR
+             {MASTKEYS_TABLE}.masterkey_type = EXCLUDED.masterkey_type)
+"""
+
+
+def _masterkey_args(masterkey: MasterKey) -> tuple:
+    return (
+        str(masterkey.guid),
+        masterkey.encrypted_key_usercred,
+        masterkey.encrypted_key_backup,
+        masterkey.plaintext_key,
+        masterkey.plaintext_key_sha1,
+        str(masterkey.backup_key_guid) if masterkey.backup_key_guid else None,
+        masterkey.masterkey_type.value,
+        masterkey.user_sid,
+    )
+
+
+def _row_to_masterkey(row: asyncpg.Record) -> MasterKey:
+    return MasterKey(
+        guid=row["guid"],
+        masterkey_type=MasterKeyType(row["masterkey_type"]) if row.get("masterkey_type") else MasterKeyType.UNKNOWN,
+        encrypted_key_usercred=row["encrypted_key_usercred"],
+        encrypted_key_backup=row["encrypted_key_backup"],
+        plaintext_key=row["plaintext_key"],
+        plaintext_key_sha1=row["plaintext_key_sha1"],
+        backup_key_guid=row["backup_key_guid"],
+        user_sid=row["user_sid"],
+    )
+
+
+def _masterkey_conditions(
+    encryption_filter: EncryptionFilter,
+    backup_key_guid: UUID | None,
+    masterkey_type: list[MasterKeyType] | None,
+    user_sid: str | None = None,
+) -> tuple[list[str], list]:
+    """Build the WHERE conditions and parameters of a filtered masterkey query."""
+    params = []
+    conditions = []
+
+    # plaintext_key_sha1 is always set for decrypted masterkeys (see MasterKey.is_decrypted)
+    if encryption_filter == EncryptionFilter.ENCRYPTED_ONLY:
+        conditions.append("plaintext_key_sha1 IS NULL")
+    elif encryption_filter == EncryptionFilter.DECRYPTED_ONLY:
+        conditions.append("plaintext_key_sha1 IS NOT NULL")
+
+    if backup_key_guid is not None:
+        conditions.append(f"backup_key_guid = ${len(params) + 1}")
+        params.append(str(backup_key_guid))
+
+    if masterkey_type is not None and len(masterkey_type) > 0:
+        # Use ANY for matching multiple values
+        conditions.append(f"masterkey_type = ANY(${len(params) + 1})")
+        params.append([t.value for t in masterkey_type])
+
+    if user_sid is not None:
+        # Masterkeys with an unknown SID could belong to any account
+        conditions.append(f"(user_sid = ${len(params) + 1} OR user_sid IS NULL)")
+        params.append(user_sid)
+
+    return conditions, params
 
 
 class PostgresMasterKeyRepository:
@@ -30,46 +131,7 @@ class PostgresMasterKeyRepository:
             WriteOnceViolationError: If attempting to modify fields that already have values
         """
         async with self.pool.acquire() as conn:
-            await conn.execute(
-                f"""
-                INSERT INTO {MASTKEYS_TABLE} (guid, encrypted_key_usercred, encrypted_key_backup,
-                                      plaintext_key, plaintext_key_sha1, backup_key_guid, masterkey_type)
-                VALUES ($1, $2, $3, $4, $5, $6, $7)
-                ON CONFLICT (guid) DO UPDATE SET
-                    encrypted_key_usercred = EXCLUDED.encrypted_key_usercred,
-                    encrypted_key_backup = EXCLUDED.encrypted_key_backup,
-                    plaintext_key = EXCLUDED.plaintext_key,
-                    plaintext_key_sha1 = EXCLUDED.plaintext_key_sha1,
-                    backup_key_guid = EXCLUDED.backup_key_guid,
-                    masterkey_type = EXCLUDED.masterkey_type
-                WHERE
-                    -- Write-once enforcement: only update if existing is NULL or matches new value
-                    -- SQL Pattern: (existing IS NULL OR existing = new)
-                    -- This correctly handles NULL because:
-                    --   - If existing IS NULL: first condition is TRUE, allows write
-                    --   - If existing is NOT NULL: second condition checked, must equal new value
-                    --   - Note: "NULL = NULL" returns NULL (falsy), but "IS NULL" returns TRUE
-                    ({MASTKEYS_TABLE}.encrypted_key_usercred IS NULL OR
-                     {MASTKEYS_TABLE}.encrypted_key_usercred = EXCLUDED.encrypted_key_usercred)
-                    AND ({MASTKEYS_TABLE}.encrypted_key_backup IS NULL OR
-                         {MASTKEYS_TABLE}.encrypted_key_backup = EXCLUDED.encrypted_key_backup)
-                    AND ({MASTKEYS_TABLE}.plaintext_key IS NULL OR
-                         {MASTKEYS_TABLE}.plaintext_key = EXCLUDED.plaintext_key)
-                    AND ({MASTKEYS_TABLE}.plaintext_key_sha1 IS NULL OR
-                         {MASTKEYS_TABLE}.plaintext_key_sha1 = EXCLUDED.plaintext_key_sha1)
-                    AND ({MASTKEYS_TABLE}.backup_key_guid IS NULL OR
-                         {MASTKEYS_TABLE}.backup_key_guid = EXCLUDED.backup_key_guid)
-                    AND ({MASTKEYS_TABLE}.masterkey_type IS NULL OR
-                         {MASTKEYS_TABLE}.masterkey_type = EXCLUDED.masterkey_type)
-                """,
-                str(masterkey.guid),
-                masterkey.encrypted_key_usercred,
-                masterkey.encrypted_key_backup,
-                masterkey.plaintext_key,
-                masterkey.plaintext_key_sha1,
-                str(masterkey.backup_key_guid) if masterkey.backup_key_guid else None,
-                masterkey.masterkey_type.value,
-            )
+            await conn.execute(_UPSERT_MASTERKEY_QUERY, *_masterkey_args(masterkey))
 
             # Check if the WHERE clause prevented the update (write-once violation)
             # Note: asyncpg returns "INSERT 0 1" for new rows, "UPDATE 1" for updated rows
@@ -77,6 +139,15 @@ class PostgresMasterKeyRepository:
             # However, asyncpg's execute() doesn't reliably return row counts for ON CONFLICT
             # so we rely on service layer validation as the primary check
 
+    async def upsert_masterkeys(self, masterkeys: Sequence[MasterKey]) -> None:
+        """Add or update many masterkeys in one transaction, with the write-once semantics of upsert_masterkey."""
+        if not masterkeys:
+            return
+
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany(_UPSERT_MASTERKEY_QUERY, [_masterkey_args(mk) for mk in masterkeys])
+
     async def get_masterkeys(
         self,
         guid: UUID | None = None,
@@ -98,65 +169,58 @@ class PostgresMasterKeyRepository:
         async with self.pool.acquire() as conn:
             # If guid is provided, return single masterkey as a list
             if guid is not None:
-                query = f"SELECT * FROM {MASTKEYS_TABLE} WHERE guid = $1"
+                query = f"SELECT {_MASTERKEY_COLUMNS} FROM {MASTKEYS_TABLE} WHERE guid = $1"
                 row = await conn.fetchrow(query, str(guid))
-                if not row:
-                    return []
-
-                mk = MasterKey(
-                    guid=row["guid"],
-                    masterkey_type=MasterKeyType(row["masterkey_type"])
-                    if row.get("masterkey_type")
-                    else MasterKeyType.UNKNOWN,
-                    encrypted_key_usercred=row["encrypted_key_usercred"],
-                    encrypted_key_backup=row["encrypted_key_backup"],
-                    plaintext_key=row["plaintext_key"],
-                    plaintext_key_sha1=row["plaintext_key_sha1"],
-                    backup_key_guid=row["backup_key_guid"],
-                )
-                return [mk]
+                return [_row_to_masterkey(row)] if row else []
 
             # Otherwise, return filtered list
-            # Build query based on filters
-            query = f"SELECT * FROM {MASTKEYS_TABLE}"
-            params = []
-            conditions = []
-
-            if backup_key_guid is not None:
-                conditions.append(f"backup_key_guid = ${len(params) + 1}")
-                params.append(str(backup_key_guid))
-
-            if masterkey_type is not None and len(masterkey_type) > 0:
-                # Use ANY for matching multiple values
-                conditions.append(f"masterkey_type = ANY(${len(params) + 1})")
-                params.append([t.value for t in masterkey_type])
-
+            conditions, params = _masterkey_conditions(encryption_filter, backup_key_guid, masterkey_type)
+            query = f"SELECT {_MASTERKEY_COLUMNS} FROM {MASTKEYS_TABLE}"
             if conditions:
                 query += " WHERE " + " AND ".join(conditions)
 
             rows = await conn.fetch(query, *params)
-            masterkeys = [
-                MasterKey(
-                    guid=row["guid"],
-                    masterkey_type=MasterKeyType(row["masterkey_type"])
-                    if row.get("masterkey_type")
-                    else MasterKeyType.UNKNOWN,
-                    encrypted_key_usercred=row["encrypted_key_usercred"],
-                    encrypted_key_backup=row["encrypted_key_backup"],
-                    plaintext_key=row["plaintext_key"],
-                    plaintext_key_sha1=row["plaintext_key_sha1"],
-                    backup_key_guid=row["backup_key_guid"],
-                )
-                for row in rows
-            ]
-
-            # Apply decryption filter in Python (could be optimized to SQL)
-            if encryption_filter == EncryptionFilter.ENCRYPTED_ONLY:
-                masterkeys = [mk for mk in masterkeys if not mk.is_decrypted]
-            elif encryption_filter == EncryptionFilter.DECRYPTED_ONLY:
-                masterkeys = [mk for mk in masterkeys if mk.is_decrypted]
-
-            return masterkeys
+            return [_row_to_masterkey(row) for row in rows]
+
+    async def iter_masterkeys(
+        self,
+        encryption_filter: EncryptionFilter = EncryptionFilter.ALL,
+        backup_key_guid: UUID | None = None,
+        masterkey_type: list[MasterKeyType] | None = None,
+        user_sid: str | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[MasterKey]]:
+        """Stream filtered masterkeys in batches.
+
+        Batches are read with keyset pagination on the row id, so no connection is held
+        between batches and masterkeys updated in the meantime don't shift the pages.
+
+        Args:
+            encryption_filter: Filter by decryption status (default: ALL).
+            backup_key_guid: Filter by backup key GUID (default: None for all).
+            masterkey_type: Filter by user account types (default: None for all).
+            user_sid: Filter by account SID (default: None for all). Masterkeys with an unknown SID always match.
+            batch_size: Maximum number of masterkeys per batch.
+
+        Yields:
+            Lists of at most batch_size MasterKeys
+        """
+        conditions, params = _masterkey_conditions(encryption_filter, backup_key_guid, masterkey_type, user_sid)
+        conditions.append(f"id > ${len(params) + 1}")
+        query = (
+            f"SELECT {_MASTERKEY_COLUMNS} FROM {MASTKEYS_TABLE} WHERE {' AND '.join(conditions)} "
+            f"ORDER BY id LIMIT ${len(params) + 2}"
+        )
+
+        last_id = 0
+        while True:
+            async with self.pool.acquire() as conn:
+                rows = await conn.fetch(query, *params, last_id, batch_size)
+            if not rows:
+                return
+
+            last_id = rows[-1]["id"]
+            yield [_row_to_masterkey(row) for row in rows]
 
     async def delete_masterkey(self, guid: UUID) -> None:
         """Delete a masterkey by GUID."""
@@ -267,3 +331,42 @@ class PostgresDpapiSystemCredentialRepository:
         """Delete all DPAPI system credentials."""
         async with self.pool.acquire() as conn:
             await conn.execute(f"DELETE FROM {SYSTEMCREDS_TABLE}")
+
+
+class PostgresMasterKeyAttemptRepository:
+    """PostgreSQL storage for failed masterkey decryption attempts."""
+
+    def __init__(self, connection_pool: asyncpg.Pool) -> None:
+        self.pool = connection_pool
+
+    async def get_attempted(self, fingerprint: str, guids: Sequence[UUID]) -> set[UUID]:
+        """Return the masterkeys among `guids` the credential with this fingerprint already failed to decrypt."""
+        if not guids:
+            return set()
+
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                f"""
+                SELECT masterkey_guid FROM {ATTEMPTS_TABLE}
+                WHERE credential_fingerprint = $1 AND masterkey_guid = ANY($2::text[])
+                """,
+                fingerprint,
+                [str(guid) for guid in guids],
+            )
+            return {UUID(row["masterkey_guid"]) for row in rows}
+
+    async def add_attempts(self, fingerprint: str, guids: Sequence[UUID]) -> None:
+        """Record that the credential with this fingerprint failed to decrypt these masterkeys."""
+        if not guids:
+            return
+
+        async with self.pool.acquire() as conn:
+            await conn.execute(
+                f"""
+                INSERT INTO {ATTEMPTS_TABLE} (credential_fingerprint, masterkey_guid)
+                SELECT $1, unnest($2::text[])
+                ON CONFLICT DO NOTHING
+                """,
+                fingerprint,
+                [str(guid) for guid in guids],
+            )
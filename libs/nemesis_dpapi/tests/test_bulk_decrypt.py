@@ -0,0 +1,106 @@
+"""Tests for bulk masterkey decryption."""
+
+import asyncio
+import base64
+import json
+from uuid import UUID, uuid4
+
+import pytest
+from nemesis_dpapi.bulk_decrypt import MasterKeyDecryptionPool, decrypt_with_backup_key
+from nemesis_dpapi.core import Blob, MasterKey, MasterKeyFile, MasterKeyType, user_sid_from_path
+from nemesis_dpapi.keys import DomainBackupKey
+from nemesis_dpapi.manager import DpapiManager
+from nemesis_dpapi.repositories import EncryptionFilter
+from nemesis_dpapi.storage_in_memory import InMemoryMasterKeyRepository
+
+USER_SID = "S-1-5-21-3821320868-1508310791-3575676346-1103"
+
+
+@pytest.fixture
+def backup_key(get_file_path) -> DomainBackupKey:
+    with open(get_file_path("old_format/dpapi_domain_backupkey.json")) as f:
+        backupkey_data = json.load(f)
+
+    return DomainBackupKey(
+        guid=UUID(backupkey_data["domain_backupkey_guid"]),
+        key_data=base64.b64decode(backupkey_data["domain_backupkey_b64"]),
+        domain_controller=backupkey_data["domain_controller"],
+    )
+
+
+@pytest.fixture
+def encrypted_masterkey(get_file_path) -> MasterKey:
+    masterkey_file = MasterKeyFile.from_file(get_file_path("old_format/ab998260-e99d-4871-8f4b-d922b2848ce6"))
+    assert masterkey_file.domain_backup_key is not None
+
+    return MasterKey(
+        guid=masterkey_file.masterkey_guid,
+        masterkey_type=MasterKeyType.USER,
+        encrypted_key_usercred=masterkey_file.master_key,
+        encrypted_key_backup=masterkey_file.domain_backup_key.raw_bytes,
+        backup_key_guid=masterkey_file.domain_backup_key.guid_key,
+        user_sid=USER_SID,
+    )
+
+
+def test_user_sid_from_path():
+    assert user_sid_from_path(f"/C:/Users/alice/AppData/Roaming/Microsoft/Protect/{USER_SID}/{uuid4()}") == USER_SID
+    assert user_sid_from_path("/C:/Windows/System32/Microsoft/Protect/S-1-5-18/User/key") == "S-1-5-18"
+    assert user_sid_from_path("/C:/Users/alice/Documents/key") is None
+
+
+def test_decrypt_with_backup_key(encrypted_masterkey, backup_key):
+    decrypted = decrypt_with_backup_key([encrypted_masterkey], backup_key)
+
+    assert len(decrypted) == 1
+    assert decrypted[0].is_decrypted
+    assert decrypted[0].user_sid == USER_SID
+
+    other_key = backup_key.model_copy(update={"guid": uuid4()})
+    assert decrypt_with_backup_key([encrypted_masterkey], other_key) == []
+
+
+@pytest.mark.asyncio
+async def test_pool_decrypts_in_worker_processes(encrypted_masterkey, backup_key):
+    pool = MasterKeyDecryptionPool(processes=2)
+    try:
+        decrypted = await pool.decrypt(decrypt_with_backup_key, [encrypted_masterkey], backup_key)
+    finally:
+        pool.shutdown()
+
+    assert [masterkey.guid for masterkey in decrypted] == [encrypted_masterkey.guid]
+
+
+@pytest.mark.asyncio
+async def test_iter_masterkeys_filters_by_user_sid(encrypted_masterkey):
+    repo = InMemoryMasterKeyRepository()
+    await repo.upsert_masterkey(encrypted_masterkey)
+    await repo.upsert_masterkey(MasterKey(guid=uuid4(), masterkey_type=MasterKeyType.USER, user_sid="S-1-5-21-1-2-3"))
+    await repo.upsert_masterkey(MasterKey(guid=uuid4(), masterkey_type=MasterKeyType.USER))
+
+    batches = [
+        batch
+        async for batch in repo.iter_masterkeys(
+            encryption_filter=EncryptionFilter.ENCRYPTED_ONLY, user_sid=USER_SID, batch_size=1
+        )
+    ]
+
+    assert [len(batch) for batch in batches] == [1, 1]
+    assert {mk.user_sid for batch in batches for mk in batch} == {USER_SID, None}
+
+
+@pytest.mark.asyncio
+async def test_new_backup_key_decrypts_stored_masterkeys(encrypted_masterkey, backup_key, get_file_path):
+    async with DpapiManager(storage_backend="memory", auto_decrypt=True, decrypt_processes=0) as manager:
+        await manager.upsert_masterkey(encrypted_masterkey)
+        await manager.upsert_domain_backup_key(backup_key)
+
+        assert manager._auto_decrypt_observer is not None
+        await asyncio.gather(*manager._auto_decrypt_observer._background_tasks)
+
+        masterkeys = await manager.get_masterkeys(guid=encrypted_masterkey.guid)
+        assert masterkeys[0].is_decrypted
+        assert masterkeys[0].user_sid == USER_SID
+
+        blob = Blob.from_file(get_file_path("old_format/dpapi_blob.bin"))
+        assert await manager.decrypt_blob(blob) == b"This is a test."
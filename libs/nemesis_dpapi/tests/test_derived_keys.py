@@ -0,0 +1,108 @@
+"""Tests for the derived key cache and the recorded failed decryption attempts."""
+
+from unittest.mock import patch
+
+import pytest
+from nemesis_dpapi import keys
+from nemesis_dpapi.bulk_decrypt import decrypt_with_encryption_keys
+from nemesis_dpapi.core import MasterKey, MasterKeyFile, MasterKeyType
+from nemesis_dpapi.keys import (
+    DerivedKeyCache,
+    DpapiSystemCredential,
+    NtlmHash,
+    Password,
+    credential_fingerprint,
+    derive_mk_encryption_keys,
+    mk_keys_fingerprint,
+)
+from nemesis_dpapi.manager import DpapiManager
+
+USER_SID = "S-1-5-21-3821320868-1508310791-3575676346-1103"
+OTHER_SID = "S-1-5-21-3821320868-1508310791-3575676346-1104"
+
+
+@pytest.fixture
+def encrypted_masterkey(get_file_path) -> MasterKey:
+    masterkey_file = MasterKeyFile.from_file(get_file_path("old_format/ab998260-e99d-4871-8f4b-d922b2848ce6"))
+
+    return MasterKey(
+        guid=masterkey_file.masterkey_guid,
+        masterkey_type=MasterKeyType.USER,
+        encrypted_key_usercred=masterkey_file.master_key,
+    )
+
+
+class TestDerivedKeyCache:
+    def test_keys_are_derived_once_per_credential_and_sid(self):
+        cache = DerivedKeyCache(max_size=4)
+        password = Password(value="Password123!")
+
+        with patch.object(keys, "derive_mk_encryption_keys", wraps=derive_mk_encryption_keys) as derive:
+            first = cache.get(password, USER_SID)
+            second = cache.get(Password(value="Password123!"), USER_SID)
+            cache.get(password, OTHER_SID)
+
+        assert derive.call_count == 2
+        assert first == second == derive_mk_encryption_keys(password, USER_SID)
+
+    def test_evicted_entries_are_zeroized(self):
+        cache = DerivedKeyCache(max_size=1)
+        cache.get(NtlmHash(value=bytes(range(16))), USER_SID)
+        evicted = next(iter(cache._entries.values()))
+
+        cache.get(NtlmHash(value=bytes(range(1, 17))), USER_SID)
+
+        assert len(cache) == 1
+        assert all(key == bytes(len(key)) for key in evicted)
+
+    def test_cache_can_be_disabled(self):
+        cache = DerivedKeyCache(max_size=0)
+
+        assert cache.get(Password(value="Password123!"), USER_SID)
+        assert len(cache) == 0
+
+    def test_fingerprints(self):
+        password = Password(value="Password123!")
+
+        assert credential_fingerprint(password, USER_SID) != credential_fingerprint(password, OTHER_SID)
+        assert "Password123!" not in credential_fingerprint(password, USER_SID)
+        mk_keys = derive_mk_encryption_keys(password, USER_SID)
+        assert mk_keys_fingerprint(mk_keys) == mk_keys_fingerprint(mk_keys[::-1])
+        # The keys of its NTLM hash are a subset of the password's, which also derives a SHA1 key
+        ntlm_hash = NtlmHash.from_hexstring("2b576acbe6bcfda7294d6bd18041b8fe")
+        ntlm_keys = derive_mk_encryption_keys(ntlm_hash, USER_SID)
+        assert {mk_key.key.value for mk_key in ntlm_keys} < {mk_key.key.value for mk_key in mk_keys}
+        assert mk_keys_fingerprint(ntlm_keys) != mk_keys_fingerprint(mk_keys)
+
+    def test_system_credential_keys(self):
+        credential = DpapiSystemCredential.from_bytes(bytes(range(40)))
+
+        mk_keys = derive_mk_encryption_keys(credential)
+
+        assert [mk_key.key.value for mk_key in mk_keys] == [credential.machine_key, credential.user_key]
+
+
+class TestMasterKeyAttempts:
+    @pytest.mark.asyncio
+    async def test_failed_masterkeys_are_skipped_on_resubmission(self, encrypted_masterkey):
+        mk_keys = derive_mk_encryption_keys(Password(value="wrong password"), USER_SID)
+        attempted = []
+
+        def decryptor(masterkeys, key):
+            attempted.extend(masterkey.guid for masterkey in masterkeys)
+            return decrypt_with_encryption_keys(masterkeys, key)
+
+        async with DpapiManager(storage_backend="memory", auto_decrypt=False, decrypt_processes=0) as manager:
+            await manager.upsert_masterkey(encrypted_masterkey)
+
+            for _ in range(2):
+                decrypted = await manager.decrypt_masterkeys(
+                    decryptor, mk_keys, attempt_fingerprint=mk_keys_fingerprint(mk_keys)
+                )
+                assert decrypted == 0
+
+            # Other keys still try the masterkey
+            other_keys = derive_mk_encryption_keys(Password(value="another password"), USER_SID)
+            await manager.decrypt_masterkeys(decryptor, other_keys, attempt_fingerprint=mk_keys_fingerprint(other_keys))
+
+        assert attempted == [encrypted_masterkey.guid, encrypted_masterkey.guid]
@@ -0,0 +1,101 @@
+"""Tests for the decrypted masterkey cache and bulk blob decryption of DpapiManager."""
+
+import base64
+import json
+from unittest.mock import patch
+from uuid import UUID
+
+import pytest
+from nemesis_dpapi.core import Blob, MasterKey, MasterKeyFile, MasterKeyType
+from nemesis_dpapi.eventing import NewPlaintextMasterKeyEvent
+from nemesis_dpapi.exceptions import MasterKeyNotFoundError
+from nemesis_dpapi.keys import DomainBackupKey
+from nemesis_dpapi.manager import DpapiManager
+
+
+@pytest.fixture
+def old_format_blob(get_file_path) -> Blob:
+    return Blob.from_file(get_file_path("old_format/dpapi_blob.bin"))
+
+
+@pytest.fixture
+def old_format_masterkey(get_file_path) -> MasterKey:
+    with open(get_file_path("old_format/dpapi_domain_backupkey.json")) as f:
+        backupkey_data = json.load(f)
+
+    backup_key = DomainBackupKey(
+        guid=UUID(backupkey_data["domain_backupkey_guid"]),
+        key_data=base64.b64decode(backupkey_data["domain_backupkey_b64"]),
+        domain_controller=backupkey_data["domain_controller"],
+    )
+    masterkey_file = MasterKeyFile.from_file(get_file_path("old_format/ab998260-e99d-4871-8f4b-d922b2848ce6"))
+    decrypted = masterkey_file.decrypt(backup_key)
+
+    return MasterKey(
+        guid=decrypted.guid,
+        masterkey_type=MasterKeyType.UNKNOWN,
+        plaintext_key=decrypted.plaintext_key,
+        plaintext_key_sha1=decrypted.plaintext_key_sha1,
+    )
+
+
+class TestMasterKeyCache:
+    """Test caching of decrypted masterkeys."""
+
+    @pytest.mark.asyncio
+    async def test_masterkey_is_looked_up_once(self, old_format_blob, old_format_masterkey):
+        """Repeated blob decryptions should reuse the cached masterkey."""
+        async with DpapiManager(storage_backend="memory", auto_decrypt=False) as manager:
+            await manager.upsert_masterkey(old_format_masterkey)
+
+            with patch.object(
+                manager._masterkey_repo, "get_masterkeys", wraps=manager._masterkey_repo.get_masterkeys
+            ) as get_masterkeys:
+                for _ in range(3):
+                    assert await manager.decrypt_blob(old_format_blob) == b"This is a test."
+
+            assert get_masterkeys.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_plaintext_masterkey_event_invalidates_entry(self, old_format_blob, old_format_masterkey):
+        """A NewPlaintextMasterKeyEvent should drop the cached masterkey."""
+        async with DpapiManager(storage_backend="memory", auto_decrypt=False) as manager:
+            await manager.upsert_masterkey(old_format_masterkey)
+            await manager.decrypt_blob(old_format_blob)
+            assert old_format_masterkey.guid in manager._masterkey_cache
+
+            await manager._publisher.publish_event(NewPlaintextMasterKeyEvent(masterkey_guid=old_format_masterkey.guid))
+
+            assert old_format_masterkey.guid not in manager._masterkey_cache
+
+    @pytest.mark.asyncio
+    async def test_cache_can_be_disabled(self, old_format_blob, old_format_masterkey):
+        """A cache size of 0 should disable caching."""
+        async with DpapiManager(storage_backend="memory", auto_decrypt=False, masterkey_cache_size=0) as manager:
+            await manager.upsert_masterkey(old_format_masterkey)
+
+            assert await manager.decrypt_blob(old_format_blob) == b"This is a test."
+            assert len(manager._masterkey_cache) == 0
+
+
+class TestDecryptBlobs:
+    """Test bulk blob decryption."""
+
+    @pytest.mark.asyncio
+    async def test_blobs_are_decrypted_per_masterkey_group(
+        self, old_format_blob, old_format_masterkey, blob_without_entropy
+    ):
+        """Each distinct masterkey is looked up once and failures are returned per blob."""
+        unknown_blob = Blob.from_bytes(blob_without_entropy)
+
+        async with DpapiManager(storage_backend="memory", auto_decrypt=False) as manager:
+            await manager.upsert_masterkey(old_format_masterkey)
+
+            with patch.object(
+                manager._masterkey_repo, "get_masterkeys", wraps=manager._masterkey_repo.get_masterkeys
+            ) as get_masterkeys:
+                results = await manager.decrypt_blobs([old_format_blob, unknown_blob, old_format_blob])
+
+            assert get_masterkeys.call_count == 2
+            assert results[0] == results[2] == b"This is a test."
+            assert isinstance(results[1], MasterKeyNotFoundError)
@@ -1,53 +1,73 @@
 """Text extraction activities."""
 
 import asyncio
+import mmap
 import os
+import re
 import tempfile
+from functools import lru_cache
 
 import document_conversion.global_vars as global_vars
 from common.logger import get_logger
 from common.models import Transform
-from common.state_helpers import get_file_enriched_async
 from common.storage import StorageS3
 from common.workflows.setup import workflow_activity
 from dapr.ext.workflow.workflow_activity_context import WorkflowActivityContext
 
+from ..scratch import ensure_document
+
 logger = get_logger(__name__)
 
 storage = StorageS3()
 
 
+# Byte translation tables: printable characters (as GNU strings sees them: ASCII graphic
+# characters, space and tab) are kept and everything else becomes NUL, zero bytes become 0xFF
+_PRINTABLE_BYTES = bytes(b if b == 0x09 or 0x20 <= b <= 0x7E else 0 for b in range(256))
+_ZERO_BYTES = bytes(0xFF if b == 0 else 0 for b in range(256))
+
+# A byte no string can span (neither printable nor NUL), or the middle of two NULs
+_STRING_BREAK = re.compile(rb"[^\t\x20-\x7e\x00]|\x00\x00")
+
+STRINGS_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+@lru_cache(maxsize=8)
+def _run_pattern(min_len: int) -> re.Pattern[bytes]:
+    return re.compile(rb"[^\x00]{%d,}" % min_len)
+
+
 @workflow_activity
-async def extract_strings(ctx: WorkflowActivityContext, file_input: dict) -> dict | None:
-    """Runs "strings" on a binary to extract strings."""
+async def extract_strings(ctx: WorkflowActivityContext, document: dict) -> dict | None:
+    """Extracts the strings of a prepared document."""
 
     assert global_vars.tracking_service is not None, "tracking_service must be initialized"
 
-    object_id = file_input.get("object_id")
+    object_id = document.get("object_id")
 
     try:
-        file_enriched = await get_file_enriched_async(object_id, global_vars.asyncpg_pool)
-
-        if file_enriched.is_container:
-            return None
+        document_path = await ensure_document(document)
 
-        with storage.download(file_enriched.object_id) as temp_file:
-            # Create temp file for streaming strings output
-            with tempfile.NamedTemporaryFile(mode="w", encoding="utf-8", delete=False) as tmp_file:
-                tmp_file_path = tmp_file.name
+        # Create temp file for streaming strings output
+        with tempfile.NamedTemporaryFile(mode="w", encoding="utf-8", delete=False) as tmp_file:
+            tmp_file_path = tmp_file.name
 
+        try:
+            with open(tmp_file_path, "w", encoding="utf-8") as output_file:
                 # Stream strings directly to temp file with filtering
-                await extract_all_strings(temp_file.name, tmp_file, min_len=5)
+                await asyncio.to_thread(extract_all_strings, document_path, output_file, 5)
 
-                if os.path.getsize(tmp_file_path) == 0:
-                    logger.info("Temporary strings file is empty", object_id=file_enriched.object_id)
-                    return None
+            if os.path.getsize(tmp_file_path) == 0:
+                logger.info("Temporary strings file is empty", object_id=object_id)
+                return None
 
-                object_id = storage.upload_file(tmp_file_path)
+            transform_object_id = storage.upload_file(tmp_file_path)
+        finally:
+            os.unlink(tmp_file_path)
 
         transform = Transform(
             type="extracted_strings",
-            object_id=str(object_id),
+            object_id=str(transform_object_id),
             metadata={
                 "file_name": "strings.txt",
                 "display_type_in_dashboard": "monaco",
@@ -63,7 +83,7 @@ async def extract_strings(ctx: WorkflowActivityContext, file_input: dict) -> dic
 
         logger.debug(
             "String extraction completed successfully",
-            object_id=file_enriched.object_id,
+            object_id=object_id,
             transform_object_id=transform.object_id,
         )
 
@@ -84,44 +104,58 @@ async def extract_strings(ctx: WorkflowActivityContext, file_input: dict) -> dic
         raise
 
 
-async def extract_all_strings(filename: str, output_file, min_len: int = 5):
+def extract_all_strings(filename: str, output_file, min_len: int = 5) -> None:
     """
     Extracts all single-byte ASCII strings and UTF-16 (both LE and BE) strings
-    from a file using the `strings` utility, streaming filtered results directly
-    to the output file.
+    from a file, streaming filtered results directly to the output file.
+
+    Finds the same strings as `strings -a` with the default, `-e l` and `-e b`
+    encodings, but in one pass over the memory-mapped file. The file is
+    processed in chunks that end where no string can span; per chunk, ASCII
+    strings are written first, then UTF-16LE and UTF-16BE strings.
 
     Args:
         filename: Path to the file to extract strings from
         output_file: File handle to write filtered strings to
         min_len: Minimum string length to extract (default: 5)
     """
-    commands = [
-        ["strings", "-a", "-n", str(min_len), filename],  # ASCII
-        ["strings", "-a", "-n", str(min_len), "-e", "l", filename],  # UTF-16 LE
-        ["strings", "-a", "-n", str(min_len), "-e", "b", filename],  # UTF-16 BE
-    ]
-
-    for cmd in commands:
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            limit=1024 * 1024 * 10,  # 10MB buffer
-        )
-
-        # Stream output line by line and filter as we go
-        assert process.stdout is not None, "stdout must not be None when PIPE is used"
-        while True:
-            line = await process.stdout.readline()
-            if not line:
-                break
-
-            # Decode and strip the line
-            line_str = line.decode("utf-8").rstrip("\n\r")
-
-            # Filter out null/empty strings
-            if line_str and line_str.strip():
-                output_file.write(line_str + "\n")
-
-        # Wait for the process to complete
-        await process.wait()
+    if os.path.getsize(filename) == 0:
+        return
+
+    with open(filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = 0
+        while start < len(data):
+            end = min(start + STRINGS_CHUNK_SIZE, len(data))
+            if end < len(data):
+                # Don't cut a string in half; give up on that after a MB of text without a break
+                string_break = _STRING_BREAK.search(data, end, min(end + 1024 * 1024, len(data)))
+                if string_break:
+                    end = string_break.start() + (1 if string_break.group() == b"\x00\x00" else 0)
+
+            for string in _chunk_strings(data[start:end], min_len):
+                # Filter out whitespace-only strings
+                if string.strip():
+                    output_file.write(string.decode("ascii") + "\n")
+
+            start = end
+
+
+def _chunk_strings(chunk: bytes, min_len: int) -> list[bytes]:
+    """ASCII, UTF-16LE and UTF-16BE strings of at least `min_len` characters in `chunk`."""
+    run_pattern = _run_pattern(min_len)
+
+    printable = chunk.translate(_PRINTABLE_BYTES)
+    strings = run_pattern.findall(printable)
+
+    # As little-endian integers, byte i of `printable >> 8` is byte i + 1 of the chunk. A UTF-16LE
+    # character is a printable byte followed by a NUL, a UTF-16BE character one preceded by a NUL.
+    printable_int = int.from_bytes(printable, "little")
+    zero_int = int.from_bytes(chunk.translate(_ZERO_BYTES), "little")
+    utf16le = (printable_int & (zero_int >> 8)).to_bytes(len(chunk), "little")
+    utf16be = (printable_int & (zero_int << 8)).to_bytes(len(chunk), "little")
+
+    # Strings can start at even or odd offsets, so each character column is scanned separately
+    for characters in (utf16le[0::2], utf16le[1::2], utf16be[0::2], utf16be[1::2]):
+        strings.extend(run_pattern.findall(characters))
+
+    return strings
@@ -1,6 +1,5 @@
 """Text extraction activities."""
 
-import asyncio
 import os
 import tempfile
 from types import SimpleNamespace
@@ -10,83 +9,75 @@ import jpype
 import jpype.imports  # noqa: F401
 from common.logger import get_logger
 from common.models import Transform
-from common.state_helpers import get_file_enriched_async
 from common.storage import StorageS3
 from common.workflows.setup import workflow_activity
 from dapr.ext.workflow.workflow_activity_context import WorkflowActivityContext
 
+from ..scratch import ensure_document
+from ..tika_pool import TikaPool
+
 logger = get_logger(__name__)
 
 storage = StorageS3()
 java = SimpleNamespace()  # Java types namespace - initialized in init_jvm
-tika_instance: jpype.JClass | None = None  # Initialized by init_tika()
+tika_pool: TikaPool | None = None  # Initialized by init_tika()
 
 
 @workflow_activity
-async def extract_text(ctx: WorkflowActivityContext, file_input: dict) -> dict | None:
-    """Extract text using Tika."""
-    global tika_instance
-
-    if not tika_instance:
+async def extract_text(ctx: WorkflowActivityContext, document: dict) -> dict | None:
+    """Extract text from a prepared document using the Tika pool."""
+    if not tika_pool:
         raise ValueError("Tika is not initialized")
 
-    object_id = file_input.get("object_id")
+    object_id = document.get("object_id")
     result = None
 
     assert global_vars.tracking_service is not None, "tracking_service must be initialized"
 
     try:
-        file_enriched = await get_file_enriched_async(object_id, global_vars.asyncpg_pool)
-
-        if not can_extract_plaintext(file_enriched.mime_type):
-            return None
+        document_path = await ensure_document(document)
 
-        with storage.download(file_enriched.object_id) as temp_file:
-            extracted_text: str | None = None
-            try:
-                java_file = java.File(temp_file.name)
-                java_text = await asyncio.to_thread(tika_instance.parseToString, java_file)
-                extracted_text = str(java_text)
-
-            except Exception as e:
-                logger.warning(
-                    "Tika extraction failed",
-                    object_id=file_enriched.object_id,
-                    error=str(e),
-                )
-                # Record failure in database
-                await global_vars.tracking_service.update_enrichment_results(
-                    instance_id=ctx.workflow_id,
-                    failure_list=["extract_tika_text"],
-                )
-
-            if not extracted_text:
-                logger.debug("Text extraction complete: no text extracted.")
-                return None
-
-            # Upload extracted text
-            object_id = storage.upload(extracted_text.encode("utf-8"))
-
-            transform = Transform(
-                type="extracted_text",
-                object_id=str(object_id),
-                metadata={
-                    "file_name": "extracted_plaintext.txt",
-                    "display_type_in_dashboard": "monaco",
-                    "display_title": "Extracted Plaintext",
-                },
+        transform_object_id: str | None = None
+        try:
+            # Extracted text is streamed to storage by the pool worker
+            transform_object_id = await tika_pool.extract(document_path, document.get("mime_type") or "unknown")
+
+        except Exception as e:
+            logger.warning(
+                "Tika extraction failed",
+                object_id=object_id,
+                error=str(e),
             )
-
-            # Record success in database
+            # Record failure in database
             await global_vars.tracking_service.update_enrichment_results(
                 instance_id=ctx.workflow_id,
-                success_list=["extract_tika_text"],
+                failure_list=["extract_tika_text"],
             )
 
-            logger.debug("Text extracted to extracted_plaintext.txt with Tika", object_id=file_enriched.object_id)
+        if not transform_object_id:
+            logger.debug("Text extraction complete: no text extracted.")
+            return None
+
+        transform = Transform(
+            type="extracted_text",
+            object_id=str(transform_object_id),
+            metadata={
+                "file_name": "extracted_plaintext.txt",
+                "display_type_in_dashboard": "monaco",
+                "display_title": "Extracted Plaintext",
+            },
+        )
+
+        # Record success in database
+        await global_vars.tracking_service.update_enrichment_results(
+            instance_id=ctx.workflow_id,
+            success_list=["extract_tika_text"],
+        )
 
-            result = transform.model_dump()
-            return result
+        logger.debug("Text extracted to extracted_plaintext.txt with Tika", object_id=object_id)
+
+        result = transform.model_dump()
+        return result
 
     except Exception as e:
         logger.exception(message="Unexpected error performing text extraction", object_id=object_id)
@@ -229,8 +220,8 @@ def init_jvm():
 
 
 def init_tika():
-    """Initialize Tika with OCR configuration."""
-    global tika_instance
+    """Initialize the Tika pool with OCR configuration."""
+    global tika_pool
     init_jvm()
 
     # Get OCR language from environment variable
@@ -253,10 +244,19 @@ def init_tika():
 
     try:
         config = java.TikaConfig(java.File(temp_config_path))
-        tika_instance = java.Tika(config)
+        tika_pool = TikaPool(lambda: java.Tika(config), storage)
         logger.info(
-            "Tika initialized successfully with OCR languages", config=temp_config_path, ocr_languages=ocr_languages
+            "Tika initialized successfully with OCR languages",
+            config=temp_config_path,
+            ocr_languages=ocr_languages,
+            workers=tika_pool.num_workers,
         )
     except Exception as e:
         logger.exception("Failed to load Tika config", ocr_languages=ocr_languages, config_xml=config_xml)
         raise e
+
+
+def shutdown_tika():
+    """Stop the Tika pool workers."""
+    if tika_pool:
+        tika_pool.shutdown()
@@ -1,111 +1,69 @@
 """PDF conversion activities."""
 
-import os
-
 import document_conversion.global_vars as global_vars
-import httpx
-from common.helpers import can_convert_to_pdf
 from common.logger import get_logger
 from common.models import Transform
-from common.state_helpers import get_file_enriched_async
-from common.storage import StorageS3
 from common.workflows.setup import workflow_activity
 from dapr.ext.workflow.workflow_activity_context import WorkflowActivityContext
 
-logger = get_logger(__name__)
+from ..gotenberg import GotenbergError
+from ..scratch import ensure_document
 
-storage = StorageS3()
+logger = get_logger(__name__)
 
 
 @workflow_activity
-async def convert_to_pdf(ctx: WorkflowActivityContext, file_input: dict) -> dict | None:
-    """Convert file to PDF using Gotenberg."""
-    assert global_vars.gotenberg_url is not None, "gotenberg_url must be initialized"
+async def convert_to_pdf(ctx: WorkflowActivityContext, document: dict) -> dict | None:
+    """Convert a prepared document to PDF using Gotenberg."""
+    assert global_vars.gotenberg is not None, "gotenberg must be initialized"
     assert global_vars.tracking_service is not None, "tracking_service must be initialized"
 
-    object_id = file_input.get("object_id")
+    object_id = document.get("object_id")
     result = None
 
     try:
-        file_enriched = await get_file_enriched_async(object_id, global_vars.asyncpg_pool)
+        # The prepared document keeps the file's extension, which Gotenberg needs to pick a converter
+        document_path = await ensure_document(document)
+
+        try:
+            transform_object_id = await global_vars.gotenberg.convert(
+                document_path, document["sha256"], document["extension"]
+            )
+        except GotenbergError as e:
+            logger.error(
+                "Error calling Gotenberg",
+                status_code=e.status_code,
+                response_text=e.response_text,
+            )
+
+            # Record failure in database due to Gotenberg error
+            await global_vars.tracking_service.update_enrichment_results(
+                instance_id=ctx.workflow_id,
+                failure_list=[f"convert_to_pdf:{e}"],
+            )
 
-        if not can_convert_to_pdf(file_enriched.file_name):
             return None
 
-        # excel docs need to be shown in landscape
-        landscape = f"{file_enriched.extension}".lower() in [
-            ".xls",
-            ".xlsb",
-            ".xlsm",
-            ".xlsx",
-            ".xlt",
-            ".xltm",
-            ".xltx",
-            ".xlw",
-        ]
-
-        with storage.download(file_enriched.object_id) as temp_file:
-            temp_file_with_ext = f"{temp_file.name}.{file_enriched.extension}"
-            os.rename(temp_file.name, temp_file_with_ext)
-
-            try:
-                with open(temp_file_with_ext, "rb") as file_data:
-                    files = {"file": file_data}
-                    data = {}
-
-                    if landscape:
-                        data["landscape"] = "true"
-
-                    # Use httpx async client instead of requests
-                    async with httpx.AsyncClient(timeout=180.0) as client:
-                        response = await client.post(
-                            global_vars.gotenberg_url,
-                            files=files,
-                            data=data,
-                        )
-
-                    if response.status_code == 200:
-                        object_id = storage.upload(response.content)
-
-                        transform = Transform(
-                            type="converted_pdf",
-                            object_id=str(object_id),
-                            metadata={
-                                "file_name": f"{file_enriched.file_name}.pdf",
-                                "display_type_in_dashboard": "pdf",
-                                "display_title": "Converted PDF",
-                            },
-                        )
-
-                        # Record success in database
-                        await global_vars.tracking_service.update_enrichment_results(
-                            instance_id=ctx.workflow_id,
-                            success_list=["convert_to_pdf"],
-                        )
-
-                        logger.debug(
-                            "File successfully converted to PDF with Gotenberg", object_id=file_enriched.object_id
-                        )
-
-                        result = transform.model_dump()
-                        return result
-                    else:
-                        logger.error(
-                            "Error calling Gotenberg",
-                            status_code=response.status_code,
-                            response_text=response.text,
-                        )
-
-                        # Record failure in database due to Gotenberg error
-                        await global_vars.tracking_service.update_enrichment_results(
-                            instance_id=ctx.workflow_id,
-                            failure_list=[f"convert_to_pdf:Gotenberg returned status code {response.status_code}"],
-                        )
-
-                        return None
-
-            finally:
-                os.rename(temp_file_with_ext, temp_file.name)
+        transform = Transform(
+            type="converted_pdf",
+            object_id=str(transform_object_id),
+            metadata={
+                "file_name": f"{document['file_name']}.pdf",
+                "display_type_in_dashboard": "pdf",
+                "display_title": "Converted PDF",
+            },
+        )
+
+        # Record success in database
+        await global_vars.tracking_service.update_enrichment_results(
+            instance_id=ctx.workflow_id,
+            success_list=["convert_to_pdf"],
+        )
+
+        logger.debug("File successfully converted to PDF with Gotenberg", object_id=object_id)
+
+        result = transform.model_dump()
+        return result
 
     except Exception as e:
         logger.exception(message="Error in PDF conversion", object_id=object_id)
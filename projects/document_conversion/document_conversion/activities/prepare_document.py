@@ -0,0 +1,59 @@
+"""Preparation and cleanup of the document shared by the extraction activities."""
+
+import document_conversion.global_vars as global_vars
+from common.helpers import can_convert_to_pdf
+from common.logger import get_logger
+from common.state_helpers import get_file_enriched_async
+from common.workflows.setup import workflow_activity
+from dapr.ext.workflow.workflow_activity_context import WorkflowActivityContext
+
+from ..scratch import document_path, download_document, remove_scratch_dir
+from .extract_text import can_extract_plaintext
+
+logger = get_logger(__name__)
+
+
+@workflow_activity
+async def prepare_document(ctx: WorkflowActivityContext, file_input: dict) -> dict | None:
+    """
+    Download a document once into the workflow's scratch space.
+
+    Returns the document description the extraction activities take as input,
+    including which of them apply, or None if none of them do.
+    """
+    object_id = file_input["object_id"]
+    file_enriched = await get_file_enriched_async(object_id, global_vars.asyncpg_pool)
+
+    tasks = {
+        "extract_text": can_extract_plaintext(file_enriched.mime_type),
+        "extract_strings": not file_enriched.is_container,
+        "convert_to_pdf": can_convert_to_pdf(file_enriched.file_name),
+    }
+    if not any(tasks.values()):
+        logger.debug("No document conversions apply", object_id=object_id)
+        return None
+
+    path = document_path(ctx.workflow_id, file_enriched.extension)
+    await download_document(object_id, path)
+
+    logger.debug("Prepared document", object_id=object_id, path=str(path), tasks=tasks)
+
+    return {
+        "object_id": object_id,
+        "file_name": file_enriched.file_name,
+        "extension": file_enriched.extension,
+        "mime_type": file_enriched.mime_type,
+        "sha256": file_enriched.hashes.sha256,
+        "path": str(path),
+        "tasks": tasks,
+    }
+
+
+@workflow_activity
+async def release_document(ctx: WorkflowActivityContext, activity_input: dict) -> None:
+    """Remove the workflow's scratch space.
+
+    Args:
+        activity_input: Dict (unused, kept for consistency)
+    """
+    remove_scratch_dir(ctx.workflow_id)
@@ -4,8 +4,10 @@ import asyncpg
 from common.workflows.tracking_service import WorkflowTrackingService
 from dapr.ext.workflow import DaprWorkflowClient
 
+from .gotenberg import GotenbergClient
+
 # Global variables that will be initialized during startup
 asyncpg_pool: asyncpg.Pool | None = None
-gotenberg_url: str | None = None
+gotenberg: GotenbergClient | None = None
 workflow_client: DaprWorkflowClient | None = None
 tracking_service: WorkflowTrackingService | None = None
@@ -0,0 +1,182 @@
+"""Client for PDF conversions with Gotenberg.
+
+All conversions share one keep-alive connection pool, and a semaphore in front of it
+bounds how many of them are in flight, so a burst of documents waits here instead
+of piling up on the LibreOffice instances. Gotenberg's response is streamed straight
+into storage.
+
+Conversions are keyed by the document's sha256 and extension (which decides the
+converter and page orientation): a document whose content was already converted
+reuses the stored PDF, and concurrent conversions of the same content share one
+request. The converted PDF is published as a file of its own, so every caller but
+the one whose request produced it gets a server-side copy under a new object ID.
+"""
+
+import asyncio
+import io
+import os
+from collections.abc import Iterator
+from typing import BinaryIO
+
+import asyncpg
+import httpx
+from common.logger import get_logger
+from common.storage import StorageS3
+from prometheus_client import Counter, Gauge
+
+logger = get_logger(__name__)
+
+GOTENBERG_CONCURRENCY_PER_REPLICA = int(os.getenv("GOTENBERG_CONCURRENCY_PER_REPLICA", 2))
+GOTENBERG_REPLICAS = int(os.getenv("GOTENBERG_REPLICAS", 1))
+GOTENBERG_TIMEOUT_SECONDS = float(os.getenv("GOTENBERG_TIMEOUT_SECONDS", 180))
+
+GOTENBERG_CONVERSIONS = Counter(
+    "nemesis_gotenberg_conversions_total",
+    "PDF conversions by outcome",
+    ["outcome"],
+)
+GOTENBERG_IN_FLIGHT = Gauge("nemesis_gotenberg_conversions_in_flight", "PDF conversions currently sent to Gotenberg")
+GOTENBERG_QUEUED = Gauge("nemesis_gotenberg_conversions_queued", "PDF conversions waiting for a Gotenberg slot")
+
+# Excel docs need to be shown in landscape
+LANDSCAPE_EXTENSIONS = {".xls", ".xlsb", ".xlsm", ".xlsx", ".xlt", ".xltm", ".xltx", ".xlw"}
+
+
+class GotenbergError(Exception):
+    """Gotenberg answered a conversion with an error status."""
+
+    def __init__(self, status_code: int, response_text: str):
+        super().__init__(f"Gotenberg returned status code {status_code}")
+        self.status_code = status_code
+        self.response_text = response_text
+
+
+class _ResponseStream(io.RawIOBase):
+    """Readable stream over the body chunks of a streamed response."""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            self._pending = next(self._chunks, b"")
+            if not self._pending:
+                return 0
+
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+class GotenbergClient:
+    """Pooled, bounded and deduplicating client for Gotenberg's LibreOffice route."""
+
+    def __init__(
+        self,
+        url: str,
+        storage: StorageS3,
+        pool: asyncpg.Pool,
+        max_in_flight: int = GOTENBERG_CONCURRENCY_PER_REPLICA * GOTENBERG_REPLICAS,
+        timeout: float = GOTENBERG_TIMEOUT_SECONDS,
+    ):
+        self.url = url
+        self.storage = storage
+        self.pool = pool
+        self.max_in_flight = max(1, max_in_flight)
+
+        self._client = httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight),
+        )
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._conversions: dict[tuple[str, str], asyncio.Task] = {}
+
+    async def convert(self, path: str, sha256: str, extension: str | None) -> str:
+        """
+        Convert a document to PDF and return the object ID of the stored PDF.
+
+        The object ID is private to the caller: PDFs reused from an earlier conversion
+        or shared with a concurrent one are copied first.
+
+        Raises GotenbergError if Gotenberg fails to convert the document.
+        """
+        key = (sha256, (extension or "").lower())
+        task = self._conversions.get(key)
+        owner = task is None
+        if owner:
+            # The conversion holds its own handle on the document: other workflows may wait
+            # on it after this one's scratch space has been released
+            document = open(path, "rb")
+            task = asyncio.create_task(self._convert(document, *key))
+            self._conversions[key] = task
+            task.add_done_callback(lambda _: self._conversions.pop(key, None))
+        else:
+            GOTENBERG_CONVERSIONS.labels("joined").inc()
+
+        # A cancelled caller must not cancel a conversion other workflows wait on
+        pdf_object_id, converted = await asyncio.shield(task)
+        if owner and converted:
+            return pdf_object_id
+
+        return await asyncio.to_thread(self.storage.copy_object, pdf_object_id)
+
+    def close(self) -> None:
+        self._client.close()
+
+    async def _convert(self, document: BinaryIO, sha256: str, extension: str) -> tuple[str, bool]:
+        """Return the object ID of the PDF, and whether it was converted (rather than reused) now."""
+        with document:
+            pdf_object_id = await self._find_converted(sha256, extension)
+            if pdf_object_id:
+                logger.debug("Reusing PDF converted from identical content", sha256=sha256, pdf_object_id=pdf_object_id)
+                GOTENBERG_CONVERSIONS.labels("reused").inc()
+                return pdf_object_id, False
+
+            GOTENBERG_QUEUED.inc()
+            try:
+                await self._slots.acquire()
+            finally:
+                GOTENBERG_QUEUED.dec()
+
+            GOTENBERG_IN_FLIGHT.inc()
+            try:
+                pdf_object_id = await asyncio.to_thread(self._post, document, extension in LANDSCAPE_EXTENSIONS)
+            except Exception:
+                GOTENBERG_CONVERSIONS.labels("failed").inc()
+                raise
+            finally:
+                GOTENBERG_IN_FLIGHT.dec()
+                self._slots.release()
+
+        GOTENBERG_CONVERSIONS.labels("converted").inc()
+        return pdf_object_id, True
+
+    def _post(self, document: BinaryIO, landscape: bool) -> str:
+        data = {"landscape": "true"} if landscape else {}
+        with self._client.stream("POST", self.url, files={"file": document}, data=data) as response:
+            if response.status_code != 200:
+                response.read()
+                raise GotenbergError(response.status_code, response.text)
+            return self.storage.upload_stream(_ResponseStream(response.iter_bytes()))
+
+    async def _find_converted(self, sha256: str, extension: str) -> str | None:
+        async with self.pool.acquire() as conn:
+            pdf_object_id = await conn.fetchval(
+                """
+                SELECT t.transform_object_id
+                FROM transforms t
+                JOIN files_enriched f ON f.object_id = t.object_id
+                WHERE t.type = 'converted_pdf'
+                  AND f.hashes @> jsonb_build_object('sha256', $1::text)
+                  AND coalesce(lower(f.extension), '') = $2
+                LIMIT 1
+            """,
+                sha256,
+                extension,
+            )
+        return str(pdf_object_id) if pdf_object_id else None
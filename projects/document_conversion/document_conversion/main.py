@@ -10,6 +10,7 @@ import jpype
 from common.db import get_postgres_connection_str
 from common.logger import WORKFLOW_CLIENT_LOG_LEVEL, get_logger
 from common.queues import DOCUMENT_CONVERSION_INPUT_TOPIC, DOCUMENT_CONVERSION_PUBSUB
+from common.storage import StorageS3
 from common.workflows.setup import set_workflow_runtime_loop, wf_runtime
 from common.workflows.workflow_purger import WorkflowPurger
 from dapr.ext.fastapi import DaprApp
@@ -17,8 +18,10 @@ from dapr.ext.workflow import DaprWorkflowClient
 from dapr.ext.workflow.logger.options import LoggerOptions
 from fastapi import FastAPI
 
-from .activities.extract_text import init_tika
+from .activities.extract_text import init_tika, shutdown_tika
+from .gotenberg import GotenbergClient
 from .routes.health import router as health_router
+from .scratch import clear_scratch, run_scratch_sweeper
 from .subscriptions.file_enriched import file_enriched_subscription_handler
 from .workflow_manager import max_parallel_workflows, max_workflow_execution_time
 
@@ -61,12 +64,13 @@ async def lifespan(app: FastAPI):
     loop = asyncio.get_running_loop()
     set_workflow_runtime_loop(loop)
 
-    # Set Gotenberg URL
-    global_vars.gotenberg_url = f"http://localhost:{dapr_port}/v1.0/invoke/gotenberg/method/forms/libreoffice/convert"
+    # Workflows interrupted by a restart download their document again when they resume
+    clear_scratch()
 
     async with AsyncExitStack() as stack:
         init_tika()
         stack.callback(jpype.shutdownJVM)
+        stack.callback(shutdown_tika)
 
         # Initialize database pool
         global_vars.asyncpg_pool = await asyncpg.create_pool(
@@ -76,6 +80,14 @@ async def lifespan(app: FastAPI):
         )
         stack.push_async_callback(global_vars.asyncpg_pool.close)
 
+        # Shared Gotenberg client, conversions are bounded and deduplicated across workflows
+        global_vars.gotenberg = GotenbergClient(
+            f"http://localhost:{dapr_port}/v1.0/invoke/gotenberg/method/forms/libreoffice/convert",
+            StorageS3(),
+            global_vars.asyncpg_pool,
+        )
+        stack.callback(global_vars.gotenberg.close)
+
         wf_runtime.start()
         stack.callback(wf_runtime.shutdown)
 
@@ -90,6 +102,7 @@ async def lifespan(app: FastAPI):
             name="document_conversion",
             pool=global_vars.asyncpg_pool,
             workflow_client=global_vars.workflow_client,
+            max_execution_time=max_workflow_execution_time,
         )
 
         try:
@@ -98,13 +111,15 @@ async def lifespan(app: FastAPI):
                 "document_conversion",
                 global_vars.asyncpg_pool,
                 global_vars.workflow_client,
-                max_execution_time=max_workflow_execution_time,
                 batch_size=50,
                 interval_seconds=workflow_purge_interval,
             )
             cleanup_dapr_workflow_state_task = asyncio.create_task(purger.run())
             logger.info("Workflow purger initialized")
 
+            # Removes scratch directories of workflows released on another replica
+            scratch_sweeper_task = asyncio.create_task(run_scratch_sweeper())
+
             logger.info("Document conversion service initialized successfully")
 
             yield
@@ -114,6 +129,7 @@ async def lifespan(app: FastAPI):
 
             # Cancel background tasks
             await cancel_task(cleanup_dapr_workflow_state_task, "Dapr workflow state purger")
+            await cancel_task(scratch_sweeper_task, "Scratch sweeper")
 
 
 app = FastAPI(lifespan=lifespan)
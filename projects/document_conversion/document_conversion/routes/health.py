@@ -5,6 +5,8 @@ import jpype
 from common.logger import get_logger
 from common.workflows.setup import wf_runtime
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from prometheus_client import generate_latest
 
 logger = get_logger(__name__)
 
@@ -32,3 +34,9 @@ async def health_check():
     except Exception as e:
         logger.exception(message="Health check failed")
         return {"status": "unhealthy", "error": str(e)}
+
+
+@router.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint."""
+    return PlainTextResponse(generate_latest(), media_type="text/plain; version=0.0.4; charset=utf-8")
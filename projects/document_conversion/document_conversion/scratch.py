@@ -0,0 +1,132 @@
+"""Per-workflow scratch space shared by the document conversion activities."""
+
+import asyncio
+import os
+import shutil
+import time
+from pathlib import Path
+
+from common.logger import get_logger
+from common.storage import StorageS3
+
+logger = get_logger(__name__)
+
+SCRATCH_PATH = Path(os.getenv("DOCUMENT_SCRATCH_PATH", "/tmp/document_conversion"))
+# Bounds of the scratch space. A workflow whose activities ran on several replicas only
+# releases the scratch directory on one of them; the sweep removes what it leaves behind.
+SCRATCH_MAX_AGE_SECONDS = int(os.getenv("DOCUMENT_SCRATCH_MAX_AGE_SECONDS", 3600))
+SCRATCH_MAX_SIZE_MB = int(os.getenv("DOCUMENT_SCRATCH_MAX_SIZE_MB", 4096))
+SCRATCH_SWEEP_INTERVAL_SECONDS = int(os.getenv("DOCUMENT_SCRATCH_SWEEP_INTERVAL_SECONDS", 300))
+
+storage = StorageS3()
+
+# Serializes downloads of a workflow's document by activities running side by side, keyed by workflow ID
+_download_locks: dict[str, asyncio.Lock] = {}
+
+
+def scratch_dir(workflow_id: str) -> Path:
+    """Scratch directory of a workflow."""
+    return SCRATCH_PATH / workflow_id
+
+
+def document_path(workflow_id: str, extension: str | None) -> Path:
+    """Local path of the workflow's document. Keeps the extension, Gotenberg picks its converter by it."""
+    suffix = f".{extension.lstrip('.')}" if extension else ""
+    return scratch_dir(workflow_id) / f"document{suffix}"
+
+
+def _download(object_id: str, dest_path: Path) -> None:
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    partial_path = dest_path.with_name(f"{dest_path.name}.partial")
+    with storage.download(object_id, delete=False) as temp_file:
+        shutil.move(temp_file.name, partial_path)
+    os.replace(partial_path, dest_path)
+
+
+async def download_document(object_id: str, dest_path: Path) -> None:
+    """Download a document into the scratch space, unless it's already there."""
+    async with _download_locks.setdefault(dest_path.parent.name, asyncio.Lock()):
+        if not dest_path.exists():
+            await asyncio.to_thread(_download, object_id, dest_path)
+
+
+async def ensure_document(document: dict) -> str:
+    """
+    Local path of a prepared document.
+
+    The document is downloaded again if the activity runs somewhere the
+    preparation stage didn't (another replica, or after a restart).
+    """
+    path = Path(document["path"])
+    if not path.exists():
+        logger.debug("Prepared document not found locally, downloading it again", object_id=document["object_id"])
+        await download_document(document["object_id"], path)
+    return str(path)
+
+
+def remove_scratch_dir(workflow_id: str) -> None:
+    """Remove the scratch directory of a workflow."""
+    _download_locks.pop(workflow_id, None)
+    shutil.rmtree(scratch_dir(workflow_id), ignore_errors=True)
+
+
+def clear_scratch() -> None:
+    """Remove leftovers of workflows interrupted by a restart, they download their document again on resume."""
+    if not SCRATCH_PATH.exists():
+        return
+    for entry in SCRATCH_PATH.iterdir():
+        shutil.rmtree(entry, ignore_errors=True)
+
+
+def _dir_size(path: Path) -> int:
+    size = 0
+    for entry in os.scandir(path):
+        try:
+            size += entry.stat(follow_symlinks=False).st_size
+        except FileNotFoundError:
+            pass
+    return size
+
+
+def sweep_scratch(max_age_seconds: int = SCRATCH_MAX_AGE_SECONDS, max_size_mb: int = SCRATCH_MAX_SIZE_MB) -> None:
+    """
+    Remove scratch directories older than `max_age_seconds`, then the oldest ones
+    until the scratch space fits in `max_size_mb`, and forget their download locks.
+
+    Directories with a download in progress are kept. Workflows still using a removed
+    directory download their document again.
+    """
+    workflows = []
+    if SCRATCH_PATH.exists():
+        for entry in SCRATCH_PATH.iterdir():
+            lock = _download_locks.get(entry.name)
+            if lock is not None and lock.locked():
+                continue
+            try:
+                workflows.append((entry.stat().st_mtime, _dir_size(entry), entry))
+            except FileNotFoundError:
+                continue
+
+    now = time.time()
+    total_size = sum(size for _, size, _ in workflows)
+    for mtime, size, entry in sorted(workflows, key=lambda workflow: workflow[0]):
+        if now - mtime <= max_age_seconds and total_size <= max_size_mb * 1024 * 1024:
+            break
+        logger.debug("Sweeping scratch directory", workflow_id=entry.name, age=int(now - mtime), size=size)
+        remove_scratch_dir(entry.name)
+        total_size -= size
+
+    # Locks of workflows whose scratch directory was released elsewhere (or never created here)
+    for workflow_id, lock in list(_download_locks.items()):
+        if not lock.locked() and not scratch_dir(workflow_id).exists():
+            del _download_locks[workflow_id]
+
+
+async def run_scratch_sweeper(interval_seconds: int = SCRATCH_SWEEP_INTERVAL_SECONDS) -> None:
+    """Sweep the scratch space every `interval_seconds`."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            sweep_scratch()
+        except Exception:
+            logger.exception("Failed to sweep the scratch space")
@@ -0,0 +1,245 @@
+"""Pool of Tika parsers for text extraction.
+
+Every worker thread owns a Tika instance, so documents are parsed side by side
+instead of queueing behind a single instance. The extracted text is read from
+Tika's streaming reader in chunks and sent straight to storage as a multipart
+upload, so a large PDF or spreadsheet never has to be held in memory as a whole.
+Each document is bounded by a parse timeout and by a cap on the extracted text.
+
+Tika parses on a background thread of its own and feeds the reader through a pipe.
+When the timeout expires the worker thread is interrupted, which wakes it up from a
+blocked read (closing the reader alone doesn't), and it goes on with the next
+document. A parse that keeps producing text ends on its next write into the closed
+pipe, but one stuck without output keeps running on Tika's thread until it returns:
+the worker is free again, the CPU it burns is not.
+"""
+
+import asyncio
+import io
+import os
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import jpype
+from common.logger import get_logger
+from common.storage import StorageS3
+from prometheus_client import Counter, Histogram
+
+logger = get_logger(__name__)
+
+TIKA_WORKERS = int(os.getenv("TIKA_WORKERS", 2))
+TIKA_TIMEOUT_SECONDS = float(os.getenv("TIKA_TIMEOUT_SECONDS", 120))
+# Same cap Tika's parseToString() applies by default, -1 disables it
+TIKA_MAX_TEXT_LENGTH = int(os.getenv("TIKA_MAX_TEXT_LENGTH", 100_000))
+
+# Characters read from Tika per chunk
+READ_CHUNK_CHARS = 64 * 1024
+
+TIKA_EXTRACTIONS = Counter(
+    "nemesis_tika_extractions_total",
+    "Tika text extractions by mime type and outcome",
+    ["mime_type", "outcome"],
+)
+TIKA_EXTRACTION_SECONDS = Histogram(
+    "nemesis_tika_extraction_seconds",
+    "Time spent extracting and uploading the text of a document",
+    ["mime_type"],
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+)
+TIKA_INPUT_BYTES = Counter(
+    "nemesis_tika_input_bytes_total",
+    "Size of the documents handed to Tika by mime type",
+    ["mime_type"],
+)
+TIKA_EXTRACTED_BYTES = Counter(
+    "nemesis_tika_extracted_bytes_total",
+    "UTF-8 bytes of text extracted by Tika by mime type",
+    ["mime_type"],
+)
+
+
+class TikaTextStream(io.RawIOBase):
+    """Readable byte stream of the UTF-8 text Tika extracts from a document."""
+
+    def __init__(self, reader: Any, max_length: int = TIKA_MAX_TEXT_LENGTH):
+        self.reader = reader
+        self.remaining = max_length if max_length >= 0 else None
+        self.truncated = False
+        self.bytes_read = 0
+
+        self._chars = jpype.JArray(jpype.JChar)(READ_CHUNK_CHARS)
+        self._held_chars = 0  # trailing high surrogate kept for the next chunk
+        self._pending = b""
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending and not self._eof:
+            self._pending = self._read_chunk()
+
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        self.bytes_read += size
+        return size
+
+    def peek(self) -> bytes:
+        """Read ahead to the first text, returns b"" if the document has none."""
+        while not self._pending and not self._eof:
+            self._pending = self._read_chunk()
+        return self._pending
+
+    def close(self) -> None:
+        if not self.closed:
+            try:
+                self.reader.close()
+            except Exception:
+                pass
+        super().close()
+
+    def _read_chunk(self) -> bytes:
+        size = READ_CHUNK_CHARS - self._held_chars
+        if self.remaining is not None:
+            if self.remaining == 0:
+                self.truncated = self.reader.read() != -1
+                self._eof = True
+                return b""
+            size = min(size, self.remaining)
+
+        count = self.reader.read(self._chars, self._held_chars, size)
+        if count == -1:
+            self._eof = True
+            count = 0
+        if self.remaining is not None:
+            self.remaining -= count
+        count += self._held_chars
+
+        # Don't split a surrogate pair across chunks
+        self._held_chars = 0
+        if not self._eof and count and jpype.JClass("java.lang.Character").isHighSurrogate(self._chars[count - 1]):
+            self._held_chars = 1
+            count -= 1
+
+        text = str(jpype.JClass("java.lang.String")(self._chars, 0, count))
+        if self._held_chars:
+            self._chars[0] = self._chars[count]
+        return text.encode("utf-8", errors="replace")
+
+
+class _ParseDeadline:
+    """Aborts the parse of the calling worker thread once the timeout expires."""
+
+    def __init__(self, timeout: float):
+        self.expired = False
+        self._stream: TikaTextStream | None = None
+        self._worker = jpype.JClass("java.lang.Thread").currentThread()
+        self._lock = threading.Lock()
+        self._finished = False
+        self._timer = threading.Timer(timeout, self._expire)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def watch(self, stream: TikaTextStream) -> TikaTextStream:
+        with self._lock:
+            self._stream = stream
+            if self.expired:
+                stream.close()
+        return stream
+
+    def finish(self) -> None:
+        """Stop the timer. Must be called from the worker thread."""
+        self._timer.cancel()
+        with self._lock:
+            self._finished = True
+        # Clear an interrupt no read consumed, the worker thread parses the next document
+        jpype.JClass("java.lang.Thread").interrupted()
+
+    def _expire(self) -> None:
+        with self._lock:
+            if self._finished:
+                return
+            self.expired = True
+            if self._stream:
+                self._stream.close()
+            self._worker.interrupt()
+
+
+class TikaPool:
+    """Fixed set of Tika instances, each used by one worker thread at a time."""
+
+    def __init__(
+        self,
+        tika_factory: Callable[[], Any],
+        storage: StorageS3,
+        num_workers: int = TIKA_WORKERS,
+        timeout: float = TIKA_TIMEOUT_SECONDS,
+        max_text_length: int = TIKA_MAX_TEXT_LENGTH,
+    ):
+        self.storage = storage
+        self.num_workers = max(1, num_workers)
+        self.timeout = timeout
+        self.max_text_length = max_text_length
+
+        self._instances: queue.Queue = queue.Queue()
+        for _ in range(self.num_workers):
+            self._instances.put(tika_factory())
+        self._executor = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="tika")
+
+    async def extract(self, path: str, mime_type: str) -> str | None:
+        """
+        Extract the text of a document and upload it to storage.
+
+        Returns the object ID of the uploaded text, or None if the document has no text.
+        Raises TimeoutError if the parse exceeds the pool's timeout.
+        """
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            object_id, extracted_bytes, truncated = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._extract, path
+            )
+            outcome = "empty" if object_id is None else "truncated" if truncated else "success"
+            TIKA_EXTRACTED_BYTES.labels(mime_type).inc(extracted_bytes)
+            TIKA_INPUT_BYTES.labels(mime_type).inc(os.path.getsize(path))
+            return object_id
+        except TimeoutError:
+            outcome = "timeout"
+            raise
+        finally:
+            TIKA_EXTRACTIONS.labels(mime_type, outcome).inc()
+            TIKA_EXTRACTION_SECONDS.labels(mime_type).observe(time.perf_counter() - start)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _extract(self, path: str) -> tuple[str | None, int, bool]:
+        tika = self._instances.get()
+        stream = None
+        # Started before parse(), which blocks until Tika produces the first text
+        deadline = _ParseDeadline(self.timeout)
+        try:
+            try:
+                reader = tika.parse(jpype.JClass("java.io.File")(path))
+                stream = deadline.watch(TikaTextStream(reader, self.max_text_length))
+                if not stream.peek():
+                    return None, 0, False
+                object_id = self.storage.upload_stream(stream)
+            except Exception:
+                if deadline.expired:
+                    raise TimeoutError(f"Tika extraction exceeded {self.timeout:g}s") from None
+                raise
+
+            if stream.truncated:
+                logger.debug("Extracted text truncated", path=path, max_text_length=self.max_text_length)
+            return object_id, stream.bytes_read, stream.truncated
+        finally:
+            deadline.finish()
+            if stream:
+                stream.close()
+            self._instances.put(tika)
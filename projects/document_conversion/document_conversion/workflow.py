@@ -14,6 +14,7 @@ from .activities.finalize_workflow import (
     update_workflow_status_to_running,
 )
 from .activities.pdf_conversion import convert_to_pdf
+from .activities.prepare_document import prepare_document, release_document
 from .activities.publish_file import publish_file_message
 from .activities.store_transform import store_transform
 
@@ -24,6 +25,7 @@ logger = get_logger(__name__)
 def document_conversion_workflow(ctx: DaprWorkflowContext, workflow_input: dict):
     """Main workflow for document conversion processing."""
     start_time = ctx.current_utc_datetime
+    document = None
 
     try:
         object_id = workflow_input["object_id"]
@@ -46,29 +48,33 @@ def document_conversion_workflow(ctx: DaprWorkflowContext, workflow_input: dict)
             retry_timeout=timedelta(minutes=10),
         )
 
-        # Run all extraction methods in parallel
-        enrichment_tasks = [
-            ctx.call_activity(
-                extract_text,
-                input={"object_id": object_id},
-                retry_policy=retry_policy,
-            ),
-            ctx.call_activity(
-                extract_strings,
-                input={"object_id": object_id},
-                retry_policy=retry_policy,
-            ),
-            ctx.call_activity(
-                convert_to_pdf,
-                input={"object_id": object_id},
-                retry_policy=retry_policy,
-            ),
-        ]
-
-        # Wait for all extraction tasks to complete
-        results = yield when_all(enrichment_tasks)
-
-        valid_transforms = [result for result in results if result is not None]
+        # Download the file once into the workflow's scratch space, shared by the extraction activities
+        document = yield ctx.call_activity(
+            prepare_document,
+            input={"object_id": object_id},
+            retry_policy=retry_policy,
+        )
+
+        valid_transforms = []
+        if document:
+            # Run all applicable extraction methods in parallel
+            extraction_activities = {
+                "extract_text": extract_text,
+                "extract_strings": extract_strings,
+                "convert_to_pdf": convert_to_pdf,
+            }
+            enrichment_tasks = [
+                ctx.call_activity(activity, input=document, retry_policy=retry_policy)
+                for task, activity in extraction_activities.items()
+                if document["tasks"][task]
+            ]
+
+            # Wait for all extraction tasks to complete
+            results = yield when_all(enrichment_tasks)
+
+            yield ctx.call_activity(release_document, input={})
+
+            valid_transforms = [result for result in results if result is not None]
 
         if valid_transforms:
             # For each transform, create parallel tasks for storing and publishing
@@ -106,6 +112,9 @@ def document_conversion_workflow(ctx: DaprWorkflowContext, workflow_input: dict)
 
         # Mark workflow as failed
         try:
+            if document:
+                yield ctx.call_activity(release_document, input={})
+
             yield ctx.call_activity(
                 finalize_workflow_failure,
                 input={
@@ -0,0 +1,110 @@
+"""Tests for the deduplicating Gotenberg client."""
+
+import asyncio
+import os
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from document_conversion.gotenberg import GotenbergClient
+
+
+class FakeStorage:
+    def __init__(self):
+        self.objects: dict[str, bytes] = {}
+
+    def upload_stream(self, stream) -> str:
+        object_id = f"pdf-{len(self.objects)}"
+        self.objects[object_id] = stream.read()
+        return object_id
+
+    def copy_object(self, object_id: str) -> str:
+        copy_id = f"copy-{len(self.objects)}"
+        self.objects[copy_id] = self.objects[object_id]
+        return copy_id
+
+
+class FakeConnection:
+    def __init__(self, converted: dict[tuple[str, str], str]):
+        self.converted = converted
+
+    async def fetchval(self, query, sha256, extension):
+        return self.converted.get((sha256, extension))
+
+
+class FakePool:
+    def __init__(self, converted: dict[tuple[str, str], str] | None = None):
+        self.converted = converted or {}
+
+    def acquire(self):
+        connection = FakeConnection(self.converted)
+
+        class Acquire:
+            async def __aenter__(self):
+                return connection
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return Acquire()
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / "scratch" / "document.docx"
+    path.parent.mkdir()
+    path.write_bytes(b"document")
+    return str(path)
+
+
+def make_client(storage: FakeStorage, pool: FakePool) -> GotenbergClient:
+    client = GotenbergClient("http://gotenberg", storage, pool)
+    client._client = MagicMock()
+    return client
+
+
+class TestGotenbergClient:
+    @pytest.mark.asyncio
+    async def test_reused_pdf_is_copied(self, document):
+        """A PDF converted for other content is published under a new object ID."""
+        storage = FakeStorage()
+        storage.objects["existing"] = b"%PDF"
+        client = make_client(storage, FakePool({("abc", ".docx"): "existing"}))
+        client._post = MagicMock()
+
+        pdf_object_id = await client.convert(document, "abc", ".DOCX")
+
+        assert pdf_object_id != "existing"
+        assert storage.objects[pdf_object_id] == b"%PDF"
+        client._post.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_conversions_share_one_request(self, document):
+        """Joined callers get their own copy of the PDF, and the scratch file may go away meanwhile."""
+        storage = FakeStorage()
+        client = make_client(storage, FakePool())
+        release = threading.Event()
+        posted = []
+
+        def post(handle, landscape):
+            release.wait(5)
+            posted.append(handle.read())
+            return storage.upload_stream(MagicMock(read=lambda: b"%PDF"))
+
+        client._post = post
+
+        owner = asyncio.create_task(client.convert(document, "abc", ".docx"))
+        await asyncio.sleep(0)
+        joiners = [asyncio.create_task(client.convert(document, "abc", ".docx")) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        # The owner's workflow releasing its scratch copy must not break the shared conversion
+        os.remove(document)
+        release.set()
+        pdf_object_ids = await asyncio.gather(owner, *joiners)
+
+        assert posted == [b"document"]
+        assert pdf_object_ids[0] == "pdf-0"
+        assert len(set(pdf_object_ids)) == 3
+        assert all(storage.objects[object_id] == b"%PDF" for object_id in pdf_object_ids)
+        assert client._conversions == {}
@@ -0,0 +1,83 @@
+"""Tests for the document conversion scratch space."""
+
+import asyncio
+import os
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# The module connects to storage on import
+with patch("common.storage.StorageS3", MagicMock()):
+    from document_conversion import scratch
+
+
+@pytest.fixture(autouse=True)
+def scratch_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(scratch, "SCRATCH_PATH", tmp_path)
+    monkeypatch.setattr(scratch, "_download_locks", {})
+    return tmp_path
+
+
+def fake_download(object_id, dest_path):
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    dest_path.write_bytes(b"x" * 1024)
+
+
+def age(workflow_id: str, seconds: int) -> None:
+    mtime = time.time() - seconds
+    os.utime(scratch.scratch_dir(workflow_id), (mtime, mtime))
+
+
+class TestSweepScratch:
+    @pytest.mark.asyncio
+    async def test_cross_replica_release(self):
+        """A workflow released on another replica leaves its directory and lock here until they're swept."""
+        with patch.object(scratch, "_download", fake_download):
+            await scratch.ensure_document({"object_id": "obj", "path": str(scratch.document_path("wf-1", ".docx"))})
+        # release_document ran on another replica, so nothing removed the directory here
+        assert scratch.scratch_dir("wf-1").exists()
+        assert "wf-1" in scratch._download_locks
+
+        scratch.sweep_scratch()
+        assert scratch.scratch_dir("wf-1").exists()
+
+        age("wf-1", scratch.SCRATCH_MAX_AGE_SECONDS + 60)
+        scratch.sweep_scratch()
+
+        assert not scratch.scratch_dir("wf-1").exists()
+        assert scratch._download_locks == {}
+
+    @pytest.mark.asyncio
+    async def test_locks_of_released_directories_are_dropped(self):
+        """A lock left by a download on one replica is dropped once the directory is gone."""
+        with patch.object(scratch, "_download", fake_download):
+            await scratch.download_document("obj", scratch.document_path("wf-1", None))
+        # The directory was removed, but not through remove_scratch_dir
+        scratch.clear_scratch()
+
+        scratch.sweep_scratch()
+
+        assert scratch._download_locks == {}
+
+    def test_size_bound_removes_oldest_first(self):
+        for i, workflow_id in enumerate(["wf-old", "wf-mid", "wf-new"]):
+            path = scratch.document_path(workflow_id, None)
+            path.parent.mkdir(parents=True)
+            path.write_bytes(b"x" * 600 * 1024)
+            age(workflow_id, 300 - i * 100)
+
+        scratch.sweep_scratch(max_size_mb=1)
+
+        assert sorted(path.name for path in scratch.SCRATCH_PATH.iterdir()) == ["wf-new"]
+
+    @pytest.mark.asyncio
+    async def test_directory_with_download_in_progress_is_kept(self):
+        fake_download("obj", scratch.document_path("wf-1", None))
+        age("wf-1", scratch.SCRATCH_MAX_AGE_SECONDS + 60)
+        lock = scratch._download_locks.setdefault("wf-1", asyncio.Lock())
+
+        async with lock:
+            scratch.sweep_scratch()
+
+        assert scratch.scratch_dir("wf-1").exists()
@@ -0,0 +1,147 @@
+"""Tests for the Tika parser pool."""
+
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+
+class FakeJavaThread:
+    """java.lang.Thread: only the interrupt status of the calling thread."""
+
+    _local = threading.local()
+
+    def __init__(self):
+        self.interrupt_status = threading.Event()
+
+    @classmethod
+    def currentThread(cls):  # noqa: N802
+        if not hasattr(cls._local, "thread"):
+            cls._local.thread = cls()
+        return cls._local.thread
+
+    @classmethod
+    def interrupted(cls) -> bool:
+        status = cls.currentThread().interrupt_status
+        was_interrupted = status.is_set()
+        status.clear()
+        return was_interrupted
+
+    def interrupt(self) -> None:
+        self.interrupt_status.set()
+
+
+class InterruptedIOError(Exception):
+    pass
+
+
+def wait_for_parser() -> None:
+    """Block like a read from Tika's pipe: only an interrupt wakes it up, closing the reader doesn't."""
+    if not FakeJavaThread.currentThread().interrupt_status.wait(10):
+        raise AssertionError("read was never interrupted")
+    FakeJavaThread.interrupted()
+    raise InterruptedIOError
+
+
+_classes = {
+    "java.lang.Thread": FakeJavaThread,
+    "java.io.File": str,
+    "java.lang.Character": types.SimpleNamespace(isHighSurrogate=lambda char: "\ud800" <= char <= "\udbff"),
+    "java.lang.String": lambda chars, offset, count: "".join(chars[offset : offset + count]),
+}
+sys.modules["jpype"] = types.SimpleNamespace(
+    JClass=_classes.__getitem__,
+    JArray=lambda _: lambda size: ["\0"] * size,
+    JChar=str,
+)
+
+from document_conversion.tika_pool import TikaPool  # noqa: E402
+
+
+class FakeReader:
+    def __init__(self, text: str, hang: bool):
+        self.text = text
+        self.hang = hang
+        self.closed = False
+
+    def read(self, chars=None, offset=0, length=0) -> int:
+        if self.hang or FakeJavaThread.currentThread().interrupt_status.is_set():
+            wait_for_parser()
+        if self.closed:
+            raise OSError("Stream closed")
+        if not self.text:
+            return -1
+        if chars is None:
+            return ord(self.text[0])
+        chunk, self.text = self.text[:length], self.text[length:]
+        chars[offset : offset + len(chunk)] = list(chunk)
+        return len(chunk)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeTika:
+    def parse(self, path: str) -> FakeReader:
+        if "parse-hangs" in path:
+            # Tika's reader waits for the first text before returning
+            wait_for_parser()
+        with open(path) as f:
+            return FakeReader(f.read(), hang="read-hangs" in path)
+
+
+class FakeStorage:
+    def __init__(self):
+        self.objects: dict[str, bytes] = {}
+
+    def upload_stream(self, stream) -> str:
+        object_id = f"text-{len(self.objects)}"
+        self.objects[object_id] = stream.read()
+        return object_id
+
+
+@pytest.fixture
+def documents(tmp_path):
+    paths = {}
+    for name in ("document", "read-hangs", "parse-hangs"):
+        paths[name] = str(tmp_path / f"{name}.txt")
+        with open(paths[name], "w") as f:
+            f.write("some text")
+    return paths
+
+
+@pytest.fixture
+def storage():
+    return FakeStorage()
+
+
+@pytest.fixture
+def pool(storage):
+    pool = TikaPool(FakeTika, storage, num_workers=1, timeout=0.2)
+    yield pool
+    pool.shutdown()
+
+
+class TestTikaPool:
+    @pytest.mark.asyncio
+    async def test_extract(self, pool, storage, documents):
+        object_id = await pool.extract(documents["document"], "text/plain")
+
+        assert storage.objects[object_id] == b"some text"
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("document", ["read-hangs", "parse-hangs"])
+    async def test_timeout_frees_the_worker(self, pool, storage, documents, document):
+        """A parse past the timeout gives its worker back, so timeouts can't exhaust the pool."""
+        start = time.monotonic()
+        with pytest.raises(TimeoutError):
+            await pool.extract(documents[document], "text/plain")
+        assert time.monotonic() - start < 5
+
+        # The only worker takes the next document, with no interrupt left over
+        object_id = await pool.extract(documents["document"], "text/plain")
+
+        assert storage.objects[object_id] == b"some text"
+        assert pool._instances.qsize() == 1
@@ -1,12 +1,10 @@
 """Basic file analysis activity."""
 
 import json
-import pathlib
 import posixpath
 from datetime import datetime
 
 import common.helpers as helpers
-import magic
 from common.helpers import get_file_extension, is_container
 from common.logger import get_logger
 from common.workflows.setup import workflow_activity
@@ -78,25 +76,17 @@ def process_basic_analysis(temp_file_path: str, file_dict: dict) -> dict:
     """
     path = file_dict.get("path", "")
 
-    mime_type = magic.from_file(temp_file_path, mime=True)
-    if mime_type == "text/plain" or helpers.is_text_file(temp_file_path):
-        is_plaintext = True
-    else:
-        is_plaintext = False
+    fingerprint = helpers.fingerprint_file(temp_file_path)
 
     basic_analysis = {
         "file_name": posixpath.basename(path),
         "extension": get_file_extension(path),
-        "size": pathlib.Path(temp_file_path).stat().st_size,
-        "hashes": {
-            "md5": helpers.calculate_file_hash(temp_file_path, "md5"),
-            "sha1": helpers.calculate_file_hash(temp_file_path, "sha1"),
-            "sha256": helpers.calculate_file_hash(temp_file_path, "sha256"),
-        },
-        "magic_type": magic.from_file(temp_file_path),
-        "mime_type": mime_type,
-        "is_plaintext": is_plaintext,
-        "is_container": is_container(mime_type),
+        "size": fingerprint.size,
+        "hashes": fingerprint.hashes,
+        "magic_type": fingerprint.magic_type,
+        "mime_type": fingerprint.mime_type,
+        "is_plaintext": fingerprint.is_plaintext,
+        "is_container": is_container(fingerprint.mime_type),
     }
 
     file_enriched = {
@@ -1,15 +1,17 @@
 """Enrichment modules activity."""
 
-import json
+import asyncio
 import os
+from collections.abc import Awaitable, Callable
 
-import common.helpers as helpers
 import file_enrichment.global_vars as global_vars
 from common.logger import get_logger
 from common.models import EnrichmentResult
+from common.state_helpers import get_file_enriched_async
 from common.workflows.setup import workflow_activity
 from dapr.ext.workflow.workflow_activity_context import WorkflowActivityContext
 
+from ..result_writer import EnrichmentBatch
 from ..tracing import get_tracer
 
 logger = get_logger(__name__)
@@ -33,8 +35,6 @@ async def run_enrichment_modules(ctx: WorkflowActivityContext, activity_input: d
         span.set_attribute("module_count", len(execution_order))
 
         results = []
-        success_list = []
-        failure_list = []
 
         try:
             # Download file as a separate span
@@ -70,7 +70,9 @@ async def run_enrichment_modules(ctx: WorkflowActivityContext, activity_input: d
                     module_count=len(modules_to_process),
                 )
 
-                for module_name in modules_to_process:
+                batch = EnrichmentBatch(object_id=object_id, workflow_id=ctx.workflow_id)
+
+                async def run_module(module_name: str) -> None:
                     # Create a span for each module execution
                     with tracer.start_as_current_span(f"enrichment.{module_name}") as module_span:
                         module_span.set_attribute("module.name", module_name)
@@ -80,8 +82,8 @@ async def run_enrichment_modules(ctx: WorkflowActivityContext, activity_input: d
                             result = await execute_enrichment_module(object_id, temp_file.name, module_name)
 
                             if result:
-                                # Store enrichment result directly in database
-                                await store_enrichment_results(object_id, module_name, result)
+                                # Stored together with the rest of this file's output below
+                                batch.results.append((module_name, result))
 
                                 results.append((module_name, {"status": "success", "module": module_name}))
                                 logger.debug("Module completed successfully with results", module_name=module_name)
@@ -91,14 +93,7 @@ async def run_enrichment_modules(ctx: WorkflowActivityContext, activity_input: d
                                 logger.debug("Module completed successfully with no results", module_name=module_name)
                                 module_span.set_attribute("module.status", "success_no_results")
 
-                            # Track success immediately after module completes
-                            # This ensures tracking is updated even if a later module fails
-                            assert global_vars.tracking_service is not None
-                            await global_vars.tracking_service.update_enrichment_results(
-                                instance_id=ctx.workflow_id,
-                                success_list=[module_name],
-                            )
-                            success_list.append(module_name)  # Keep for logging
+                            batch.success_list.append(module_name)
 
                         except Exception as e:
                             logger.exception(
@@ -108,28 +103,33 @@ async def run_enrichment_modules(ctx: WorkflowActivityContext, activity_input: d
                                 error=str(e),
                             )
 
-                            # Track failure immediately
-                            failure_msg = f"{module_name}:{str(e)[:100]}"
-                            assert global_vars.tracking_service is not None
-                            await global_vars.tracking_service.update_enrichment_results(
-                                instance_id=ctx.workflow_id,
-                                failure_list=[failure_msg],
-                            )
-                            failure_list.append(failure_msg)  # Keep for logging
+                            batch.failure_list.append(f"{module_name}:{str(e)[:100]}")
 
                             results.append((module_name, None))
                             module_span.set_attribute("module.status", "error")
                             module_span.set_attribute("module.error", str(e)[:200])
                             # Continue with other modules instead of raising
+
+                # Independent modules run concurrently; each module starts once its dependencies finish
+                await run_modules_in_dependency_order(
+                    modules_to_process,
+                    global_vars.module_dependency_graph,
+                    run_module,
+                    global_vars.max_parallel_modules,
+                )
             finally:
                 # Ensure temp_file is cleaned up
                 temp_file.__exit__(None, None, None)
 
-            # Tracking is now done incrementally inside the loop above
+            # Write all enrichments, transforms, findings and tracking updates for the file at once
+            with tracer.start_as_current_span("store_enrichment_results") as store_span:
+                store_span.set_attribute("row_count", batch.row_count)
+                await store_enrichment_batch(batch)
+
             logger.debug(
                 "All enrichment modules processed",
-                success_count=len(success_list),
-                failure_count=len(failure_list),
+                success_count=len(batch.success_list),
+                failure_count=len(batch.failure_list),
             )
 
         except Exception as e:
@@ -144,24 +144,76 @@ async def run_enrichment_modules(ctx: WorkflowActivityContext, activity_input: d
 
 
 async def determine_modules_to_process(object_id: str, temp_file_path: str, execution_order: list[str]) -> list[str]:
-    """First pass: determine which modules should process this file."""
-    modules_to_process = []
+    """First pass: determine which modules should process this file.
 
-    for module_name in execution_order:
-        if module_name not in global_vars.global_module_map:
-            logger.warning("Module not found", module_name=module_name)
-            continue
+    The routing index selects the candidate modules from the file's basic analysis (and one
+    scan of its header), should_process is only awaited for candidates that ask for it.
+    """
+    assert global_vars.module_router is not None
+    file_enriched = await get_file_enriched_async(object_id, global_vars.asyncpg_pool)
+    candidates = global_vars.module_router.route(file_enriched, temp_file_path)
+
+    async def check(module_name: str) -> bool:
+        if not global_vars.module_router.needs_should_process(module_name):
+            return True
 
         module = global_vars.global_module_map[module_name]
         try:
-            should_process = await module.should_process(object_id, temp_file_path)
-
-            if should_process:
-                modules_to_process.append(module_name)
+            return await module.should_process(object_id, temp_file_path)
         except Exception as e:
             logger.exception("Error in should_process", module_name=module_name, error=str(e))
+            return False
 
-    return modules_to_process
+    modules_to_check = []
+    for module_name in execution_order:
+        if module_name not in global_vars.global_module_map:
+            logger.warning("Module not found", module_name=module_name)
+        elif module_name in candidates:
+            modules_to_check.append(module_name)
+
+    results = await asyncio.gather(*(check(module_name) for module_name in modules_to_check))
+    return [
+        module_name for module_name, should_process in zip(modules_to_check, results, strict=True) if should_process
+    ]
+
+
+async def run_modules_in_dependency_order(
+    modules_to_process: list[str],
+    dependency_graph: dict[str, set[str]],
+    run_module: Callable[[str], Awaitable[None]],
+    max_parallel: int,
+) -> None:
+    """
+    Run the selected modules concurrently while respecting declared dependencies.
+
+    A module starts as soon as every dependency that was also selected for this file
+    has finished (successfully or not), and at most `max_parallel` modules run at once.
+    `run_module` is expected to handle and record its own errors.
+
+    Args:
+        modules_to_process: Selected module names, in topological order
+        dependency_graph: Mapping of module name to the names of the modules it depends on
+        run_module: Coroutine function that runs a single module
+        max_parallel: Maximum number of modules running at the same time
+    """
+    selected = set(modules_to_process)
+    finished = {module_name: asyncio.Event() for module_name in modules_to_process}
+    semaphore = asyncio.Semaphore(max(1, max_parallel))
+
+    async def run_when_ready(module_name: str) -> None:
+        try:
+            for dependency in dependency_graph.get(module_name, ()):
+                if dependency in selected:
+                    await finished[dependency].wait()
+
+            async with semaphore:
+                await run_module(module_name)
+        finally:
+            finished[module_name].set()
+
+    async with asyncio.TaskGroup() as task_group:
+        for module_name in modules_to_process:
+            task_group.create_task(run_when_ready(module_name))
 
 
 async def execute_enrichment_module(object_id: str, temp_file_path: str, module_name: str) -> EnrichmentResult | None:
@@ -170,58 +222,32 @@ async def execute_enrichment_module(object_id: str, temp_file_path: str, module_
     logger.debug("Starting module processing", module_name=module_name)
 
     module = global_vars.global_module_map[module_name]
-    result = await module.process(object_id, temp_file_path)
+    timeout = global_vars.max_module_execution_time
+    try:
+        async with asyncio.timeout(timeout):
+            result = await module.process(object_id, temp_file_path)
+    except TimeoutError as e:
+        raise TimeoutError(f"Module processing timed out after {timeout} seconds") from e
 
     return result
 
 
-async def store_enrichment_results(object_id: str, module_name: str, result: EnrichmentResult):
-    """Store enrichment results, transforms, and findings in the database."""
-    assert global_vars.asyncpg_pool is not None
-    async with global_vars.asyncpg_pool.acquire() as conn:
-        async with conn.transaction():
-            # Store enrichment
-            results_escaped = json.dumps(helpers.sanitize_for_jsonb(result.model_dump(mode="json")))
-            await conn.execute(
-                """
-                INSERT INTO enrichments (object_id, module_name, result_data)
-                VALUES ($1, $2, $3)
-            """,
-                object_id,
-                module_name,
-                results_escaped,
-            )
-
-            # Store any transforms
-            if result.transforms:
-                for transform in result.transforms:
-                    await conn.execute(
-                        """
-                        INSERT INTO transforms (object_id, type, transform_object_id, metadata)
-                        VALUES ($1, $2, $3, $4)
-                    """,
-                        object_id,
-                        transform.type,
-                        transform.object_id,
-                        json.dumps(transform.metadata) if transform.metadata else None,
-                    )
-
-            # Store any findings
-            if result.findings:
-                for finding in result.findings:
-                    await conn.execute(
-                        """
-                        INSERT INTO findings (
-                            finding_name, category, severity, object_id,
-                            origin_type, origin_name, raw_data, data
-                        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-                    """,
-                        finding.finding_name,
-                        finding.category,
-                        finding.severity,
-                        object_id,
-                        finding.origin_type,
-                        finding.origin_name,
-                        json.dumps(finding.raw_data),
-                        json.dumps([obj.model_dump_json() for obj in finding.data]),
-                    )
+async def store_enrichment_batch(batch: EnrichmentBatch) -> None:
+    """Persist a file's enrichment output, falling back to recording its modules as failed."""
+    assert global_vars.result_writer is not None
+    try:
+        await global_vars.result_writer.write(batch)
+    except Exception as e:
+        logger.exception("Failed to store enrichment results", object_id=batch.object_id, error=str(e))
+
+        # Modules whose results could not be stored are tracked as failures
+        stored_modules = {module_name for module_name, _ in batch.results}
+        failure_list = batch.failure_list + [f"{module_name}:{str(e)[:100]}" for module_name in stored_modules]
+        success_list = [module_name for module_name in batch.success_list if module_name not in stored_modules]
+
+        assert global_vars.tracking_service is not None
+        await global_vars.tracking_service.update_enrichment_results(
+            instance_id=batch.workflow_id,
+            success_list=success_list,
+            failure_list=failure_list,
+        )
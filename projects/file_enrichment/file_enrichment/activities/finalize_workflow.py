@@ -20,6 +20,10 @@ async def finalize_workflow_success(ctx: WorkflowActivityContext, activity_input
     """
     instance_id = ctx.workflow_id
 
+    # Workflows are timed out by the replica that scheduled them, this is a no-op elsewhere
+    if global_vars.workflow_manager is not None:
+        global_vars.workflow_manager.workflow_finished(instance_id)
+
     assert global_vars.tracking_service is not None
     try:
         logger.info(
@@ -50,6 +54,9 @@ async def finalize_workflow_failure(ctx: WorkflowActivityContext, activity_input
     instance_id = ctx.workflow_id
     error_message = activity_input.get("error_message", "Unknown error")
 
+    if global_vars.workflow_manager is not None:
+        global_vars.workflow_manager.workflow_finished(instance_id)
+
     assert global_vars.tracking_service is not None
     try:
         logger.error(
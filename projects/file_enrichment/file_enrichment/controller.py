@@ -3,6 +3,7 @@ import os
 from contextlib import AsyncExitStack, asynccontextmanager
 
 import file_enrichment.global_vars as global_vars
+from chromium import ChromiumRetryScheduler
 from common.db import create_connection_pool, pool_stats_logger
 from common.logger import get_logger
 from common.queues import (
@@ -21,12 +22,14 @@ from dapr.aio.clients import DaprClient
 from dapr.ext.fastapi import DaprApp
 from fastapi import FastAPI
 from file_enrichment.postgres_notifications import postgres_notify_listener
-from file_linking import FileLinkingEngine
+from file_enrichment_modules.process_pool import start_process_pool
+from file_linking import FileLinkingDatabaseService, FileLinkingEngine, FileLinkingWriter
 from grpc import RpcError
 from nemesis_dpapi import DpapiManager as NemesisDpapiManager
 from nemesis_dpapi.eventing import DaprDpapiEventPublisher
 
 from .debug_utils import setup_debug_signals
+from .result_writer import EnrichmentResultWriter
 from .routes.dpapi import dpapi_background_monitor, dpapi_router
 from .routes.enrichments import router as enrichments_router
 from .routes.health import router as health_router
@@ -103,10 +106,14 @@ async def lifespan(app: FastAPI):
         dapr_client = await stack.enter_async_context(DaprClient())
 
         global_vars.asyncpg_pool = await create_connection_pool(dapr_client)
-        global_vars.file_linking_engine = FileLinkingEngine(global_vars.asyncpg_pool)
-
         stack.push_async_callback(global_vars.asyncpg_pool.close)
 
+        # Merge the file listing/linking writes of concurrently processed files
+        file_linking_writer = await stack.enter_async_context(
+            FileLinkingWriter(FileLinkingDatabaseService(global_vars.asyncpg_pool))
+        )
+        global_vars.file_linking_engine = FileLinkingEngine(global_vars.asyncpg_pool, writer=file_linking_writer)
+
         dpapi_manager = await stack.enter_async_context(
             NemesisDpapiManager(
                 storage_backend=global_vars.asyncpg_pool,
@@ -116,18 +123,35 @@ async def lifespan(app: FastAPI):
         )
         app.state.dpapi_manager = dpapi_manager
 
+        global_vars.chromium_retry_scheduler = ChromiumRetryScheduler(dpapi_manager, global_vars.asyncpg_pool)
+        stack.push_async_callback(global_vars.chromium_retry_scheduler.close)
+
         # Initialize workflow runtime and modules
         global_vars.module_execution_order = await initialize_enrichment_modules(dpapi_manager)
 
+        # Move the parsing of CPU-bound modules off the workflow event loop
+        module_process_pool = start_process_pool(global_vars.global_module_map.values())
+        if module_process_pool:
+            stack.callback(module_process_pool.shutdown)
+
         # Initialize workflow tracking service as a global variable
         global_vars.tracking_service = WorkflowTrackingService(
             name="file_enrichment",
             pool=global_vars.asyncpg_pool,
             workflow_client=global_vars.workflow_client,
+            max_execution_time=max_workflow_execution_time,
         )
 
         logger.info("Workflow purger initialized")
 
+        global_vars.result_writer = await stack.enter_async_context(
+            EnrichmentResultWriter(
+                pool=global_vars.asyncpg_pool,
+                flush_interval=global_vars.result_flush_interval_ms / 1000,
+                max_batch_rows=global_vars.result_flush_max_rows,
+            )
+        )
+
         # Use async context manager for WorkflowManager
         wf_manager = await stack.enter_async_context(
             WorkflowManager(
@@ -148,7 +172,7 @@ async def lifespan(app: FastAPI):
                 "file_enrichment",
                 global_vars.asyncpg_pool,
                 global_vars.workflow_client,
-                max_execution_time=max_workflow_execution_time,
+                handle_timeouts=False,  # WorkflowManager times out workflows
                 batch_size=50,
                 interval_seconds=5,
             )
@@ -2,13 +2,16 @@ import os
 
 import asyncpg
 import dapr.ext.workflow as wf
+from chromium import ChromiumRetryScheduler
 from common.logger import WORKFLOW_CLIENT_LOG_LEVEL
 from common.storage import StorageS3
 from common.workflows.tracking_service import WorkflowTrackingService
 from dapr.ext.workflow.logger.options import LoggerOptions
 from file_enrichment_modules.module_loader import EnrichmentModule
+from file_enrichment_modules.routing import ModuleRouter
 from file_linking import FileLinkingEngine
 
+from .result_writer import EnrichmentResultWriter
 from .workflow_manager import WorkflowManager
 
 workflow_client = wf.DaprWorkflowClient(
@@ -34,7 +37,15 @@ asyncpg_pool: asyncpg.Pool | None = None  # Connection pool for database operati
 file_linking_engine: FileLinkingEngine | None = None
 
 module_execution_order: list[str] = []
+module_dependency_graph: dict[str, set[str]] = {}  # module name -> names of the modules it depends on
+module_router: ModuleRouter | None = None  # Index of the modules' routing declarations
 workflow_manager: WorkflowManager | None = None
 tracking_service: WorkflowTrackingService | None = None  # Workflow tracking service for monitoring workflow state
+result_writer: EnrichmentResultWriter | None = None  # Batched writer for enrichment results/transforms/findings
+chromium_retry_scheduler: ChromiumRetryScheduler | None = None  # Coalesced retries of chromium data decryption
 
 max_workflow_execution_time = int(os.getenv("MAX_WORKFLOW_EXECUTION_TIME", 300))
+max_parallel_modules = int(os.getenv("MAX_PARALLEL_MODULES", 4))  # concurrent enrichment modules per file
+max_module_execution_time = int(os.getenv("MAX_MODULE_EXECUTION_TIME", 120))  # per-module timeout in seconds
+result_flush_interval_ms = int(os.getenv("RESULT_FLUSH_INTERVAL_MS", 20))  # window for coalescing result writes
+result_flush_max_rows = int(os.getenv("RESULT_FLUSH_MAX_ROWS", 5000))  # pending rows that force a flush
@@ -0,0 +1,202 @@
+"""Batched persistence of enrichment results, transforms, findings and tracking updates."""
+
+import asyncio
+import json
+from dataclasses import dataclass, field
+
+import asyncpg
+import common.helpers as helpers
+from common.logger import get_logger
+from common.models import EnrichmentResult
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class EnrichmentBatch:
+    """Everything the enrichment modules produced for one file."""
+
+    object_id: str
+    workflow_id: str
+    results: list[tuple[str, EnrichmentResult]] = field(default_factory=list)
+    success_list: list[str] = field(default_factory=list)
+    failure_list: list[str] = field(default_factory=list)
+
+    @property
+    def row_count(self) -> int:
+        return sum(1 + len(result.transforms or []) + len(result.findings or []) for _, result in self.results)
+
+
+def _enrichment_rows(batches: list[EnrichmentBatch]) -> tuple[list[tuple], list[tuple], list[tuple]]:
+    enrichments = []
+    transforms = []
+    findings = []
+
+    for batch in batches:
+        for module_name, result in batch.results:
+            results_escaped = json.dumps(helpers.sanitize_for_jsonb(result.model_dump(mode="json")))
+            enrichments.append((batch.object_id, module_name, results_escaped))
+
+            for transform in result.transforms or []:
+                transforms.append(
+                    (
+                        batch.object_id,
+                        transform.type,
+                        transform.object_id,
+                        json.dumps(transform.metadata) if transform.metadata else None,
+                    )
+                )
+
+            for finding in result.findings or []:
+                findings.append(
+                    (
+                        finding.finding_name,
+                        finding.category,
+                        finding.severity,
+                        batch.object_id,
+                        finding.origin_type,
+                        finding.origin_name,
+                        json.dumps(finding.raw_data),
+                        json.dumps([obj.model_dump_json() for obj in finding.data]),
+                    )
+                )
+
+    return enrichments, transforms, findings
+
+
+class EnrichmentResultWriter:
+    """
+    Coalesces the enrichment output of concurrently running workflows into batched writes.
+
+    Each `write()` call is queued and flushed together with every other batch that
+    arrives within `flush_interval` seconds (or as soon as `max_batch_rows` rows are
+    pending). A flush writes all queued batches in one transaction, with a single
+    pipelined executemany per table. If that transaction fails, each batch is retried
+    in its own transaction so one bad file cannot fail the files it was flushed with.
+    """
+
+    def __init__(self, pool: asyncpg.Pool, flush_interval: float = 0.02, max_batch_rows: int = 5000):
+        """
+        Args:
+            pool: asyncpg connection pool (externally managed)
+            flush_interval: seconds to wait for other batches before flushing
+            max_batch_rows: pending row count that triggers an immediate flush
+        """
+        self.pool = pool
+        self.flush_interval = flush_interval
+        self.max_batch_rows = max_batch_rows
+
+        self._pending: list[tuple[EnrichmentBatch, asyncio.Future]] = []
+        self._pending_rows = 0
+        self._flush_timer: asyncio.TimerHandle | None = None
+        self.background_tasks = set()  # Track flush tasks to prevent GC
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Flush whatever is still queued and wait for in-flight flushes."""
+        self._start_flush()
+        if self.background_tasks:
+            await asyncio.gather(*self.background_tasks, return_exceptions=True)
+
+    async def write(self, batch: EnrichmentBatch) -> None:
+        """Queue `batch` and wait until it has been committed."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((batch, future))
+        self._pending_rows += batch.row_count
+
+        if self._pending_rows >= self.max_batch_rows:
+            self._start_flush()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.get_running_loop().call_later(self.flush_interval, self._start_flush)
+
+        # Shield the commit so a cancelled caller doesn't leave the future unresolved mid-flush
+        await asyncio.shield(future)
+
+    def _start_flush(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, []
+        self._pending_rows = 0
+
+        task = asyncio.create_task(self._flush(pending))
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+
+    async def _flush(self, pending: list[tuple[EnrichmentBatch, asyncio.Future]]) -> None:
+        batches = [batch for batch, _ in pending]
+        try:
+            await self._write_batches(batches)
+            for _, future in pending:
+                if not future.done():
+                    future.set_result(None)
+            logger.debug("Flushed enrichment results", files=len(batches))
+            return
+        except Exception as e:
+            if len(pending) == 1:
+                pending[0][1].set_exception(e)
+                return
+            logger.warning("Batched enrichment write failed, retrying per file", files=len(batches), error=str(e))
+
+        for batch, future in pending:
+            try:
+                await self._write_batches([batch])
+                future.set_result(None)
+            except Exception as e:
+                future.set_exception(e)
+
+    async def _write_batches(self, batches: list[EnrichmentBatch]) -> None:
+        enrichments, transforms, findings = _enrichment_rows(batches)
+        tracking = [
+            (batch.success_list, batch.failure_list, batch.workflow_id)
+            for batch in batches
+            if batch.success_list or batch.failure_list
+        ]
+
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if enrichments:
+                    await conn.executemany(
+                        """
+                        INSERT INTO enrichments (object_id, module_name, result_data)
+                        VALUES ($1, $2, $3)
+                        """,
+                        enrichments,
+                    )
+
+                if transforms:
+                    await conn.executemany(
+                        """
+                        INSERT INTO transforms (object_id, type, transform_object_id, metadata)
+                        VALUES ($1, $2, $3, $4)
+                        """,
+                        transforms,
+                    )
+
+                if findings:
+                    await conn.executemany(
+                        """
+                        INSERT INTO findings (
+                            finding_name, category, severity, object_id,
+                            origin_type, origin_name, raw_data, data
+                        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                        """,
+                        findings,
+                    )
+
+                if tracking:
+                    await conn.executemany(
+                        """
+                        UPDATE workflows
+                        SET enrichments_success = enrichments_success || $1,
+                            enrichments_failure = enrichments_failure || $2
+                        WHERE wf_id = $3
+                        """,
+                        tracking,
+                    )
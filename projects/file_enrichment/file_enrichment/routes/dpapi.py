@@ -11,7 +11,6 @@ from uuid import UUID
 import asyncpg
 from chromium import (
     retry_decrypt_chrome_keys_for_masterkey,
-    retry_decrypt_chromium_data,
     retry_decrypt_state_keys_for_masterkey,
 )
 from common.logger import get_logger
@@ -103,21 +102,12 @@ class PlaintextMasterKeyMonitor(DpapiObserver):
                 result=result,
             )
 
-            if result and result["state_keys_progressed"] > 0:
-                # Finally, try to decrypt chromium cookies and logins with newly available keys
-                chromium_data_result = await retry_decrypt_chromium_data(
-                    evnt.masterkey_guid,
-                    self.dpapi_manager,
-                    global_vars.asyncpg_pool,
-                    masterkey_type,
-                )
-
-                logger.debug(
-                    "Completed retroactive chromium data decryption",
-                    masterkey_guid=evnt.masterkey_guid,
-                    masterkey_type=masterkey_type,
-                    result=chromium_data_result,
-                )
+            # Finally, retry the chromium cookies and logins the new keys may decrypt
+            assert global_vars.chromium_retry_scheduler is not None
+            global_vars.chromium_retry_scheduler.schedule(
+                masterkey_guids=[evnt.masterkey_guid],
+                state_key_ids=result["state_key_ids_progressed"] if result else [],
+            )
 
 
 def get_event_loop(request: Request):
@@ -365,7 +355,7 @@ async def _handle_chromium_app_bound_key(dpapi_manager: DpapiManager, request: C
             assert global_vars.asyncpg_pool is not None
             async with global_vars.asyncpg_pool.acquire() as conn:
                 # Insert into chromium.state_keys
-                await conn.execute(
+                state_key_id = await conn.fetchval(
                     """
                     INSERT INTO chromium.state_keys (
                         originating_object_id,
@@ -378,6 +368,7 @@ async def _handle_chromium_app_bound_key(dpapi_manager: DpapiManager, request: C
                         app_bound_key_dec,
                         app_bound_key_is_decrypted
                     ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                    RETURNING id
                     """,
                     None,  # originating_object_id
                     None,  # agent_id
@@ -410,16 +401,9 @@ async def _handle_chromium_app_bound_key(dpapi_manager: DpapiManager, request: C
                 attempts=attempt + 1,
             )
 
-            # Finally, try to decrypt chromium cookies and logins with newly submitted key
-            assert global_vars.asyncpg_pool is not None
-            chromium_data_result = await retry_decrypt_chromium_data(
-                UUID(int=0), dpapi_manager, global_vars.asyncpg_pool
-            )
-
-            logger.debug(
-                "Completed retroactive chromium data decryption with new ABE key",
-                result=chromium_data_result,
-            )
+            # Finally, retry the chromium cookies and logins the submitted key may decrypt
+            assert global_vars.chromium_retry_scheduler is not None
+            global_vars.chromium_retry_scheduler.schedule(state_key_ids=[state_key_id])
 
             return result
 
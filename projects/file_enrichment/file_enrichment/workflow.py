@@ -7,6 +7,7 @@ from common.models import File
 from common.workflows.setup import wf_runtime
 from durabletask.task import TaskFailedError
 from file_enrichment_modules.module_loader import ModuleLoader
+from file_enrichment_modules.routing import ModuleRouter
 from nemesis_dpapi import DpapiManager
 
 from .activities import (
@@ -283,6 +284,10 @@ async def initialize_enrichment_modules(dpapi_manager: DpapiManager) -> list[str
     # Build dependency graph from filtered modules
     graph = build_dependency_graph(available_modules)
     execution_order = topological_sort(graph)
+    global_vars.module_dependency_graph = graph
+
+    # Compile the modules' routing declarations into one index
+    global_vars.module_router = ModuleRouter(available_modules)
 
     # execution_order = ["yara"]  # for testing a single specific module
 
@@ -6,7 +6,7 @@ from datetime import datetime
 import asyncpg
 from common.logger import get_logger
 from common.models import File, SingleEnrichmentWorkflowInput
-from common.workflows.tracking_service import WorkflowStatus
+from common.workflows.timeout_wheel import WorkflowTimeoutWheel
 from dapr.ext.workflow.workflow_state import WorkflowStatus as DaprWorkflowStatus
 
 from . import global_vars
@@ -29,14 +29,18 @@ class WorkflowManager:
         self.max_execution_time = max_execution_time
         self.background_tasks = set()  # Track background tasks to prevent GC
         self.pool = pool
+        self.timeouts = WorkflowTimeoutWheel(
+            "file_enrichment",
+            pool,
+            global_vars.workflow_client,
+            on_timeout=self._on_workflow_timeout,
+        )
 
     async def __aenter__(self):
         """Async context manager entry - start background tasks"""
 
-        # Start background cleanup task
-        cleanup_task = asyncio.create_task(self._cleanup_loop())
-        self.background_tasks.add(cleanup_task)
-        cleanup_task.add_done_callback(self.background_tasks.discard)
+        # Start the timeout wheel (and its sweep for workflows left running by other instances)
+        await self.timeouts.__aenter__()
 
         logger.info("WorkflowManager fully initialized")
 
@@ -46,6 +50,8 @@ class WorkflowManager:
         """Async context manager exit - cleanup background tasks (pool is externally managed)"""
         logger.info("Cleaning up WorkflowManager...")
 
+        await self.timeouts.__aexit__(exc_type, exc_val, exc_tb)
+
         # Cancel all background tasks
         for task in self.background_tasks:
             if not task.done():
@@ -60,14 +66,13 @@ class WorkflowManager:
 
         return False  # Don't suppress exceptions
 
-    async def _cleanup_loop(self):
-        """Run cleanup_stale_workflows every 60 seconds"""
-        while True:
-            await asyncio.sleep(60)
-            try:
-                await self.cleanup_stale_workflows()
-            except Exception as e:
-                logger.error(f"Background cleanup error: {e}")
+    def workflow_finished(self, instance_id: str):
+        """Stop tracking the timeout of a workflow that completed or failed"""
+        self.timeouts.discard(instance_id)
+
+    async def _on_workflow_timeout(self, wf_id: str):
+        """Publish the completion event of a timed out workflow for large container processing"""
+        await publish_workflow_completion(wf_id, completed=False)
 
     def _get_status_string(self, state_obj):
         """Convert workflow state to string"""
@@ -80,48 +85,6 @@ class WorkflowManager:
 
         return state_obj.runtime_status.name
 
-    async def cleanup_stale_workflows(self):
-        """Clean up workflows that were left running from previous service instances"""
-        try:
-            async with self.pool.acquire() as conn:
-                # Find workflows that have been running for longer than max execution time
-                stale_workflows = await conn.fetch(
-                    """
-                    SELECT wf_id, object_id,
-                        EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - start_time)) as runtime_seconds
-                    FROM workflows
-                    WHERE status = 'RUNNING'
-                    AND EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - start_time)) > $1
-                """,
-                    self.max_execution_time,
-                )
-
-            if stale_workflows:
-                logger.warning(f"Found {len(stale_workflows)} stale workflows, cleaning up...")
-
-                for wf_id, _object_id, runtime_seconds in stale_workflows:
-                    logger.info(f"Cleaning up stale workflow {wf_id}, runtime: {runtime_seconds:.2f}s")
-
-                    # Try to terminate the workflow in Dapr
-                    try:
-                        await asyncio.to_thread(global_vars.workflow_client.terminate_workflow, wf_id)
-                    except Exception as e:
-                        logger.warning(f"Could not terminate workflow {wf_id}: {e}")
-
-                    # Update database status using tracking service
-                    assert global_vars.tracking_service is not None
-                    await global_vars.tracking_service.update_status(
-                        wf_id,
-                        WorkflowStatus.TIMEOUT,
-                        error_message="cleaned up by cleanup_stale_workflows",
-                    )
-
-                    # Publish completion event for large container processing
-                    await publish_workflow_completion(wf_id, completed=False)
-
-        except Exception as e:
-            logger.error(f"Error during stale workflow cleanup: {e}")
-
     async def reset(self):
         """Reset the workflow manager's state."""
         try:
@@ -174,6 +137,7 @@ class WorkflowManager:
                     workflow=enrichment_pipeline_workflow,
                     input=file.model_dump(exclude_unset=True),
                 )
+                self.timeouts.add(instance_id, self.max_execution_time)
 
                 # await asyncio.to_thread(global_vars.workflow_client.wait_for_workflow_completion, instance_id)
 
@@ -251,6 +215,7 @@ class WorkflowManager:
                     workflow=single_enrichment_workflow,
                     input=workflow_input_dict,
                 )
+                self.timeouts.add(instance_id, self.max_execution_time)
 
                 return instance_id
 
@@ -5,13 +5,11 @@ We include a copy of the function here to avoid triggering module-level
 Dapr initialization that occurs when importing from the main module.
 """
 
-import pathlib
 import posixpath
 from datetime import UTC
 from uuid import uuid4
 
 import common.helpers as helpers
-import magic
 import pytest
 from common.helpers import get_file_extension, is_container
 
@@ -32,25 +30,17 @@ def process_basic_analysis(temp_file_path: str, file_dict: dict) -> dict:
     """
     path = file_dict.get("path", "")
 
-    mime_type = magic.from_file(temp_file_path, mime=True)
-    if mime_type == "text/plain" or helpers.is_text_file(temp_file_path):
-        is_plaintext = True
-    else:
-        is_plaintext = False
+    fingerprint = helpers.fingerprint_file(temp_file_path)
 
     basic_analysis = {
         "file_name": posixpath.basename(path),
         "extension": get_file_extension(path),
-        "size": pathlib.Path(temp_file_path).stat().st_size,
-        "hashes": {
-            "md5": helpers.calculate_file_hash(temp_file_path, "md5"),
-            "sha1": helpers.calculate_file_hash(temp_file_path, "sha1"),
-            "sha256": helpers.calculate_file_hash(temp_file_path, "sha256"),
-        },
-        "magic_type": magic.from_file(temp_file_path),
-        "mime_type": mime_type,
-        "is_plaintext": is_plaintext,
-        "is_container": is_container(mime_type),
+        "size": fingerprint.size,
+        "hashes": fingerprint.hashes,
+        "magic_type": fingerprint.magic_type,
+        "mime_type": fingerprint.mime_type,
+        "is_plaintext": fingerprint.is_plaintext,
+        "is_container": is_container(fingerprint.mime_type),
     }
 
     file_enriched = {
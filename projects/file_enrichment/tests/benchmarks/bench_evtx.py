@@ -0,0 +1,330 @@
+"""Benchmarks comparing the streaming EVTX parse against decoding every record.
+
+The legacy path parsed the log on one thread and ran json.loads on every record,
+kept every timestamp to sort them and held every process creation event in memory.
+`parse_evtx` decodes chunks on several threads, reads the event ID, time and the
+account/IP fields from the record text, and only decodes the records of the event IDs
+the analyzer reports on.
+
+There is no large EVTX fixture in the repo, so `write_synthetic_evtx` builds one: chunks
+of template-instance records in the layout Windows writes, with a Security log mix of
+mostly high-volume events the analyzer only counts.
+"""
+
+import json
+import os
+import random
+import struct
+import tracemalloc
+import zlib
+from collections import defaultdict
+
+import evtx as evtx_lib
+import pytest
+from file_enrichment_modules.evtx.analyzer import _normalize_event_id, parse_evtx
+
+CHUNK_SIZE = 65536
+CHUNK_HEADER_SIZE = 512
+
+# BinXML value types
+STRING = 0x01
+UINT16 = 0x06
+UINT64 = 0x0A
+FILETIME = 0x11
+
+# (event ID, weight, EventData field names) of a busy domain controller's Security log
+EVENT_MIX = [
+    (4624, 20, ("SubjectUserName", "TargetUserName", "TargetDomainName", "LogonType", "IpAddress", "WorkstationName")),
+    (4634, 18, ("TargetUserName", "TargetDomainName", "LogonType")),
+    (4672, 15, ("SubjectUserName", "SubjectDomainName", "PrivilegeList")),
+    (5156, 15, ("ProcessID", "Application", "SourceAddress", "DestAddress", "DestPort")),
+    (4663, 8, ("SubjectUserName", "ObjectName", "AccessMask")),
+    (4688, 8, ("SubjectUserName", "SubjectDomainName", "NewProcessName", "CommandLine", "ParentProcessName")),
+    (4769, 6, ("TargetUserName", "TargetDomainName", "ServiceName", "IpAddress", "TicketOptions", "FailureCode")),
+    (4776, 4, ("TargetUserName", "Workstation", "Status")),
+    (4625, 3, ("TargetUserName", "TargetDomainName", "LogonType", "FailureReason", "IpAddress")),
+    (4732, 1, ("MemberSid", "TargetUserName", "TargetDomainName", "TargetSid", "SubjectUserName")),
+    (7045, 1, ("ServiceName", "ImagePath", "ServiceType", "StartType", "AccountName")),
+]
+
+
+def _name_hash(name: str) -> int:
+    value = 0
+    for char in name:
+        value = (value * 65599 + ord(char)) & 0xFFFFFFFF
+    return value & 0xFFFF
+
+
+class _BinXmlWriter:
+    """Writes BinXML tokens for a record starting at `base` in its chunk."""
+
+    def __init__(self, base: int):
+        self.base = base
+        self.buf = bytearray()
+        self._open_elements: list[int] = []
+
+    def name(self, name: str) -> None:
+        # Names are stored inline, right after their chunk offset
+        self.buf += struct.pack("<I", self.base + len(self.buf) + 4)
+        self.buf += struct.pack("<IHH", 0, _name_hash(name), len(name)) + name.encode("utf-16-le") + b"\x00\x00"
+
+    def open(self, name: str, attributes=()) -> None:
+        self.buf += bytes([0x41 if attributes else 0x01]) + struct.pack("<hI", -1, 0)
+        self._open_elements.append(len(self.buf))
+        self.name(name)
+        if attributes:
+            size_at = len(self.buf)
+            self.buf += struct.pack("<I", 0)
+            for i, (attribute, write_value) in enumerate(attributes):
+                self.buf += bytes([0x46 if i < len(attributes) - 1 else 0x06])
+                self.name(attribute)
+                write_value()
+            struct.pack_into("<I", self.buf, size_at, len(self.buf) - size_at - 4)
+        self.buf += b"\x02"
+
+    def close(self) -> None:
+        self.buf += b"\x04"
+        start = self._open_elements.pop()
+        struct.pack_into("<I", self.buf, start - 4, len(self.buf) - start)
+
+    def text(self, value: str) -> None:
+        self.buf += bytes([0x05, STRING]) + struct.pack("<H", len(value)) + value.encode("utf-16-le")
+
+    def substitution(self, index: int, value_type: int) -> None:
+        self.buf += bytes([0x0D]) + struct.pack("<HB", index, value_type)
+
+    def element(self, name: str, write_value=None, attributes=()) -> None:
+        self.open(name, attributes)
+        if write_value:
+            write_value()
+        self.close()
+
+
+def _write_template(writer: _BinXmlWriter, data_names: tuple[str, ...]) -> None:
+    """An event template whose values are EventID, SystemTime, EventRecordID, Computer and the EventData."""
+    writer.buf += b"\x0f\x01\x01\x00"
+    writer.open("Event", [("xmlns", lambda: writer.text("http://schemas.microsoft.com/win/2004/08/events/event"))])
+    writer.open("System")
+    writer.element(
+        "Provider",
+        attributes=[
+            ("Name", lambda: writer.text("Microsoft-Windows-Security-Auditing")),
+            ("Guid", lambda: writer.text("{54849625-5478-4994-a5ba-3e3b0328c30d}")),
+        ],
+    )
+    writer.element("EventID", lambda: writer.substitution(0, UINT16))
+    writer.element("Version", lambda: writer.text("2"))
+    writer.element("Level", lambda: writer.text("0"))
+    writer.element("Keywords", lambda: writer.text("0x8020000000000000"))
+    writer.element("TimeCreated", attributes=[("SystemTime", lambda: writer.substitution(1, FILETIME))])
+    writer.element("EventRecordID", lambda: writer.substitution(2, UINT64))
+    writer.element("Channel", lambda: writer.text("Security"))
+    writer.element("Computer", lambda: writer.substitution(3, STRING))
+    writer.close()
+    writer.open("EventData")
+    for i, data_name in enumerate(data_names):
+        writer.element(
+            "Data",
+            lambda i=i: writer.substitution(4 + i, STRING),
+            attributes=[("Name", lambda data_name=data_name: writer.text(data_name))],
+        )
+    writer.close()
+    writer.close()
+    writer.buf += b"\x00"
+
+
+def _record_body(base: int, templates: dict, event_id: int, filetime: int, record_id: int, data: dict) -> bytes:
+    """A template instance, defining the template inline the first time it's used in a chunk."""
+    writer = _BinXmlWriter(base)
+    writer.buf += b"\x0f\x01\x01\x00" + b"\x0c\x01" + struct.pack("<I", 0)
+    data_names = tuple(data)
+    if data_names in templates:
+        writer.buf += struct.pack("<I", templates[data_names])
+    else:
+        templates[data_names] = base + len(writer.buf) + 4
+        writer.buf += struct.pack("<I", templates[data_names])
+        size_at = len(writer.buf) + 20
+        writer.buf += struct.pack("<I", 0) + bytes(16) + struct.pack("<I", 0)
+        _write_template(writer, data_names)
+        struct.pack_into("<I", writer.buf, size_at, len(writer.buf) - size_at - 4)
+
+    values = [
+        (struct.pack("<H", event_id), UINT16),
+        (struct.pack("<Q", filetime), FILETIME),
+        (struct.pack("<Q", record_id), UINT64),
+        ("DC01.corp.local".encode("utf-16-le"), STRING),
+    ] + [(value.encode("utf-16-le"), STRING) for value in data.values()]
+    writer.buf += struct.pack("<I", len(values))
+    for value, value_type in values:
+        writer.buf += struct.pack("<HBB", len(value), value_type, 0)
+    for value, _ in values:
+        writer.buf += value
+    return bytes(writer.buf)
+
+
+def _event_data(event_id: int, data_names: tuple[str, ...], rng: random.Random) -> dict:
+    users = [f"user{n}" for n in range(200)] + ["SYSTEM", "DC01$", "-"]
+    values = {
+        "LogonType": lambda: rng.choice(["2", "3", "3", "5", "10"]),
+        "IpAddress": lambda: rng.choice(["-", "127.0.0.1", f"10.0.{rng.randrange(8)}.{rng.randrange(254)}"]),
+        "TargetSid": lambda: rng.choice(["S-1-5-32-544", "S-1-5-21-1-2-3-513"]),
+        "CommandLine": lambda: f"C:\\Windows\\System32\\cmd.exe /c whoami /groups {rng.randrange(10**6)}",
+    }
+    return {
+        name: values[name]()
+        if name in values
+        else rng.choice(users)
+        if name.endswith("UserName")
+        else f"{name}-{rng.randrange(100)}"
+        for name in data_names
+    }
+
+
+def write_synthetic_evtx(path: str, record_count: int, seed: int = 1) -> None:
+    """Write an EVTX file of `record_count` Security events spread over a week."""
+    rng = random.Random(seed)
+    start = 133485408000000000  # 2024-01-01
+    step = 7 * 24 * 3600 * 10_000_000 // record_count
+    weights = [weight for _, weight, _ in EVENT_MIX]
+
+    chunks: list[bytes] = []
+    chunk, offset, templates, first_id, last_offset = bytearray(CHUNK_SIZE), CHUNK_HEADER_SIZE, {}, 1, 0
+
+    def finish_chunk(last_id: int) -> None:
+        chunk[0:8] = b"ElfChnk\x00"
+        struct.pack_into("<QQQQIII", chunk, 8, first_id, last_id, first_id, last_id, 128, last_offset, offset)
+        struct.pack_into("<I", chunk, 52, zlib.crc32(chunk[CHUNK_HEADER_SIZE:offset]))
+        struct.pack_into("<I", chunk, 124, zlib.crc32(chunk[0:120] + chunk[128:CHUNK_HEADER_SIZE]))
+        chunks.append(bytes(chunk))
+
+    for record_id in range(1, record_count + 1):
+        event_id, _, data_names = rng.choices(EVENT_MIX, weights)[0]
+        filetime = start + record_id * step
+        data = _event_data(event_id, data_names, rng)
+
+        body = _record_body(offset + 24, dict(templates), event_id, filetime, record_id, data)
+        if offset + len(body) + 28 > CHUNK_SIZE:
+            finish_chunk(record_id - 1)
+            chunk, offset, templates, first_id = bytearray(CHUNK_SIZE), CHUNK_HEADER_SIZE, {}, record_id
+        body = _record_body(offset + 24, templates, event_id, filetime, record_id, data)
+
+        size = len(body) + 28
+        chunk[offset : offset + size] = (
+            struct.pack("<IIQQ", 0x2A2A, size, record_id, filetime) + body + struct.pack("<I", size)
+        )
+        last_offset = offset
+        offset += size
+    finish_chunk(record_count)
+
+    header = bytearray(4096)
+    header[0:8] = b"ElfFile\x00"
+    struct.pack_into("<QQQIHHHH", header, 8, 0, len(chunks) - 1, record_count + 1, 128, 1, 3, 4096, len(chunks))
+    struct.pack_into("<I", header, 124, zlib.crc32(header[0:120]))
+    with open(path, "wb") as f:
+        f.write(header)
+        for chunk_data in chunks:
+            f.write(chunk_data)
+
+
+def legacy_parse_evtx(file_path: str) -> dict:
+    """The per-record work previously done by EVTXAnalyzer._parse_evtx, without the per-ID details."""
+    parser = evtx_lib.PyEvtxParser(file_path, number_of_threads=1)
+    event_counts: dict[str, int] = defaultdict(int)
+    timestamps: list[str] = []
+    unique_accounts: set[str] = set()
+    unique_computers: set[str] = set()
+    unique_ips: set[str] = set()
+    events: list[dict] = []
+
+    for record in parser.records_json():
+        data = json.loads(record["data"])
+        event = data.get("Event", {})
+        sys = event.get("System", {})
+        edata = event.get("EventData", {}) or {}
+
+        eid = _normalize_event_id(sys.get("EventID", ""))
+        event_counts[eid] += 1
+        timestamps.append(sys["TimeCreated"]["#attributes"]["SystemTime"])
+        unique_computers.add(sys["Computer"])
+        for field in ("SubjectUserName", "TargetUserName"):
+            val = str(edata.get(field, "")).strip()
+            if val and val not in ("-", "SYSTEM", "LOCAL SERVICE", "NETWORK SERVICE") and not val.endswith("$"):
+                unique_accounts.add(val)
+        for field in ("IpAddress", "Workstation", "WorkstationName"):
+            val = str(edata.get(field, "")).strip()
+            if val and val not in ("-", "::1", "127.0.0.1"):
+                unique_ips.add(val)
+        if eid == "4688":
+            events.append(edata)
+
+    timestamps.sort()
+    return {
+        "event_counts": dict(event_counts),
+        "time_range": {"first": timestamps[0], "last": timestamps[-1]},
+        "unique_accounts": unique_accounts,
+        "unique_computers": unique_computers,
+        "unique_ips": unique_ips,
+        "process_creation_count": len(events),
+    }
+
+
+def streaming_parse_evtx(file_path: str) -> dict:
+    parsed = parse_evtx(file_path)
+    if parsed["process_creation_csv"]:
+        os.unlink(parsed["process_creation_csv"])
+    return parsed
+
+
+def peak_memory_mb(func, file_path: str) -> float:
+    """Peak Python heap allocations of one call, in MB."""
+    tracemalloc.start()
+    try:
+        func(file_path)
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.fixture(scope="module", params=[50_000, 200_000], ids=lambda count: f"{count // 1000}k_records")
+def synthetic_evtx(request, tmp_path_factory):
+    """A synthetic Security log with the requested number of records."""
+    record_count = request.param
+    path = tmp_path_factory.mktemp("evtx") / f"security_{record_count}.evtx"
+    write_synthetic_evtx(str(path), record_count)
+    return str(path), record_count
+
+
+class TestEvtxParseBenchmarks:
+    """Throughput comparison between decoding every record and the streaming parse."""
+
+    def test_legacy_parse(self, benchmark, synthetic_evtx):
+        """Benchmark the single-threaded parse that decodes every record."""
+        file_path, record_count = synthetic_evtx
+        benchmark.extra_info["records"] = record_count
+        benchmark.extra_info["peak_memory_mb"] = peak_memory_mb(legacy_parse_evtx, file_path)
+
+        result = benchmark.pedantic(legacy_parse_evtx, args=(file_path,), rounds=3)
+
+        assert sum(result["event_counts"].values()) == record_count
+        benchmark.extra_info["records_per_second"] = record_count / benchmark.stats.stats.mean
+
+    def test_streaming_parse(self, benchmark, synthetic_evtx):
+        """Benchmark the multithreaded parse that only decodes the reported event IDs."""
+        file_path, record_count = synthetic_evtx
+        benchmark.extra_info["records"] = record_count
+
+        # Verify both approaches agree before benchmarking
+        legacy = legacy_parse_evtx(file_path)
+        parsed = streaming_parse_evtx(file_path)
+        assert parsed["event_counts"] == legacy["event_counts"]
+        assert parsed["time_range"] == legacy["time_range"]
+        assert set(parsed["unique_accounts"]) == legacy["unique_accounts"]
+        assert set(parsed["unique_computers"]) == legacy["unique_computers"]
+        assert set(parsed["unique_ips"]) == legacy["unique_ips"]
+        assert parsed["process_creation_count"] == legacy["process_creation_count"]
+        benchmark.extra_info["peak_memory_mb"] = peak_memory_mb(streaming_parse_evtx, file_path)
+
+        result = benchmark.pedantic(streaming_parse_evtx, args=(file_path,), rounds=3)
+
+        assert sum(result["event_counts"].values()) == record_count
+        benchmark.extra_info["records_per_second"] = record_count / benchmark.stats.stats.mean
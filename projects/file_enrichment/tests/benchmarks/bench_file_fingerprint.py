@@ -0,0 +1,81 @@
+"""Benchmarks comparing single-pass file fingerprinting against the per-digest approach.
+
+The legacy path reads the file once per digest (4 KB reads), once for the
+plaintext sample, and twice through libmagic by file name. `fingerprint_file`
+feeds every digest from one buffered pass and sniffs the type from the open
+descriptor.
+"""
+
+import os
+
+import common.helpers as helpers
+import magic
+import pytest
+
+
+def legacy_fingerprint(file_path: str) -> dict:
+    """The hash/type detection previously done by process_basic_analysis."""
+    mime_type = magic.from_file(file_path, mime=True)
+    return {
+        "size": os.stat(file_path).st_size,
+        "hashes": {
+            "md5": helpers.calculate_file_hash(file_path, "md5"),
+            "sha1": helpers.calculate_file_hash(file_path, "sha1"),
+            "sha256": helpers.calculate_file_hash(file_path, "sha256"),
+        },
+        "magic_type": magic.from_file(file_path),
+        "mime_type": mime_type,
+        "is_plaintext": mime_type == "text/plain" or helpers.is_text_file(file_path),
+    }
+
+
+def single_pass_fingerprint(file_path: str) -> dict:
+    fingerprint = helpers.fingerprint_file(file_path)
+    return {
+        "size": fingerprint.size,
+        "hashes": fingerprint.hashes,
+        "magic_type": fingerprint.magic_type,
+        "mime_type": fingerprint.mime_type,
+        "is_plaintext": fingerprint.is_plaintext,
+    }
+
+
+@pytest.fixture(params=[1, 16, 64], ids=lambda mb: f"{mb}mb")
+def large_file(request, tmp_path):
+    """Create a file of semi-random data of the requested size in MB."""
+    size_mb = request.param
+    test_file = tmp_path / f"test_{size_mb}mb.bin"
+
+    block = os.urandom(1024 * 1024)
+    with open(test_file, "wb") as f:
+        for _ in range(size_mb):
+            f.write(block)
+
+    return str(test_file), size_mb
+
+
+class TestFileFingerprintBenchmarks:
+    """Throughput comparison between the legacy and single-pass fingerprinting."""
+
+    def test_legacy_fingerprint(self, benchmark, large_file):
+        """Benchmark the three-pass hashing plus two libmagic lookups."""
+        file_path, size_mb = large_file
+        benchmark.extra_info["file_size_mb"] = size_mb
+
+        result = benchmark(legacy_fingerprint, file_path)
+
+        assert result["size"] == size_mb * 1024 * 1024
+        benchmark.extra_info["mb_per_second"] = size_mb / benchmark.stats.stats.mean
+
+    def test_single_pass_fingerprint(self, benchmark, large_file):
+        """Benchmark the single-pass fingerprint engine."""
+        file_path, size_mb = large_file
+        benchmark.extra_info["file_size_mb"] = size_mb
+
+        # Verify both approaches agree before benchmarking
+        assert single_pass_fingerprint(file_path) == legacy_fingerprint(file_path)
+
+        result = benchmark(single_pass_fingerprint, file_path)
+
+        assert result["size"] == size_mb * 1024 * 1024
+        benchmark.extra_info["mb_per_second"] = size_mb / benchmark.stats.stats.mean
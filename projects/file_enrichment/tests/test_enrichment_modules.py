@@ -0,0 +1,132 @@
+"""Tests for the enrichment module scheduler."""
+
+import asyncio
+import sys
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+# Mock the global_vars module to avoid Dapr initialization during import
+sys.modules["file_enrichment.global_vars"] = MagicMock()
+
+from file_enrichment.activities import enrichment_modules  # noqa: E402
+from file_enrichment.activities.enrichment_modules import (  # noqa: E402
+    execute_enrichment_module,
+    run_modules_in_dependency_order,
+)
+from file_enrichment_modules.module_loader import run_blocking  # noqa: E402
+
+
+class BlockingModule:
+    """Module whose process() does blocking parsing through run_blocking."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    async def process(self, object_id: str, file_path: str | None = None):
+        await run_blocking(time.sleep, self.seconds)
+        return None
+
+
+class TestRunModulesInDependencyOrder:
+    """Test cases for run_modules_in_dependency_order."""
+
+    @pytest.mark.asyncio
+    async def test_independent_modules_run_concurrently(self):
+        """Independent modules overlap instead of running back to back."""
+        running = 0
+        max_running = 0
+
+        async def run_module(module_name: str) -> None:
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.05)
+            running -= 1
+
+        await run_modules_in_dependency_order(["a", "b", "c"], {"a": set(), "b": set(), "c": set()}, run_module, 8)
+
+        assert max_running == 3
+
+    @pytest.mark.asyncio
+    async def test_concurrency_cap(self):
+        """No more than max_parallel modules run at once."""
+        running = 0
+        max_running = 0
+
+        async def run_module(module_name: str) -> None:
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        modules = [f"m{i}" for i in range(10)]
+        await run_modules_in_dependency_order(modules, {}, run_module, 2)
+
+        assert max_running == 2
+
+    @pytest.mark.asyncio
+    async def test_dependents_wait_for_dependencies(self):
+        """A module starts only after its selected dependencies finish."""
+        events = []
+
+        async def run_module(module_name: str) -> None:
+            events.append(f"start:{module_name}")
+            await asyncio.sleep(0.02 if module_name == "slow" else 0)
+            events.append(f"end:{module_name}")
+
+        graph = {"slow": set(), "fast": set(), "dependent": {"slow"}}
+        await run_modules_in_dependency_order(["slow", "fast", "dependent"], graph, run_module, 8)
+
+        assert events.index("end:slow") < events.index("start:dependent")
+        assert events.index("end:fast") < events.index("end:slow")
+
+    @pytest.mark.asyncio
+    async def test_unselected_dependency_does_not_block(self):
+        """Dependencies that were not selected for this file are ignored."""
+        ran = []
+
+        async def run_module(module_name: str) -> None:
+            ran.append(module_name)
+
+        await run_modules_in_dependency_order(["dependent"], {"dependent": {"skipped"}}, run_module, 4)
+
+        assert ran == ["dependent"]
+
+    @pytest.mark.asyncio
+    async def test_blocking_modules_finish_in_time_of_slowest(self, monkeypatch):
+        """Modules that parse through run_blocking overlap instead of adding up."""
+        global_vars = MagicMock()
+        global_vars.max_module_execution_time = 10
+        global_vars.global_module_map = {name: BlockingModule(0.3) for name in ("a", "b", "c")}
+        monkeypatch.setattr(enrichment_modules, "global_vars", global_vars)
+
+        async def run_module(module_name: str) -> None:
+            await execute_enrichment_module("object-id", "/tmp/file", module_name)
+
+        start = time.monotonic()
+        await run_modules_in_dependency_order(["a", "b", "c"], {}, run_module, 4)
+        elapsed = time.monotonic() - start
+
+        # Sequential execution would take at least 0.9 seconds
+        assert elapsed < 0.6
+
+
+class TestExecuteEnrichmentModule:
+    """Test cases for execute_enrichment_module."""
+
+    @pytest.mark.asyncio
+    async def test_blocking_module_times_out(self, monkeypatch):
+        """A module stuck in blocking parsing is abandoned after the per-module timeout."""
+        global_vars = MagicMock()
+        global_vars.max_module_execution_time = 0.1
+        global_vars.global_module_map = {"slow": BlockingModule(1.0)}
+        monkeypatch.setattr(enrichment_modules, "global_vars", global_vars)
+
+        start = time.monotonic()
+        with pytest.raises(TimeoutError, match="timed out after 0.1 seconds"):
+            await execute_enrichment_module("object-id", "/tmp/file", "slow")
+
+        assert time.monotonic() - start < 0.5
@@ -0,0 +1,37 @@
+"""Tests for the workflow finalization activities."""
+
+import inspect
+import sys
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+# Mock the global_vars module to avoid Dapr initialization during import
+sys.modules["file_enrichment.global_vars"] = MagicMock()
+
+from file_enrichment.activities import finalize_workflow  # noqa: E402
+from file_enrichment.workflow_manager import WorkflowManager  # noqa: E402
+
+
+@pytest.fixture
+def workflow_manager(monkeypatch):
+    manager = WorkflowManager(MagicMock(), max_execution_time=300)
+    monkeypatch.setattr(finalize_workflow.global_vars, "workflow_manager", manager)
+    monkeypatch.setattr(finalize_workflow.global_vars, "tracking_service", AsyncMock())
+    return manager
+
+
+class TestFinalizeWorkflow:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "activity", [finalize_workflow.finalize_workflow_success, finalize_workflow.finalize_workflow_failure]
+    )
+    async def test_finished_workflows_leave_the_timeout_wheel(self, workflow_manager, activity):
+        workflow_manager.timeouts.add("file_enrichment.done", 300)
+        workflow_manager.timeouts.add("file_enrichment.running", 300)
+
+        await inspect.unwrap(activity)(MagicMock(workflow_id="file_enrichment.done"), {})
+
+        assert len(workflow_manager.timeouts) == 1
+        expired = [wf_id for _ in range(400) for wf_id in workflow_manager.timeouts.advance()]
+        assert expired == ["file_enrichment.running"]
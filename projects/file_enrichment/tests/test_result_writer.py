@@ -0,0 +1,117 @@
+"""Tests for the batched enrichment result writer."""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from common.models import EnrichmentResult, Finding, FindingCategory, FindingOrigin, Transform
+from file_enrichment.result_writer import EnrichmentBatch, EnrichmentResultWriter
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    @asynccontextmanager
+    async def transaction(self):
+        self.pool.transactions += 1
+        yield
+
+    async def executemany(self, query: str, rows: list[tuple]) -> None:
+        words = query.split()
+        table = words[1] if words[0] == "UPDATE" else words[2]
+        if any(value in self.pool.failing_object_ids for row in rows for value in row if isinstance(value, str)):
+            raise ValueError("bad row")
+        self.pool.executemany_calls.append((table, list(rows)))
+
+
+class FakePool:
+    def __init__(self, failing_object_ids: set[str] | None = None):
+        self.transactions = 0
+        self.executemany_calls: list[tuple[str, list[tuple]]] = []
+        self.failing_object_ids = failing_object_ids or set()
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield FakeConnection(self)
+
+
+def make_batch(object_id: str, findings: int = 0) -> EnrichmentBatch:
+    result = EnrichmentResult(
+        module_name="test_module",
+        transforms=[Transform(type="displayable_parsed", object_id=f"{object_id}-transform")],
+        findings=[
+            Finding(
+                category=FindingCategory.PII,
+                finding_name=f"finding_{i}",
+                origin_type=FindingOrigin.ENRICHMENT_MODULE,
+                origin_name="test_module",
+                object_id=object_id,
+                severity=3,
+                raw_data={"i": i},
+                data=[],
+            )
+            for i in range(findings)
+        ],
+    )
+    return EnrichmentBatch(
+        object_id=object_id,
+        workflow_id=f"wf-{object_id}",
+        results=[("test_module", result)],
+        success_list=["test_module"],
+        failure_list=["other_module:boom"],
+    )
+
+
+class TestEnrichmentResultWriter:
+    @pytest.mark.asyncio
+    async def test_file_is_written_in_one_transaction(self):
+        pool = FakePool()
+        writer = EnrichmentResultWriter(pool, flush_interval=0.01)  # type: ignore[arg-type]
+
+        await writer.write(make_batch("file-1", findings=300))
+
+        assert pool.transactions == 1
+        calls = dict(pool.executemany_calls)
+        assert len(calls["enrichments"]) == 1
+        assert len(calls["transforms"]) == 1
+        assert len(calls["findings"]) == 300
+        assert calls["workflows"] == [(["test_module"], ["other_module:boom"], "wf-file-1")]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_files_are_coalesced(self):
+        pool = FakePool()
+        writer = EnrichmentResultWriter(pool, flush_interval=0.05)  # type: ignore[arg-type]
+
+        await asyncio.gather(*(writer.write(make_batch(f"file-{i}", findings=2)) for i in range(5)))
+
+        assert pool.transactions == 1
+        calls = dict(pool.executemany_calls)
+        assert len(calls["enrichments"]) == 5
+        assert len(calls["findings"]) == 10
+        assert len(calls["workflows"]) == 5
+
+    @pytest.mark.asyncio
+    async def test_full_batch_flushes_without_waiting(self):
+        pool = FakePool()
+        writer = EnrichmentResultWriter(pool, flush_interval=10, max_batch_rows=10)  # type: ignore[arg-type]
+
+        await asyncio.wait_for(writer.write(make_batch("file-1", findings=20)), timeout=1)
+
+        assert pool.transactions == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_file_does_not_fail_others(self):
+        pool = FakePool(failing_object_ids={"file-bad"})
+        writer = EnrichmentResultWriter(pool, flush_interval=0.05)  # type: ignore[arg-type]
+
+        results = await asyncio.gather(
+            writer.write(make_batch("file-good")),
+            writer.write(make_batch("file-bad")),
+            return_exceptions=True,
+        )
+
+        assert results[0] is None
+        assert isinstance(results[1], ValueError)
+        written = [row[0] for table, rows in pool.executemany_calls if table == "enrichments" for row in rows]
+        assert written == ["file-good"]
@@ -77,12 +77,19 @@ async def get_transform_object_ids(object_ids: list[str]) -> list[str]:
     try:
         pool = await get_db_pool()
         async with pool.acquire() as conn:
-            # Get all transform_object_ids related to the expired object_ids
+            # Get all transform_object_ids related to the expired object_ids. Converted PDFs are
+            # shared between files with identical content, those still referenced are kept.
             transform_records = await conn.fetch(
                 """
-                SELECT transform_object_id
-                FROM transforms
-                WHERE object_id = ANY($1::uuid[])
+                SELECT DISTINCT t.transform_object_id
+                FROM transforms t
+                WHERE t.object_id = ANY($1::uuid[])
+                  AND NOT EXISTS (
+                      SELECT 1
+                      FROM transforms other
+                      WHERE other.transform_object_id = t.transform_object_id
+                        AND other.object_id <> ALL($1::uuid[])
+                  )
                 """,
                 object_ids,
             )
@@ -341,11 +348,21 @@ async def delete_expired_dpapi_data(expiration_date: datetime | None = None) ->
                         """,
                         comparison_date,
                     )
+
+                    # Delete dpapi.masterkey_attempts
+                    await conn.execute(
+                        """
+                        DELETE FROM dpapi.masterkey_attempts
+                        WHERE created_at < $1
+                        """,
+                        comparison_date,
+                    )
                 else:
                     # Delete all records from dpapi tables
                     await conn.execute("DELETE FROM dpapi.masterkeys")
                     await conn.execute("DELETE FROM dpapi.domain_backup_keys")
                     await conn.execute("DELETE FROM dpapi.system_credentials")
+                    await conn.execute("DELETE FROM dpapi.masterkey_attempts")
 
             return True
 
@@ -0,0 +1,48 @@
+"""Tests for the background container job engine."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from web_api.container_jobs import ContainerJobEngine
+
+
+@pytest.fixture
+def engine():
+    job_engine = ContainerJobEngine(MagicMock(), num_workers=1)
+    with patch.object(job_engine, "_finish_job") as finish_job:
+        job_engine.finish_job = finish_job
+        yield job_engine
+
+
+class TestContainerJobEngine:
+    def test_job_resumes_from_checkpoint_and_releases_staged_file(self, engine, tmp_path):
+        staged = tmp_path / "container.zip"
+        staged.write_bytes(b"PK")
+        metadata = {"filename": "container.zip"}
+
+        engine._run_job("container-1", str(staged), metadata, 42)
+
+        engine.processor.process_container_from_path.assert_called_once_with(
+            "container-1", staged, metadata, resume_from=42
+        )
+        engine.finish_job.assert_called_once_with("container-1", None)
+        assert not staged.exists()
+        assert engine.active_jobs == set()
+
+    def test_failed_job_records_error(self, engine, tmp_path):
+        staged = tmp_path / "container.zip"
+        staged.write_bytes(b"PK")
+        engine.processor.process_container_from_path.side_effect = ValueError("corrupt container")
+
+        engine._run_job("container-1", str(staged), {}, 0)
+
+        engine.finish_job.assert_called_once_with("container-1", "corrupt container")
+        assert not staged.exists()
+
+    def test_missing_staged_file_fails_job(self, engine, tmp_path):
+        engine._run_job("container-1", str(tmp_path / "gone.zip"), {}, 0)
+
+        engine.processor.process_container_from_path.assert_not_called()
+        container_id, error = engine.finish_job.call_args.args
+        assert container_id == "container-1"
+        assert "no longer exists" in error
@@ -0,0 +1,175 @@
+"""Tests for the streaming upload pipeline used by large container extraction."""
+
+import threading
+import time
+import zipfile
+from unittest.mock import MagicMock, patch
+
+import pytest
+from web_api.large_containers import ContainerProgress, ContainerUploadPipeline, ZipContainerExtractor
+
+
+class RecordingStorage:
+    """Storage stand-in that records what was streamed to it."""
+
+    def __init__(self):
+        self.objects: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def upload_stream(self, stream, length: int) -> str:
+        data = stream.read()
+        assert len(data) == length
+        with self._lock:
+            object_id = f"object-{len(self.objects)}"
+            self.objects[object_id] = data
+        return object_id
+
+
+@pytest.fixture
+def container_zip(tmp_path):
+    path = tmp_path / "container.zip"
+    with zipfile.ZipFile(path, "w") as zf:
+        for i in range(25):
+            zf.writestr(f"dir/file_{i}.txt", f"contents {i}" * (i + 1))
+        zf.writestr("../escape.txt", "nope")
+    return path
+
+
+def make_extractor(storage, dapr_client=None) -> ZipContainerExtractor:
+    extractor = ZipContainerExtractor(storage, dapr_client or MagicMock(), ContainerProgress())  # type: ignore[arg-type]
+    extractor.set_container_info(
+        "container-1",
+        {"agent_id": "agent", "project": "project", "source": "host", "path": "/mounted-containers/container.zip"},
+    )
+    extractor.progress_tracker.initialize("container-1", 25, 0)
+    return extractor
+
+
+class TestZipContainerExtractor:
+    def test_members_are_streamed_and_published_in_batches(self, container_zip):
+        storage = RecordingStorage()
+        extractor = make_extractor(storage)
+
+        with patch("web_api.large_containers.requests.post") as post:
+            post.return_value.ok = True
+            processed = extractor.extract_and_process(container_zip)
+
+        assert processed == 25
+        assert sorted(storage.objects.values()) == sorted(f"contents {i}".encode() * (i + 1) for i in range(25))
+
+        published = [entry["event"] for call in post.call_args_list for entry in call.kwargs["json"]]
+        assert len(published) == 25
+        assert post.call_count < 25
+        assert {event["object_id"] for event in published} == set(storage.objects)
+        assert all(event["originating_container_id"] == "container-1" for event in published)
+
+        assert extractor.filter_stats["files_processed"] == 25
+        assert extractor.filter_stats["files_skipped_by_error"] == 1
+        assert extractor.progress_tracker.get_progress("container-1")["processed_files"] == 25
+
+    def test_failed_bulk_publish_falls_back_to_single_events(self, container_zip):
+        dapr_client = MagicMock()
+        extractor = make_extractor(RecordingStorage(), dapr_client)
+
+        with patch("web_api.large_containers.requests.post", side_effect=ConnectionError("no bulk api")):
+            processed = extractor.extract_and_process(container_zip)
+
+        assert processed == 25
+        assert dapr_client.publish_event.call_count == 25
+
+    def test_resumed_extraction_skips_checkpointed_members(self, container_zip):
+        storage = RecordingStorage()
+        extractor = make_extractor(storage)
+        extractor.resume_from = 10
+
+        with patch("web_api.large_containers.requests.post") as post:
+            post.return_value.ok = True
+            processed = extractor.extract_and_process(container_zip)
+
+        # Only the members after the checkpoint are uploaded again, but all of them count as processed
+        assert processed == 25
+        assert sorted(storage.objects.values()) == sorted(f"contents {i}".encode() * (i + 1) for i in range(10, 25))
+        assert extractor.progress_tracker.get_progress("container-1")["processed_files"] == 25
+        assert len([entry for call in post.call_args_list for entry in call.kwargs["json"]]) == 15
+
+
+class TestContainerUploadPipeline:
+    def test_submit_blocks_when_queue_is_full(self):
+        release = threading.Event()
+
+        class SlowStorage(RecordingStorage):
+            def upload_stream(self, stream, length: int) -> str:
+                release.wait()
+                return super().upload_stream(stream, length)
+
+        extractor = make_extractor(SlowStorage())
+        submitted = 0
+
+        def produce(pipeline):
+            nonlocal submitted
+            for i in range(10):
+                pipeline.submit(f"file_{i}", 1, lambda: _BytesStream(b"x"))
+                submitted += 1
+
+        with patch("web_api.large_containers.requests.post") as post:
+            post.return_value.ok = True
+            with ContainerUploadPipeline(extractor, num_uploaders=1, queue_depth=2) as pipeline:
+                producer = threading.Thread(target=produce, args=(pipeline,))
+                producer.start()
+                producer.join(timeout=0.3)
+
+                # One member is with the uploader, two are queued; the producer has to wait
+                assert producer.is_alive()
+                assert submitted == 3
+
+                release.set()
+                producer.join()
+
+        assert pipeline.processed_count == 10
+
+    def test_watermark_waits_for_earlier_members(self):
+        release = threading.Event()
+
+        class FirstUploadSlowStorage(RecordingStorage):
+            def upload_stream(self, stream, length: int) -> str:
+                if stream.read() == b"first":
+                    release.wait()
+                return super().upload_stream(_BytesStream(b"x"), length)
+
+        extractor = make_extractor(FirstUploadSlowStorage())
+        checkpoints = []
+        extractor.checkpoint_callback = checkpoints.append
+
+        with patch("web_api.large_containers.requests.post") as post:
+            post.return_value.ok = True
+            with ContainerUploadPipeline(extractor, num_uploaders=2, checkpoint_interval=0) as pipeline:
+                pipeline.submit("first", 1, lambda: _BytesStream(b"first"))
+                for i in range(5):
+                    pipeline.submit(f"file_{i}", 1, lambda: _BytesStream(b"x"))
+
+                # Later members are published, but the checkpoint can't pass the pending first member
+                deadline = time.monotonic() + 5
+                while pipeline.processed_count < 5 and time.monotonic() < deadline:
+                    time.sleep(0.05)
+                assert pipeline.processed_count == 5
+                assert set(checkpoints) <= {0}
+
+                release.set()
+
+        assert pipeline.watermark == 6
+        assert checkpoints[-1] == 6
+
+
+class _BytesStream:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def read(self, size: int = -1) -> bytes:
+        data, self.data = self.data, b""
+        return data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
@@ -0,0 +1,252 @@
+"""Background job engine for containers submitted through the API.
+
+`POST /containers` only stages the upload and records a job row in
+container_processing. The engine, running in the web-api worker that holds the
+container monitor lock, claims queued jobs for this host and extracts them on a
+bounded set of worker threads. Extraction checkpoints are persisted to the same
+row, so jobs interrupted by a restart are picked up again and resume where they
+left off.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import threading
+from pathlib import Path
+from typing import Any
+
+import psycopg
+from common.logger import get_logger
+from web_api.large_containers import ContainerStatus, LargeContainerProcessor
+
+logger = get_logger(__name__)
+
+CONTAINER_JOB_WORKERS = int(os.getenv("CONTAINER_JOB_WORKERS", 2))
+CONTAINER_JOB_POLL_INTERVAL = float(os.getenv("CONTAINER_JOB_POLL_INTERVAL", 2))
+TEMP_CONTAINER_PATH = os.getenv("TEMP_CONTAINER_PATH", "/tmp/containers")
+
+# Staged uploads only exist on the host that received them, so jobs are bound to it
+JOB_HOST = socket.gethostname()
+
+
+class ContainerJobEngine:
+    """Runs queued container jobs from the container_processing table"""
+
+    def __init__(
+        self,
+        processor: LargeContainerProcessor,
+        num_workers: int = CONTAINER_JOB_WORKERS,
+        poll_interval: float = CONTAINER_JOB_POLL_INTERVAL,
+    ):
+        self.processor = processor
+        self.num_workers = max(1, num_workers)
+        self.poll_interval = poll_interval
+        self.running = False
+        self.active_jobs: set[str] = set()
+
+        self._workers: list[threading.Thread] = []
+        self._wakeup = threading.Event()
+        self._jobs_lock = threading.Lock()
+
+    def submit(self, container_id: str, staged_path: Path, container_type: str, metadata: dict[str, Any]) -> None:
+        """Queue a staged container for extraction. Safe to call from any worker process."""
+        with psycopg.connect(self.processor.postgres_connection_string) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO container_processing (
+                        container_id, container_type, original_filename, original_size,
+                        agent_id, source, project, status, expiration,
+                        staged_path, job_metadata, job_host
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """,
+                    (
+                        container_id,
+                        container_type,
+                        metadata.get("filename"),
+                        metadata.get("size", 0),
+                        metadata.get("agent_id"),
+                        metadata.get("source"),
+                        metadata.get("project"),
+                        ContainerStatus.SUBMITTED,
+                        metadata.get("expiration"),
+                        str(staged_path),
+                        json.dumps(metadata, default=str),
+                        JOB_HOST,
+                    ),
+                )
+                conn.commit()
+
+        logger.info("Queued container job", container_id=container_id, container_type=container_type)
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """Requeue jobs interrupted on this host and start the job workers"""
+        if self.running:
+            logger.warning("Container job engine is already running")
+            return
+
+        requeued = self._requeue_interrupted_jobs()
+        if requeued:
+            logger.info("Requeued interrupted container jobs", count=requeued)
+
+        self.running = True
+        self._workers = [
+            threading.Thread(target=self._work, name=f"ContainerJobWorker-{i}", daemon=True)
+            for i in range(self.num_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+        logger.info("Container job engine started", workers=self.num_workers, host=JOB_HOST)
+
+    def stop(self) -> None:
+        """Stop claiming jobs. Jobs still running are resumed from their checkpoint on the next start."""
+        if not self.running:
+            return
+
+        self.running = False
+        self._wakeup.set()
+        for worker in self._workers:
+            worker.join(timeout=5)
+        self._workers = []
+
+        logger.info("Container job engine stopped", interrupted_jobs=len(self.active_jobs))
+
+    def get_status(self) -> dict[str, Any]:
+        """Get job engine status information"""
+        return {
+            "running": self.running,
+            "workers": self.num_workers,
+            "active_jobs": sorted(self.active_jobs),
+        }
+
+    def _work(self) -> None:
+        while self.running:
+            try:
+                job = self._claim_next_job()
+            except Exception as e:
+                logger.exception(f"Error claiming container job: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            self._run_job(*job)
+
+    def _run_job(self, container_id: str, staged_path: str, metadata: dict[str, Any], checkpoint: int) -> None:
+        file_path = Path(staged_path)
+        with self._jobs_lock:
+            self.active_jobs.add(container_id)
+
+        error = None
+        try:
+            if not file_path.exists():
+                raise FileNotFoundError(f"Staged container file no longer exists: {file_path}")
+
+            result = self.processor.process_container_from_path(
+                container_id, file_path, metadata, resume_from=checkpoint
+            )
+            logger.info("Container job completed", container_id=container_id, result=result)
+        except Exception as e:
+            logger.exception(f"Container job failed: {e}", container_id=container_id)
+            error = str(e)
+        finally:
+            with self._jobs_lock:
+                self.active_jobs.discard(container_id)
+
+        self._finish_job(container_id, error)
+        try:
+            file_path.unlink(missing_ok=True)
+        except Exception as e:
+            logger.warning(f"Error cleaning up staged container {file_path}: {e}")
+
+    def _claim_next_job(self) -> tuple[str, str, dict[str, Any], int] | None:
+        with psycopg.connect(self.processor.postgres_connection_string) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE container_processing
+                    SET status = %s
+                    WHERE container_id = (
+                        SELECT container_id
+                        FROM container_processing
+                        WHERE status = %s AND job_host = %s AND staged_path IS NOT NULL
+                        ORDER BY submitted_at
+                        LIMIT 1
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING container_id, staged_path, job_metadata, checkpoint_files
+                """,
+                    (ContainerStatus.PROCESSING, ContainerStatus.SUBMITTED, JOB_HOST),
+                )
+                row = cur.fetchone()
+                conn.commit()
+
+        if row is None:
+            return None
+        container_id, staged_path, metadata, checkpoint = row
+        return str(container_id), staged_path, metadata, checkpoint or 0
+
+    def _requeue_interrupted_jobs(self) -> int:
+        with psycopg.connect(self.processor.postgres_connection_string) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE container_processing
+                    SET status = %s
+                    WHERE status IN (%s, %s) AND job_host = %s AND staged_path IS NOT NULL
+                """,
+                    (ContainerStatus.SUBMITTED, ContainerStatus.PROCESSING, ContainerStatus.EXTRACTING, JOB_HOST),
+                )
+                requeued = cur.rowcount
+                conn.commit()
+        return requeued
+
+    def _finish_job(self, container_id: str, error: str | None) -> None:
+        """Release the staged file of a job and record its failure, if any"""
+        try:
+            with psycopg.connect(self.processor.postgres_connection_string) as conn:
+                with conn.cursor() as cur:
+                    if error is None:
+                        cur.execute(
+                            "UPDATE container_processing SET staged_path = NULL WHERE container_id = %s",
+                            (container_id,),
+                        )
+                    else:
+                        cur.execute(
+                            """
+                            UPDATE container_processing
+                            SET staged_path = NULL, status = %s, error_message = %s, processing_completed_at = NOW()
+                            WHERE container_id = %s
+                        """,
+                            (ContainerStatus.FAILED, error, container_id),
+                        )
+                    conn.commit()
+        except Exception as e:
+            logger.error(f"Error finishing container job: {e}", container_id=container_id)
+
+
+# Global job engine instance
+_engine_instance: ContainerJobEngine | None = None
+
+
+def get_job_engine(processor: LargeContainerProcessor | None = None) -> ContainerJobEngine:
+    """Get the global job engine instance"""
+    global _engine_instance
+    if _engine_instance is None:
+        _engine_instance = ContainerJobEngine(processor or LargeContainerProcessor())
+    return _engine_instance
+
+
+async def start_job_engine():
+    """Start the container job engine"""
+    await asyncio.get_event_loop().run_in_executor(None, get_job_engine().start)
+
+
+async def stop_job_engine():
+    """Stop the container job engine"""
+    await asyncio.get_event_loop().run_in_executor(None, get_job_engine().stop)
@@ -1,14 +1,18 @@
 import json
 import os
+import queue
 import re
-import tempfile
+import threading
+import time
 import zipfile
+from collections.abc import Callable
 from datetime import UTC, datetime, timedelta
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO
 
 import psycopg
 import pytsk3
+import requests
 from common.db import get_postgres_connection_str
 from common.logger import get_logger
 from common.models import File as FileModel
@@ -26,6 +30,16 @@ DAPR_STORE_NAME = "container_processing"
 MOUNTED_CONTAINER_PATH = os.getenv("MOUNTED_CONTAINER_PATH", "/mounted-containers/")
 DEFAULT_EXPIRATION_DAYS = int(os.getenv("DEFAULT_EXPIRATION_DAYS", 100))
 
+# Extracted files are streamed to storage by a pool of uploaders fed through a bounded queue
+CONTAINER_UPLOAD_WORKERS = int(os.getenv("CONTAINER_UPLOAD_WORKERS", 8))
+CONTAINER_UPLOAD_QUEUE_DEPTH = int(os.getenv("CONTAINER_UPLOAD_QUEUE_DEPTH", 64))
+CONTAINER_PUBLISH_BATCH_SIZE = int(os.getenv("CONTAINER_PUBLISH_BATCH_SIZE", 100))
+
+# Seconds between persisted extraction checkpoints, which let an interrupted container job resume
+CONTAINER_CHECKPOINT_INTERVAL = float(os.getenv("CONTAINER_CHECKPOINT_INTERVAL", 5))
+
+DAPR_PORT = os.getenv("DAPR_HTTP_PORT", 3500)
+
 
 class ContainerStatus:
     """Container processing status enumeration"""
@@ -45,6 +59,18 @@ class ContainerType:
     DD_IMAGE = "dd_image"
 
 
+def stage_throughput(files: int, size: int, elapsed_seconds: float) -> dict[str, float]:
+    """Files/s and bytes/s for a processing stage that handled `files` files of `size` bytes"""
+    elapsed_seconds = max(elapsed_seconds, 0.0)
+    return {
+        "files": files,
+        "bytes": size,
+        "elapsed_seconds": round(elapsed_seconds, 2),
+        "files_per_second": round(files / elapsed_seconds, 2) if elapsed_seconds > 0 else 0.0,
+        "bytes_per_second": round(size / elapsed_seconds, 2) if elapsed_seconds > 0 else 0.0,
+    }
+
+
 class ContainerProgress:
     """In-memory progress tracking for container processing"""
 
@@ -74,6 +100,14 @@ class ContainerProgress:
         """Get current progress for a container"""
         return self._progress.get(container_id)
 
+    def get_throughput(self, container_id: str) -> dict[str, float] | None:
+        """Get the extraction throughput of a container since its tracking was initialized"""
+        progress = self._progress.get(container_id)
+        if not progress:
+            return None
+        elapsed = (datetime.now() - progress["started_at"]).total_seconds()
+        return stage_throughput(progress["processed_files"], progress["processed_bytes"], elapsed)
+
     def cleanup(self, container_id: str):
         """Clean up progress tracking for completed container"""
         self._progress.pop(container_id, None)
@@ -100,6 +134,11 @@ class BaseContainerExtractor:
         self.file_filter = FilePathFilter()
         self.filter_stats = {"files_processed": 0, "files_skipped_by_filter": 0, "files_skipped_by_error": 0}
 
+        # Members (in extraction order) already published by an interrupted earlier run of this container
+        self.resume_from = 0
+        # Called with the number of leading members that are fully handled, every CONTAINER_CHECKPOINT_INTERVAL
+        self.checkpoint_callback: Callable[[int], None] | None = None
+
     def set_container_info(self, container_id: str, file_metadata: dict[str, Any]):
         """Set container processing information"""
         self.container_id = container_id
@@ -150,8 +189,7 @@ class BaseContainerExtractor:
 
         return should_include
 
-    def publish_file_message(self, temp_file_path: str, object_id: str, real_path: str):
-        """Publish file message to the message bus"""
+    def _build_file_message(self, object_id: str, real_path: str) -> str:
         if self.file_metadata is None or self.container_id is None:
             raise RuntimeError("container_id and file_metadata must be set via set_container_info before publishing")
         file_message = FileModel(
@@ -166,25 +204,59 @@ class BaseContainerExtractor:
             nesting_level=(self.file_metadata.get("nesting_level", 0) + 1),
             originating_container_id=self.container_id,
         )
+        return json.dumps(file_message.model_dump(exclude_unset=True, mode="json"))
 
-        data = json.dumps(file_message.model_dump(exclude_unset=True, mode="json"))
-        self.dapr_client.publish_event(
-            pubsub_name=FILES_PUBSUB,
-            topic_name=FILES_NEW_FILE_TOPIC,
-            data=data,
-            data_content_type="application/json",
-        )
+    def publish_file_messages(self, uploaded: list[tuple[str, str, int]]) -> None:
+        """Publish new_file messages for a batch of uploaded files.
+
+        Uses Dapr's bulk publish API, falling back to one publish per message for the
+        entries the bulk call did not deliver.
+
+        Args:
+            uploaded: (object_id, real_path, file_size) for each uploaded file
+        """
+        if self.container_id is None:
+            raise RuntimeError("container_id must be set via set_container_info before publishing")
+
+        messages = {
+            str(i): self._build_file_message(object_id, real_path)
+            for i, (object_id, real_path, _) in enumerate(uploaded)
+        }
+        failed_ids = set(messages)
+        try:
+            response = requests.post(
+                f"http://localhost:{DAPR_PORT}/v1.0-alpha1/publish/bulk/{FILES_PUBSUB}/{FILES_NEW_FILE_TOPIC}",
+                json=[
+                    {"entryId": entry_id, "event": json.loads(data), "contentType": "application/json"}
+                    for entry_id, data in messages.items()
+                ],
+                timeout=60,
+            )
+            if response.ok:
+                failed_ids = set()
+            else:
+                failed_ids = {entry["entryId"] for entry in response.json().get("failedEntries", [])} or failed_ids
+        except Exception as e:
+            logger.warning(f"Bulk publish failed, publishing individually: {e}", container_id=self.container_id)
+
+        for entry_id in failed_ids:
+            self.dapr_client.publish_event(
+                pubsub_name=FILES_PUBSUB,
+                topic_name=FILES_NEW_FILE_TOPIC,
+                data=messages[entry_id],
+                data_content_type="application/json",
+            )
 
         # Update progress and stats
-        file_size = os.path.getsize(temp_file_path)
-        self.progress_tracker.update_file_progress(self.container_id, os.path.basename(real_path), file_size)
-        self.filter_stats["files_processed"] += 1
+        for _, real_path, file_size in uploaded:
+            self.progress_tracker.update_file_progress(self.container_id, os.path.basename(real_path), file_size)
+        self.filter_stats["files_processed"] += len(uploaded)
 
         logger.info(
-            "Published file message for extracted file",
+            "Published file messages for extracted files",
             container_id=self.container_id,
-            object_id=object_id,
-            path=real_path,
+            count=len(uploaded),
+            individually_published=len(failed_ids),
         )
 
     def get_processing_stats(self) -> dict:
@@ -203,6 +275,157 @@ class BaseContainerExtractor:
         raise NotImplementedError("Subclasses must implement estimate_container_contents")
 
 
+class ContainerUploadPipeline:
+    """
+    Bounded producer/consumer pipeline that streams extracted files into storage.
+
+    The extractor (producer) submits members with a callable that opens a stream over
+    the member's contents. `num_uploaders` threads stream each member straight into an
+    S3 (multipart) upload, and a single publisher thread batches the new_file events.
+    `submit` blocks while `queue_depth` members are waiting for an uploader, so a slow
+    object store throttles extraction instead of letting it run ahead.
+
+    Members are numbered in submission order. The publisher tracks the watermark below
+    which every member has been published (or failed) and periodically hands it to the
+    extractor's `checkpoint_callback`; a resumed run skips the members below the
+    extractor's `resume_from`. Members published after the last checkpoint are
+    published again on resume, so delivery is at-least-once.
+    """
+
+    _DONE = object()
+    # Stands in for the object ID of members that were published before the job was interrupted
+    _RESUMED = object()
+
+    def __init__(
+        self,
+        extractor: BaseContainerExtractor,
+        num_uploaders: int = CONTAINER_UPLOAD_WORKERS,
+        queue_depth: int = CONTAINER_UPLOAD_QUEUE_DEPTH,
+        publish_batch_size: int = CONTAINER_PUBLISH_BATCH_SIZE,
+        checkpoint_interval: float = CONTAINER_CHECKPOINT_INTERVAL,
+    ):
+        self.extractor = extractor
+        self.publish_batch_size = publish_batch_size
+        self.checkpoint_interval = checkpoint_interval
+        self.processed_count = 0
+        self.watermark = 0
+
+        self._next_index = 0
+        self._completed: set[int] = set()
+        self._last_checkpoint = time.monotonic()
+
+        self._upload_queue: queue.Queue = queue.Queue(maxsize=max(1, queue_depth))
+        self._publish_queue: queue.Queue = queue.Queue()
+        self._error_lock = threading.Lock()
+
+        self._uploaders = [
+            threading.Thread(target=self._upload_loop, name=f"container-uploader-{i}", daemon=True)
+            for i in range(max(1, num_uploaders))
+        ]
+        self._publisher = threading.Thread(target=self._publish_loop, name="container-publisher", daemon=True)
+
+    def __enter__(self) -> "ContainerUploadPipeline":
+        for thread in self._uploaders:
+            thread.start()
+        self._publisher.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        for _ in self._uploaders:
+            self._upload_queue.put(self._DONE)
+        for thread in self._uploaders:
+            thread.join()
+
+        self._publish_queue.put(self._DONE)
+        self._publisher.join()
+
+    def submit(self, real_path: str, file_size: int, open_stream: Callable[[], BinaryIO]) -> None:
+        """Queue a member for upload, blocking while the upload queue is full."""
+        index = self._next_index
+        self._next_index += 1
+
+        if index < self.extractor.resume_from:
+            self._publish_queue.put((index, self._RESUMED, real_path, file_size))
+        else:
+            self._upload_queue.put((index, real_path, file_size, open_stream))
+
+    def _record_error(self, real_path: str, error: Exception) -> None:
+        logger.warning(f"Error processing file {real_path}: {error}")
+        with self._error_lock:
+            self.extractor.filter_stats["files_skipped_by_error"] += 1
+
+    def _upload_loop(self) -> None:
+        while (item := self._upload_queue.get()) is not self._DONE:
+            index, real_path, file_size, open_stream = item
+            object_id = None
+            try:
+                with open_stream() as stream:
+                    object_id = str(self.extractor.storage.upload_stream(stream, file_size))
+            except Exception as e:
+                self._record_error(real_path, e)
+            self._publish_queue.put((index, object_id, real_path, file_size))
+
+    def _publish_loop(self) -> None:
+        batch: list[tuple[int, str, str, int]] = []
+        done = False
+        while not done:
+            try:
+                # Publish a partial batch whenever uploads pause for a moment
+                item = self._publish_queue.get(timeout=0.5 if batch else None)
+            except queue.Empty:
+                item = None
+
+            if item is self._DONE:
+                done = True
+            elif item is not None:
+                index, object_id, real_path, file_size = item
+                if object_id is self._RESUMED:
+                    self._record_resumed(index, real_path, file_size)
+                elif object_id is None:
+                    # Upload failed, the error is already recorded
+                    self._complete([index])
+                else:
+                    batch.append(item)
+
+            if batch and (done or item is None or len(batch) >= self.publish_batch_size):
+                self._publish(batch)
+                batch = []
+
+    def _publish(self, batch: list[tuple[int, str, str, int]]) -> None:
+        try:
+            self.extractor.publish_file_messages([(object_id, path, size) for _, object_id, path, size in batch])
+            self.processed_count += len(batch)
+        except Exception as e:
+            for _, _, real_path, _ in batch:
+                self._record_error(real_path, e)
+        self._complete([index for index, _, _, _ in batch])
+
+    def _record_resumed(self, index: int, real_path: str, file_size: int) -> None:
+        if self.extractor.container_id is not None:
+            self.extractor.progress_tracker.update_file_progress(
+                self.extractor.container_id, os.path.basename(real_path), file_size
+            )
+        self.extractor.filter_stats["files_processed"] += 1
+        self.processed_count += 1
+        self._complete([index])
+
+    def _complete(self, indices: list[int]) -> None:
+        """Mark members as handled, advance the watermark and checkpoint it when due."""
+        self._completed.update(indices)
+        while self.watermark in self._completed:
+            self._completed.remove(self.watermark)
+            self.watermark += 1
+
+        callback = self.extractor.checkpoint_callback
+        if callback is None or time.monotonic() - self._last_checkpoint < self.checkpoint_interval:
+            return
+        self._last_checkpoint = time.monotonic()
+        try:
+            callback(self.watermark)
+        except Exception as e:
+            logger.warning(f"Error saving container checkpoint: {e}", container_id=self.extractor.container_id)
+
+
 class FilePathFilter:
     """Handles file path filtering with glob and regex patterns"""
 
@@ -369,13 +592,23 @@ class ZipContainerExtractor(BaseContainerExtractor):
             return 0, 0
 
     def extract_and_process(self, container_file_path: Path) -> int:
-        """Extract ZIP file and process each file individually with filtering"""
+        """Stream each ZIP member into storage through the upload pipeline, with filtering"""
         if self.file_metadata is None:
             raise RuntimeError("file_metadata must be set via set_container_info before extraction")
-        processed_count = 0
+        base_dir = os.path.dirname(self.file_metadata["path"])
+
+        # ZipFile objects are not safe to read from several threads; give each uploader its own
+        local = threading.local()
+        uploader_zip_refs: list[zipfile.ZipFile] = []
+
+        def open_member(info: zipfile.ZipInfo) -> BinaryIO:
+            if not hasattr(local, "zip_ref"):
+                local.zip_ref = zipfile.ZipFile(container_file_path, "r")
+                uploader_zip_refs.append(local.zip_ref)
+            return local.zip_ref.open(info)
 
         try:
-            with zipfile.ZipFile(container_file_path, "r") as zip_ref:
+            with zipfile.ZipFile(container_file_path, "r") as zip_ref, ContainerUploadPipeline(self) as pipeline:
                 for info in zip_ref.infolist():
                     if info.is_dir():
                         continue
@@ -395,40 +628,21 @@ class ZipContainerExtractor(BaseContainerExtractor):
                     if not self.should_process_file(info.filename):
                         continue  # Skip this file due to filter
 
-                    try:
-                        # Extract single file to temporary location
-                        with tempfile.NamedTemporaryFile(delete=False) as temp_extracted:
-                            temp_extracted.write(zip_ref.read(info))
-                            temp_extracted.flush()
-
-                            # Upload to storage
-                            object_id = self.storage.upload_file(temp_extracted.name)
-
-                            # Calculate real path
-                            base_dir = os.path.dirname(self.file_metadata["path"])
-                            real_path = os.path.join(base_dir, info.filename).removeprefix(MOUNTED_CONTAINER_PATH)
-
-                            # Publish file message
-                            self.publish_file_message(temp_extracted.name, str(object_id), real_path)
-                            processed_count += 1
-
-                    except Exception as e:
-                        logger.warning(f"Error processing file {info.filename}: {e}")
-                        self.filter_stats["files_skipped_by_error"] += 1
-                    finally:
-                        # Clean up temporary file
-                        if "temp_extracted" in locals() and os.path.exists(temp_extracted.name):
-                            os.unlink(temp_extracted.name)
+                    real_path = os.path.join(base_dir, info.filename).removeprefix(MOUNTED_CONTAINER_PATH)
+                    pipeline.submit(real_path, info.file_size, lambda info=info: open_member(info))
 
         except Exception as e:
             logger.exception(f"Error extracting ZIP file: {e}")
             raise
+        finally:
+            for uploader_zip_ref in uploader_zip_refs:
+                uploader_zip_ref.close()
 
         # Log final statistics
         stats = self.get_processing_stats()
         logger.info("Container extraction completed", container_id=self.container_id, stats=stats)
 
-        return processed_count
+        return pipeline.processed_count
 
 
 class DDImageContainerExtractor(BaseContainerExtractor):
@@ -552,17 +766,20 @@ class DDImageContainerExtractor(BaseContainerExtractor):
         return processed_count
 
     def _process_filesystem(self, fs_info: pytsk3.FS_Info, img_info: pytsk3.Img_Info) -> int:
-        """Process files from a parsed filesystem"""
+        """Stream files from a parsed filesystem into storage through the upload pipeline"""
         if self.file_metadata is None:
             raise RuntimeError("file_metadata must be set via set_container_info before processing")
-        file_metadata = self.file_metadata
-        processed_count = 0
+        base_dir = os.path.dirname(self.file_metadata["path"])
+
+        # The TSK handles are shared by the walker and all uploaders, so serialize access to them
+        tsk_lock = threading.Lock()
 
-        def process_directory(directory, path=""):
-            """Recursively process files in directory"""
-            nonlocal processed_count
+        def process_directory(directory, pipeline: ContainerUploadPipeline, path=""):
+            """Recursively submit files in directory"""
+            with tsk_lock:
+                entries = list(directory)
 
-            for entry in directory:
+            for entry in entries:
                 # Skip . and .. entries
                 if entry.info.name.name in [b".", b".."]:
                     continue
@@ -579,8 +796,9 @@ class DDImageContainerExtractor(BaseContainerExtractor):
                     # If it's a directory, recurse
                     if entry.info.meta.type == pytsk3.TSK_FS_META_TYPE_DIR:
                         try:
-                            sub_directory = entry.as_directory()
-                            process_directory(sub_directory, file_path)
+                            with tsk_lock:
+                                sub_directory = entry.as_directory()
+                            process_directory(sub_directory, pipeline, file_path)
                         except Exception as e:
                             logger.debug(f"Could not access directory {file_path}: {e}")
 
@@ -602,49 +820,59 @@ class DDImageContainerExtractor(BaseContainerExtractor):
                             continue
 
                         # Skip empty files
-                        if entry.info.meta.size == 0:
+                        file_size = entry.info.meta.size
+                        if file_size == 0:
                             logger.debug(f"Skipping empty file: {file_path}")
                             continue
 
-                        try:
-                            # Read file content
-                            file_content = entry.read_random(0, entry.info.meta.size)
+                        real_path = os.path.join(base_dir, file_path).removeprefix(MOUNTED_CONTAINER_PATH)
+                        pipeline.submit(
+                            real_path,
+                            file_size,
+                            lambda entry=entry, file_size=file_size: TskFileReader(entry, file_size, tsk_lock),
+                        )
 
-                            # Save to temporary file and upload
-                            with tempfile.NamedTemporaryFile(delete=False) as temp_extracted:
-                                temp_extracted.write(file_content)
-                                temp_extracted.flush()
+                except Exception as e:
+                    logger.warning(f"Error processing entry: {e}")
+                    self.filter_stats["files_skipped_by_error"] += 1
 
-                                # Upload to storage
-                                object_id = self.storage.upload_file(temp_extracted.name)
+        # Start processing from root
+        with ContainerUploadPipeline(self) as pipeline:
+            try:
+                with tsk_lock:
+                    root_dir = fs_info.open_dir(path="/")
+                process_directory(root_dir, pipeline)
+            except Exception as e:
+                logger.error(f"Error opening root directory: {e}")
 
-                                # Calculate real path
-                                base_dir = os.path.dirname(file_metadata["path"])
-                                real_path = os.path.join(base_dir, file_path).removeprefix(MOUNTED_CONTAINER_PATH)
+        return pipeline.processed_count
 
-                                # Publish file message
-                                self.publish_file_message(temp_extracted.name, str(object_id), real_path)
-                                processed_count += 1
 
-                                # Clean up temporary file
-                                os.unlink(temp_extracted.name)
+class TskFileReader:
+    """Read-only file object over a TSK file entry, for streaming it into storage"""
 
-                        except Exception as e:
-                            logger.warning(f"Error processing file {file_path}: {e}")
-                            self.filter_stats["files_skipped_by_error"] += 1
+    def __init__(self, entry, size: int, lock: threading.Lock):
+        self.entry = entry
+        self.size = size
+        self.lock = lock
+        self.offset = 0
 
-                except Exception as e:
-                    logger.warning(f"Error processing entry: {e}")
-                    self.filter_stats["files_skipped_by_error"] += 1
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.size - self.offset:
+            size = self.size - self.offset
+        if size <= 0:
+            return b""
 
-        # Start processing from root
-        try:
-            root_dir = fs_info.open_dir(path="/")
-            process_directory(root_dir)
-        except Exception as e:
-            logger.error(f"Error opening root directory: {e}")
+        with self.lock:
+            data = self.entry.read_random(self.offset, size)
+        self.offset += len(data)
+        return data
 
-        return processed_count
+    def __enter__(self) -> "TskFileReader":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
 
 
 class LargeContainerProcessor:
@@ -669,7 +897,7 @@ class LargeContainerProcessor:
         estimated_files: int,
         estimated_size: int,
     ) -> None:
-        """Create initial container processing record in database"""
+        """Create the container processing record, or start the record of a queued container job"""
         try:
             with psycopg.connect(self.postgres_connection_string) as conn:
                 with conn.cursor() as cur:
@@ -680,6 +908,13 @@ class LargeContainerProcessor:
                             agent_id, source, project, status, workflows_total,
                             processing_started_at, expiration
                         ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                        ON CONFLICT (container_id) DO UPDATE
+                        SET status = EXCLUDED.status,
+                            workflows_total = EXCLUDED.workflows_total,
+                            expiration = EXCLUDED.expiration,
+                            processing_started_at = COALESCE(
+                                container_processing.processing_started_at, EXCLUDED.processing_started_at
+                            )
                     """,
                         (
                             container_id,
@@ -754,10 +989,17 @@ class LargeContainerProcessor:
                         UPDATE container_processing
                         SET total_files_extracted = %s,
                             total_bytes_extracted = %s,
-                            status = %s
+                            status = %s,
+                            extraction_completed_at = %s
                         WHERE container_id = %s
                     """,
-                        (total_files_extracted, total_bytes_extracted, ContainerStatus.EXTRACTED, container_id),
+                        (
+                            total_files_extracted,
+                            total_bytes_extracted,
+                            ContainerStatus.EXTRACTED,
+                            datetime.now(),
+                            container_id,
+                        ),
                     )
                     rows_affected = cur.rowcount
                     conn.commit()
@@ -806,6 +1048,38 @@ class LargeContainerProcessor:
                 bytes=total_bytes_extracted,
             )
 
+    def update_container_checkpoint(self, container_id: str, checkpoint_files: int) -> None:
+        """Persist an extraction checkpoint along with the extraction progress so far
+
+        Args:
+            container_id: Container UUID
+            checkpoint_files: Number of leading members (in extraction order) that are fully handled
+        """
+        progress = self.progress_tracker.get_progress(container_id) or {}
+        try:
+            with psycopg.connect(self.postgres_connection_string) as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        UPDATE container_processing
+                        SET checkpoint_files = %s,
+                            total_files_extracted = %s,
+                            total_bytes_extracted = %s
+                        WHERE container_id = %s
+                    """,
+                        (
+                            checkpoint_files,
+                            progress.get("processed_files", 0),
+                            progress.get("processed_bytes", 0),
+                            container_id,
+                        ),
+                    )
+                    conn.commit()
+
+            logger.debug("Saved container checkpoint", container_id=container_id, checkpoint_files=checkpoint_files)
+        except Exception as e:
+            logger.error(f"Error saving container checkpoint: {e}", container_id=container_id)
+
     def update_container_workflow_progress(
         self, container_id: str, file_size: int = 0, increment_completed: bool = False, increment_failed: bool = False
     ) -> bool:
@@ -886,7 +1160,8 @@ class LargeContainerProcessor:
                         """
                         SELECT container_id, container_type, status, total_files_extracted,
                                total_bytes_extracted, total_bytes_processed, workflows_completed,
-                               workflows_failed, workflows_total, processing_started_at, processing_completed_at
+                               workflows_failed, workflows_total, processing_started_at, processing_completed_at,
+                               extraction_completed_at, error_message
                         FROM container_processing
                         WHERE container_id = %s
                     """,
@@ -907,6 +1182,8 @@ class LargeContainerProcessor:
                             "workflows_total": row[8],
                             "processing_started_at": row[9].isoformat() if row[9] else None,
                             "processing_completed_at": row[10].isoformat() if row[10] else None,
+                            "extraction_completed_at": row[11].isoformat() if row[11] else None,
+                            "error_message": row[12],
                         }
                     return None
         except Exception as e:
@@ -951,8 +1228,17 @@ class LargeContainerProcessor:
 
         return None
 
-    def process_container_from_path(self, container_id: str, file_path: Path, metadata: dict) -> dict[str, Any]:
-        """Process a container file from a filesystem path."""
+    def process_container_from_path(
+        self, container_id: str, file_path: Path, metadata: dict, resume_from: int = 0
+    ) -> dict[str, Any]:
+        """Process a container file from a filesystem path.
+
+        Args:
+            container_id: Container UUID
+            file_path: Path of the container file
+            metadata: File metadata applied to every extracted file
+            resume_from: Checkpoint of an interrupted earlier run; members before it are not extracted again
+        """
         try:
             # Detect container type
             container_type = self.detect_container_type(metadata.get("filename", file_path.name), file_path)
@@ -967,6 +1253,10 @@ class LargeContainerProcessor:
             with DaprClient() as dapr_client:
                 extractor = extractor_class(self.storage, dapr_client, self.progress_tracker)
                 extractor.set_container_info(container_id, metadata)
+                extractor.resume_from = resume_from
+                extractor.checkpoint_callback = lambda watermark: self.update_container_checkpoint(
+                    container_id, watermark
+                )
 
                 # Estimate contents for progress tracking and create database record
                 file_count, total_size = extractor.estimate_container_contents(file_path)
@@ -981,6 +1271,9 @@ class LargeContainerProcessor:
                 # Store container info for tracking
                 self.progress_tracker.set_container_info(container_id, {"container_id": container_id})
 
+                if resume_from:
+                    logger.info("Resuming container extraction", container_id=container_id, checkpoint=resume_from)
+
                 # Update status to EXTRACTING before starting extraction
                 self.update_container_status(container_id, ContainerStatus.EXTRACTING)
 
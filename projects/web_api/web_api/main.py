@@ -3,6 +3,7 @@ import fcntl
 import json
 import ntpath
 import os
+import shutil
 import urllib.parse
 import uuid
 from contextlib import asynccontextmanager
@@ -44,10 +45,12 @@ from psycopg import Connection
 from psycopg.rows import TupleRow
 from psycopg_pool import ConnectionPool
 from pydantic import ValidationError
+from web_api.container_jobs import TEMP_CONTAINER_PATH, get_job_engine, start_job_engine, stop_job_engine
 from web_api.container_monitor import get_monitor, start_monitor, stop_monitor
-from web_api.large_containers import LargeContainerProcessor
+from web_api.large_containers import ContainerStatus, LargeContainerProcessor, stage_throughput
 from web_api.models.requests import ChatbotRequest, CleanupRequest, EnrichmentRequest
 from web_api.models.responses import (
+    ContainerStageThroughput,
     ContainerStatusResponse,
     ContainerSubmissionResponse,
     EnrichmentResponse,
@@ -81,7 +84,7 @@ async def lifespan(app: FastAPI):
     # Startup
     try:
         # Try to acquire exclusive lock for container monitoring
-        # This ensures only one worker process handles container monitoring
+        # This ensures only one worker process handles container monitoring and container jobs
         lock_path = "/tmp/nemesis_container_monitor.lock"
         lock_file = open(lock_path, "w")
         fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
@@ -91,6 +94,8 @@ async def lifespan(app: FastAPI):
         monitor_started = True
         logger.info("Container monitor started successfully (acquired lock)")
 
+        await start_job_engine()
+
     except OSError:
         # Lock is held by another process
         logger.info("Container monitor already running in another worker")
@@ -108,6 +113,7 @@ async def lifespan(app: FastAPI):
     # Shutdown
     try:
         if monitor_started:
+            await stop_job_engine()
             await stop_monitor()
             logger.info("Container monitor stopped successfully")
         if lock_file:
@@ -160,8 +166,9 @@ storage = StorageS3()
 DOWNLOAD_SIZE_LIMIT_MB = 500
 default_expiration_days = int(os.getenv("DEFAULT_EXPIRATION_DAYS", 100))
 
-# Initialize container processor
+# Initialize container processor and the engine that runs submitted containers in the background
 container_processor = LargeContainerProcessor()
+container_job_engine = get_job_engine(container_processor)
 
 # Initialize Dapr app for pub/sub
 dapr_app = DaprApp(app)
@@ -421,65 +428,97 @@ async def submit_container(
         # Generate container ID
         container_id = str(uuid.uuid4())
 
-        # Save uploaded file to temporary location
-        temp_dir = os.getenv("TEMP_CONTAINER_PATH", "/tmp/containers")
-        os.makedirs(temp_dir, exist_ok=True)
-
-        temp_file_path = os.path.join(temp_dir, f"{container_id}_{file.filename}")
+        # Stage the upload for the background container job
+        os.makedirs(TEMP_CONTAINER_PATH, exist_ok=True)
+        temp_file_path = PathLib(TEMP_CONTAINER_PATH) / f"{container_id}_{file.filename}"
 
-        with open(temp_file_path, "wb") as temp_file:
+        def stage_upload() -> None:
             file.file.seek(0)
-            while chunk := file.file.read(8192):  # Read in 8KB chunks
-                temp_file.write(chunk)
+            with open(temp_file_path, "wb") as temp_file:
+                shutil.copyfileobj(file.file, temp_file, 1024 * 1024)
+
+        await asyncio.to_thread(stage_upload)
 
         try:
+            container_type = container_processor.detect_container_type(file.filename or "", temp_file_path)
+            if not container_type:
+                raise HTTPException(status_code=400, detail="Unsupported container type")
+
             # Prepare file metadata for processing
-            processing_metadata = file_metadata.model_dump()
+            processing_metadata = file_metadata.model_dump(mode="json")
             processing_metadata["filename"] = file.filename
             processing_metadata["content_type"] = file.content_type
             processing_metadata["size"] = file.size
 
-            # Process the container from file path
-            result = container_processor.process_container_from_path(
-                container_id, PathLib(temp_file_path), processing_metadata
-            )
-
-            logger.info("Container extraction + file submission completed", container_id=container_id, result=result)
-
-            response = ContainerSubmissionResponse(
-                container_id=container_id,
-                message="Files extracted from container and processing initiated",
-                estimated_files=result["estimated_files"],
-                estimated_size=result["estimated_size"],
+            await asyncio.to_thread(
+                container_job_engine.submit, container_id, temp_file_path, container_type, processing_metadata
             )
-
-            # Add filter configuration to response if filters were used
-            if file_metadata.file_filters:
-                filter_config = {
-                    "pattern_type": file_metadata.file_filters.pattern_type,
-                    "include_patterns": file_metadata.file_filters.include or [],
-                    "exclude_patterns": file_metadata.file_filters.exclude or [],
-                    "filters_enabled": True,
-                }
-                response.filter_config = filter_config
-
-            return response
-
-        finally:
-            # Clean up temporary file
+        except Exception:
+            # The job owns the staged file once it is queued, until then it's ours to clean up
             try:
                 os.unlink(temp_file_path)
             except Exception as cleanup_error:
                 logger.warning(f"Error cleaning up temporary file {temp_file_path}: {cleanup_error}")
+            raise
+
+        response = ContainerSubmissionResponse(
+            container_id=container_id,
+            message="Container queued for extraction, poll /containers/{container_id}/status for progress",
+        )
+
+        # Add filter configuration to response if filters were used
+        if file_metadata.file_filters:
+            filter_config = {
+                "pattern_type": file_metadata.file_filters.pattern_type,
+                "include_patterns": file_metadata.file_filters.include or [],
+                "exclude_patterns": file_metadata.file_filters.exclude or [],
+                "filters_enabled": True,
+            }
+            response.filter_config = filter_config
+
+        return response
 
     except ValidationError as e:
         logger.error("Validation error in container metadata", errors=e.errors())
         raise HTTPException(status_code=400, detail=e.errors()) from e
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception(message="Error processing container submission")
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
+def get_container_throughput(container_id: str, db_status: dict) -> dict[str, ContainerStageThroughput] | None:
+    """Files/s and bytes/s of the extraction and enrichment stages of a container"""
+    if not db_status["processing_started_at"]:
+        return None
+
+    started_at = datetime.fromisoformat(db_status["processing_started_at"])
+    now = datetime.now(UTC)
+
+    # The worker running the extraction has live numbers, other workers use the last checkpoint
+    extraction = container_processor.progress_tracker.get_throughput(container_id)
+    if extraction is None or db_status["extraction_completed_at"]:
+        extracted_at = db_status["extraction_completed_at"]
+        extraction = stage_throughput(
+            db_status["total_files_extracted"],
+            db_status["total_bytes_extracted"],
+            ((datetime.fromisoformat(extracted_at) if extracted_at else now) - started_at).total_seconds(),
+        )
+
+    completed_at = db_status["processing_completed_at"]
+    enrichment = stage_throughput(
+        db_status["workflows_completed"] + db_status["workflows_failed"],
+        db_status["total_bytes_processed"],
+        ((datetime.fromisoformat(completed_at) if completed_at else now) - started_at).total_seconds(),
+    )
+
+    return {
+        "extraction": ContainerStageThroughput(**extraction),
+        "enrichment": ContainerStageThroughput(**enrichment),
+    }
+
+
 @app.get(
     "/containers/{container_id}/status",
     response_model=ContainerStatusResponse,
@@ -512,7 +551,7 @@ async def get_container_status(
 
         # Get current_file from in-memory tracking if container is still extracting
         current_file = None
-        if db_status["status"] in ["processing", "extracting"]:
+        if db_status["status"] in [ContainerStatus.PROCESSING, ContainerStatus.EXTRACTING]:
             progress = container_processor.get_container_progress(container_id)
             if progress and "error" not in progress:
                 current_file = progress.get("current_file")
@@ -528,6 +567,8 @@ async def get_container_status(
             total_bytes=db_status["total_bytes_extracted"],
             current_file=current_file,
             started_at=db_status["processing_started_at"],
+            error=db_status["error_message"],
+            throughput=get_container_throughput(container_id, db_status),
         )
 
     except HTTPException:
@@ -89,11 +89,20 @@ class FailedWorkflowsResponse(BaseModel):
 class ContainerSubmissionResponse(BaseModel):
     container_id: str
     message: str
-    estimated_files: int
-    estimated_size: int
+    # Containers are extracted in the background, so estimates are only known once the job has started
+    estimated_files: int | None = None
+    estimated_size: int | None = None
     filter_config: dict | None = None
 
 
+class ContainerStageThroughput(BaseModel):
+    files: int
+    bytes: int
+    elapsed_seconds: float
+    files_per_second: float
+    bytes_per_second: float
+
+
 class ContainerStatusResponse(BaseModel):
     container_id: str
     status: str
@@ -107,6 +116,8 @@ class ContainerStatusResponse(BaseModel):
     started_at: str | None = None
     error: str | None = None
     filter_stats: dict | None = None
+    # Per-stage throughput, keyed by stage ("extraction", "enrichment")
+    throughput: dict[str, ContainerStageThroughput] | None = None
 
 
 class QueueMetrics(BaseModel):